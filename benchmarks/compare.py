@@ -0,0 +1,91 @@
+"""
+Compare a benchmark report against a stored baseline.
+
+Usage:
+    python -m benchmarks.compare BASELINE CURRENT [--threshold 0.2] [--min-seconds 0.005]
+
+Results are matched by name and record count. A result regresses when it is slower than the
+baseline by more than the threshold; results faster than ``--min-seconds`` in the baseline are
+reported but never flagged, since their timings are dominated by noise. The exit status is 1
+if anything regressed, so the check can gate CI.
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List
+
+DEFAULT_THRESHOLD = 0.2
+MIN_SECONDS = 0.005
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = DEFAULT_THRESHOLD,
+            min_seconds: float = MIN_SECONDS) -> List[Dict]:
+    """
+    Matches the results of two reports and computes the relative change of each.
+
+    Args:
+        baseline (Dict): The stored report.
+        current (Dict): The new report.
+        threshold (float): Allowed slowdown, e.g. 0.2 for 20%.
+        min_seconds (float): Baseline runs faster than this are never flagged as regressions.
+
+    Returns:
+        List[Dict]: name, records, baseline and current seconds, change (current / baseline - 1)
+        and regressed, for the results present in both reports.
+    """
+
+    previous = {(result["name"], result["records"]): result for result in baseline["results"]}
+    rows = []
+    for result in current["results"]:
+        old = previous.get((result["name"], result["records"]))
+        if old is None:
+            continue
+        change = result["seconds"] / old["seconds"] - 1 if old["seconds"] else 0.0
+        rows.append({
+            "name": result["name"],
+            "records": result["records"],
+            "baseline": old["seconds"],
+            "current": result["seconds"],
+            "change": change,
+            "regressed": change > threshold and old["seconds"] >= min_seconds,
+        })
+    return rows
+
+
+def print_comparison(rows: List[Dict]) -> None:
+    """
+    Prints a comparison table, marking regressions.
+    """
+
+    for row in rows:
+        mark = "  REGRESSION" if row["regressed"] else ""
+        print(
+            f"{row['name']:<20} {row['records']:>9} records  {row['baseline'] * 1000:>10.2f} ms -> "
+            f"{row['current'] * 1000:>10.2f} ms  {row['change']:>+8.1%}{mark}"
+        )
+    regressions = sum(row["regressed"] for row in rows)
+    print(f"{regressions} regression(s) in {len(rows)} compared result(s).")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare a benchmark report against a baseline.")
+    parser.add_argument("baseline", help="stored JSON report")
+    parser.add_argument("current", help="new JSON report")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed slowdown, 0.2 = 20%%")
+    parser.add_argument("--min-seconds", type=float, default=MIN_SECONDS, help="ignore faster baseline results")
+    args = parser.parse_args()
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+
+    rows = compare(baseline, current, args.threshold, args.min_seconds)
+    print_comparison(rows)
+    if any(row["regressed"] for row in rows):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
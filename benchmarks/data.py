@@ -0,0 +1,157 @@
+"""
+Seeded generator of realistic synthetic contacts and notes for benchmarks.
+
+The same seed always yields the same records. Contacts have unique names and valid phones, and
+most have an email, address and birthday. Note words and tags follow Zipf distributions, so a few
+tags are on many notes and most are rare, as in real use.
+"""
+
+import random
+from datetime import date, timedelta
+from itertools import accumulate
+from typing import List, Sequence
+
+from models.contact import Contact
+from models.note import Note
+
+FIRST_NAMES = [
+    "Olena", "Andrii", "Iryna", "Taras", "Oksana", "Dmytro", "Natalia", "Serhii", "Yulia", "Oleksandr",
+    "Maria", "Ivan", "Kateryna", "Mykola", "Sofia", "Bohdan", "Anna", "Yurii", "Daria", "Maksym",
+    "Emma", "Liam", "Olivia", "Noah", "Ava", "James", "Mia", "Lucas", "Zoë", "José",
+    "Chloé", "Søren", "Ingrid", "Mateo", "Aiko", "Wei", "Priya", "Arjun", "Fatima", "Omar",
+]
+LAST_NAMES = [
+    "Shevchenko", "Kovalenko", "Bondarenko", "Tkachenko", "Kravchenko", "Melnyk", "Boyko", "Kovalchuk",
+    "Oliynyk", "Lysenko", "Marchenko", "Rudenko", "Savchenko", "Petrenko", "Moroz", "Pavlenko",
+    "Smith", "Johnson", "Williams", "Brown", "Garcia", "Müller", "Rossi", "Dubois", "Nowak",
+    "Kowalski", "Novák", "Jensen", "Tanaka", "Chen", "Patel", "Haddad", "O'Brien", "García-López",
+]
+STREETS = ["Main", "Khreshchatyk", "Shevchenka", "Franka", "Park", "Oak", "Lesi Ukrainky", "Sadova", "Lake", "Hill"]
+CITIES = ["Kyiv", "Lviv", "Odesa", "Kharkiv", "Dnipro", "Warsaw", "Berlin", "London", "Toronto", "Vinnytsia"]
+DOMAINS = ["gmail.com", "ukr.net", "outlook.com", "example.com", "i.ua", "proton.me"]
+OPERATOR_CODES = ["50", "63", "66", "67", "68", "73", "93", "95", "96", "97", "98", "99"]
+SYLLABLES = ["ka", "lo", "mi", "ne", "ra", "to", "vi", "su", "de", "po", "li", "an", "er", "on", "ti", "ma"]
+
+BIRTHDAY_START = date(1940, 1, 1)
+BIRTHDAY_DAYS = (date(2010, 12, 31) - BIRTHDAY_START).days
+
+
+def zipf_weights(count: int, exponent: float = 1.1) -> List[float]:
+    """
+    Returns cumulative weights for drawing ranks 0..count-1 with a Zipf distribution.
+
+    Args:
+        count (int): Number of distinct values.
+        exponent (float): The Zipf exponent; larger values concentrate draws on the first ranks.
+
+    Returns:
+        List[float]: Cumulative weights for ``random.Random.choices``.
+    """
+
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def make_vocabulary(count: int, seed: int = 0) -> List[str]:
+    """
+    Returns ``count`` distinct pseudo-words built from syllables.
+    """
+
+    rng = random.Random(seed)
+    words: List[str] = []
+    seen = set()
+    while len(words) < count:
+        word = "".join(rng.choices(SYLLABLES, k=rng.randint(2, 4)))
+        if word not in seen:
+            seen.add(word)
+            words.append(word)
+    return words
+
+
+def generate_contacts(count: int, seed: int = 0) -> List[Contact]:
+    """
+    Generates contacts with unique names.
+
+    About 70% have an email, 50% an address and 80% a birthday between 1940 and 2010 (including
+    February 29ths). Phones are valid 10 to 12 digit numbers in local or international format.
+
+    Args:
+        count (int): Number of contacts.
+        seed (int): The random seed.
+
+    Returns:
+        List[Contact]: The contacts.
+    """
+
+    rng = random.Random(seed)
+    name_counts = {}
+    contacts = []
+    for _ in range(count):
+        first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        base = f"{first} {last}"
+        number = name_counts.get(base, 0) + 1
+        name_counts[base] = number
+        name = base if number == 1 else f"{base} {number}"
+
+        subscriber = f"{rng.randrange(10_000_000):07d}"
+        operator = rng.choice(OPERATOR_CODES)
+        phone = f"+380{operator}{subscriber}" if rng.random() < 0.6 else f"0{operator}{subscriber}"
+
+        email = None
+        if rng.random() < 0.7:
+            local = f"{first}.{last}".lower().replace("'", "").replace(" ", "")
+            email = f"{local}{number if number > 1 else ''}@{rng.choice(DOMAINS)}"
+            if not email.isascii():
+                email = f"user{len(contacts)}@{rng.choice(DOMAINS)}"
+
+        address = None
+        if rng.random() < 0.5:
+            address = f"{rng.randint(1, 250)} {rng.choice(STREETS)} St, {rng.choice(CITIES)}"
+
+        birthday = None
+        if rng.random() < 0.8:
+            birthday = (BIRTHDAY_START + timedelta(days=rng.randrange(BIRTHDAY_DAYS + 1))).isoformat()
+
+        contacts.append(Contact(name, phone, email, address, birthday))
+    return contacts
+
+
+def generate_notes(
+    count: int, seed: int = 0, vocabulary_size: int = 5000, tag_count: int = 200
+) -> List[Note]:
+    """
+    Generates notes whose words and tags follow Zipf distributions.
+
+    Notes have 5 to 30 words and 0 to 4 tags; ids run from 1 to ``count``.
+
+    Args:
+        count (int): Number of notes.
+        seed (int): The random seed.
+        vocabulary_size (int): Number of distinct words.
+        tag_count (int): Number of distinct tags.
+
+    Returns:
+        List[Note]: The notes.
+    """
+
+    rng = random.Random(seed)
+    words = make_vocabulary(vocabulary_size, seed)
+    tags = [f"{word}-{index}" for index, word in enumerate(make_vocabulary(tag_count, seed + 1))]
+    word_weights = zipf_weights(len(words), 1.0)
+    tag_weights = zipf_weights(len(tags), 1.1)
+
+    notes = []
+    for note_id in range(1, count + 1):
+        text = " ".join(rng.choices(words, cum_weights=word_weights, k=rng.randint(5, 30)))
+        # Tags are rebuilt as fresh strings, as if parsed from user input.
+        note_tags = ["".join(tag) for tag in rng.choices(tags, cum_weights=tag_weights, k=rng.randint(0, 4))]
+        notes.append(Note(text, list(dict.fromkeys(note_tags)), note_id))
+    return notes
+
+
+def sample(values: Sequence, count: int, seed: int = 0) -> List:
+    """
+    Returns ``count`` values drawn with replacement, reproducibly.
+    """
+
+    rng = random.Random(seed)
+    return [rng.choice(values) for _ in range(count)]
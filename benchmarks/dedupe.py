@@ -0,0 +1,129 @@
+"""
+Duplicate detection benchmark: time and accuracy of the dedupe engine on generated books.
+
+Usage:
+    python -m benchmarks.dedupe [--sizes 100000 1000000] [--duplicates 0.01] [--seed 0] [--apply] [--json]
+
+For every size, ``--duplicates`` of the generated contacts get a near-duplicate: the same person
+with the name words swapped, a letter dropped or a different case, and the phone written in the
+other notation or the same email. The report gives the time to find them, the number of scored
+pairs (which should grow linearly with the size), and precision and recall against the injected
+duplicates. With --apply the merge plan is also applied to a ContactBook in one batch.
+"""
+
+import argparse
+import json
+import random
+import time
+from typing import Dict, List, Set, Tuple
+
+from benchmarks.data import generate_contacts
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.dedupe import find_duplicates
+
+
+def _variant(contact: Contact, rng: random.Random) -> Contact:
+    words = contact.name.split()
+    style = rng.randrange(3)
+    if style == 0 and len(words) > 1:
+        name = " ".join([words[1], words[0], *words[2:]])
+    elif style == 1:
+        position = rng.randrange(1, len(words[0])) if len(words[0]) > 1 else 0
+        name = " ".join([words[0][:position] + words[0][position + 1:], *words[1:]])
+    else:
+        name = contact.name.upper()
+
+    phone = contact.phone
+    if rng.random() < 0.7:
+        phone = "0" + phone[4:] if phone.startswith("+380") else "+38" + phone
+    email = contact.email if rng.random() < 0.8 else None
+    birthday = contact.birthday if rng.random() < 0.5 else None
+    return Contact(name, phone, email, None, birthday)
+
+
+def make_book(size: int, share: float, seed: int) -> Tuple[List[Contact], Set[Tuple[str, str]]]:
+    """
+    Generates ``size`` contacts plus near-duplicates of a ``share`` of them.
+
+    Returns:
+        Tuple[List[Contact], Set[Tuple[str, str]]]: The contacts, shuffled, and the (original,
+        duplicate) name pairs.
+    """
+
+    rng = random.Random(seed)
+    contacts = generate_contacts(size, seed)
+    names = {contact.name.casefold() for contact in contacts}
+    truth = set()
+    for contact in rng.sample(contacts, int(size * share)):
+        duplicate = _variant(contact, rng)
+        if duplicate.name.casefold() in names:
+            continue
+        names.add(duplicate.name.casefold())
+        contacts.append(duplicate)
+        truth.add((contact.name, duplicate.name))
+    rng.shuffle(contacts)
+    return contacts, truth
+
+
+def run(size: int, share: float, seed: int, apply: bool) -> Dict:
+    contacts, truth = make_book(size, share, seed)
+
+    start = time.perf_counter()
+    report = find_duplicates(contacts)
+    seconds = time.perf_counter() - start
+
+    found = set()
+    for merge in report.merges:
+        group = [merge.keep.name] + [contact.name for contact in merge.remove]
+        found.update((a, b) for a in group for b in group if a != b)
+    hits = sum(1 for pair in truth if pair in found)
+    planned = sum(len(merge.remove) for merge in report.merges)
+
+    result = {
+        "records": len(contacts),
+        "injected": len(truth),
+        "seconds": seconds,
+        "compared_pairs": report.compared,
+        "merge_groups": len(report.merges),
+        "planned_removals": planned,
+        "skipped_blocks": report.skipped_blocks,
+        "recall": hits / len(truth) if truth else 1.0,
+        "precision": min(1.0, hits / planned) if planned else 1.0,
+    }
+
+    if apply:
+        book = ContactBook()
+        book.add_contacts(contacts)
+        start = time.perf_counter()
+        removed = book.merge_contacts(merge.to_dict() for merge in report.merges)
+        result["apply_seconds"] = time.perf_counter() - start
+        result["removed"] = removed
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time duplicate detection on generated contact books.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--duplicates", type=float, default=0.01, help="share of contacts given a duplicate")
+    parser.add_argument("--seed", type=int, default=0, help="data generator seed")
+    parser.add_argument("--apply", action="store_true", help="also time applying the merge plan")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = [run(size, args.duplicates, args.seed, args.apply) for size in args.sizes]
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        line = (
+            f"{result['records']:>9} records  {result['seconds']:>7.2f} s  {result['compared_pairs']:>9} pairs  "
+            f"{result['merge_groups']:>6} groups  recall {result['recall']:.1%}  precision {result['precision']:.1%}"
+        )
+        if "apply_seconds" in result:
+            line += f"  applied in {result['apply_seconds']:.2f} s"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Load test for the book server: requests per second with many concurrent clients.
+
+Usage:
+    python -m benchmarks.load_test [--clients 100] [--requests 200] [--contacts 10000]
+                                   [--writes 0.1] [--storage pickle] [--tcp] [--seed 0] [--json]
+
+A server (``main.py --serve``) is started on the chosen storage in a temporary directory and
+preloaded with generated contacts. Then ``--clients`` connections each send ``--requests``
+requests back to back: lookups by name and phone and text searches, with a ``--writes`` share of
+additions and edits. The report gives the throughput and the read and write latency percentiles.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from benchmarks.data import generate_contacts
+from server.client import RemoteStorage
+from server.protocol import MAX_LINE, dump_line
+from utils.metrics import Histogram
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _start_server(address: str, storage: str, directory: str) -> subprocess.Popen:
+    env = dict(os.environ, MEMOMATE_STORAGE=storage, PYTHONPATH=ROOT)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--serve", address],
+        cwd=directory, env=env, stdout=subprocess.PIPE, text=True,
+    )
+    # The server prints one line once it accepts connections.
+    if not process.stdout.readline():
+        raise RuntimeError("The server did not start.")
+    return process
+
+
+def _request(rng: random.Random, names: List[str], phones: List[str], client: int, number: int, writes: float) -> Dict:
+    if rng.random() < writes:
+        if rng.random() < 0.5:
+            contact = {"$contact": {"name": f"Load Client{client} Request{number}", "phone": "+380500000000"}}
+            return {"book": "contacts", "method": "add_contact", "args": [contact]}
+        return {"book": "contacts", "method": "edit_contact", "args": [rng.choice(names)],
+                "kwargs": {"address": f"Street {number}"}}
+    kind = rng.random()
+    if kind < 0.5:
+        return {"book": "contacts", "method": "find", "args": [rng.choice(names)]}
+    if kind < 0.8:
+        return {"book": "contacts", "method": "find_by_phone", "args": [rng.choice(phones)]}
+    return {"book": "contacts", "method": "search_contacts", "args": [rng.choice(names).split()[0]]}
+
+
+async def _client(
+    address: str, client: int, requests: int, writes: float, seed: int,
+    names: List[str], phones: List[str], reads: Histogram, written: Histogram,
+) -> None:
+    if address.startswith("unix:"):
+        reader, writer = await asyncio.open_unix_connection(address[len("unix:"):], limit=MAX_LINE)
+    else:
+        host, _, port = address.rpartition(":")
+        reader, writer = await asyncio.open_connection(host, int(port), limit=MAX_LINE)
+    rng = random.Random(seed * 1000 + client)
+    for number in range(requests):
+        request = _request(rng, names, phones, client, number, writes)
+        request["id"] = number
+        start = time.perf_counter()
+        writer.write(dump_line(request))
+        response = json.loads(await reader.readline())
+        elapsed = time.perf_counter() - start
+        if "error" in response:
+            raise RuntimeError(f"{request['method']} failed: {response['error']}")
+        (reads if request["method"] in ("find", "find_by_phone", "search_contacts") else written).record(elapsed)
+    writer.close()
+    await writer.wait_closed()
+
+
+async def _load(address: str, clients: int, requests: int, writes: float, seed: int,
+                names: List[str], phones: List[str]) -> Dict:
+    reads, written = Histogram(), Histogram()
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(address, client, requests, writes, seed, names, phones, reads, written) for client in range(clients)
+    ))
+    seconds = time.perf_counter() - start
+    total = reads.count + written.count
+    return {
+        "requests": total,
+        "seconds": seconds,
+        "requests_per_second": total / seconds,
+        "reads": reads.summary(),
+        "writes": written.summary(),
+    }
+
+
+def run(clients: int, requests: int, contacts: int, writes: float, storage: str, tcp: bool, seed: int) -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        address = "127.0.0.1:7499" if tcp else "unix:" + os.path.join(directory, "books.sock")
+        process = _start_server(address, storage, directory)
+        try:
+            book = generate_contacts(contacts, seed)
+            remote = RemoteStorage(address)
+            remote.contact_book.add_contacts(book)
+            remote.close()
+            names = [contact.name for contact in book]
+            phones = [contact.phone for contact in book]
+            result = asyncio.run(_load(address, clients, requests, writes, seed, names, phones))
+        finally:
+            process.terminate()
+            process.wait()
+    result.update(clients=clients, contacts=contacts, storage=storage, transport="tcp" if tcp else "unix")
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure book server throughput with concurrent clients.")
+    parser.add_argument("--clients", type=int, default=100, help="concurrent connections")
+    parser.add_argument("--requests", type=int, default=200, help="requests sent by each client")
+    parser.add_argument("--contacts", type=int, default=10_000, help="contacts preloaded into the server")
+    parser.add_argument("--writes", type=float, default=0.1, help="share of requests that are writes")
+    parser.add_argument("--storage", choices=["pickle", "sqlite"], default="pickle")
+    parser.add_argument("--tcp", action="store_true", help="connect over localhost TCP instead of a Unix socket")
+    parser.add_argument("--seed", type=int, default=0, help="data generator seed")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    result = run(args.clients, args.requests, args.contacts, args.writes, args.storage, args.tcp, args.seed)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+    print(
+        f"{result['clients']} clients, {result['requests']} requests ({result['storage']}, {result['transport']}): "
+        f"{result['requests_per_second']:.0f} req/s"
+    )
+    for kind in ("reads", "writes"):
+        summary = result[kind]
+        print(
+            f"  {kind:<6} {summary['count']:>7}  p50 {summary['p50'] * 1000:7.2f} ms  "
+            f"p99 {summary['p99'] * 1000:7.2f} ms  max {summary['max'] * 1000:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
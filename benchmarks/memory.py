@@ -0,0 +1,89 @@
+"""
+Memory benchmark: bytes per contact and per note, measured with tracemalloc.
+
+Usage:
+    python -m benchmarks.memory [--sizes 100000 1000000] [--books] [--json]
+
+Models are measured on their own (records plus their field strings); with --books the
+measurement also includes a ContactBook / NoteBook holding the records, with all their indexes.
+"""
+
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Callable, Dict, List
+
+from benchmarks.data import generate_contacts, generate_notes
+from models.contact import Contact
+from models.note import Note
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+
+
+def fill_contact_book(contacts: List[Contact]) -> ContactBook:
+    book = ContactBook()
+    for contact in contacts:
+        book.add_contact(contact)
+    # Secondary indexes are built on first use; build them all so they are measured too.
+    book._search_index(), book._birthday_index(), book._name_index(), book._phone_index(), book._name_order()
+    return book
+
+
+def fill_note_book(notes: List[Note]) -> NoteBook:
+    book = NoteBook()
+    book.notes = notes
+    book._text_index(), book._text_order()
+    return book
+
+
+def measure(build: Callable[[], object], count: int) -> float:
+    """
+    Returns the traced bytes allocated per record by ``build`` that are still alive afterwards.
+    """
+
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    gc.collect()
+    return (after - before) / count
+
+
+def run(sizes: List[int], books: bool) -> List[Dict]:
+    results = []
+    for size in sizes:
+        results.append({"kind": "contact", "records": size, "bytes_per_record": measure(lambda: generate_contacts(size), size)})
+        results.append({"kind": "note", "records": size, "bytes_per_record": measure(lambda: generate_notes(size), size)})
+        if books:
+            results.append({
+                "kind": "contact_book", "records": size,
+                "bytes_per_record": measure(lambda: fill_contact_book(generate_contacts(size)), size),
+            })
+            results.append({
+                "kind": "note_book", "records": size,
+                "bytes_per_record": measure(lambda: fill_note_book(generate_notes(size)), size),
+            })
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Report bytes per contact and per note.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000])
+    parser.add_argument("--books", action="store_true", help="also measure books with their indexes")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.books)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for result in results:
+        print(f"{result['kind']:<13} {result['records']:>9} records  {result['bytes_per_record']:>9.1f} bytes/record")
+
+
+if __name__ == "__main__":
+    main()
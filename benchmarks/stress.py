@@ -0,0 +1,166 @@
+"""
+Multi-process stress test for the pickle storage: many processes saving to the same files at once.
+
+Usage:
+    python -m benchmarks.stress [--processes 8] [--operations 300] [--compact-every 100] [--json]
+
+Every process opens the contact and note books in one shared temporary directory and, as fast as
+it can, adds its own contacts, deletes some of them again, edits a few contacts shared by all
+processes (so concurrent changes hit the same records) and adds notes (so concurrent additions
+compete for the same note ids). A low compaction threshold makes snapshots and journal rotations
+happen throughout. Afterwards the books are loaded fresh and checked: every contact a process
+kept is there, every contact it deleted is gone, no note was lost or overwritten, and every
+process, after a final refresh, sees exactly the data on disk. The exit status is 1 on any
+inconsistency.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+from utils.journal import JournaledStore
+
+SHARED_CONTACTS = 5
+
+
+def _open(directory: str, compact_every: int) -> Dict[str, JournaledStore]:
+    stores = {
+        "contacts": JournaledStore(ContactBook(), "contacts", os.path.join(directory, "addressbook.pkl"), compact_every),
+        "notes": JournaledStore(NoteBook(), "notes", os.path.join(directory, "notes.pkl"), compact_every),
+    }
+    for store in stores.values():
+        store.open()
+    return stores
+
+
+def _digest(stores: Dict[str, JournaledStore]) -> Dict:
+    contacts = stores["contacts"].book.contacts
+    notes = stores["notes"].book.notes
+    return {
+        "contacts": sorted((name, contact.address) for name, contact in contacts.items()),
+        "notes": sorted((note_id, note.text) for note_id, note in notes.items()),
+    }
+
+
+def _worker(directory: str, worker: int, operations: int, compact_every: int, barrier, results) -> None:
+    stores = _open(directory, compact_every)
+    contacts, notes = stores["contacts"].book, stores["notes"].book
+    kept, deleted, texts = [], [], []
+    for number in range(operations):
+        name = f"Worker{worker} Contact{number}"
+        contacts.add_contact(Contact(name, f"+38050{worker:03d}{number:04d}"))
+        kept.append(name)
+        if number % 5 == 4:
+            victim = kept.pop(0)
+            contacts.delete_contact(victim)
+            deleted.append(victim)
+        if number % 3 == 0:
+            contacts.edit_contact(f"Shared Contact{number % SHARED_CONTACTS}", address=f"Worker{worker} Street{number}")
+        text = f"worker {worker} note {number}"
+        notes.add_note(text)
+        texts.append(text)
+        if number % 10 == 0:
+            stores["contacts"].refresh()
+
+    barrier.wait()
+    for store in stores.values():
+        store.refresh()
+    results.put({"worker": worker, "kept": kept, "deleted": deleted, "notes": texts, "view": _digest(stores)})
+    for store in stores.values():
+        store.close()
+
+
+def run(processes: int, operations: int, compact_every: int) -> Dict:
+    with tempfile.TemporaryDirectory() as directory:
+        stores = _open(directory, compact_every)
+        stores["contacts"].book.add_contacts(Contact(f"Shared Contact{i}", "+380500000000") for i in range(SHARED_CONTACTS))
+        for store in stores.values():
+            store.close()
+
+        context = multiprocessing.get_context("spawn")
+        barrier = context.Barrier(processes)
+        results = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(directory, worker, operations, compact_every, barrier, results))
+            for worker in range(processes)
+        ]
+        start = time.perf_counter()
+        for process in workers:
+            process.start()
+        reports = [results.get() for _ in workers]
+        for process in workers:
+            process.join()
+        seconds = time.perf_counter() - start
+
+        stores = _open(directory, compact_every)
+        final = _digest(stores)
+        contacts = stores["contacts"].book
+        texts = [note.text for note in stores["notes"].book.notes.values()]
+        for store in stores.values():
+            store.close()
+
+    errors: List[str] = []
+    for report in reports:
+        missing = [name for name in report["kept"] if contacts.find(name) is None]
+        resurrected = [name for name in report["deleted"] if contacts.find(name) is not None]
+        if missing:
+            errors.append(f"worker {report['worker']}: {len(missing)} kept contacts missing, e.g. {missing[0]}")
+        if resurrected:
+            errors.append(f"worker {report['worker']}: {len(resurrected)} deleted contacts present, e.g. {resurrected[0]}")
+        lost = set(report["notes"]) - set(texts)
+        if lost:
+            errors.append(f"worker {report['worker']}: {len(lost)} notes lost")
+        if json.loads(json.dumps(report["view"])) != json.loads(json.dumps(final)):
+            errors.append(f"worker {report['worker']}: in-memory books differ from the data on disk")
+    if len(texts) != processes * operations:
+        errors.append(f"expected {processes * operations} notes, found {len(texts)}")
+    if any(contacts.find(f"Shared Contact{i}") is None for i in range(SHARED_CONTACTS)):
+        errors.append("a shared contact is missing")
+
+    writes = sum(len(r["kept"]) + 2 * len(r["deleted"]) + len(r["notes"]) for r in reports)
+    writes += processes * -(-operations // 3)
+    return {
+        "processes": processes,
+        "operations": operations,
+        "seconds": seconds,
+        "writes": writes,
+        "writes_per_second": writes / seconds,
+        "contacts": len(contacts),
+        "notes": len(texts),
+        "errors": errors,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Hammer the pickle storage with concurrent writer processes.")
+    parser.add_argument("--processes", type=int, default=8, help="concurrent writer processes")
+    parser.add_argument("--operations", type=int, default=300, help="iterations per process")
+    parser.add_argument("--compact-every", type=int, default=100, help="journal records that trigger a snapshot")
+    parser.add_argument("--json", action="store_true", help="print the result as JSON")
+    args = parser.parse_args()
+
+    result = run(args.processes, args.operations, args.compact_every)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(
+            f"{result['processes']} processes, {result['writes']} writes in {result['seconds']:.2f} s "
+            f"({result['writes_per_second']:.0f}/s): {result['contacts']} contacts, {result['notes']} notes"
+        )
+        for error in result["errors"]:
+            print(f"  FAIL {error}")
+        if not result["errors"]:
+            print("  OK: no lost, resurrected or diverging records")
+    sys.exit(1 if result["errors"] else 0)
+
+
+if __name__ == "__main__":
+    main()
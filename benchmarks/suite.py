@@ -0,0 +1,332 @@
+"""
+Timing benchmark suite for the contact and note books.
+
+Usage:
+    python -m benchmarks.suite [--sizes 1000 10000 100000] [--repeat 3] [--seed 0]
+                               [--output report.json] [--baseline baseline.json] [--threshold 0.2]
+
+For every size the suite generates reproducible data (see benchmarks.data) and times adding,
+finding by name, fuzzy name and phone, phone prefix queries, editing, deleting, searching,
+birthday windows, list rendering (with and without cached rows), paging through listings while renaming, and snapshot save/load.
+Each operation is run ``--repeat`` times and the fastest run is kept. The JSON report can be
+stored as a baseline and later reports compared against it (see benchmarks.compare); with
+``--baseline`` the comparison runs right away and the exit status is 1 on a regression.
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from benchmarks.compare import compare, print_comparison
+from benchmarks.data import DOMAINS, generate_contacts, generate_notes, make_vocabulary, sample
+from cli.commands import list_contacts, list_notes
+from cli.prompts import inline_arguments
+from cli.render import ROW_CACHE
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+from utils.journal import JournaledStore
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+# Number of operations timed for the per-record operations.
+LOOKUPS = 1000
+SEARCHES = 100
+WINDOWS = 20
+
+
+def measure(
+    name: str, records: int, ops: int, run: Callable[[], None], repeat: int,
+    reset: Optional[Callable[[], None]] = None,
+) -> Dict:
+    """
+    Times ``run`` ``repeat`` times and returns the fastest run as a result record.
+
+    Args:
+        name (str): The benchmark name, e.g. "contacts.find".
+        records (int): The number of records in the book.
+        ops (int): The number of operations ``run`` performs.
+        run (Callable[[], None]): The timed code.
+        repeat (int): Number of runs.
+        reset (Optional[Callable[[], None]]): Untimed code restoring the state after each run.
+
+    Returns:
+        Dict: name, records, ops, seconds and us_per_op.
+    """
+
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        best = min(best, time.perf_counter() - start)
+        if reset is not None:
+            reset()
+    return {"name": name, "records": records, "ops": ops, "seconds": best, "us_per_op": best / ops * 1e6}
+
+
+def _consume(chunks) -> None:
+    for _ in chunks:
+        pass
+
+
+def _save_load(name: str, book, attribute: str, factory: Callable, records: int, repeat: int) -> List[Dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, f"{attribute}.pkl")
+
+        def save() -> None:
+            JournaledStore(book, attribute, path).compact(background=False)
+
+        def load() -> None:
+            store = JournaledStore(factory(), attribute, path)
+            store.open()
+            store.close()
+
+        return [measure(f"{name}.save", records, 1, save, repeat), measure(f"{name}.load", records, 1, load, repeat)]
+
+
+def bench_contacts(size: int, seed: int, repeat: int) -> List[Dict]:
+    """
+    Times the ContactBook operations on ``size`` generated contacts.
+    """
+
+    contacts = generate_contacts(size, seed)
+    names = [contact.name for contact in contacts]
+    book = ContactBook()
+
+    def add() -> None:
+        nonlocal book
+        book = ContactBook()
+        for contact in contacts:
+            book.add_contact(contact)
+
+    results = [measure("contacts.add", size, size, add, repeat)]
+
+    lookups = [name.lower() for name in sample(names, LOOKUPS, seed)]
+    results.append(measure("contacts.find", size, len(lookups), lambda: [book.find(n) for n in lookups], repeat))
+
+    rng = random.Random(seed)
+    queries = []
+    for name in sample(names, SEARCHES, seed + 1):
+        start = rng.randrange(max(1, len(name) - 3))
+        queries.append(name[start:start + 4])
+    results.append(measure(
+        "contacts.search", size, len(queries), lambda: [book.search_contacts(q) for q in queries], repeat,
+    ))
+
+    typos = []
+    for name in sample(names, SEARCHES, seed + 4):
+        position = rng.randrange(len(name))
+        typos.append(name[:position] + name[position + 1:])
+    results.append(measure(
+        "contacts.fuzzy_find", size, len(typos), lambda: [book.fuzzy_find(t) for t in typos], repeat,
+    ))
+
+    phones = sample([contact.phone for contact in contacts], LOOKUPS, seed + 5)
+    results.append(measure(
+        "contacts.find_phone", size, len(phones), lambda: [book.find_by_phone(p) for p in phones], repeat,
+    ))
+    # Operator code plus the first subscriber digits, e.g. "+3805012": about 1 in 1000 numbers.
+    prefixes = [phone[:-6] for phone in sample(phones, SEARCHES, seed + 6)]
+    results.append(measure(
+        "contacts.phone_prefix", size, len(prefixes), lambda: [book.search_phone_prefix(p) for p in prefixes], repeat,
+    ))
+
+    results.append(measure(
+        "contacts.birthdays", size, WINDOWS,
+        lambda: [book.upcoming_birthdays(7 if i % 2 else 30) for i in range(WINDOWS)], repeat,
+    ))
+
+    # Structured queries: an indexed predicate ANDed with a scan-only one, and a prefix OR a name.
+    structured = [
+        f"email:*@{DOMAINS[i % len(DOMAINS)]} birthday:month={1 + i % 12} limit:20" if i % 2 else
+        f"phone:{prefixes[i][:-1]}* OR name:=\"{names[i]}\" sort:-birthday"
+        for i in range(SEARCHES)
+    ]
+    results.append(measure(
+        "contacts.query", size, len(structured), lambda: [book.query(q) for q in structured], repeat,
+    ))
+
+    def render() -> None:
+        with inline_arguments(["--plain"]):
+            _consume(list_contacts(book))
+
+    # Cold: every row is formatted and measured; warm: the rows come from the row cache.
+    ROW_CACHE.clear()
+    results.append(measure("contacts.render_cold", size, size, render, repeat, ROW_CACHE.clear))
+    render()
+    results.append(measure("contacts.render", size, size, render, repeat))
+
+    renamed = sample(names, SEARCHES, seed + 5)
+
+    def rename_and_page() -> None:
+        # Each rename moves a contact in the listing order; the next page must reflect it.
+        for name in renamed:
+            book.edit_contact(name, name=f"{name} Jr")
+            with inline_arguments(["--from", name, "--limit", "20", "--plain"]):
+                _consume(list_contacts(book))
+            book.edit_contact(f"{name} Jr", name=name)
+
+    results.append(measure("contacts.rename_page", size, len(renamed), rename_and_page, repeat))
+
+    edits = sample(names, LOOKUPS, seed + 2)
+    results.append(measure(
+        "contacts.edit", size, len(edits),
+        lambda: [book.edit_contact(name, phone="0501234567") for name in edits], repeat,
+    ))
+
+    results.extend(_save_load("contacts", book, "contacts", ContactBook, size, repeat))
+
+    doomed = list(dict.fromkeys(sample(names, LOOKUPS, seed + 3)))
+    removed = []
+
+    def delete() -> None:
+        removed.extend(book.delete_contact(name) for name in doomed)
+
+    def restore() -> None:
+        for contact in removed:
+            book.add_contact(contact)
+        removed.clear()
+
+    results.append(measure("contacts.delete", size, len(doomed), delete, repeat, restore))
+    return results
+
+
+def bench_notes(size: int, seed: int, repeat: int) -> List[Dict]:
+    """
+    Times the NoteBook operations on ``size`` generated notes.
+    """
+
+    notes = generate_notes(size, seed)
+    book = NoteBook()
+
+    def add() -> None:
+        nonlocal book
+        book = NoteBook()
+        for note in notes:
+            book.add_note(note.text, list(note.tags))
+
+    results = [measure("notes.add", size, size, add, repeat)]
+
+    words = sample([word for note in notes[:1000] for word in note.text.split()], SEARCHES, seed)
+    results.append(measure("notes.search", size, len(words), lambda: [book.search_notes(w) for w in words], repeat))
+
+    vocabulary = make_vocabulary(200, seed)
+    ranked = [f"{words[i]} {vocabulary[i % len(vocabulary)][:3]}*" for i in range(len(words))]
+    results.append(measure(
+        "notes.search_ranked", size, len(ranked), lambda: [book.search_ranked(q) for q in ranked], repeat,
+    ))
+
+    tags = sample([tag for note in notes[:1000] for tag in note.tags] or ["none"], LOOKUPS, seed)
+    results.append(measure("notes.search_tag", size, len(tags), lambda: [book.search_tag(t) for t in tags], repeat))
+
+    structured = [f"tag:{tags[i]} -text:{words[i]} limit:20" for i in range(SEARCHES)]
+    results.append(measure(
+        "notes.query", size, len(structured), lambda: [book.query(q) for q in structured], repeat,
+    ))
+
+    def render() -> None:
+        with inline_arguments(["--plain"]):
+            _consume(list_notes(book))
+
+    ROW_CACHE.clear()
+    results.append(measure("notes.render_cold", size, size, render, repeat, ROW_CACHE.clear))
+    render()
+    results.append(measure("notes.render", size, size, render, repeat))
+
+    ids = sample(list(book.notes), LOOKUPS, seed + 2)
+    results.append(measure(
+        "notes.edit", size, len(ids), lambda: [book.edit_note_by_id(i, new_tags=["edited"]) for i in ids], repeat,
+    ))
+
+    results.extend(_save_load("notes", book, "notes", NoteBook, size, repeat))
+
+    doomed = list(dict.fromkeys(sample(list(book.notes), LOOKUPS, seed + 3)))
+    removed = []
+
+    def delete() -> None:
+        removed.extend(book.delete_note_by_id(note_id) for note_id in doomed)
+
+    def restore() -> None:
+        for note in removed:
+            book.apply({"op": "add", "note": note.to_dict()})
+        removed.clear()
+
+    results.append(measure("notes.delete", size, len(doomed), delete, repeat, restore))
+    return results
+
+
+def run(sizes: List[int], seed: int = 0, repeat: int = 3, log: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Runs the suite and returns the report.
+
+    Args:
+        sizes (List[int]): Book sizes to benchmark.
+        seed (int): The data generator seed.
+        repeat (int): Runs per operation; the fastest is reported.
+        log (Optional[Callable[[Dict], None]]): Called with each result as soon as it is measured.
+
+    Returns:
+        Dict: {"meta": {...}, "results": [...]}.
+    """
+
+    results = []
+    for size in sizes:
+        for bench in (bench_contacts, bench_notes):
+            for result in bench(size, seed, repeat):
+                results.append(result)
+                if log is not None:
+                    log(result)
+
+    meta = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sizes": sizes,
+        "seed": seed,
+        "repeat": repeat,
+    }
+    return {"meta": meta, "results": results}
+
+
+def format_result(result: Dict) -> str:
+    return (
+        f"{result['name']:<20} {result['records']:>9} records  {result['seconds'] * 1000:>10.2f} ms  "
+        f"{result['us_per_op']:>12.2f} us/op"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Time contact and note book operations.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--repeat", type=int, default=3, help="runs per operation, the fastest is kept")
+    parser.add_argument("--seed", type=int, default=0, help="data generator seed")
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--baseline", help="compare against this stored JSON report")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown, 0.2 = 20%%")
+    args = parser.parse_args()
+
+    report = run(args.sizes, args.seed, args.repeat, log=lambda result: print(format_result(result), flush=True))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        rows = compare(baseline, report, args.threshold)
+        print_comparison(rows)
+        if any(row["regressed"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
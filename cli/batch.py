@@ -0,0 +1,110 @@
+import io
+import json
+from contextlib import redirect_stdout
+from typing import Any, Dict, Iterable, List, Optional, TextIO, Tuple
+
+from colorama import Fore
+
+from cli.command_handler import dispatcher, resolve
+from cli.dispatcher import unknown_command
+from cli.prompts import inline_arguments, strip_colors
+from cli.render import output_text
+
+def parse_line(line: str) -> Tuple[Optional[str], List[str], str]:
+    """
+    Splits a batch line into a command and its inline arguments.
+
+    Arguments are separated by spaces and may be quoted, e.g.
+    ``add contact "Jane Doe" +380501234567 "" "Kyiv, Main St 1" 1990-05-17``; an empty
+    argument ``""`` answers an optional prompt with nothing.
+
+    Args:
+        line (str): The batch line.
+
+    Returns:
+        Tuple[Optional[str], List[str], str]: The command (None if unknown), its arguments, and
+        the arguments as typed.
+    """
+
+    return dispatcher.parse(line)
+
+
+def run_command(command: str, arguments: List[str], storage: Any, text: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Runs one command with inline arguments and returns its status record.
+
+    The command is the same function the interactive loop calls; its prompts are answered from
+    ``arguments`` and anything it prints is captured into the record.
+
+    Args:
+        command (str): A key of ``commands``.
+        arguments (List[str]): The inline arguments, in prompt order.
+        storage (Any): An opened storage backend (see ``storage.backends.open_storage``).
+        text (Optional[str]): The arguments as typed, quotes included, if known.
+
+    Returns:
+        Dict[str, Any]: The record with "command", "status" ("ok" or "error") and "output", plus
+        "messages" and "unused" when the command printed warnings or left arguments unused.
+    """
+
+    func, context = resolve(command, storage)
+    printed = io.StringIO()
+    with redirect_stdout(printed), inline_arguments(arguments, text=text) as unused:
+        result = output_text(func(context))
+
+    # A lazily rendered result that fails mid-stream ends with the error message instead.
+    last_line = result.rpartition("\n")[2]
+    failed = result.startswith("Error:") or result.startswith(Fore.RED) or last_line.startswith("Error:")
+    record: Dict[str, Any] = {
+        "command": command,
+        "status": "error" if failed else "ok",
+        "output": strip_colors(result),
+    }
+    messages = [strip_colors(line) for line in printed.getvalue().splitlines() if line.strip()]
+    if messages:
+        record["messages"] = messages
+    if unused:
+        record["unused"] = unused
+    return record
+
+
+def run_batch(lines: Iterable[str], storage: Any, out: TextIO) -> int:
+    """
+    Executes commands from a script, one per line, and writes a JSON status record per command.
+
+    Blank lines and lines starting with '#' are skipped; 'exit' or 'close' ends the batch. Changes
+    are persisted once at the end of the batch rather than after every command.
+
+    Args:
+        lines (Iterable[str]): The script lines.
+        storage (Any): An opened storage backend (see ``storage.backends.open_storage``).
+        out (TextIO): Where the JSON-lines status records are written.
+
+    Returns:
+        int: The number of commands that failed.
+    """
+
+    failures = 0
+    with storage.deferred():
+        for line_number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.lower() in ("exit", "close"):
+                break
+
+            try:
+                command, arguments, text = parse_line(line)
+            except ValueError as e:
+                record = {"command": line, "status": "error", "output": f"Cannot parse line: {e}."}
+            else:
+                if command is None:
+                    record = {"command": line, "status": "error", "output": unknown_command(dispatcher, line)}
+                else:
+                    record = run_command(command, arguments, storage, text)
+
+            if record["status"] != "ok":
+                failures += 1
+            out.write(json.dumps({"line": line_number, **record}, ensure_ascii=False) + "\n")
+    out.flush()
+    return failures
@@ -1,91 +1,209 @@
-from prompt_toolkit import PromptSession
-from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
-from prompt_toolkit.completion import WordCompleter
-from prompt_toolkit.styles import Style
-from cli.commands import (
-    add_contact, search_contact, add_note, search_note, list_notes, list_contacts,
-    edit_contact, delete_contact, edit_note, delete_note, show_birthday, show_commands, birthdays
-)
-from services.contact_book import ContactBook
-from services.note_book import NoteBook
-from utils.utils import load_data, save_data
-
+import importlib
+import threading
+from typing import Any, Callable, List, Optional, Tuple
+
+from cli.dispatcher import CommandTrie, unknown_command
+from cli.prompts import inline_arguments
+from storage.backends import open_storage
+from utils.metrics import metrics
+from utils.startup import profile
+
+# Command names mapped to the name of their function in cli.commands, which is imported on first use
+# so that startup does not pay for tabulate, colorama and the import/export code, and to the book the
+# function operates on ("contact", "note", or None for commands that need neither).
 commands = {
-    "add contact": add_contact,
-    "search contact": search_contact,
-    "edit contact": edit_contact,
-    "delete contact": delete_contact,
-    "show contacts": list_contacts,
-    "add note": add_note,
-    "search note": search_note,
-    "edit note": edit_note,
-    "delete note": delete_note,
-    "show notes": list_notes,
-    "show birthday": (show_birthday, "contact"),
-    "commands": show_commands,
-    "birthdays": (birthdays, "contact"),
+    "add contact": ("add_contact", "contact"),
+    "search contact": ("search_contact", "contact"),
+    "edit contact": ("edit_contact", "contact"),
+    "delete contact": ("delete_contact", "contact"),
+    "show contacts": ("list_contacts", "contact"),
+    "import contacts": ("import_contacts", "contact"),
+    "export contacts": ("export_contacts", "contact"),
+    "show birthday": ("show_birthday", "contact"),
+    "birthdays": ("birthdays", "contact"),
+    "lookup phone": ("lookup_phone", "contact"),
+    "duplicate phones": ("duplicate_phones", "contact"),
+    "dedupe contacts": ("dedupe_contacts", "contact"),
+    "query contacts": ("query_contacts", "contact"),
+    "explain contacts": ("explain_contacts", "contact"),
+    "add note": ("add_note", "note"),
+    "search note": ("search_note", "note"),
+    "edit note": ("edit_note", "note"),
+    "delete note": ("delete_note", "note"),
+    "show notes": ("list_notes", "note"),
+    "list tags": ("list_tags", "note"),
+    "query notes": ("query_notes", "note"),
+    "explain notes": ("explain_notes", "note"),
+    "commands": ("show_commands", None),
+    "stats": ("show_stats", None),
 }
 
+dispatcher = CommandTrie(commands)
+
+
+_implementations_module = None
+
+
+def _implementations() -> Any:
+    """
+    Returns the cli.commands module, importing it on first use.
+    """
+
+    global _implementations_module
+    if _implementations_module is None:
+        with profile.phase("import cli.commands"):
+            _implementations_module = importlib.import_module("cli.commands")
+    return _implementations_module
+
+
+def _create_session() -> Any:
+    """
+    Builds the prompt_toolkit session with command completion and history suggestions.
+    """
+
+    from prompt_toolkit import PromptSession
+    from prompt_toolkit.auto_suggest import AutoSuggestFromHistory
+    from prompt_toolkit.completion import WordCompleter
+    from prompt_toolkit.styles import Style
+
+    command_completer = WordCompleter(commands.keys(), ignore_case=True)
+
+    style = Style.from_dict({
+        '': '#00aaaa',
+        'prompt': 'bold',
+    })
+
+    return PromptSession(auto_suggest=AutoSuggestFromHistory(), completer=command_completer, style=style)
+
+
+class _LazySession:
+    """
+    A prompt session whose prompt_toolkit import and setup run in a background thread.
+
+    Importing prompt_toolkit takes longer than the rest of startup together, so the first prompt
+    falls back to plain ``input()`` if the session is not ready yet; lines read that way are added
+    to the session history once it is.
+    """
+
+    def __init__(self):
+        self._session: Optional[Any] = None
+        self._early_lines: List[str] = []
+        self._thread = threading.Thread(target=self._create, name="prompt-session", daemon=True)
+        self._thread.start()
+
+    def _create(self) -> None:
+        with profile.phase("import prompt_toolkit (background)"):
+            self._session = _create_session()
+
+    def prompt(self, message: str) -> str:
+        if self._session is None and self._thread.is_alive():
+            line = input(message)
+            self._early_lines.append(line)
+            return line
+
+        self._thread.join()
+        if self._session is None:
+            return input(message)
+        for line in self._early_lines:
+            self._session.history.append_string(line)
+        self._early_lines.clear()
+        return self._session.prompt(message, complete_while_typing=True)
+
+
+def resolve(command: str, storage: Any) -> Tuple[Callable, Any]:
+    """
+    Returns the function implementing a command and the book it operates on.
+
+    Only that book is loaded from the storage, the first time a command needs it; commands that
+    need no book (a ``None`` target) get None. With instrumentation enabled, the book is wrapped so
+    its calls are timed as service calls.
+
+    Args:
+        command (str): A key of ``commands``.
+        storage (Any): An opened storage backend (see ``storage.backends.open_storage``).
 
-command_completer = WordCompleter(commands.keys(), ignore_case=True)
+    Returns:
+        Tuple[Callable, Any]: The command function and its book (or None).
+    """
+
+    name, target = commands[command]
+    func = getattr(_implementations(), name)
+    if target is None:
+        return func, None
+    if target == "contact":
+        return func, metrics.instrument(storage.contact_book, "contacts")
+    return func, metrics.instrument(storage.note_book, "notes")
 
-style = Style.from_dict({
-    '': '#00aaaa',
-    'prompt': 'bold',
-})
 
-def run_command_loop() -> None:
+def run_command_loop(storage: Any = None) -> None:
     """
         Launches the interactive command-line loop for the assistant bot.
 
-        This function initializes the contact and note books, loads persisted data from pickle files,
-        and listens for user input to execute supported commands such as adding, editing, or listing
-        contacts and notes. It provides auto-suggestions and command completions via PromptToolkit.
+        This function opens the storage backend selected by MEMOMATE_STORAGE ("pickle" by default,
+        or "sqlite"), which provides the contact and note books, and listens for user input to execute
+        supported commands such as adding, editing, or listing contacts and notes. It provides
+        auto-suggestions and command completions via PromptToolkit.
+
+        Startup is kept short: each book is loaded when a command first needs it, and heavy modules are
+        imported on first use or, for PromptToolkit, in the background.
 
-        The function supports graceful shutdown via 'exit' or 'close' commands or keyboard interrupts,
-        and it ensures that any changes to contact or note data are saved to disk upon exit.
+        Every change to contact or note data is persisted as it happens, so nothing is lost if the session
+        ends abruptly. The function supports graceful shutdown via 'exit' or 'close' commands or keyboard
+        interrupts, and closes the storage on any of them.
 
         Parameters:
-            None
+            storage (Any): An opened storage to use instead, such as a RemoteStorage connected to a
+                book server; it is closed on exit as well.
 
         Returns:
             None
         """
 
-    contact_book = ContactBook()
-    note_book = NoteBook()
-
-    contact_book.contacts = load_data("addressbook.pkl") or {}
-    note_book.notes = load_data("notes.pkl") or []
+    if storage is None:
+        storage = open_storage()
 
     print("Welcome to the assistant bot!")
 
-    session = PromptSession(auto_suggest=AutoSuggestFromHistory(), completer=command_completer, style=style)
+    session = _LazySession()
+
+    try:
+        _prompt_loop(session, storage)
+    finally:
+        storage.close()
+
+
+def _prompt_loop(session: Any, storage: Any) -> None:
+    """
+    Reads and dispatches commands until the user exits.
+    """
 
+    milestone = "first prompt"
     while True:
         try:
-            user_input = session.prompt(">>> ", complete_while_typing=True).strip().lower()
+            profile.report(milestone)
+            milestone = None
+            line = session.prompt(">>> ").strip()
 
-            if user_input in ("exit", "close"):
-                save_data(contact_book.contacts, "addressbook.pkl")
-                save_data(note_book.notes, "notes.pkl")
+            if line.lower() in ("exit", "close"):
                 print("Good bye!")
                 break
+            if not line:
+                continue
 
-            matched = next((cmd for cmd in commands if user_input.startswith(cmd)), None)
+            try:
+                matched, arguments, text = dispatcher.parse(line)
+            except ValueError as e:
+                print(f"Error: {e}")
+                continue
 
             if matched:
-                entry = commands[matched]
-                if isinstance(entry, tuple):
-                    func, target = entry
-                    context = contact_book if target == "contact" else note_book
-                else:
-                    func = entry
-                    context = contact_book if "contact" in matched else note_book
-
-                print(func(context))
+                func, context = resolve(matched, storage)
+                # Already imported by cli.commands.
+                from cli.render import write_output
+                with inline_arguments(arguments, interactive=True, text=text), storage.busy():
+                    write_output(func(context))
             else:
-                print("Unknown command. Type 'commands' to see available options.")
+                print(unknown_command(dispatcher, line))
         except (EOFError, KeyboardInterrupt):
             print("\nExiting...")
             break
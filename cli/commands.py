@@ -1,60 +1,47 @@
 import re
-from datetime import date, datetime
+import shlex
+from itertools import chain
+from typing import Any, Dict, Iterator, List, Tuple, Union
+
 from tabulate import tabulate
 from colorama import Fore, Style, init
 
+from cli.prompts import ask, raw_arguments, remaining_arguments
+from cli.render import (
+    PageOptions, page_footer, page_window, parse_page_options, stream_records, stream_table, use_color,
+)
 from models.contact import Contact
 from services.contact_book import ContactBook
+from utils.bulk_io import export_contacts as write_contacts, import_contacts as read_contacts
+from utils.metrics import metrics
 from utils.utils import input_error
+from utils.validators import is_valid_birthday, is_valid_email, is_valid_phone
+from models.note import Note
 from services.note_book import NoteBook
 
 init(autoreset=True)
 
-
-def is_valid_email(email: str) -> bool:
-    """
-    Check if the given email address is valid.
-
-    Args:
-        email (str): Email address to validate.
-
-    Returns:
-        bool: True if valid, False otherwise.
-    """
-
-    return bool(re.match(r"[^@]+@[^@]+\.[^@]+", email))
+# Columns of the contact and note tables; their rows are cached across commands (see cli.render.RowCache).
+CONTACT_HEADERS = ["Name", "Phone", "Email", "Address", "Birthday"]
+CONTACT_COLORS = [Fore.YELLOW, Fore.CYAN, Fore.MAGENTA, Fore.BLUE, Fore.GREEN]
+NOTE_HEADERS = ["ID", "Note Text", "Tags"]
+NOTE_COLORS = [Fore.CYAN, Fore.YELLOW, Fore.MAGENTA]
 
 
-def is_valid_phone(phone: str) -> bool:
+def _contact_cells(contact: Contact) -> Tuple[str, ...]:
     """
-    Validate the phone number format.
-
-    Args:
-        phone (str): Phone number to validate.
-
-    Returns:
-        bool: True if valid, False otherwise.
+    Returns the cells of a contact in the contact tables.
     """
 
-    return bool(re.match(r"^\+?\d{10,15}$", phone))
+    return contact.name, contact.phone or "", contact.email or "", contact.address or "", contact.birthday or ""
 
 
-def is_valid_birthday(birthday_str: str) -> bool:
+def _note_cells(note: Note) -> Tuple[str, ...]:
     """
-    Validate the birthday format and ensure it is not in the future.
-
-    Args:
-        birthday_str (str): Birthday string in 'YYYY-MM-DD' format.
-
-    Returns:
-        bool: True if valid and not in future, False otherwise.
+    Returns the cells of a note in the note tables.
     """
 
-    try:
-        bday = datetime.strptime(birthday_str, "%Y-%m-%d").date()
-        return bday <= date.today()
-    except ValueError:
-        return False
+    return f"#{note.id}", note.text, ", ".join(note.tags)
 
 
 @input_error
@@ -70,7 +57,7 @@ def add_contact(contact_book: ContactBook) -> str:
     """
 
     while True:
-        name = input(f"{Fore.CYAN}Name:{Style.RESET_ALL} ").strip().title()
+        name = ask(f"{Fore.CYAN}Name:{Style.RESET_ALL} ").strip().title()
         if not name:
             print(f"{Fore.RED}Name is required.{Style.RESET_ALL}")
             continue
@@ -80,22 +67,22 @@ def add_contact(contact_book: ContactBook) -> str:
         break
 
     while True:
-        phone = input(f"{Fore.CYAN}Phone:{Style.RESET_ALL} ").strip()
+        phone = ask(f"{Fore.CYAN}Phone:{Style.RESET_ALL} ").strip()
         if is_valid_phone(phone):
             break
         print(f"{Fore.RED}Invalid phone number. Please enter a valid phone (10–15 digits, optional '+' at start).{Style.RESET_ALL}")
 
     while True:
-        email = input(f"{Fore.CYAN}Email (optional):{Style.RESET_ALL} ").strip()
+        email = ask(f"{Fore.CYAN}Email (optional):{Style.RESET_ALL} ", optional=True).strip()
         if not email:
             break
         if is_valid_email(email):
             break
         print(f"{Fore.RED}Invalid email address. Please enter a valid email or press Enter to skip.{Style.RESET_ALL}")
 
-    address = input(f"{Fore.CYAN}Address (optional):{Style.RESET_ALL} ").strip()
+    address = ask(f"{Fore.CYAN}Address (optional):{Style.RESET_ALL} ", optional=True).strip()
     while True:
-        birthday = input(f"{Fore.CYAN}Birthday (YYYY-MM-DD):{Style.RESET_ALL} ").strip()
+        birthday = ask(f"{Fore.CYAN}Birthday (YYYY-MM-DD):{Style.RESET_ALL} ", optional=True).strip()
         if not birthday:
             break
         if is_valid_birthday(birthday):
@@ -103,16 +90,20 @@ def add_contact(contact_book: ContactBook) -> str:
         print(f"{Fore.RED}Invalid birthday. Please use YYYY-MM-DD and ensure the date is not in the future.{Style.RESET_ALL}")
 
     contact = Contact(name, phone, email, address, birthday)
+    same_phone = contact_book.find_by_phone(phone)
     success = contact_book.add_contact(contact)
 
     if not success:
         return f"{Fore.YELLOW}Contact with name '{name}' already exists.{Style.RESET_ALL}"
+    if same_phone:
+        names = ", ".join(repr(other.name) for other in same_phone)
+        return f"{Fore.GREEN}Contact added.{Style.RESET_ALL} {Fore.YELLOW}The phone is also used by {names}.{Style.RESET_ALL}"
     return f"{Fore.GREEN}Contact added.{Style.RESET_ALL}"
 
 
 
 @input_error
-def search_contact(contact_book: ContactBook) -> str:
+def search_contact(contact_book: ContactBook) -> Union[str, Iterator[str]]:
     """
     Search for contacts by name and return matching results.
 
@@ -120,34 +111,39 @@ def search_contact(contact_book: ContactBook) -> str:
         contact_book (ContactBook): Instance of the contact book.
 
     Returns:
-        str: Tabulated results or error message.
+        Union[str, Iterator[str]]: Chunks of the results table, or an error message.
     """
 
-    query = input(f"{Fore.CYAN}Search query:{Style.RESET_ALL} ").strip()
+    query = ask(f"{Fore.CYAN}Search query:{Style.RESET_ALL} ").strip()
     results = contact_book.search_contacts(query)
+    note = ""
 
     if not results:
-        return f"{Fore.RED}No contacts found.{Style.RESET_ALL}"
+        results = [contact for contact, _ in contact_book.fuzzy_find(query)]
+        if not results:
+            return f"{Fore.RED}No contacts found.{Style.RESET_ALL}"
+        note = f"{Fore.YELLOW}No exact matches. Closest names:{Style.RESET_ALL}\n"
 
-    table = []
-    for contact in results:
-        table.append([
-            f"{Fore.YELLOW}{contact.name}{Style.RESET_ALL}",
-            f"{Fore.CYAN}{contact.phone}{Style.RESET_ALL}",
-            f"{Fore.MAGENTA}{contact.email or ''}{Style.RESET_ALL}",
-            f"{Fore.BLUE}{contact.address or ''}{Style.RESET_ALL}",
-            f"{Fore.GREEN}{contact.birthday or ''}{Style.RESET_ALL}",
-        ])
+    table = stream_records(results, _contact_cells, CONTACT_HEADERS, CONTACT_COLORS, use_color(PageOptions()))
+    return chain([note], table)
 
-    headers = [
-        f"{Fore.YELLOW}Name{Style.RESET_ALL}",
-        f"{Fore.CYAN}Phone{Style.RESET_ALL}",
-        f"{Fore.MAGENTA}Email{Style.RESET_ALL}",
-        f"{Fore.BLUE}Address{Style.RESET_ALL}",
-        f"{Fore.GREEN}Birthday{Style.RESET_ALL}"
-    ]
 
-    return tabulate(table, headers=headers, tablefmt="grid")
+def _did_you_mean(contact_book: ContactBook, name: str) -> str:
+    """
+    Suggest the contacts whose names are closest to one that was not found.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+        name (str): The name that was not found.
+
+    Returns:
+        str: " Did you mean: ...?" with the closest names, or an empty string if none is close.
+    """
+
+    matches = contact_book.fuzzy_find(name)
+    if not matches:
+        return ""
+    return f" Did you mean: {', '.join(repr(contact.name) for contact, _ in matches)}?"
 
 
 @input_error
@@ -162,18 +158,21 @@ def edit_contact(contact_book: ContactBook) -> str:
         str: Update status message.
     """
 
-    name = input(f"{Fore.CYAN}Contact name to edit:{Style.RESET_ALL} ").strip()
+    name = ask(f"{Fore.CYAN}Contact name to edit:{Style.RESET_ALL} ").strip()
     contact = contact_book.find(name)
     if not contact:
-        return f"{Fore.RED}Contact '{name}' not found. Add a new contact instead.{Style.RESET_ALL}"
+        return (
+            f"{Fore.RED}Contact '{name}' not found.{_did_you_mean(contact_book, name) or ' Add a new contact instead.'}"
+            f"{Style.RESET_ALL}"
+        )
 
-    field = input(f"{Fore.CYAN}Field to edit (name, phone, email, address, birthday):{Style.RESET_ALL} ").strip().lower()
+    field = ask(f"{Fore.CYAN}Field to edit (name, phone, email, address, birthday):{Style.RESET_ALL} ").strip().lower()
     if field not in ["name", "phone", "email", "address", "birthday"]:
         return f"{Fore.RED}Invalid field. Please choose one of: name, phone, email, address, birthday.{Style.RESET_ALL}"
 
     if field == "name":
         while True:
-            new_name = input(f"{Fore.CYAN}New name:{Style.RESET_ALL} ").strip().title()
+            new_name = ask(f"{Fore.CYAN}New name:{Style.RESET_ALL} ").strip().title()
             if not new_name:
                 print(f"{Fore.RED}Name cannot be empty.{Style.RESET_ALL}")
                 continue
@@ -189,27 +188,27 @@ def edit_contact(contact_book: ContactBook) -> str:
 
     elif field == "phone":
         while True:
-            new_value = input(f"{Fore.CYAN}New phone number:{Style.RESET_ALL} ").strip()
+            new_value = ask(f"{Fore.CYAN}New phone number:{Style.RESET_ALL} ").strip()
             if is_valid_phone(new_value):
                 break
             print(f"{Fore.RED}Invalid phone number. Please enter a valid phone (10–15 digits, optional '+' at start).{Style.RESET_ALL}")
 
     elif field == "email":
         while True:
-            new_value = input(f"{Fore.CYAN}New email address:{Style.RESET_ALL} ").strip()
+            new_value = ask(f"{Fore.CYAN}New email address:{Style.RESET_ALL} ").strip()
             if is_valid_email(new_value):
                 break
             print(f"{Fore.RED}Invalid email address. Please enter a valid format (e.g. name@example.com).{Style.RESET_ALL}")
 
     elif field == "birthday":
         while True:
-            new_value = input(f"{Fore.CYAN}New birthday (YYYY-MM-DD):{Style.RESET_ALL} ").strip()
+            new_value = ask(f"{Fore.CYAN}New birthday (YYYY-MM-DD):{Style.RESET_ALL} ").strip()
             if is_valid_birthday(new_value):
                 break
             print(f"{Fore.RED}Invalid birthday. Please use YYYY-MM-DD and ensure the date is not in the past.{Style.RESET_ALL}")
 
     elif field == "address":
-        new_value = input(f"{Fore.CYAN}New address:{Style.RESET_ALL} ").strip()
+        new_value = ask(f"{Fore.CYAN}New address:{Style.RESET_ALL} ").strip()
 
     success = contact_book.edit_contact(name, **{field: new_value})
     if success:
@@ -231,51 +230,331 @@ def delete_contact(contact_book: ContactBook) -> str:
         str: Success or failure message.
     """
 
-    name = input(f"{Fore.CYAN}Name of the contact to delete:{Style.RESET_ALL} ").strip()
+    name = ask(f"{Fore.CYAN}Name of the contact to delete:{Style.RESET_ALL} ").strip()
     removed = contact_book.delete_contact(name)
     return (
         f"{Fore.GREEN}Deleted contact: {name}{Style.RESET_ALL}"
         if removed else
-        f"{Fore.RED}Contact '{name}' not found.{Style.RESET_ALL}"
+        f"{Fore.RED}Contact '{name}' not found.{_did_you_mean(contact_book, name)}{Style.RESET_ALL}"
     )
 
 
 @input_error
-def list_contacts(contact_book: ContactBook) -> str:
+def list_contacts(contact_book: ContactBook) -> Union[str, Iterator[str]]:
     """
-    List all contacts in the contact book.
+    List the contacts in the contact book, sorted by name.
+
+    Accepts the options ``--page N``, ``--limit N``, ``--offset N`` and ``--plain`` after the command,
+    and ``--from X --to Y`` to list only names from X through those starting with Y. The rows are
+    walked lazily from the book's sorted name index and rendered a chunk at a time.
 
     Args:
         contact_book (ContactBook): Instance of the contact book.
 
     Returns:
-        str: Tabulated list of contacts.
+        Union[str, Iterator[str]]: Chunks of the contacts table, or an error message.
     """
 
-    if not contact_book.contacts:
+    options = parse_page_options(remaining_arguments(), ranges=True)
+    if not len(contact_book):
         return f"{Fore.RED}No contacts found.{Style.RESET_ALL}"
 
-    table = []
-    for contact in sorted(contact_book.contacts.values(), key=lambda c: c.name.lower()):
-        table.append([
-            f"{Fore.YELLOW}{contact.name}{Style.RESET_ALL}",
-            f"{Fore.CYAN}{contact.phone}{Style.RESET_ALL}",
-            f"{Fore.MAGENTA}{contact.email or ''}{Style.RESET_ALL}",
-            f"{Fore.BLUE}{contact.address or ''}{Style.RESET_ALL}",
-            f"{Fore.GREEN}{contact.birthday or ''}{Style.RESET_ALL}",
-        ])
+    low, high = contact_book.sorted_range(options.first, options.last)
+    total = high - low
+    if not total:
+        return f"{Fore.RED}No contacts in this range.{Style.RESET_ALL}"
 
-    headers = [
-        f"{Fore.YELLOW}Name{Style.RESET_ALL}",
-        f"{Fore.CYAN}Phone{Style.RESET_ALL}",
-        f"{Fore.MAGENTA}Email{Style.RESET_ALL}",
-        f"{Fore.BLUE}Address{Style.RESET_ALL}",
-        f"{Fore.GREEN}Birthday{Style.RESET_ALL}"
-    ]
+    start, stop = page_window(total, options)
+    if start >= stop:
+        return f"{Fore.RED}No contacts on this page ({total} in total).{Style.RESET_ALL}"
+
+    table = stream_records(
+        contact_book.iter_sorted(low + start, low + stop), _contact_cells, CONTACT_HEADERS, CONTACT_COLORS,
+        use_color(options),
+    )
+    return chain(table, [page_footer(total, options)])
+
+
+@input_error
+def lookup_phone(contact_book: ContactBook) -> Union[str, Iterator[str]]:
+    """
+    Find the contacts with a phone number, in any notation, or, if none has exactly that number,
+    the contacts whose number starts with it (e.g. an operator code such as "050").
+
+    Accepts the listing options ``--page N``, ``--limit N``, ``--offset N`` and ``--plain``.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        Union[str, Iterator[str]]: Chunks of the matching contacts table, or an error message.
+    """
+
+    phone = ask(f"{Fore.CYAN}Phone number or prefix:{Style.RESET_ALL} ").strip()
+    options = parse_page_options(remaining_arguments())
+    if not any(char.isdigit() for char in phone):
+        raise ValueError("Please enter a phone number or the start of one.")
+
+    results = contact_book.find_by_phone(phone) or contact_book.search_phone_prefix(phone)
+    if not results:
+        return f"{Fore.RED}No contacts with phone '{phone}'.{Style.RESET_ALL}"
+
+    total = len(results)
+    start, stop = page_window(total, options)
+    if start >= stop:
+        return f"{Fore.RED}No contacts on this page ({total} in total).{Style.RESET_ALL}"
+
+    rows = ((contact.name, contact.phone or "", contact.email or "") for contact in results[start:stop])
+    table = stream_table(rows, ["Name", "Phone", "Email"], [Fore.YELLOW, Fore.CYAN, Fore.MAGENTA], use_color(options))
+    return chain(table, [page_footer(total, options)])
+
+
+@input_error
+def duplicate_phones(contact_book: ContactBook) -> str:
+    """
+    List the phone numbers shared by several contacts, whatever notation each contact uses.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        str: Tabulated numbers with their contacts, or a message if there are none.
+    """
 
+    duplicates = contact_book.duplicate_phones()
+    if not duplicates:
+        return f"{Fore.GREEN}No phone number is used by more than one contact.{Style.RESET_ALL}"
+
+    table = [
+        [
+            f"{Fore.CYAN}+{phone}{Style.RESET_ALL}",
+            f"{Fore.YELLOW}{', '.join(contact.name for contact in contacts)}{Style.RESET_ALL}",
+        ]
+        for phone, contacts in duplicates
+    ]
+    headers = [f"{Fore.CYAN}Phone{Style.RESET_ALL}", f"{Fore.YELLOW}Contacts{Style.RESET_ALL}"]
     return tabulate(table, headers=headers, tablefmt="fancy_grid")
 
 
+# Merge groups shown before asking to apply the plan; the rest are only counted.
+DEDUPE_PREVIEW = 20
+
+
+@input_error
+def dedupe_contacts(contact_book: ContactBook) -> str:
+    """
+    Find contacts that are probably the same person (same email or phone, similar names), show
+    the merge plan and apply it in one batch if confirmed.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        str: Merge summary, or a message if nothing was merged.
+    """
+
+    # Imported here: only this command needs the dedupe engine.
+    from services.dedupe import DEFAULT_THRESHOLD, MAX_BLOCK, find_duplicates
+
+    value = ask(
+        f"{Fore.CYAN}Minimum match score, 0 to 1 (Enter for {DEFAULT_THRESHOLD}):{Style.RESET_ALL} ", optional=True,
+    ).strip()
+    try:
+        threshold = float(value) if value else DEFAULT_THRESHOLD
+    except ValueError:
+        raise ValueError("The score must be a number between 0 and 1.")
+    if not 0 <= threshold <= 1:
+        raise ValueError("The score must be a number between 0 and 1.")
+
+    report = find_duplicates(contact_book.iter_sorted(), threshold)
+    # Oversized blocks are never compared, so duplicates in them go unnoticed: always say so.
+    skipped = (
+        f"{Fore.YELLOW}{report.skipped_blocks} groups of more than {MAX_BLOCK} contacts sharing an email, phone "
+        f"or name were not compared.{Style.RESET_ALL}"
+    ) if report.skipped_blocks else ""
+    if not report.merges:
+        found = f"{Fore.GREEN}No duplicate contacts found ({report.compared} pairs compared).{Style.RESET_ALL}"
+        return "\n".join(filter(None, [found, skipped]))
+
+    table = [
+        [
+            f"{Fore.YELLOW}{merge.keep.name}{Style.RESET_ALL}",
+            f"{Fore.RED}{', '.join(contact.name for contact in merge.remove)}{Style.RESET_ALL}",
+            ", ".join(f"{field}={value}" for field, value in merge.fields.items()),
+            f"{merge.score:.2f}",
+        ]
+        for merge in report.merges[:DEDUPE_PREVIEW]
+    ]
+    headers = [f"{Fore.YELLOW}Keep{Style.RESET_ALL}", f"{Fore.RED}Merge and delete{Style.RESET_ALL}", "Filled fields", "Score"]
+    print(tabulate(table, headers=headers, tablefmt="fancy_grid"))
+    if len(report.merges) > DEDUPE_PREVIEW:
+        print(f"... and {len(report.merges) - DEDUPE_PREVIEW} more groups.")
+    if skipped:
+        print(skipped)
+
+    answer = ask(
+        f"{Fore.CYAN}Apply {len(report.merges)} merges? (yes/no):{Style.RESET_ALL} ", optional=True,
+    ).strip().lower()
+    if answer != "yes":
+        return f"{Fore.YELLOW}No contacts were merged.{Style.RESET_ALL}"
+
+    removed = contact_book.merge_contacts(merge.to_dict() for merge in report.merges)
+    return f"{Fore.GREEN}Merged {len(report.merges)} groups, {removed} duplicate contacts removed.{Style.RESET_ALL}"
+
+
+@input_error
+def import_contacts(contact_book: ContactBook) -> str:
+    """
+    Import contacts from a CSV, vCard (.vcf) or JSON-lines file.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        str: Import summary, with the first rejected rows if any.
+    """
+
+    path = ask(f"{Fore.CYAN}File to import (.csv, .vcf or .jsonl):{Style.RESET_ALL} ").strip()
+    try:
+        result = read_contacts(contact_book, path)
+    except OSError as e:
+        raise ValueError(f"Cannot read '{path}': {e.strerror}")
+
+    summary = f"{Fore.GREEN}Imported {result.added} contact(s).{Style.RESET_ALL}"
+    if not result.rejected:
+        return summary
+
+    lines = [
+        summary,
+        f"{Fore.YELLOW}Rejected {result.rejected} row(s), see {result.report_path}:{Style.RESET_ALL}",
+        *(f"  row {row}: {name or '<no name>'} - {reason}" for row, name, reason in result.sample),
+    ]
+    if result.rejected > len(result.sample):
+        lines.append("  ...")
+    return "\n".join(lines)
+
+
+@input_error
+def export_contacts(contact_book: ContactBook) -> str:
+    """
+    Export all contacts, sorted by name, to a CSV, vCard (.vcf) or JSON-lines file.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        str: Export summary.
+    """
+
+    path = ask(f"{Fore.CYAN}File to export to (.csv, .vcf or .jsonl):{Style.RESET_ALL} ").strip()
+    try:
+        count = write_contacts(contact_book.iter_sorted(), path)
+    except OSError as e:
+        raise ValueError(f"Cannot write '{path}': {e.strerror}")
+    return f"{Fore.GREEN}Exported {count} contact(s) to {path}.{Style.RESET_ALL}"
+
+
+_QUERY_FIELD = re.compile(r"(-?[A-Za-z_]+:(?:!=|>=|<=|=|>|<)?)(.*)", re.DOTALL)
+
+
+def _query_text() -> str:
+    """
+    Read a structured query: the text after the command, or a prompt when there is none.
+
+    The query is taken as typed, so quoted values such as ``name:="Jane Doe"`` keep their quotes;
+    a query quoted as a whole, as in ``explain notes "tag:urgent AND tag:client"``, is unquoted.
+    When only the split words are known, a single argument is the whole query and a word with
+    spaces in it is quoted again after its ``field:`` part.
+
+    Returns:
+        str: The query.
+    """
+
+    text = raw_arguments()
+    if text is not None:
+        if len(text) > 1 and text[0] in "\"'" and text[-1] == text[0]:
+            words = shlex.split(text)
+            if len(words) == 1:
+                return words[0]
+        return text or ask(f"{Fore.CYAN}Query:{Style.RESET_ALL} ").strip()
+
+    words = remaining_arguments()
+    if not words:
+        return ask(f"{Fore.CYAN}Query:{Style.RESET_ALL} ").strip()
+    if len(words) == 1:
+        return words[0]
+
+    parts: List[str] = []
+    for word in words:
+        if any(char.isspace() for char in word):
+            match = _QUERY_FIELD.fullmatch(word)
+            word = f'{match.group(1)}"{match.group(2)}"' if match else f'"{word}"'
+        parts.append(word)
+    return " ".join(parts)
+
+
+def _explanation(plan: Dict[str, Any]) -> str:
+    """
+    Format the plan returned by a book's ``explain``.
+
+    Args:
+        plan (Dict[str, Any]): The plan.
+
+    Returns:
+        str: The plan as colored lines.
+    """
+
+    lines = [
+        f"{Fore.GREEN}Access:{Style.RESET_ALL} {plan['access']}",
+        f"{Fore.GREEN}Cost:{Style.RESET_ALL} ~{plan['cost']} of {plan['rows']} rows examined",
+        f"{Fore.GREEN}Filter:{Style.RESET_ALL} {plan['filter'] or '-'}",
+        f"{Fore.GREEN}Sort:{Style.RESET_ALL} {plan['sort']}"
+        + (f", {Fore.GREEN}limit:{Style.RESET_ALL} {plan['limit']}" if plan["limit"] is not None else ""),
+    ]
+    if plan["considered"]:
+        lines.append(f"{Fore.GREEN}Indexes considered:{Style.RESET_ALL}")
+        lines.extend(
+            f"  {Fore.YELLOW if description == plan['access'] else ''}{description}: ~{cost} rows{Style.RESET_ALL}"
+            for description, cost in plan["considered"]
+        )
+    return "\n".join(lines)
+
+
+@input_error
+def query_contacts(contact_book: ContactBook) -> Union[str, Iterator[str]]:
+    """
+    Find contacts with a structured query, e.g. ``email:*@acme.com birthday:month=5 limit:10``.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        Union[str, Iterator[str]]: Chunks of the matching contacts table, or an error message.
+    """
+
+    results = contact_book.query(_query_text())
+    if not results:
+        return f"{Fore.RED}No contacts found.{Style.RESET_ALL}"
+
+    table = stream_records(results, _contact_cells, CONTACT_HEADERS, CONTACT_COLORS, use_color(PageOptions()))
+    return chain(table, [f"{len(results)} contact(s) found.\n"])
+
+
+@input_error
+def explain_contacts(contact_book: ContactBook) -> str:
+    """
+    Show how a structured contact query would be run: the index or scan chosen and its cost.
+
+    Args:
+        contact_book (ContactBook): Instance of the contact book.
+
+    Returns:
+        str: The plan.
+    """
+
+    return _explanation(contact_book.explain(_query_text()))
+
+
 @input_error
 def add_note(note_book: NoteBook) -> str:
     """
@@ -288,11 +567,14 @@ def add_note(note_book: NoteBook) -> str:
         str: Success message.
     """
 
-    text = input(f"{Fore.CYAN}Note text:{Style.RESET_ALL} ").strip()
-    tags_input = input(f"{Fore.CYAN}Tags (comma-separated, optional):{Style.RESET_ALL} ").strip()
+    text = ask(f"{Fore.CYAN}Note text:{Style.RESET_ALL} ").strip()
+    tags_input = ask(f"{Fore.CYAN}Tags (comma-separated, optional):{Style.RESET_ALL} ", optional=True).strip()
     tags = [tag.strip() for tag in tags_input.split(',')] if tags_input else []
-    note_book.add_note(text, tags)
-    return f"{Fore.GREEN}Note added.{Style.RESET_ALL}"
+    note = note_book.add_note(text, tags)
+    return f"{Fore.GREEN}Note #{note.id} added.{Style.RESET_ALL}"
+
+
+RANKED_RESULTS_LIMIT = 10
 
 
 @input_error
@@ -300,6 +582,9 @@ def search_note(note_book: NoteBook) -> str:
     """
     Search for notes by keyword or tag, and return them sorted alphabetically.
 
+    In ranked mode the keyword is a full-text query (terms, 'prefix*' terms and "quoted phrases")
+    and the most relevant notes are returned first, with their scores.
+
     Args:
         note_book (NoteBook): Instance of the note book.
 
@@ -307,51 +592,107 @@ def search_note(note_book: NoteBook) -> str:
         str: Search result or error message.
     """
 
-    keyword = input(f"{Fore.CYAN}Keyword or tag to search:{Style.RESET_ALL} ").strip()
+    keyword = ask(f"{Fore.CYAN}Keyword or tag to search:{Style.RESET_ALL} ").strip()
+    mode = ask(f"{Fore.CYAN}Mode (plain/ranked, default plain):{Style.RESET_ALL} ", optional=True).strip().lower()
+
+    if mode == "ranked":
+        ranked = note_book.search_ranked(keyword, RANKED_RESULTS_LIMIT)
+        return (
+            "\n".join(
+                f"{Fore.GREEN}[{score:.2f}]{Style.RESET_ALL} {Fore.YELLOW}Note #{n.id}:{Style.RESET_ALL} {n.text} | "
+                f"{Fore.MAGENTA}Tags:{Style.RESET_ALL} {', '.join(n.tags)}"
+                for n, score in ranked
+            ) or f"{Fore.RED}No notes found.{Style.RESET_ALL}"
+        )
+    if mode not in ["plain", ""]:
+        print(f"{Fore.YELLOW}Unknown mode. Using plain search.{Style.RESET_ALL}")
+
+    # Matches come in the book's maintained text order, so they need no sorting here.
     results = note_book.search_notes(keyword)
-    sorted_results = sorted(results, key=lambda n: n.text.lower())
 
     return (
         "\n".join(
-            f"{Fore.YELLOW}Note:{Style.RESET_ALL} {n.text} | {Fore.MAGENTA}Tags:{Style.RESET_ALL} {', '.join(n.tags)}"
-            for n in sorted_results
+            f"{Fore.YELLOW}Note #{n.id}:{Style.RESET_ALL} {n.text} | {Fore.MAGENTA}Tags:{Style.RESET_ALL} {', '.join(n.tags)}"
+            for n in results
         ) or f"{Fore.RED}No notes found.{Style.RESET_ALL}"
     )
 
 
 
 @input_error
-def list_notes(note_book: NoteBook) -> str:
+def list_notes(note_book: NoteBook) -> Union[str, Iterator[str]]:
     """
-    List all notes with their tags, sorted alphabetically by note text.
+    List the notes with their tags, sorted alphabetically by note text.
+
+    Accepts the options ``--page N``, ``--limit N``, ``--offset N`` and ``--plain`` after the command,
+    and ``--from X --to Y`` to list only texts from X through those starting with Y. The rows are
+    walked lazily from the book's sorted text index and rendered a chunk at a time.
 
     Args:
         note_book (NoteBook): Instance of the note book.
 
     Returns:
-        str: Tabulated list of notes.
+        Union[str, Iterator[str]]: Chunks of the notes table, or an error message.
     """
-    if not note_book.notes:
+
+    options = parse_page_options(remaining_arguments(), ranges=True)
+    if not len(note_book):
         return f"{Fore.RED}No notes found.{Style.RESET_ALL}"
 
-    sorted_notes = sorted(note_book.notes, key=lambda n: n.text.lower())
+    low, high = note_book.sorted_range(options.first, options.last)
+    total = high - low
+    if not total:
+        return f"{Fore.RED}No notes in this range.{Style.RESET_ALL}"
 
-    table = []
-    for note in sorted_notes:
-        table.append([
-            f"{Fore.YELLOW}{note.text}{Style.RESET_ALL}",
-            f"{Fore.MAGENTA}{', '.join(note.tags)}{Style.RESET_ALL}" if note.tags else ""
-        ])
+    start, stop = page_window(total, options)
+    if start >= stop:
+        return f"{Fore.RED}No notes on this page ({total} in total).{Style.RESET_ALL}"
 
-    headers = [f"{Fore.YELLOW}Note Text{Style.RESET_ALL}", f"{Fore.MAGENTA}Tags{Style.RESET_ALL}"]
-    return tabulate(table, headers=headers, tablefmt="fancy_grid")
+    table = stream_records(
+        note_book.iter_sorted(low + start, low + stop), _note_cells, NOTE_HEADERS, NOTE_COLORS, use_color(options),
+    )
+    return chain(table, [page_footer(total, options)])
 
 
+@input_error
+def query_notes(note_book: NoteBook) -> Union[str, Iterator[str]]:
+    """
+    Find notes with a structured query, e.g. ``tag:urgent AND tag:client -text:draft``.
+
+    Args:
+        note_book (NoteBook): Instance of the note book.
+
+    Returns:
+        Union[str, Iterator[str]]: Chunks of the matching notes table, or an error message.
+    """
+
+    results = note_book.query(_query_text())
+    if not results:
+        return f"{Fore.RED}No notes found.{Style.RESET_ALL}"
+
+    table = stream_records(results, _note_cells, NOTE_HEADERS, NOTE_COLORS, use_color(PageOptions()))
+    return chain(table, [f"{len(results)} note(s) found.\n"])
+
+
+@input_error
+def explain_notes(note_book: NoteBook) -> str:
+    """
+    Show how a structured note query would be run: the index or scan chosen and its cost.
+
+    Args:
+        note_book (NoteBook): Instance of the note book.
+
+    Returns:
+        str: The plan.
+    """
+
+    return _explanation(note_book.explain(_query_text()))
+
 
 @input_error
 def edit_note(note_book: NoteBook) -> str:
     """
-    Edit the text and/or tags of a note identified by text or tag.
+    Edit the text and/or tags of a note identified by #id, text or tag.
 
     Args:
         note_book (NoteBook): Instance of the note book.
@@ -360,14 +701,14 @@ def edit_note(note_book: NoteBook) -> str:
         str: Update status message.
     """
 
-    identifier = input(f"{Fore.CYAN}Enter note text or tag to edit:{Style.RESET_ALL} ").strip()
-    new_text = input(f"{Fore.CYAN}New text:{Style.RESET_ALL} ").strip()
+    identifier = ask(f"{Fore.CYAN}Enter note #id, text or tag to edit:{Style.RESET_ALL} ").strip()
+    new_text = ask(f"{Fore.CYAN}New text:{Style.RESET_ALL} ", optional=True).strip()
 
     new_tags = None
-    update_tags = input(f"{Fore.CYAN}Do you want to edit tags as well? (yes/no):{Style.RESET_ALL} ").strip().lower()
+    update_tags = ask(f"{Fore.CYAN}Do you want to edit tags as well? (yes/no):{Style.RESET_ALL} ", optional=True).strip().lower()
 
     if update_tags == "yes":
-        tags_input = input(f"{Fore.CYAN}Enter new tags (comma-separated):{Style.RESET_ALL} ").strip()
+        tags_input = ask(f"{Fore.CYAN}Enter new tags (comma-separated):{Style.RESET_ALL} ").strip()
         new_tags = [tag.strip() for tag in tags_input.split(',')] if tags_input else []
     elif update_tags not in ["no", ""]:
         print(f"{Fore.YELLOW}Unknown response. Tags will not be updated.{Style.RESET_ALL}")
@@ -382,7 +723,7 @@ def edit_note(note_book: NoteBook) -> str:
 @input_error
 def delete_note(note_book: NoteBook) -> str:
     """
-    Delete notes that match a given text or tag.
+    Delete the note with a given #id, or notes that match a given text or tag.
 
     Args:
         note_book (NoteBook): Instance of the note book.
@@ -391,20 +732,40 @@ def delete_note(note_book: NoteBook) -> str:
         str: Deletion status message.
     """
 
-    identifier = input(f"{Fore.CYAN}Enter note text or tag to delete:{Style.RESET_ALL} ").strip()
-    original_len = len(note_book.notes)
-
-    note_book.notes = [
-        note for note in note_book.notes
-        if note.text != identifier and identifier not in note.tags
-    ]
+    identifier = ask(f"{Fore.CYAN}Enter note #id, text or tag to delete:{Style.RESET_ALL} ").strip()
+    deleted = note_book.delete_notes(identifier)
 
     return (
-        f"{Fore.GREEN}Note(s) deleted.{Style.RESET_ALL}" if len(note_book.notes) < original_len
+        f"{Fore.GREEN}Note(s) deleted.{Style.RESET_ALL}" if deleted
         else f"{Fore.RED}Note not found.{Style.RESET_ALL}"
     )
 
 
+@input_error
+def list_tags(note_book: NoteBook) -> str:
+    """
+    List all note tags with the number of notes carrying each, most used first.
+
+    Args:
+        note_book (NoteBook): Instance of the note book.
+
+    Returns:
+        str: Tabulated list of tags.
+    """
+
+    counts = note_book.tag_counts()
+    if not counts:
+        return f"{Fore.RED}No tags found.{Style.RESET_ALL}"
+
+    table = [
+        [f"{Fore.MAGENTA}{tag}{Style.RESET_ALL}", f"{Fore.CYAN}{count}{Style.RESET_ALL}"]
+        for tag, count in counts
+    ]
+
+    headers = [f"{Fore.MAGENTA}Tag{Style.RESET_ALL}", f"{Fore.CYAN}Notes{Style.RESET_ALL}"]
+    return tabulate(table, headers=headers, tablefmt="fancy_grid")
+
+
 @input_error
 def show_birthday(contact_book: ContactBook):
     """
@@ -416,12 +777,15 @@ def show_birthday(contact_book: ContactBook):
     Returns:
         str: Birthday info or error.
     """
-    name = input(f"{Fore.CYAN}Name:{Style.RESET_ALL} ").strip()
+    name = ask(f"{Fore.CYAN}Name:{Style.RESET_ALL} ").strip()
     contact = contact_book.find(name)
+    if not contact:
+        return f"{Fore.RED}Contact '{name}' not found.{_did_you_mean(contact_book, name)}{Style.RESET_ALL}"
 
-    if contact and contact.birthday:
-        days = contact_book.days_to_birthday(contact.birthday)
-        return f"{Fore.YELLOW}{contact.name}'s birthday is on {contact.birthday}, in {days} days.{Style.RESET_ALL}"
+    if contact.birthday:
+        days = contact_book.days_until_birthday(contact.name)
+        if days is not None:
+            return f"{Fore.YELLOW}{contact.name}'s birthday is on {contact.birthday}, in {days} days.{Style.RESET_ALL}"
     return f"{Fore.RED}Birthday not found.{Style.RESET_ALL}"
 
 
@@ -438,27 +802,18 @@ def birthdays(contact_book: ContactBook) -> str:
     """
 
     try:
-        days = int(input("Show birthdays in how many days? ").strip())
+        days = int(ask("Show birthdays in how many days? ").strip())
     except ValueError:
         raise ValueError("Please enter a valid number of days.")
 
-    matches = []
-
-    for contact in contact_book.contacts.values():
-        if contact.birthday:
-            delta = contact_book.days_to_birthday(contact.birthday)
-            if isinstance(delta, int) and delta <= days:
-                matches.append((
-                    contact.name,
-                    contact.birthday,
-                    delta
-                ))
+    matches = [
+        (contact.name, contact.birthday, delta)
+        for contact, delta in contact_book.upcoming_birthdays(days)
+    ]
 
     if not matches:
         return f"{Fore.RED}No upcoming birthdays in {days} days.{Style.RESET_ALL}"
 
-    matches.sort(key=lambda x: x[2])
-
     table = [
         [
             f"{Fore.YELLOW}{name}{Style.RESET_ALL}",
@@ -494,18 +849,79 @@ def show_commands(*args) -> str:
     {Fore.YELLOW}search contact{Style.RESET_ALL}             - Search contacts by name
     {Fore.YELLOW}edit contact{Style.RESET_ALL}               - Edit a contact field
     {Fore.YELLOW}delete contact{Style.RESET_ALL}             - Delete a contact
-    {Fore.YELLOW}show contacts{Style.RESET_ALL}              - List all contacts
+    {Fore.YELLOW}show contacts{Style.RESET_ALL}              - List contacts [--from X] [--to Y] [--page N] [--limit N] [--offset N] [--plain]
     {Fore.YELLOW}show birthday{Style.RESET_ALL}              - Show upcoming birthday for a contact
     {Fore.YELLOW}birthdays{Style.RESET_ALL}                  - Show upcoming birthday for a given number of days
+    {Fore.YELLOW}lookup phone{Style.RESET_ALL}               - Find contacts by phone number or prefix
+    {Fore.YELLOW}duplicate phones{Style.RESET_ALL}           - List phone numbers shared by several contacts
+    {Fore.YELLOW}dedupe contacts{Style.RESET_ALL}            - Find and merge duplicate contacts
+    {Fore.YELLOW}import contacts{Style.RESET_ALL}            - Import contacts from a CSV, vCard or JSONL file
+    {Fore.YELLOW}export contacts{Style.RESET_ALL}            - Export contacts to a CSV, vCard or JSONL file
+    {Fore.YELLOW}query contacts{Style.RESET_ALL}             - Find contacts with a query, e.g. email:*@acme.com birthday:month=5
+    {Fore.YELLOW}explain contacts{Style.RESET_ALL}           - Show the plan and cost of a contact query
 
   {Fore.CYAN}📝 Notes:{Style.RESET_ALL}
     {Fore.YELLOW}add note{Style.RESET_ALL}                   - Add a new note
-    {Fore.YELLOW}search note{Style.RESET_ALL}                - Search notes by keyword or tag
-    {Fore.YELLOW}edit note{Style.RESET_ALL}                  - Edit a note by text or tag
-    {Fore.YELLOW}delete note{Style.RESET_ALL}                - Delete a note by text or tag
-    {Fore.YELLOW}show notes{Style.RESET_ALL}                 - List all notes
+    {Fore.YELLOW}search note{Style.RESET_ALL}                - Search notes by keyword or tag (plain or ranked)
+    {Fore.YELLOW}edit note{Style.RESET_ALL}                  - Edit a note by #id, text or tag
+    {Fore.YELLOW}delete note{Style.RESET_ALL}                - Delete a note by #id, text or tag
+    {Fore.YELLOW}show notes{Style.RESET_ALL}                 - List notes [--from X] [--to Y] [--page N] [--limit N] [--offset N] [--plain]
+    {Fore.YELLOW}list tags{Style.RESET_ALL}                  - List all tags with note counts
+    {Fore.YELLOW}query notes{Style.RESET_ALL}                - Find notes with a query, e.g. tag:urgent -text:draft
+    {Fore.YELLOW}explain notes{Style.RESET_ALL}              - Show the plan and cost of a note query
 
   {Fore.CYAN}🚪 Exit:{Style.RESET_ALL}
     {Fore.YELLOW}exit / close{Style.RESET_ALL}               - Exit the assistant bot
     {Fore.YELLOW}commands{Style.RESET_ALL}                   - Show this command list
+    {Fore.YELLOW}stats{Style.RESET_ALL}                      - Show per-command call counts and latencies
 """
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:.2f}"
+
+
+def show_stats(*args) -> str:
+    """
+    Show the call and error counts and latency percentiles of every command run so far, plus the
+    timings of book (service) calls and persistence operations.
+
+    Args:
+        *args (Any): Ignored, for compatibility.
+
+    Returns:
+        str: Tabulated statistics, latencies in milliseconds.
+    """
+
+    if not metrics.enabled:
+        return f"{Fore.RED}Instrumentation is off. Start with --stats or --stats-json FILE.{Style.RESET_ALL}"
+    if not metrics.commands:
+        return f"{Fore.RED}No commands recorded yet.{Style.RESET_ALL}"
+
+    table = []
+    for name, stats in sorted(metrics.commands.items()):
+        latency = stats.latency.summary()
+        table.append([
+            f"{Fore.YELLOW}{name}{Style.RESET_ALL}",
+            stats.calls,
+            f"{Fore.RED}{stats.errors}{Style.RESET_ALL}" if stats.errors else stats.errors,
+            _ms(latency["p50"]), _ms(latency["p95"]), _ms(latency["p99"]), _ms(latency["max"]),
+            _ms(stats.service.summary()["mean"]), _ms(stats.render.summary()["mean"]),
+        ])
+    headers = [
+        f"{Fore.YELLOW}Command{Style.RESET_ALL}", "Calls", "Errors", "p50 ms", "p95 ms", "p99 ms", "Max ms",
+        "Avg service ms", "Avg render ms",
+    ]
+    result = tabulate(table, headers=headers, tablefmt="fancy_grid")
+
+    if metrics.operations:
+        operations = []
+        for name, histogram in sorted(metrics.operations.items()):
+            summary = histogram.summary()
+            operations.append([
+                f"{Fore.CYAN}{name}{Style.RESET_ALL}", summary["count"],
+                _ms(summary["p50"]), _ms(summary["p95"]), _ms(summary["p99"]), _ms(summary["max"]),
+            ])
+        headers = [f"{Fore.CYAN}Operation{Style.RESET_ALL}", "Calls", "p50 ms", "p95 ms", "p99 ms", "Max ms"]
+        result += "\n" + tabulate(operations, headers=headers, tablefmt="fancy_grid")
+    return result
@@ -0,0 +1,160 @@
+import shlex
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# How many suggestions an unknown command gets, and how similar they must be (see difflib).
+SUGGESTIONS = 3
+SUGGESTION_CUTOFF = 0.6
+
+
+class _Node:
+    __slots__ = ("children", "command")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.command: Optional[str] = None
+
+
+class CommandTrie:
+    """
+    Prefix trie over the words of command names, matching the longest command a line starts with.
+
+    Matching walks one node per word, so it costs the length of the command rather than the number
+    of registered commands, and "show birthday" is never mistaken for "show birthdays".
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._root = _Node()
+        self.names: List[str] = []
+        for name in names:
+            self.add(name)
+
+    def add(self, name: str) -> None:
+        """
+        Register a command name.
+
+        Args:
+            name (str): The command, one or more words, e.g. "add contact".
+        """
+
+        node = self._root
+        for word in name.lower().split():
+            node = node.children.setdefault(word, _Node())
+        node.command = name
+        self.names.append(name)
+
+    def match(self, words: List[str]) -> Tuple[Optional[str], int]:
+        """
+        Find the longest registered command the words start with.
+
+        Args:
+            words (List[str]): The tokens of a line.
+
+        Returns:
+            Tuple[Optional[str], int]: The command (None if there is none) and how many words it spans.
+        """
+
+        node = self._root
+        command, size = None, 0
+        for index, word in enumerate(words):
+            node = node.children.get(word.lower())
+            if node is None:
+                break
+            if node.command is not None:
+                command, size = node.command, index + 1
+        return command, size
+
+    def suggest(self, text: str) -> List[str]:
+        """
+        Return the registered commands closest to an unknown one.
+
+        Args:
+            text (str): What was typed, e.g. "ad contcat".
+
+        Returns:
+            List[str]: Up to SUGGESTIONS command names, best first.
+        """
+
+        # difflib is only needed for mistyped commands, so it is not imported at startup.
+        from difflib import get_close_matches
+
+        words = text.lower().split()
+        # Compare against as many words as the longest command has, so trailing arguments do not count.
+        longest = max((len(name.split()) for name in self.names), default=0)
+        candidates: List[str] = []
+        for size in range(min(longest, len(words)), 0, -1):
+            for name in get_close_matches(" ".join(words[:size]), self.names, SUGGESTIONS, SUGGESTION_CUTOFF):
+                if name not in candidates:
+                    candidates.append(name)
+        return candidates[:SUGGESTIONS]
+
+    def parse(self, line: str) -> Tuple[Optional[str], List[str], str]:
+        """
+        Split a line into a command and its inline arguments.
+
+        Arguments are separated by spaces and may be quoted, e.g.
+        ``add contact "Jane Doe" +380501234567 "" "Kyiv, Main St 1" 1990-05-17``; an empty
+        argument ``""`` answers an optional prompt with nothing.
+
+        Args:
+            line (str): The input line.
+
+        Returns:
+            Tuple[Optional[str], List[str], str]: The command (None if unknown), its arguments
+            (all the tokens of the line if the command is unknown), and the arguments as typed,
+            quotes included, for commands that parse them with their own syntax.
+
+        Raises:
+            ValueError: If the line has unbalanced quotes.
+        """
+
+        tokens, starts = split_line(line)
+        command, size = self.match(tokens)
+        text = line[starts[size]:].strip() if size < len(tokens) else ""
+        return command, tokens[size:], text
+
+
+def split_line(line: str) -> Tuple[List[str], List[int]]:
+    """
+    Split a line into shell-like tokens, as ``shlex.split`` does, and find where each one starts.
+
+    Args:
+        line (str): The input line.
+
+    Returns:
+        Tuple[List[str], List[int]]: The tokens and, for each, the offset in the line from which
+        it (possibly preceded by spaces) was read.
+
+    Raises:
+        ValueError: If the line has unbalanced quotes.
+    """
+
+    lexer = shlex.shlex(line, posix=True)
+    lexer.whitespace_split = True
+    lexer.commenters = ""
+    tokens: List[str] = []
+    starts: List[int] = []
+    while True:
+        start = lexer.instream.tell()
+        token = lexer.get_token()
+        if token is None:
+            return tokens, starts
+        tokens.append(token)
+        starts.append(start)
+
+
+def unknown_command(trie: CommandTrie, line: str) -> str:
+    """
+    Build the message for an unknown command, with "did you mean" suggestions when there are any.
+
+    Args:
+        trie (CommandTrie): The registered commands.
+        line (str): The input line.
+
+    Returns:
+        str: The message.
+    """
+
+    suggestions = trie.suggest(line)
+    if not suggestions:
+        return "Unknown command. Type 'commands' to see available options."
+    return f"Unknown command. Did you mean: {', '.join(repr(name) for name in suggestions)}?"
@@ -0,0 +1,147 @@
+import re
+from collections import deque
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional
+
+from utils.metrics import metrics
+
+_COLOR_CODE = re.compile(r"\x1b\[[0-9;]*m")
+
+
+class ArgumentError(ValueError):
+    """
+    Raised in batch mode when a command needs an argument that was not given, or rejects one.
+    """
+
+
+class _Arguments:
+    """
+    Inline arguments supplied to the command being run, consumed in prompt order.
+    """
+
+    def __init__(self, values: Iterable[str], interactive: bool, text: Optional[str] = None):
+        self.values = deque(values)
+        self.interactive = interactive
+        self.text = text
+        self.given = len(self.values)
+        self.last_prompt: Optional[str] = None
+
+
+_arguments: Optional[_Arguments] = None
+
+
+def ask(prompt: str, optional: bool = False) -> str:
+    """
+    Read one command argument.
+
+    Interactively this is ``input(prompt)``. Inside ``inline_arguments`` the next inline argument is
+    returned instead. Asking the same prompt twice in a row means the command rejected the previous
+    value and would prompt again, which a batch cannot answer, so it raises an ArgumentError; an
+    interactive session falls back to ``input`` in that case and once the inline arguments run out.
+
+    Args:
+        prompt (str): The prompt shown to the user.
+        optional (bool): Whether the argument may be omitted at the end of an inline command.
+
+    Returns:
+        str: The raw argument.
+    """
+
+    if _arguments is None:
+        with metrics.waiting():
+            return input(prompt)
+
+    retry = prompt == _arguments.last_prompt
+    _arguments.last_prompt = prompt
+    if _arguments.interactive and (retry or not _arguments.values):
+        _arguments.values.clear()
+        with metrics.waiting():
+            return input(prompt)
+
+    label = _label(prompt)
+    if retry:
+        raise ArgumentError(f"Invalid value for '{label}'")
+    if _arguments.values:
+        return _arguments.values.popleft()
+    if optional:
+        return ""
+    raise ArgumentError(f"Missing argument '{label}'")
+
+
+@contextmanager
+def inline_arguments(
+    values: Iterable[str], interactive: bool = False, text: Optional[str] = None
+) -> Iterator[List[str]]:
+    """
+    Answer the prompts of the commands run inside the block with the given values.
+
+    Args:
+        values (Iterable[str]): The arguments, in the order the command asks for them.
+        interactive (bool): Whether to prompt the user for the arguments not given inline.
+        text (Optional[str]): The arguments as typed, quotes included, if known (see ``raw_arguments``).
+
+    Yields:
+        List[str]: A list that receives the arguments left unused when the block exits.
+    """
+
+    global _arguments
+    previous, _arguments = _arguments, _Arguments(values, interactive, text)
+    unused: List[str] = []
+    try:
+        yield unused
+    finally:
+        unused.extend(_arguments.values)
+        _arguments = previous
+
+
+def remaining_arguments() -> List[str]:
+    """
+    Take all inline arguments not consumed yet, e.g. the options following a listing command.
+
+    Returns:
+        List[str]: The arguments, or an empty list outside ``inline_arguments``.
+    """
+
+    if _arguments is None:
+        return []
+    values = list(_arguments.values)
+    _arguments.values.clear()
+    return values
+
+
+def raw_arguments() -> Optional[str]:
+    """
+    Take all inline arguments as they were typed, quotes included, for commands with their own
+    syntax (e.g. structured queries) that splitting the line into words would distort.
+
+    Returns:
+        Optional[str]: The text, or None if it is unknown or some arguments were already consumed;
+        the arguments are left in place then.
+    """
+
+    if _arguments is None or _arguments.text is None or len(_arguments.values) != _arguments.given:
+        return None
+    _arguments.values.clear()
+    return _arguments.text
+
+
+def strip_colors(text: str) -> str:
+    """
+    Remove ANSI color codes from a string.
+
+    Args:
+        text (str): Text that may contain colorama codes.
+
+    Returns:
+        str: The plain text.
+    """
+
+    return _COLOR_CODE.sub("", text)
+
+
+def _label(prompt: str) -> str:
+    """
+    Returns a prompt without its color codes and trailing punctuation, e.g. 'Phone'.
+    """
+
+    return strip_colors(prompt).strip().rstrip(":?").strip()
@@ -0,0 +1,423 @@
+import sys
+from collections import OrderedDict
+from itertools import chain, islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Tuple, Union
+
+from colorama import Style
+from wcwidth import wcswidth
+
+# Column widths are measured on this many rows; later rows that are wider get truncated.
+SAMPLE_ROWS = 1000
+# Cells never grow a column beyond this display width.
+MAX_COLUMN_WIDTH = 60
+# Rows are formatted and written in chunks of this size.
+CHUNK_ROWS = 200
+# Rows per page when --page is given without --limit.
+DEFAULT_PAGE_SIZE = 20
+# Approximate memory budget of the rows cached for listings, in bytes.
+ROW_CACHE_BYTES = 64 * 1024 * 1024
+# Estimated bytes of a cached row besides the characters of its text.
+ROW_OVERHEAD = 400
+# Distinct table layouts remembered before the canonical layouts are reset.
+MAX_LAYOUTS = 256
+
+
+class PageOptions:
+    """
+    Paging and output options of a listing command.
+
+    Attributes:
+        offset (int): Number of rows to skip.
+        limit (Optional[int]): Maximum number of rows to show, or None for all.
+        plain (bool): Whether to print without colors and box drawing.
+        page (Optional[int]): The 1-based page number, if paging by page.
+        first (Optional[str]): With ``--from``, the key the listing starts at.
+        last (Optional[str]): With ``--to``, the prefix of the last keys listed.
+    """
+
+    def __init__(
+        self, offset: int = 0, limit: Optional[int] = None, plain: bool = False, page: Optional[int] = None,
+        first: Optional[str] = None, last: Optional[str] = None,
+    ):
+        self.offset = offset
+        self.limit = limit
+        self.plain = plain
+        self.page = page
+        self.first = first
+        self.last = last
+
+
+def parse_page_options(args: Sequence[str], ranges: bool = False) -> PageOptions:
+    """
+    Parses listing options: ``--page N``, ``--limit N``, ``--offset N`` and ``--plain``, and, for
+    listings in key order, ``--from X`` and ``--to Y``.
+
+    ``--page`` counts pages of ``--limit`` rows (20 by default) and cannot be combined with ``--offset``.
+    Paging applies within the ``--from``/``--to`` range.
+
+    Args:
+        args (Sequence[str]): The option tokens.
+        ranges (bool): Whether ``--from`` and ``--to`` are accepted.
+
+    Returns:
+        PageOptions: The parsed options.
+    """
+
+    values = {}
+    bounds = {}
+    plain = False
+    tokens = iter(args)
+    for token in tokens:
+        option = token.lower()
+        if option in ("--plain", "--no-color"):
+            plain = True
+        elif option in ("--page", "--limit", "--offset"):
+            value = next(tokens, "")
+            if not value.isdigit():
+                raise ValueError(f"{option} expects a non-negative number.")
+            values[option] = int(value)
+        elif ranges and option in ("--from", "--to"):
+            value = next(tokens, "").strip()
+            if not value:
+                raise ValueError(f"{option} expects a name or the start of one.")
+            bounds[option] = value
+        else:
+            usage = "--page N, --limit N, --offset N, --from X, --to Y" if ranges else "--page N, --limit N, --offset N"
+            raise ValueError(f"Unknown option '{token}'. Use {usage} or --plain.")
+
+    page = values.get("--page")
+    limit = values.get("--limit")
+    if page is not None:
+        if page < 1:
+            raise ValueError("--page starts at 1.")
+        if "--offset" in values:
+            raise ValueError("Use either --page or --offset.")
+        limit = limit or DEFAULT_PAGE_SIZE
+        return PageOptions((page - 1) * limit, limit, plain, page, bounds.get("--from"), bounds.get("--to"))
+    return PageOptions(values.get("--offset", 0), limit, plain, None, bounds.get("--from"), bounds.get("--to"))
+
+
+def use_color(options: PageOptions) -> bool:
+    """
+    Returns whether output should be colored: not with --plain, nor when stdout is not a terminal.
+    """
+
+    return not options.plain and sys.stdout.isatty()
+
+
+def _width(text: str) -> int:
+    if text.isascii():
+        return len(text)
+    width = wcswidth(text)
+    return len(text) if width < 0 else width
+
+
+def _fit(text: str, width: int, size: Optional[int] = None) -> str:
+    """
+    Pads or truncates a cell to an exact display width, given its own width if already measured.
+    """
+
+    if size is None:
+        size = _width(text)
+    if size > width:
+        text = text[:width]
+        while text and _width(text) > width - 1:
+            text = text[:-1]
+        text += "…"
+        size = _width(text)
+    return text + " " * (width - size)
+
+
+# A cached row: the id of the cell function, the cells, their display widths, and the layout and
+# text of the row as last rendered. Plain tuples of strings and numbers, so the garbage collector
+# stops tracking them and a large cache does not slow down collections.
+_Row = Tuple[int, Tuple[str, ...], Tuple[int, ...], Optional[Tuple], str]
+
+
+class RowCache:
+    """
+    Bounded LRU cache of the table rows of contacts and notes, shared by the listing commands.
+
+    Listing the same records again formats the same cells and measures the same display widths;
+    the cache keeps, per record, the cells with their widths and the text of the row as last laid
+    out, so repeated listings (or another command showing the same records with the same columns)
+    reuse them. Rows are keyed by the record's ``revision``, which the books stamp with a new
+    process-wide number whenever a record is stored or edited: an edited record misses, and its
+    old row ages out. Records that were never stored in a book (revision 0, e.g. fetched from
+    SQLite or a server) are rendered without caching.
+
+    The least recently used rows are evicted once their estimated size exceeds the budget.
+
+    Attributes:
+        budget (int): The memory budget in bytes.
+        size (int): The estimated size of the cached rows in bytes.
+    """
+
+    def __init__(self, budget: int = ROW_CACHE_BYTES):
+        self.budget = budget
+        self.size = 0
+        self._rows: "OrderedDict[int, _Row]" = OrderedDict()
+        self._layouts: Dict[Tuple, Tuple] = {}
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def clear(self) -> None:
+        """
+        Drops every cached row.
+        """
+
+        self._rows.clear()
+        self._layouts.clear()
+        self.size = 0
+
+    def row(self, record: Any, cells: Callable[[Any], Sequence[str]]) -> Tuple[int, _Row]:
+        """
+        Returns the cached row of a record, building it if it is missing or stale.
+
+        Args:
+            record (Any): A contact or note.
+            cells (Callable[[Any], Sequence[str]]): Returns the cell values of a record.
+
+        Returns:
+            Tuple[int, _Row]: The revision of the record and its row.
+        """
+
+        revision, source = record.revision, id(cells)
+        row = self._rows.get(revision)
+        if row is not None and row[0] == source:
+            self._rows.move_to_end(revision)
+            return revision, row
+
+        values = tuple(cells(record))
+        fresh = (source, values, tuple(map(_width, values)), None, "")
+        if revision:
+            if row is not None:
+                self.size -= ROW_OVERHEAD + len(row[4])
+            self._rows[revision] = fresh
+            self._rows.move_to_end(revision)
+            self.size += ROW_OVERHEAD
+            self._evict()
+        return revision, fresh
+
+    def layout(self, widths: Sequence[int], colors: Sequence[str], color: bool) -> Tuple:
+        """
+        Returns the canonical object describing a table layout, so rows can check it by identity.
+        """
+
+        layout = (tuple(widths), tuple(colors), color)
+        if len(self._layouts) > MAX_LAYOUTS:
+            self._layouts.clear()
+        return self._layouts.setdefault(layout, layout)
+
+    def text(
+        self, revision: int, row: _Row, layout: Tuple, render: Callable[[Sequence[str], Sequence[int]], str]
+    ) -> str:
+        """
+        Returns the text of a row in a layout, rendering it if it was last laid out differently.
+        """
+
+        source, cells, widths, last, text = row
+        if last is layout:
+            return text
+
+        fresh = render(cells, widths)
+        if self._rows.get(revision) is row:
+            self._rows[revision] = (source, cells, widths, layout, fresh)
+            self.size += len(fresh) - len(text)
+            self._evict()
+        return fresh
+
+    def _evict(self) -> None:
+        while self.size > self.budget and self._rows:
+            _, row = self._rows.popitem(last=False)
+            self.size -= ROW_OVERHEAD + len(row[4])
+
+
+# Rows shared by all listings of the session.
+ROW_CACHE = RowCache()
+
+
+def _column_widths(headers: Sequence[str], sample: Iterable[Sequence[int]]) -> List[int]:
+    """
+    Returns the width of each column: the widest of the header and the sampled cell widths, capped.
+    """
+
+    widths = [_width(header) for header in headers]
+    for row in sample:
+        widths = [max(width, cell) for width, cell in zip(widths, row)]
+    return [min(width, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def _frame(
+    widths: Sequence[int], colors: Sequence[str], color: bool
+) -> Tuple[Callable[[Sequence[str], Sequence[int]], str], str, str, str, str]:
+    """
+    Returns the row formatter, taking the cells and their display widths, and the top, header
+    rule, separator and bottom lines of a table.
+    """
+
+    if color:
+        def line(left: str, fill: str, middle: str, right: str) -> str:
+            return left + middle.join(fill * (width + 2) for width in widths) + right + "\n"
+
+        def row_text(cells: Sequence[str], sizes: Sequence[int]) -> str:
+            return "│" + "│".join(
+                f" {paint}{_fit(cell, width, size)}{Style.RESET_ALL} "
+                for cell, size, width, paint in zip(cells, sizes, widths, colors)
+            ) + "│\n"
+
+        return (
+            row_text, line("╒", "═", "╤", "╕"), line("╞", "═", "╪", "╡"),
+            line("├", "─", "┼", "┤"), line("╘", "═", "╧", "╛"),
+        )
+
+    def plain_text(cells: Sequence[str], sizes: Sequence[int]) -> str:
+        return "  ".join(_fit(cell, width, size) for cell, size, width in zip(cells, sizes, widths)).rstrip() + "\n"
+
+    return plain_text, "", "  ".join("-" * width for width in widths) + "\n", "", ""
+
+
+def _join_rows(texts: Iterator[str], separator: str) -> Iterator[str]:
+    """
+    Joins row texts into chunks of CHUNK_ROWS rows, with separator lines between rows.
+    """
+
+    lead = ""
+    while True:
+        chunk = list(islice(texts, CHUNK_ROWS))
+        if not chunk:
+            return
+        yield lead + separator.join(chunk)
+        lead = separator
+
+
+def stream_table(
+    rows: Iterable[Sequence[str]], headers: Sequence[str], colors: Sequence[str], color: bool = True
+) -> Iterator[str]:
+    """
+    Lazily renders rows as a table, yielding the text of a few hundred rows at a time.
+
+    Column widths are computed from the headers and the first SAMPLE_ROWS rows, capped at
+    MAX_COLUMN_WIDTH, so the rest of the rows are formatted without being held in memory.
+    Colored output is drawn like tabulate's "fancy_grid"; plain output is a simple aligned table.
+
+    Args:
+        rows (Iterable[Sequence[str]]): The cell values of each row.
+        headers (Sequence[str]): The column headers.
+        colors (Sequence[str]): A colorama color per column.
+        color (bool): Whether to use colors and box drawing.
+
+    Yields:
+        str: Chunks of the table, each ending with a newline.
+    """
+
+    rows = iter(rows)
+    sample = [(row, [_width(cell) for cell in row]) for row in islice(rows, SAMPLE_ROWS)]
+    widths = _column_widths(headers, (sizes for _, sizes in sample))
+    row_text, top, header_rule, separator, bottom = _frame(widths, colors, color)
+
+    yield top + row_text(headers, [_width(header) for header in headers]) + header_rule
+    measured = chain(sample, ((row, [_width(cell) for cell in row]) for row in rows))
+    yield from _join_rows((row_text(row, sizes) for row, sizes in measured), separator)
+    if bottom:
+        yield bottom
+
+
+def stream_records(
+    records: Iterable[Any], cells: Callable[[Any], Sequence[str]], headers: Sequence[str], colors: Sequence[str],
+    color: bool = True, cache: Optional[RowCache] = None,
+) -> Iterator[str]:
+    """
+    Lazily renders contacts or notes as a table like ``stream_table``, reusing cached rows.
+
+    The cells, their widths and the row text of every record come from the row cache when the
+    record is unchanged since it was last listed with the same cell function (and, for the text,
+    the same column widths and colors).
+
+    Args:
+        records (Iterable[Any]): The contacts or notes.
+        cells (Callable[[Any], Sequence[str]]): Returns the cell values of a record; a module-level
+            function, since rows are cached per function.
+        headers (Sequence[str]): The column headers.
+        colors (Sequence[str]): A colorama color per column.
+        color (bool): Whether to use colors and box drawing.
+        cache (Optional[RowCache]): The row cache, ROW_CACHE by default.
+
+    Yields:
+        str: Chunks of the table, each ending with a newline.
+    """
+
+    cache = ROW_CACHE if cache is None else cache
+    rows = (cache.row(record, cells) for record in records)
+    sample = list(islice(rows, SAMPLE_ROWS))
+    widths = _column_widths(headers, (row[2] for _, row in sample))
+    row_text, top, header_rule, separator, bottom = _frame(widths, colors, color)
+    layout = cache.layout(widths, colors, color)
+
+    yield top + row_text(headers, [_width(header) for header in headers]) + header_rule
+    texts = (cache.text(revision, row, layout, row_text) for revision, row in chain(sample, rows))
+    yield from _join_rows(texts, separator)
+    if bottom:
+        yield bottom
+
+
+def page_window(total: int, options: PageOptions) -> Tuple[int, int]:
+    """
+    Returns the (start, stop) row range selected by the options out of ``total`` rows.
+    """
+
+    start = min(options.offset, total)
+    stop = total if options.limit is None else min(start + options.limit, total)
+    return start, stop
+
+
+def page_footer(total: int, options: PageOptions) -> str:
+    """
+    Returns a line describing which rows are shown, or an empty string when all of them are.
+    """
+
+    start, stop = page_window(total, options)
+    if start == 0 and stop == total:
+        return ""
+    if options.page is not None and options.limit:
+        pages = max(1, -(-total // options.limit))
+        return f"Page {options.page} of {pages}, rows {start + 1}-{stop} of {total}.\n"
+    return f"Rows {start + 1}-{stop} of {total}.\n"
+
+
+def write_output(result: Union[str, Iterable[str]], out: Optional[TextIO] = None) -> None:
+    """
+    Prints a command result; lazily rendered output is written chunk by chunk as it is produced.
+
+    Ctrl+C stops a long listing without ending the session.
+
+    Args:
+        result (Union[str, Iterable[str]]): A message, or chunks of text each ending with a newline.
+        out (Optional[TextIO]): The stream to write to, stdout by default.
+    """
+
+    out = out or sys.stdout
+    if isinstance(result, str):
+        print(result, file=out)
+        return
+    try:
+        for chunk in result:
+            out.write(chunk)
+    except KeyboardInterrupt:
+        out.write("\n")
+    out.flush()
+
+
+def output_text(result: Union[str, Iterable[str]]) -> str:
+    """
+    Returns a command result as a single string.
+
+    Args:
+        result (Union[str, Iterable[str]]): A message, or chunks of text each ending with a newline.
+
+    Returns:
+        str: The full text, without a trailing newline.
+    """
+
+    return result if isinstance(result, str) else "".join(result).rstrip("\n")
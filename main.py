@@ -1,5 +1,112 @@
-from cli.command_handler import run_command_loop
+# Imported first, so that startup phases are timed from the start of the program.
+from utils.startup import profile
+
+import argparse
+import signal
+import sys
+from typing import List, Optional
+
+with profile.phase("import cli.command_handler"):
+    from cli.command_handler import run_command_loop
+from server.protocol import DEFAULT_ADDRESS
+from storage.backends import open_storage
+from utils.metrics import metrics
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """
+    Entry point of the memomate command.
+
+    Without arguments the interactive assistant starts. With ``--batch FILE`` (or ``--batch`` alone
+    to read standard input) the commands in the file are run headlessly, one per line with inline
+    arguments, and a JSON status record is printed for each; the exit status is 1 if any failed.
+    ``--startup-profile`` prints how long imports and book loading take to stderr. ``--stats`` turns
+    on per-command instrumentation (see the ``stats`` command) and ``--stats-json FILE`` also writes
+    the statistics to FILE on exit.
+
+    ``--serve [ADDRESS]`` runs a book server instead, sharing the storage with concurrent clients
+    over a localhost TCP port or a Unix socket, and ``--connect [ADDRESS]`` runs the assistant (or
+    the batch) as a thin client of such a server.
+
+    Args:
+        argv (Optional[List[str]]): Command-line arguments, defaults to sys.argv[1:].
+    """
+
+    parser = argparse.ArgumentParser(prog="memomate", description="CLI assistant for managing contacts and notes.")
+    parser.add_argument(
+        "--batch", nargs="?", const="-", metavar="FILE",
+        help="run the commands in FILE ('-' or omitted for standard input) and report JSON lines",
+    )
+    parser.add_argument(
+        "--startup-profile", action="store_true", help="print import and load times to stderr",
+    )
+    parser.add_argument("--stats", action="store_true", help="record per-command counts and latencies")
+    parser.add_argument("--stats-json", metavar="FILE", help="record statistics and write them to FILE on exit")
+    parser.add_argument(
+        "--serve", nargs="?", const=DEFAULT_ADDRESS, metavar="ADDRESS",
+        help=f"serve the books to concurrent clients on HOST:PORT or unix:PATH (default {DEFAULT_ADDRESS})",
+    )
+    parser.add_argument(
+        "--connect", nargs="?", const=DEFAULT_ADDRESS, metavar="ADDRESS",
+        help="use the books of a server started with --serve instead of the local storage",
+    )
+    args = parser.parse_args(argv)
+    profile.enabled = args.startup_profile
+    metrics.enabled = args.stats or args.stats_json is not None
+
+    if args.serve is not None:
+        from server.server import serve
+
+        serve(args.serve)
+        return
+
+    _exit_on_signals()
+    try:
+        if args.batch is None:
+            run_command_loop(_open(args.connect))
+        else:
+            _run_batch(args.batch, _open(args.connect))
+    finally:
+        if args.stats_json:
+            metrics.dump(args.stats_json)
+
+
+def _exit_on_signals() -> None:
+    """
+    Turn SIGTERM and SIGHUP (e.g. a closed terminal) into SystemExit, so the storage is closed and
+    its journals flushed as on a normal exit.
+    """
+
+    def exit_on(signum: int, frame) -> None:
+        raise SystemExit(128 + signum)
+
+    for name in ("SIGTERM", "SIGHUP"):
+        if hasattr(signal, name):
+            signal.signal(getattr(signal, name), exit_on)
+
+
+def _open(address: Optional[str]):
+    if address is None:
+        return open_storage()
+    from server.client import RemoteStorage
+
+    return RemoteStorage(address)
+
+
+def _run_batch(path: str, storage) -> None:
+    from cli.batch import run_batch
+
+    try:
+        if path == "-":
+            failures = run_batch(sys.stdin, storage, sys.stdout)
+        else:
+            with open(path, encoding="utf-8") as script:
+                failures = run_batch(script, storage, sys.stdout)
+    finally:
+        storage.close()
+    profile.report("batch finished")
+    sys.exit(1 if failures else 0)
 
 
 if __name__ == "__main__":
-    run_command_loop()
+    main()
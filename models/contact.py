@@ -8,14 +8,47 @@ class Contact:
             email (str): Email address of the contact.
             address (str): Physical address of the contact.
             birthday (str): Birthday of the contact in 'YYYY-MM-DD' format.
+            revision (int): Stamped by the ContactBook with a new, process-wide unique number whenever
+                the contact is stored or edited (0 until then), so cached renderings of it (see
+                cli.render.RowCache) can tell that it changed.
+
+        Instances use __slots__ instead of a per-object __dict__ to keep large books compact.
     """
 
+    FIELDS = ("name", "phone", "email", "address", "birthday")
+    __slots__ = FIELDS + ("revision",)
+
     def __init__(self, name, phone=None, email=None, address=None, birthday=None):
         self.name = name
         self.phone = phone
         self.email = email
         self.address = address
         self.birthday = birthday
+        self.revision = 0
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        # Pickles written before __slots__ store the instance __dict__; slotted pickles use the same layout.
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+        for field in self.FIELDS:
+            setattr(self, field, state.get(field))
+        self.revision = 0
+
+    def to_dict(self):
+        """
+        Returns the contact fields as a plain dictionary.
+        """
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a contact from a dictionary produced by to_dict.
+        """
+        return cls(**{field: data.get(field) for field in cls.FIELDS})
 
     def __str__(self):
         return (
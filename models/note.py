@@ -1,15 +1,82 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+# Shared table of tag strings and tag tuples, so notes with the same tags share the same objects.
+_TAG_TABLE: Dict = {}
+
+
+def intern_tags(tags: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """
+    Returns the canonical, shared tuple for a sequence of tags.
+
+    Args:
+        tags (Optional[Iterable[str]]): The tags.
+
+    Returns:
+        Tuple[str, ...]: A tuple of interned tag strings, shared by all notes with the same tags.
+    """
+
+    if not tags:
+        return ()
+    interned = tuple(_TAG_TABLE.setdefault(tag, tag) for tag in tags)
+    return _TAG_TABLE.setdefault(interned, interned)
+
+
 class Note:
     """
         Represents a note that contains text and optional tags for categorization.
 
         Attributes:
             text (str): The main content of the note.
-            tags (list of str): A list of tags associated with the note.
+            tags (tuple of str): The tags associated with the note; any iterable assigned is stored
+                as an interned tuple shared with other notes carrying the same tags.
+            id (int): Stable identifier assigned by the NoteBook, None until the note is added to one.
+            revision (int): Stamped by the NoteBook with a new, process-wide unique number whenever
+                the note is stored or edited (0 until then), so cached renderings of it (see
+                cli.render.RowCache) can tell that it changed.
+
+        Instances use __slots__ instead of a per-object __dict__ to keep large books compact.
     """
 
-    def __init__(self, text, tags=None):
+    __slots__ = ("id", "text", "_tags", "revision")
+
+    def __init__(self, text, tags=None, note_id=None):
         self.text = text
-        self.tags = tags if tags else []
+        self.tags = tags
+        self.id = note_id
+        self.revision = 0
+
+    @property
+    def tags(self):
+        return self._tags
+
+    @tags.setter
+    def tags(self, tags):
+        self._tags = intern_tags(tags)
+
+    def __getstate__(self):
+        return {"id": self.id, "text": self.text, "tags": self._tags}
+
+    def __setstate__(self, state):
+        # Pickles written before __slots__ store the instance __dict__ and may lack an id.
+        if isinstance(state, tuple):
+            state = {**(state[0] or {}), **(state[1] or {})}
+        self.text = state.get("text")
+        self.tags = state.get("tags", state.get("_tags"))
+        self.id = state.get("id")
+        self.revision = 0
+
+    def to_dict(self):
+        """
+        Returns the note fields as a plain dictionary.
+        """
+        return {"id": self.id, "text": self.text, "tags": list(self.tags)}
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Creates a note from a dictionary produced by to_dict.
+        """
+        return cls(data["text"], data.get("tags"), data.get("id"))
 
     def __str__(self):
-        return f"Tags: ({self.tags}), Note: {self.text}"
+        return f"#{self.id} Tags: ({', '.join(self.tags)}), Note: {self.text}"
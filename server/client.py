@@ -0,0 +1,136 @@
+import json
+import socket
+from collections import Counter
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List
+
+from models.contact import Contact
+from server.protocol import DEFAULT_ADDRESS, PASSTHROUGH_ERRORS, decode, dump_line, encode, parse_address
+
+
+class RemoteError(RuntimeError):
+    """
+    Raised for a server-side failure that has no local equivalent, or a lost connection.
+    """
+
+
+class _Connection:
+    """
+    A blocking connection to a book server, sending one request at a time.
+    """
+
+    def __init__(self, address: str):
+        kind, where = parse_address(address)
+        if kind == "unix":
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._socket.connect(where)
+        self._file = self._socket.makefile("rwb")
+        self._next_id = 0
+
+    def request(self, book: str, method: str, args: Iterable = (), kwargs: Dict = None) -> Any:
+        self._next_id += 1
+        message = {
+            "id": self._next_id, "book": book, "method": method,
+            "args": encode(list(args)), "kwargs": encode(kwargs or {}),
+        }
+        self._file.write(dump_line(message))
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise RemoteError("The server closed the connection.")
+        response = json.loads(line)
+        error = response.get("error")
+        if error:
+            exception = PASSTHROUGH_ERRORS.get(error["type"])
+            if exception is not None:
+                raise exception(error["message"])
+            raise RemoteError(f"{error['type']}: {error['message']}")
+        return decode(response["result"])
+
+    def close(self) -> None:
+        self._file.close()
+        self._socket.close()
+
+
+class RemoteBook:
+    """
+    Stands in for a ContactBook or NoteBook served by a book server: method calls are sent to
+    the server and their results returned as local objects.
+    """
+
+    def __init__(self, connection: _Connection, name: str):
+        self._connection = connection
+        self._name = name
+
+    def __len__(self) -> int:
+        return self._connection.request(self._name, "__len__")
+
+    def __getattr__(self, method: str) -> Any:
+        if method.startswith("_"):
+            raise AttributeError(method)
+
+        def call(*args, **kwargs):
+            return self._connection.request(self._name, method, args, kwargs)
+
+        return call
+
+
+class RemoteContactBook(RemoteBook):
+    """
+    A remote contact book.
+    """
+
+    def add_contacts(self, contacts: Iterable[Contact]) -> List[Contact]:
+        # Callers match rejected contacts by identity (see utils.bulk_io), so return the originals.
+        # Of several contacts with one name only the first can be added, so the rejected ones are the
+        # last occurrences.
+        contacts = list(contacts)
+        rejected = Counter(contact.name for contact in self._connection.request(self._name, "add_contacts", [contacts]))
+        originals = []
+        for contact in reversed(contacts):
+            if rejected[contact.name]:
+                rejected[contact.name] -= 1
+                originals.append(contact)
+        originals.reverse()
+        return originals
+
+
+class RemoteStorage:
+    """
+    The books of a running book server (see ``server.server``), used like a local storage backend.
+
+    Attributes:
+        contact_book (RemoteContactBook): The served contact book.
+        note_book (RemoteBook): The served note book.
+    """
+
+    def __init__(self, address: str = DEFAULT_ADDRESS):
+        self._connection = _Connection(address)
+        self.contact_book = RemoteContactBook(self._connection, "contacts")
+        self.note_book = RemoteBook(self._connection, "notes")
+
+    @contextmanager
+    def busy(self) -> Iterator[None]:
+        """
+        The server guards its own books, so there is nothing to do.
+        """
+
+        yield
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """
+        The server already batches writes, so there is nothing to defer.
+        """
+
+        yield
+
+    def close(self) -> None:
+        """
+        Close the connection to the server.
+        """
+
+        self._connection.close()
@@ -0,0 +1,123 @@
+"""
+The JSON-lines protocol spoken by the book server.
+
+Each request and response is one JSON object on its own line. A request names a book, one of its
+methods and the arguments::
+
+    {"id": 1, "book": "contacts", "method": "find", "args": ["Jane Doe"], "kwargs": {}}
+
+and gets either ``{"id": 1, "result": ...}`` or ``{"id": 1, "error": {"type": "ValueError",
+"message": "..."}}``. Contacts and notes travel as ``{"$contact": {...}}`` and ``{"$note": {...}}``;
+tuples become lists.
+"""
+
+import json
+from collections.abc import Iterator as IteratorABC
+from typing import Any, Dict, FrozenSet, Tuple
+
+from models.contact import Contact
+from models.note import Note
+
+DEFAULT_ADDRESS = "127.0.0.1:7420"
+# The longest request line the server accepts, e.g. an import of many contacts.
+MAX_LINE = 64 * 1024 * 1024
+
+# Methods clients may call, split into reads (answered at once) and writes (queued and applied in batches).
+READS: Dict[str, FrozenSet[str]] = {
+    "contacts": frozenset({
+        "__len__", "find", "fuzzy_find", "find_by_phone", "search_phone_prefix", "duplicate_phones",
+        "search_contacts", "sorted_contacts", "sorted_range", "iter_sorted", "days_to_birthday", "days_until_birthday",
+        "upcoming_birthdays", "query", "explain",
+    }),
+    "notes": frozenset({
+        "__len__", "get", "search_notes", "sorted_notes", "sorted_range", "iter_sorted", "search_ranked", "search_tag",
+        "tag_counts", "query", "explain",
+    }),
+}
+WRITES: Dict[str, FrozenSet[str]] = {
+    "contacts": frozenset({"add_contact", "add_contacts", "edit_contact", "delete_contact", "merge_contacts"}),
+    "notes": frozenset({
+        "add_note", "edit_note", "edit_note_by_id", "delete_notes", "delete_note_by_id", "delete_note",
+    }),
+}
+
+# Errors re-raised as themselves by the client, so commands handle them as they do locally.
+PASSTHROUGH_ERRORS = {"KeyError": KeyError, "ValueError": ValueError, "IndexError": IndexError}
+
+
+def encode(value: Any) -> Any:
+    """
+    Converts a book argument or result into JSON-serializable data.
+
+    Args:
+        value (Any): A contact, note, or a structure of them and plain values.
+
+    Returns:
+        Any: The JSON-serializable form.
+    """
+
+    if isinstance(value, Contact):
+        return {"$contact": value.to_dict()}
+    if isinstance(value, Note):
+        return {"$note": value.to_dict()}
+    if isinstance(value, dict):
+        return {key: encode(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, IteratorABC)):
+        return [encode(item) for item in value]
+    return value
+
+
+def decode(value: Any) -> Any:
+    """
+    Converts data produced by ``encode`` back into contacts and notes.
+
+    Args:
+        value (Any): The decoded JSON.
+
+    Returns:
+        Any: The value with contacts and notes restored.
+    """
+
+    if isinstance(value, dict):
+        if len(value) == 1:
+            if "$contact" in value:
+                return Contact.from_dict(value["$contact"])
+            if "$note" in value:
+                return Note.from_dict(value["$note"])
+        return {key: decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    return value
+
+
+def dump_line(message: Dict) -> bytes:
+    """
+    Serializes a message as one protocol line.
+    """
+
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def parse_address(address: str) -> Tuple[str, Any]:
+    """
+    Parses a server address: "unix:PATH" or a path containing "/" for a Unix socket, otherwise
+    "HOST:PORT" (or just "PORT" for localhost) for TCP.
+
+    Args:
+        address (str): The address.
+
+    Returns:
+        Tuple[str, Any]: ("unix", path) or ("tcp", (host, port)).
+
+    Raises:
+        ValueError: If a TCP address has no valid port.
+    """
+
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if "/" in address:
+        return "unix", address
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid server address '{address}'. Use HOST:PORT or a Unix socket path.")
+    return "tcp", (host or "127.0.0.1", int(port))
@@ -0,0 +1,240 @@
+"""
+Asyncio server sharing one storage between many local clients.
+
+Clients send JSON-lines requests (see ``server.protocol``) over a Unix socket or a localhost TCP
+port. Writes are queued, and a single writer task applies everything queued so far as one batch,
+inside ``storage.deferred()``, so a burst of writes costs one journal flush (or one WAL checkpoint)
+instead of one per request. A write is acknowledged only after its batch is on disk.
+
+The books are plain Python objects (whose indexes are built lazily on first use) or an SQLite
+connection bound to the thread that opened it, so every book call, read or write batch, runs on
+one worker thread that owns the storage, one at a time in the order they arrive. Book calls never
+overlap; what the server adds is that the event loop keeps serving sockets while a call runs, and
+that queued writes share one disk write.
+"""
+
+import asyncio
+import json
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from server.protocol import DEFAULT_ADDRESS, MAX_LINE, READS, WRITES, decode, dump_line, encode, parse_address
+from storage.backends import open_storage
+
+# The most queued writes applied in one batch.
+MAX_BATCH = 256
+
+
+class _Call:
+    """
+    A decoded request waiting to be run.
+    """
+
+    def __init__(self, book: str, method: str, args: List, kwargs: Dict):
+        self.book = book
+        self.method = method
+        self.args = args
+        self.kwargs = kwargs
+
+
+def _error(request_id: Any, error: BaseException) -> Dict:
+    return {"id": request_id, "error": {"type": type(error).__name__, "message": str(error)}}
+
+
+class BookServer:
+    """
+    Serves the contact and note books of a storage backend to concurrent clients.
+
+    Attributes:
+        storage_factory (Callable[[], Any]): Opens the storage, on the worker thread.
+        requests (int): Number of requests answered.
+        batches (int): Number of write batches applied.
+    """
+
+    def __init__(self, storage_factory: Callable[[], Any] = open_storage, max_batch: int = MAX_BATCH):
+        self.storage_factory = storage_factory
+        self.max_batch = max_batch
+        self.requests = 0
+        self.batches = 0
+        self._storage: Any = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="books")
+        self._writes: Optional[asyncio.Queue] = None
+        self._writer: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """
+        Opens the storage and starts the writer task.
+        """
+
+        loop = asyncio.get_running_loop()
+        self._storage = await loop.run_in_executor(self._executor, self.storage_factory)
+        self._writes = asyncio.Queue()
+        self._writer = asyncio.create_task(self._write_batches())
+
+    async def stop(self) -> None:
+        """
+        Applies the queued writes, then closes the storage.
+        """
+
+        if self._writer is not None:
+            await self._writes.join()
+            self._writer.cancel()
+            self._writer = None
+        if self._storage is not None:
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._storage.close)
+            self._storage = None
+        self._executor.shutdown()
+
+    def _book(self, name: str) -> Any:
+        return self._storage.contact_book if name == "contacts" else self._storage.note_book
+
+    def _run(self, call: _Call) -> Any:
+        # Encoded on the worker thread, before later writes can change the objects.
+        with self._storage.busy():
+            return encode(getattr(self._book(call.book), call.method)(*call.args, **call.kwargs))
+
+    def _run_batch(self, calls: List[_Call]) -> List[Tuple[bool, Any]]:
+        outcomes = []
+        with self._storage.deferred():
+            for call in calls:
+                try:
+                    outcomes.append((True, self._run(call)))
+                except Exception as e:
+                    outcomes.append((False, e))
+        return outcomes
+
+    async def _write_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < self.max_batch and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            try:
+                outcomes = await loop.run_in_executor(self._executor, self._run_batch, [c for c, _ in batch])
+                self.batches += 1
+                for (_, future), (ok, value) in zip(batch, outcomes):
+                    if ok:
+                        future.set_result(value)
+                    else:
+                        future.set_exception(value)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    async def call(self, book: str, method: str, args: List, kwargs: Dict) -> Any:
+        """
+        Runs one book method on the worker thread; writes join the next batch.
+
+        Args:
+            book (str): "contacts" or "notes".
+            method (str): The method name, one of ``READS`` or ``WRITES`` for the book.
+            args (List): Positional arguments, already decoded.
+            kwargs (Dict): Keyword arguments, already decoded.
+
+        Returns:
+            Any: The encoded result.
+
+        Raises:
+            ValueError: If the book or method is not served.
+        """
+
+        if book not in READS:
+            raise ValueError(f"Unknown book: {book}")
+        call = _Call(book, method, args, kwargs)
+        if method in READS[book]:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, self._run, call)
+        if method in WRITES[book]:
+            future = asyncio.get_running_loop().create_future()
+            await self._writes.put((call, future))
+            return await future
+        raise ValueError(f"Unknown method: {book}.{method}")
+
+    async def _answer(self, line: bytes) -> Dict:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            result = await self.call(
+                request["book"], request["method"], decode(request.get("args") or []), decode(request.get("kwargs") or {}),
+            )
+            return {"id": request_id, "result": result}
+        except Exception as e:
+            return _error(request_id, e)
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """
+        Answers the requests of one client, in order, until it disconnects.
+        """
+
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError as e:
+                    # The line exceeded MAX_LINE; the stream cannot be resynchronized.
+                    writer.write(dump_line(_error(None, e)))
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                writer.write(dump_line(await self._answer(line)))
+                self.requests += 1
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, address: str = DEFAULT_ADDRESS, ready: Optional[Callable[[], None]] = None) -> None:
+        """
+        Listens on the address until cancelled or sent SIGINT/SIGTERM, then shuts down cleanly.
+
+        Args:
+            address (str): "HOST:PORT", or "unix:PATH" (or a path) for a Unix socket.
+            ready (Optional[Callable[[], None]]): Called once the server accepts connections.
+        """
+
+        kind, where = parse_address(address)
+        await self.start()
+        try:
+            if kind == "unix":
+                if os.path.exists(where):
+                    os.remove(where)
+                listener = await asyncio.start_unix_server(self.handle, where, limit=MAX_LINE)
+                os.chmod(where, 0o600)
+            else:
+                listener = await asyncio.start_server(self.handle, *where, limit=MAX_LINE)
+
+            stopped = asyncio.Event()
+            loop = asyncio.get_running_loop()
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                try:
+                    loop.add_signal_handler(signum, stopped.set)
+                except (NotImplementedError, RuntimeError, ValueError):
+                    pass
+            async with listener:
+                if ready is not None:
+                    ready()
+                await stopped.wait()
+        finally:
+            await self.stop()
+            if kind == "unix" and os.path.exists(where):
+                os.remove(where)
+
+
+def serve(address: str = DEFAULT_ADDRESS) -> None:
+    """
+    Runs a book server on the storage selected by MEMOMATE_STORAGE until interrupted.
+
+    Args:
+        address (str): "HOST:PORT", or "unix:PATH" (or a path) for a Unix socket.
+    """
+
+    asyncio.run(BookServer().serve(address, ready=lambda: print(f"Serving contacts and notes on {address}", flush=True)))
@@ -0,0 +1,191 @@
+import calendar
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Birthdays are bucketed by their day of year in a leap year, so February 29 has a slot of its own.
+_LEAP_YEAR = 2000
+_DAYS_IN_CALENDAR = 366
+_FEB_28_SLOT = date(_LEAP_YEAR, 2, 28).timetuple().tm_yday - 1
+_FEB_29_SLOT = _FEB_28_SLOT + 1
+
+
+def parse_birthday(birthday_str: str) -> Optional[Tuple[int, int]]:
+    """
+    Parses a 'YYYY-MM-DD' birthday into its month and day.
+
+    Args:
+        birthday_str (str): Birthday string.
+
+    Returns:
+        Optional[Tuple[int, int]]: (month, day), or None if the string is not a valid date.
+    """
+
+    try:
+        birthday = datetime.strptime(birthday_str, "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return None
+    return birthday.month, birthday.day
+
+
+def birthday_in_year(month: int, day: int, year: int) -> date:
+    """
+    Returns the date a birthday is celebrated on in the given year.
+
+    Leap-day policy: a February 29 birthday is celebrated on February 28 in non-leap years.
+
+    Args:
+        month (int): Birth month.
+        day (int): Birth day.
+        year (int): The year to place the birthday in.
+
+    Returns:
+        date: The celebration date.
+    """
+
+    if month == 2 and day == 29 and not calendar.isleap(year):
+        day = 28
+    return date(year, month, day)
+
+
+def days_until(month: int, day: int, today: date) -> int:
+    """
+    Returns the number of days from today until the next celebration of a birthday (0 if it is today).
+
+    Args:
+        month (int): Birth month.
+        day (int): Birth day.
+        today (date): The reference date.
+
+    Returns:
+        int: Days until the next birthday.
+    """
+
+    next_birthday = birthday_in_year(month, day, today.year)
+    if next_birthday < today:
+        next_birthday = birthday_in_year(month, day, today.year + 1)
+    return (next_birthday - today).days
+
+
+def _slot(month: int, day: int) -> int:
+    return date(_LEAP_YEAR, month, day).timetuple().tm_yday - 1
+
+
+class BirthdayIndex:
+    """
+    Calendar of birthdays bucketed by day of year.
+
+    Each birthday is parsed once when the document is added. Window queries then walk the calendar
+    day by day from a reference date, so they cost O(window + matches) regardless of book size.
+    """
+
+    def __init__(self, birthday: str = "birthday"):
+        self._attr = birthday
+        self._slots: List[Dict[str, Any]] = [{} for _ in range(_DAYS_IN_CALENDAR)]
+        self._dates: Dict[str, Tuple[int, int]] = {}
+
+    def __len__(self) -> int:
+        return len(self._dates)
+
+    def clear(self) -> None:
+        """
+        Removes all documents from the index.
+        """
+
+        for slot in self._slots:
+            slot.clear()
+        self._dates.clear()
+
+    def add(self, key: str, doc: Any) -> None:
+        """
+        Indexes a document under the given key if it has a valid birthday.
+
+        Args:
+            key (str): The key the document is stored under.
+            doc (Any): The document to index.
+        """
+
+        month_day = parse_birthday(getattr(doc, self._attr))
+        if month_day is None:
+            return
+        self._dates[key] = month_day
+        self._slots[_slot(*month_day)][key] = doc
+
+    def remove(self, key: str) -> None:
+        """
+        Removes the document stored under the given key, if any.
+
+        Args:
+            key (str): The key the document is stored under.
+        """
+
+        month_day = self._dates.pop(key, None)
+        if month_day is not None:
+            del self._slots[_slot(*month_day)][key]
+
+    def days_until(self, key: str, today: Optional[date] = None) -> Optional[int]:
+        """
+        Returns the days until the next birthday of the document stored under the given key.
+
+        Args:
+            key (str): The key the document is stored under.
+            today (Optional[date]): The reference date, defaults to today.
+
+        Returns:
+            Optional[int]: Days until the birthday, or None if the key has no indexed birthday.
+        """
+
+        month_day = self._dates.get(key)
+        if month_day is None:
+            return None
+        return days_until(*month_day, today or date.today())
+
+    def upcoming(self, days: int, today: Optional[date] = None) -> List[Tuple[Any, int]]:
+        """
+        Returns the documents whose birthday falls within the next ``days`` days, soonest first.
+
+        Args:
+            days (int): Size of the window in days; 0 means birthdays today only.
+            today (Optional[date]): The reference date, defaults to today.
+
+        Returns:
+            List[Tuple[Any, int]]: (document, days until birthday) pairs.
+        """
+
+        today = today or date.today()
+        matches = []
+        visited = set()
+
+        for offset in range(min(days, _DAYS_IN_CALENDAR - 1) + 1):
+            day = today + timedelta(days=offset)
+            slots = [_slot(day.month, day.day)]
+            if slots[0] == _FEB_28_SLOT and not calendar.isleap(day.year):
+                slots.append(_FEB_29_SLOT)
+
+            for slot in slots:
+                if slot in visited:
+                    continue
+                visited.add(slot)
+                matches.extend((doc, offset) for doc in self._slots[slot].values())
+
+        return matches
+
+    def select(self, months: Iterable[int], days: Iterable[int]) -> List[Any]:
+        """
+        Returns the documents whose birthday falls on one of the given days of one of the given
+        months, visiting only those calendar slots.
+
+        Args:
+            months (Iterable[int]): Birth months, 1 to 12.
+            days (Iterable[int]): Birth days, 1 to 31; days a month does not have are skipped.
+
+        Returns:
+            List[Any]: The documents, in calendar order.
+        """
+
+        days = list(days)
+        matches = []
+        for month in months:
+            for day in days:
+                if day <= calendar.monthrange(_LEAP_YEAR, month)[1]:
+                    matches.extend(self._slots[_slot(month, day)].values())
+        return matches
@@ -0,0 +1,176 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Returns the Levenshtein distance between two strings: the number of single-character
+    insertions, deletions and substitutions turning one into the other.
+
+    With a ``limit``, only the cells within ``limit`` of the diagonal are computed and the
+    computation stops as soon as the distance is known to exceed it, which makes verifying
+    candidates against a small limit much cheaper.
+
+    Args:
+        a (str): The first string.
+        b (str): The second string.
+        limit (Optional[int]): If given, any distance above it is returned as ``limit + 1``.
+
+    Returns:
+        int: The distance.
+    """
+
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if limit is None:
+        limit = len(a)
+    elif len(a) - len(b) > limit:
+        return limit + 1
+    if not b:
+        return len(a)
+
+    cap = limit + 1
+    width = len(b)
+    previous = [j if j <= limit else cap for j in range(width + 1)]
+    for i, char_a in enumerate(a, 1):
+        low = i - limit if i > limit else 1
+        high = i + limit if i + limit < width else width
+        current = [cap] * (width + 1)
+        best = cap
+        if low == 1 and i <= limit:
+            current[0] = best = i
+        for j in range(low, high + 1):
+            value = previous[j - 1] + (char_a != b[j - 1])
+            other = current[j - 1] + 1
+            if other < value:
+                value = other
+            other = previous[j] + 1
+            if other < value:
+                value = other
+            if value > cap:
+                value = cap
+            current[j] = value
+            if value < best:
+                best = value
+        if best > limit:
+            return cap
+        previous = current
+    return previous[width]
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree over strings, answering "all words within edit distance k" queries without
+    comparing the query against every word.
+
+    Each node keeps its children keyed by their distance to it, so by the triangle inequality a
+    query at distance d from a node only needs to descend into children keyed d - k to d + k.
+    Words are added incrementally; removed words stay in the tree as tombstones until more than
+    half of it is dead, and then the tree is rebuilt.
+    """
+
+    def __init__(self):
+        self._words: List[str] = []
+        self._children: Dict[int, Dict[int, int]] = {}
+        self._positions: Dict[str, int] = {}
+        self._dead: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._positions) - len(self._dead)
+
+    def __contains__(self, word: str) -> bool:
+        return word in self._positions and word not in self._dead
+
+    def clear(self) -> None:
+        """
+        Removes all words from the tree.
+        """
+
+        self._words.clear()
+        self._children.clear()
+        self._positions.clear()
+        self._dead.clear()
+
+    def add(self, word: str) -> None:
+        """
+        Adds a word to the tree; adding a word already present does nothing.
+
+        Args:
+            word (str): The word, e.g. one word of a normalized name.
+        """
+
+        if word in self._positions:
+            self._dead.discard(word)
+            return
+
+        position = len(self._words)
+        self._words.append(word)
+        self._positions[word] = position
+        if position == 0:
+            return
+
+        node = 0
+        while True:
+            distance = edit_distance(word, self._words[node])
+            children = self._children.get(node)
+            if children is None:
+                self._children[node] = {distance: position}
+                return
+            child = children.get(distance)
+            if child is None:
+                children[distance] = position
+                return
+            node = child
+
+    def remove(self, word: str) -> None:
+        """
+        Removes a word from the tree, if present.
+
+        Args:
+            word (str): The word to remove.
+        """
+
+        if word not in self._positions or word in self._dead:
+            return
+        self._dead.add(word)
+        if len(self._dead) * 2 > len(self._positions):
+            live = [w for w in self._words if w not in self._dead]
+            self.clear()
+            for w in live:
+                self.add(w)
+
+    def search(self, word: str, max_distance: int, limit: int = 0) -> List[Tuple[str, int]]:
+        """
+        Finds the words within an edit distance of the given one.
+
+        Args:
+            word (str): The query word, normalized like the stored words.
+            max_distance (int): The largest edit distance returned.
+            limit (int): The most results returned, 0 for all.
+
+        Returns:
+            List[Tuple[str, int]]: Matching words and their distances, closest first (ties in
+            alphabetical order).
+        """
+
+        if not self._words:
+            return []
+
+        matches = []
+        pending = [0]
+        while pending:
+            node = pending.pop()
+            candidate = self._words[node]
+            children = self._children.get(node)
+            # Past the largest child key plus max_distance the exact distance no longer matters.
+            bound = max_distance + (max(children) if children else 0)
+            distance = edit_distance(word, candidate, bound)
+            if distance <= max_distance and candidate not in self._dead:
+                matches.append((candidate, distance))
+            if children:
+                low, high = distance - max_distance, distance + max_distance
+                pending.extend(child for key, child in children.items() if low <= key <= high)
+
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches[:limit] if limit else matches
@@ -1,17 +1,132 @@
-from datetime import datetime, date
-from typing import Optional, List, Union
+import unicodedata
+from datetime import date
+from typing import Dict, Iterable, Iterator, Optional, List, Set, Tuple, Union
 
 from models.contact import Contact
+from services.birthday_index import BirthdayIndex, days_until, parse_birthday
+from services.events import ChangeNotifier, next_revision
+from services.name_index import FuzzyNameIndex
+from services.phone_index import PhoneIndex, normalize_phone
+from services.query import Access, Field, Predicate, Queryable, Schema
+from services.sorted_index import SortedIndex, prefix_end
+from services.trigram_index import TrigramIndex
+from utils.startup import profile
 
 
-class ContactBook:
+def normalize_name(name: str) -> str:
+    """
+    Returns the caseless form of a contact name used for lookups.
+
+    The name is NFKC-normalized before and after Unicode case folding, so that
+    e.g. "STRASSE" and "straße" or composed and decomposed accents compare equal.
+
+    Args:
+        name (str): The name to normalize.
+
+    Returns:
+        str: The normalized name.
+    """
+
+    return unicodedata.normalize("NFKC", unicodedata.normalize("NFKC", name).casefold())
+
+
+def _search_fields(contact: Contact) -> List[str]:
+    """
+    Returns the lowercased non-empty fields matched by search_contacts.
+    """
+
+    fields = (contact.name, contact.phone, contact.email, contact.address, contact.birthday)
+    return [f.lower() for f in fields if f]
+
+
+def _matches_search(contact: Contact, query: str) -> bool:
+    """
+    Returns whether a lowercased query is a substring of one of a contact's fields, as in search_contacts.
+    """
+
+    for field in (contact.name, contact.phone, contact.email, contact.address, contact.birthday):
+        if field and query in field.lower():
+            return True
+    return False
+
+
+# The fields structured queries (see services.query) can use on contacts.
+CONTACT_SCHEMA = Schema(
+    {
+        "name": Field("text", lambda contact: contact.name),
+        "phone": Field("phone", lambda contact: contact.phone),
+        "email": Field("text", lambda contact: contact.email),
+        "address": Field("text", lambda contact: contact.address),
+        "birthday": Field("date", lambda contact: contact.birthday),
+    },
+    _matches_search,
+    order="name",
+    key=lambda contact: contact.name,
+    normalize=normalize_phone,
+)
+
+
+class ContactBook(ChangeNotifier, Queryable):
     """
     Manages a collection of contacts, providing methods to add, edit, delete, and search contacts,
     as well as calculate days until a contact's next birthday.
+
+    Contacts are kept in name order by a sorted index, built on the first listing and then updated
+    on every addition, rename and deletion, so listings walk it instead of sorting the book.
+
+    Only the case-folded name lookup is built when a book is loaded. The other indexes (trigram
+    search, birthdays, fuzzy names, phones) are built the same way as the name order: by the first
+    call that needs each of them, and kept up to date from then on. So loading a book, or running a
+    command, never pays for an index it does not use.
+
+    Every successful mutation is published to subscribers as a record that ``apply`` can replay.
+    Structured queries (``query``, ``explain``) are answered from the name, phone, birthday and
+    trigram indexes when one of them narrows the search.
     """
 
+    query_schema = CONTACT_SCHEMA
+
     def __init__(self):
-        self.contacts = {}
+        self._init_listeners()
+        self._contacts = {}
+        self._keys = {}
+        self._search: Optional[TrigramIndex] = None
+        self._birthdays: Optional[BirthdayIndex] = None
+        self._names: Optional[FuzzyNameIndex] = None
+        self._phones: Optional[PhoneIndex] = None
+        self._order: Optional[SortedIndex] = None
+
+    @property
+    def contacts(self) -> Dict[str, Contact]:
+        """
+        The contacts dictionary keyed by contact name.
+
+        Mutate it only through the ContactBook methods, otherwise the lookup index goes stale.
+        Assigning a new dictionary (e.g. one loaded from a pickle file) rebuilds the index.
+        """
+
+        return self._contacts
+
+    @contacts.setter
+    def contacts(self, contacts: Dict[str, Contact]) -> None:
+        self._contacts = contacts
+        self._keys = {}
+        self._search = self._birthdays = self._names = self._phones = None
+        self._order = None
+        for key, contact in contacts.items():
+            self._keys.setdefault(normalize_name(key), key)
+            contact.revision = next_revision()
+        self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._contacts)
+
+    def __getstate__(self) -> dict:
+        return {"contacts": self._contacts}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+        self.contacts = state["contacts"]
 
     def _get_actual_key(self, name: str) -> Optional[str]:
         """
@@ -24,10 +139,90 @@ class ContactBook:
             Optional[str]: The matched key from the dictionary, or None if not found.
         """
 
-        for stored_name in self.contacts:
-            if stored_name.lower() == name.lower():
-                return stored_name
-        return None
+        return self._keys.get(normalize_name(name))
+
+    def _index(self, key: str, contact: Contact, doc_id: Optional[int] = None) -> None:
+        """
+        Adds a contact stored under the given key to the secondary indexes built so far, and stamps
+        a new revision on it since it is (re)indexed whenever it is stored or edited.
+        """
+
+        contact.revision = next_revision()
+        if self._search is not None:
+            self._search.add(key, contact, doc_id)
+        if self._birthdays is not None:
+            self._birthdays.add(key, contact)
+        if self._names is not None:
+            self._names.add(normalize_name(key))
+        if self._phones is not None:
+            self._phones.add(key, contact.phone)
+
+    def _unindex(self, key: str) -> Optional[int]:
+        """
+        Removes the contact stored under the given key from the secondary indexes built so far.
+
+        Returns:
+            Optional[int]: The search index id of the contact, to re-index it in place after an edit.
+        """
+
+        if self._birthdays is not None:
+            self._birthdays.remove(key)
+        if self._names is not None:
+            self._names.remove(normalize_name(key))
+        if self._phones is not None:
+            self._phones.remove(key, self._contacts[key].phone)
+        return self._search.remove(key) if self._search is not None else None
+
+    def _search_index(self) -> TrigramIndex:
+        """
+        Returns the trigram index over the searchable fields, building it on first use.
+        """
+
+        if self._search is None:
+            with profile.phase("build contacts search index"):
+                index = TrigramIndex(_search_fields)
+                index.add_many(self._contacts.items())
+            self._search = index
+        return self._search
+
+    def _birthday_index(self) -> BirthdayIndex:
+        """
+        Returns the birthday calendar, building it on first use.
+        """
+
+        if self._birthdays is None:
+            with profile.phase("build contacts birthday index"):
+                index = BirthdayIndex()
+                for key, contact in self._contacts.items():
+                    index.add(key, contact)
+            self._birthdays = index
+        return self._birthdays
+
+    def _name_index(self) -> FuzzyNameIndex:
+        """
+        Returns the fuzzy name index, building it on first use.
+        """
+
+        if self._names is None:
+            with profile.phase("build contacts fuzzy name index"):
+                index = FuzzyNameIndex()
+                for normalized in self._keys:
+                    index.add(normalized)
+            self._names = index
+        return self._names
+
+    def _phone_index(self) -> PhoneIndex:
+        """
+        Returns the phone index, building it on first use.
+        """
+
+        if self._phones is None:
+            with profile.phase("build contacts phone index"):
+                index = PhoneIndex()
+                for key, contact in self._contacts.items():
+                    index.add(key, contact.phone)
+            self._phones = index
+        return self._phones
 
     def add_contact(self, contact: Contact) -> bool:
         """
@@ -40,9 +235,44 @@ class ContactBook:
             bool: True if added successfully, False if a contact with the same name already exists.
         """
 
-        if self._get_actual_key(contact.name):
+        if not self._insert(contact):
+            return False
+        self._emit({"op": "add", "contact": contact.to_dict()})
+        return True
+
+    def add_contacts(self, contacts: Iterable[Contact]) -> List[Contact]:
+        """
+        Adds several contacts at once, skipping names that already exist (case-insensitive).
+
+        Subscribers receive a single record for the whole batch.
+
+        Args:
+            contacts (Iterable[Contact]): The contacts to add.
+
+        Returns:
+            List[Contact]: The contacts that were rejected because their name already exists.
+        """
+
+        added, duplicates = [], []
+        for contact in contacts:
+            (added if self._insert(contact) else duplicates).append(contact)
+        if added:
+            self._emit({"op": "add_many", "contacts": [contact.to_dict() for contact in added]})
+        return duplicates
+
+    def _insert(self, contact: Contact) -> bool:
+        """
+        Stores and indexes a contact unless its name already exists.
+        """
+
+        normalized = normalize_name(contact.name)
+        if normalized in self._keys:
             return False
-        self.contacts[contact.name] = contact
+        self._contacts[contact.name] = contact
+        self._keys[normalized] = contact.name
+        self._index(contact.name, contact)
+        if self._order is not None:
+            self._order.add(normalized)
         return True
 
 
@@ -58,7 +288,63 @@ class ContactBook:
         """
 
         actual_key = self._get_actual_key(name)
-        return self.contacts.get(actual_key)
+        return self._contacts.get(actual_key)
+
+    def fuzzy_find(self, name: str, max_distance: Optional[int] = None, limit: int = 5) -> List[Tuple[Contact, int]]:
+        """
+        Finds the contacts whose names are closest to a possibly misspelled name.
+
+        Args:
+            name (str): The name to look up, e.g. "Jon Smtih".
+            max_distance (Optional[int]): The largest edit distance between the names; by default it
+                grows with the length of the name, up to 3.
+            limit (int): The most contacts returned.
+
+        Returns:
+            List[Tuple[Contact, int]]: Contacts and the edit distance of their names, closest first.
+        """
+
+        matches = self._name_index().search(normalize_name(name), max_distance, limit)
+        return [(self._contacts[self._keys[key]], distance) for key, distance in matches]
+
+    def find_by_phone(self, phone: str) -> List[Contact]:
+        """
+        Finds the contacts with a phone number, whatever its notation ("+380...", "0...", spaces).
+
+        Args:
+            phone (str): The phone number.
+
+        Returns:
+            List[Contact]: The contacts using the number.
+        """
+
+        return [self._contacts[key] for key in self._phone_index().find(phone)]
+
+    def search_phone_prefix(self, prefix: str) -> List[Contact]:
+        """
+        Finds the contacts whose phone number starts with a prefix, e.g. an operator code.
+
+        Args:
+            prefix (str): The start of a phone number, normalized like a number.
+
+        Returns:
+            List[Contact]: The matching contacts, ordered by phone number.
+        """
+
+        return [self._contacts[key] for _, key in self._phone_index().prefix(prefix)]
+
+    def duplicate_phones(self) -> List[Tuple[str, List[Contact]]]:
+        """
+        Lists the phone numbers shared by several contacts.
+
+        Returns:
+            List[Tuple[str, List[Contact]]]: Canonical numbers with the contacts using them.
+        """
+
+        return [
+            (phone, [self._contacts[key] for key in keys])
+            for phone, keys in self._phone_index().duplicates()
+        ]
 
     def edit_contact(self, current_name: str, **kwargs) -> bool:
         """
@@ -73,22 +359,37 @@ class ContactBook:
         """
 
         actual_key = self._get_actual_key(current_name)
-        contact = self.contacts.get(actual_key)
+        contact = self._contacts.get(actual_key)
         if not contact:
             return False
 
         new_name = kwargs.get("name")
-        if new_name and new_name.lower() != actual_key.lower():
-            if self._get_actual_key(new_name):
+        renamed = bool(new_name) and new_name != actual_key
+        if renamed:
+            normalized = normalize_name(new_name)
+            if normalized != normalize_name(actual_key) and normalized in self._keys:
                 print(f"Cannot rename to '{new_name}': already exists.")
                 return False
 
-            self.contacts.pop(actual_key)
-            self.contacts[new_name] = contact
+        doc_id = self._unindex(actual_key)
+        if renamed:
+            self._contacts.pop(actual_key)
+            del self._keys[normalize_name(actual_key)]
+            self._contacts[new_name] = contact
+            self._keys[normalized] = new_name
+            if self._order is not None:
+                self._order.remove(normalize_name(actual_key))
+                self._order.add(normalized)
 
         for key, value in kwargs.items():
             setattr(contact, key, value)
 
+        if renamed:
+            self._index(new_name, contact)
+        else:
+            self._index(actual_key, contact, doc_id)
+
+        self._emit({"op": "edit", "name": actual_key, "fields": kwargs})
         return True
 
 
@@ -105,40 +406,260 @@ class ContactBook:
 
         actual_key = self._get_actual_key(name)
         if actual_key:
-            return self.contacts.pop(actual_key)
+            contact = self._remove(actual_key)
+            self._emit({"op": "delete", "name": actual_key})
+            return contact
         return None
 
+    def _remove(self, key: str) -> Contact:
+        """
+        Unindexes and removes the contact stored under the given key.
+        """
+
+        normalized = normalize_name(key)
+        del self._keys[normalized]
+        self._unindex(key)
+        if self._order is not None:
+            self._order.remove(normalized)
+        return self._contacts.pop(key)
+
+    def merge_contacts(self, merges: Iterable[Dict]) -> int:
+        """
+        Merges groups of duplicate contacts in one batch: each kept contact gets the given fields
+        and its duplicates are deleted. Subscribers receive a single record for the whole batch.
+
+        Args:
+            merges (Iterable[Dict]): Entries with "keep" (a name), "fields" (field values to set on
+                it, not including the name) and "remove" (the names of its duplicates), as produced
+                by services.dedupe.Merge.to_dict.
+
+        Returns:
+            int: The number of contacts deleted.
+        """
+
+        applied = []
+        for merge in merges:
+            keep_key = self._get_actual_key(merge["keep"])
+            if keep_key is None:
+                continue
+            removed = []
+            for name in merge["remove"]:
+                key = self._get_actual_key(name)
+                if key is not None and key != keep_key:
+                    self._remove(key)
+                    removed.append(key)
+
+            fields = {field: value for field, value in merge["fields"].items() if field != "name"}
+            contact = self._contacts[keep_key]
+            doc_id = self._unindex(keep_key)
+            for field, value in fields.items():
+                setattr(contact, field, value)
+            self._index(keep_key, contact, doc_id)
+            applied.append({"keep": keep_key, "fields": fields, "remove": removed})
+
+        if applied:
+            self._emit({"op": "merge", "merges": applied})
+        return sum(len(merge["remove"]) for merge in applied)
+
+    def apply(self, record: dict) -> None:
+        """
+        Replays a mutation record previously published to subscribers.
+
+        Args:
+            record (dict): The mutation record.
+        """
+
+        op = record["op"]
+        if op == "add":
+            self.add_contact(Contact.from_dict(record["contact"]))
+        elif op == "add_many":
+            self.add_contacts(Contact.from_dict(contact) for contact in record["contacts"])
+        elif op == "edit":
+            self.edit_contact(record["name"], **record["fields"])
+        elif op == "delete":
+            self.delete_contact(record["name"])
+        elif op == "merge":
+            self.merge_contacts(record["merges"])
+        else:
+            raise ValueError(f"Unknown contact operation: {op}")
+
+    @staticmethod
+    def changed_keys(record: dict) -> Set[str]:
+        """
+        Returns the normalized names of the contacts a mutation record creates, changes or removes,
+        so that records of concurrent writers touching different contacts can be told apart.
+
+        Args:
+            record (dict): The mutation record.
+
+        Returns:
+            Set[str]: The normalized contact names.
+        """
+
+        op = record["op"]
+        if op == "add":
+            names = [record["contact"]["name"]]
+        elif op == "add_many":
+            names = [contact["name"] for contact in record["contacts"]]
+        elif op == "edit":
+            names = [record["name"], record["fields"].get("name") or record["name"]]
+        elif op == "delete":
+            names = [record["name"]]
+        elif op == "merge":
+            names = [name for merge in record["merges"] for name in [merge["keep"], *merge["remove"]]]
+        else:
+            raise ValueError(f"Unknown contact operation: {op}")
+        return {normalize_name(name) for name in names}
+
+    def revert(self, record: dict) -> bool:
+        """
+        Undoes the last mutation, given its record, without notifying subscribers (the version
+        still changes). Only additions can be undone from their record alone.
+
+        Args:
+            record (dict): The record of the last mutation.
+
+        Returns:
+            bool: True if the mutation was undone.
+        """
+
+        if record["op"] not in ("add", "add_many"):
+            return False
+        added = [record["contact"]] if record["op"] == "add" else record["contacts"]
+        for contact in added:
+            self._remove(contact["name"])
+        self.version += 1
+        return True
+
+    def rebase(self, record: dict) -> dict:
+        """
+        Returns a mutation record made against an older state, adjusted to be applied to this one.
+        Contact records name their contacts, so they apply as they are.
+
+        Args:
+            record (dict): The mutation record.
+
+        Returns:
+            dict: The record to apply.
+        """
+
+        return record
+
 
     def search_contacts(self, query: str) -> List[Contact]:
         """
-        Searches contacts by partial name match (case-insensitive).
+        Searches contacts by partial match on name, phone, email, address or birthday (case-insensitive).
+
+        Queries of three or more characters are answered from the trigram index; shorter ones, and
+        ones so common that the index would not narrow them down, fall back to a scan.
 
         Args:
-            query (str): The substring to search in contact names.
+            query (str): The substring to search in contact fields.
 
         Returns:
             List[Contact]: A list of matching Contact objects.
         """
 
         query = query.lower()
-        results = []
-        for contact in self.contacts.values():
-            fields = [
-                contact.name,
-                contact.phone,
-                contact.email,
-                contact.address,
-                contact.birthday
-            ]
-            if any(f and query in f.lower() for f in fields):
-                results.append(contact)
-        return results
+        results = self._search_index().search(query)
+        if results is not None:
+            return results
+        return [contact for contact in self._contacts.values() if _matches_search(contact, query)]
+
+
+    def _query_access(self, predicate: Predicate) -> Optional[Access]:
+        field, op, value = predicate.field, predicate.op, predicate.value
+        if field == "name" and op == "eq":
+            key = self._get_actual_key(value)
+            found = [self._contacts[key]] if key is not None else []
+            return Access(f"name index: {value}", len(found), lambda: found)
+        if field == "phone" and op == "eq":
+            keys = self._phone_index().find(value)
+            return Access(f"phone index: {value}", len(keys), lambda: [self._contacts[key] for key in keys])
+        if field == "phone" and op == "prefix":
+            pairs = self._phone_index().prefix(value)
+            return Access(f"phone index: {value}*", len(pairs), lambda: [self._contacts[key] for _, key in pairs])
+        if field == "birthday" and predicate.part in ("month", "day"):
+            bounds = predicate.bounds(1, 12 if predicate.part == "month" else 31)
+            if bounds is None:
+                return None
+            span = range(bounds[0], bounds[1] + 1)
+            months, days = (span, range(1, 32)) if predicate.part == "month" else (range(1, 13), span)
+            found = self._birthday_index().select(months, days)
+            return Access(f"birthday index: {predicate.part} {bounds[0]}..{bounds[1]}", len(found), lambda: found)
+        if predicate.fragment is not None:
+            estimate = self._search_index().estimate(predicate.fragment)
+            if estimate is not None:
+                fragment = predicate.fragment
+                return Access(f"trigram index: '{fragment}'", estimate, lambda: self._trigram_candidates(fragment))
+        return None
+
+    def _trigram_candidates(self, fragment: str) -> List[Contact]:
+        # The index leaves fragments found in most of the book to a scan (see TrigramIndex.search).
+        found = self._search_index().search(fragment)
+        return found if found is not None else list(self._contacts.values())
+
+    def _query_scan(self) -> Access:
+        return Access("full scan", len(self._contacts), lambda: list(self._contacts.values()))
+
+    def _name_order(self) -> SortedIndex:
+        """
+        Returns the normalized names in order, building the index on first use.
+        """
+
+        if self._order is None:
+            self._order = SortedIndex(self._keys)
+        return self._order
+
+    def sorted_contacts(self) -> List[Contact]:
+        """
+        Returns all contacts ordered by normalized name.
 
+        Returns:
+            List[Contact]: The sorted contacts.
+        """
+
+        return list(self.iter_sorted())
+
+    def sorted_range(self, first: Optional[str] = None, last: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Returns the positions, in name order, of the contacts from one name through another.
+
+        Args:
+            first (Optional[str]): The first name (or start of a name) included, e.g. "M"; None
+                starts at the first contact.
+            last (Optional[str]): The names starting with this are the last included, e.g. "P"
+                includes "Petrenko"; None runs to the last contact.
+
+        Returns:
+            Tuple[int, int]: (start, stop) positions for ``iter_sorted``.
+        """
+
+        low = normalize_name(first) if first else None
+        high = prefix_end(normalize_name(last)) if last else None
+        return self._name_order().window(low, high)
+
+    def iter_sorted(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Contact]:
+        """
+        Lazily yields the contacts at positions ``start`` to ``stop`` (exclusive) in name order.
+
+        Args:
+            start (int): The first position.
+            stop (Optional[int]): The position to stop at, or None for the end.
+
+        Returns:
+            Iterator[Contact]: The contacts.
+        """
+
+        contacts, keys = self._contacts, self._keys
+        return (contacts[keys[key]] for key in self._name_order().islice(start, stop))
 
     def days_to_birthday(self, birthday_str: str) -> Union[int, str]:
         """
         Calculates the number of days until the next birthday based on a given date string.
 
+        February 29 birthdays are celebrated on February 28 in non-leap years.
+
         Args:
             birthday_str (str): Birthday in 'YYYY-MM-DD' format.
 
@@ -146,17 +667,37 @@ class ContactBook:
             Union[int, str]: Days remaining until next birthday, or error string if the date is invalid.
         """
 
-        try:
-            birthday = datetime.strptime(birthday_str, "%Y-%m-%d").date()
-        except ValueError:
+        month_day = parse_birthday(birthday_str)
+        if month_day is None:
             return "Invalid birthday format. Expected YYYY-MM-DD."
+        return days_until(*month_day, date.today())
+
+    def days_until_birthday(self, name: str) -> Optional[int]:
+        """
+        Returns the number of days until a contact's next birthday, using the pre-parsed birthday index.
 
-        today = date.today()
-        this_year_birthday = date(today.year, birthday.month, birthday.day)
+        Args:
+            name (str): The name of the contact.
 
-        if this_year_birthday < today:
-            next_birthday = date(today.year + 1, birthday.month, birthday.day)
-        else:
-            next_birthday = this_year_birthday
+        Returns:
+            Optional[int]: Days remaining until next birthday, or None if the contact is unknown
+            or has no valid birthday.
+        """
+
+        actual_key = self._get_actual_key(name)
+        if actual_key is None:
+            return None
+        return self._birthday_index().days_until(actual_key)
+
+    def upcoming_birthdays(self, days: int) -> List[Tuple[Contact, int]]:
+        """
+        Returns the contacts whose birthday falls within the given number of days, soonest first.
+
+        Args:
+            days (int): Size of the window in days; 0 means birthdays today only.
+
+        Returns:
+            List[Tuple[Contact, int]]: (contact, days until birthday) pairs.
+        """
 
-        return (next_birthday - today).days
+        return self._birthday_index().upcoming(days)
@@ -0,0 +1,215 @@
+from itertools import combinations
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from models.contact import Contact
+from services.bk_tree import edit_distance
+from services.contact_book import normalize_name
+from services.phone_index import normalize_phone
+
+DEFAULT_THRESHOLD = 0.6
+# Blocks larger than this (e.g. a shared office number) are skipped: comparing all their pairs
+# would be quadratic and they rarely hold duplicates of one person.
+MAX_BLOCK = 50
+
+# Score contributions of matching fields; a conflicting birthday counts against a pair.
+EMAIL_WEIGHT = 0.45
+PHONE_WEIGHT = 0.35
+NAME_WEIGHT = 0.3
+BIRTHDAY_WEIGHT = 0.2
+BIRTHDAY_CONFLICT = -0.4
+ADDRESS_WEIGHT = 0.1
+
+
+def name_sort_key(name: str) -> str:
+    """
+    Returns the words of a normalized name in alphabetical order, so "Smith John" and "john smith"
+    share a key.
+
+    Args:
+        name (str): The contact name.
+
+    Returns:
+        str: The key.
+    """
+
+    return " ".join(sorted(normalize_name(name).split()))
+
+
+def blocking_keys(contact: Contact) -> List[Tuple[str, str]]:
+    """
+    Returns the keys under which a contact is compared with others: only contacts sharing at
+    least one key are ever scored.
+
+    Args:
+        contact (Contact): The contact.
+
+    Returns:
+        List[Tuple[str, str]]: (kind, value) pairs for the normalized email, phone and name.
+    """
+
+    keys = [("name", name_sort_key(contact.name))]
+    if contact.email:
+        keys.append(("email", normalize_name(contact.email)))
+    if contact.phone:
+        phone = normalize_phone(contact.phone)
+        if phone:
+            keys.append(("phone", phone))
+    return keys
+
+
+def score_pair(a: Contact, b: Contact) -> float:
+    """
+    Scores how likely two contacts are the same person, from 0 to 1.
+
+    Matching emails and phones weigh most, then name similarity (by edit distance of the sorted
+    name words), matching birthdays and addresses; two different birthdays lower the score.
+
+    Args:
+        a (Contact): The first contact.
+        b (Contact): The second contact.
+
+    Returns:
+        float: The score.
+    """
+
+    score = 0.0
+    if a.email and b.email and normalize_name(a.email) == normalize_name(b.email):
+        score += EMAIL_WEIGHT
+    if a.phone and b.phone and normalize_phone(a.phone) == normalize_phone(b.phone):
+        score += PHONE_WEIGHT
+
+    name_a, name_b = name_sort_key(a.name), name_sort_key(b.name)
+    longest = max(len(name_a), len(name_b)) or 1
+    score += NAME_WEIGHT * (1 - edit_distance(name_a, name_b) / longest)
+
+    if a.birthday and b.birthday:
+        score += BIRTHDAY_WEIGHT if a.birthday == b.birthday else BIRTHDAY_CONFLICT
+    if a.address and b.address and normalize_name(a.address) == normalize_name(b.address):
+        score += ADDRESS_WEIGHT
+    return max(0.0, min(1.0, score))
+
+
+class Merge:
+    """
+    One entry of a merge plan: a group of contacts believed to be the same person.
+
+    Attributes:
+        keep (Contact): The contact that is kept, the one with the most fields filled in.
+        remove (List[Contact]): The duplicates merged into it and deleted.
+        fields (Dict[str, str]): Empty fields of the kept contact filled from the duplicates.
+        score (float): The lowest score among the pairs linking the group.
+    """
+
+    def __init__(self, keep: Contact, remove: List[Contact], fields: Dict[str, str], score: float):
+        self.keep = keep
+        self.remove = remove
+        self.fields = fields
+        self.score = score
+
+    def to_dict(self) -> Dict:
+        """
+        Returns the merge as ContactBook.merge_contacts expects it.
+        """
+
+        return {"keep": self.keep.name, "fields": dict(self.fields), "remove": [c.name for c in self.remove]}
+
+
+class DedupeReport:
+    """
+    The result of a duplicate search.
+
+    Attributes:
+        merges (List[Merge]): The merge plan, most certain groups first.
+        compared (int): Number of scored pairs.
+        skipped_blocks (int): Blocks larger than the block limit, left out.
+    """
+
+    def __init__(self, merges: List[Merge], compared: int, skipped_blocks: int):
+        self.merges = merges
+        self.compared = compared
+        self.skipped_blocks = skipped_blocks
+
+
+def _find(parents: List[int], item: int) -> int:
+    while parents[item] != item:
+        parents[item] = parents[parents[item]]
+        item = parents[item]
+    return item
+
+
+def find_duplicates(
+    contacts: Iterable[Contact], threshold: float = DEFAULT_THRESHOLD, max_block: int = MAX_BLOCK,
+) -> DedupeReport:
+    """
+    Finds groups of contacts that are probably the same person and plans their merges.
+
+    Contacts are grouped into blocks by their blocking keys and only pairs within a block are
+    scored, so the work grows with the number of contacts rather than its square. Pairs scoring
+    at least ``threshold`` are linked, and each connected group becomes one merge.
+
+    Args:
+        contacts (Iterable[Contact]): The contacts to examine.
+        threshold (float): The lowest score linking two contacts.
+        max_block (int): Blocks with more contacts are skipped.
+
+    Returns:
+        DedupeReport: The merge plan and how much work it took.
+    """
+
+    contacts: Sequence[Contact] = list(contacts)
+    blocks: Dict[Tuple[str, str], List[int]] = {}
+    for index, contact in enumerate(contacts):
+        for key in blocking_keys(contact):
+            blocks.setdefault(key, []).append(index)
+
+    parents = list(range(len(contacts)))
+    link_scores: Dict[int, float] = {}
+    seen = set()
+    skipped = 0
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        if len(members) > max_block:
+            skipped += 1
+            continue
+        for i, j in combinations(members, 2):
+            if (i, j) in seen:
+                continue
+            seen.add((i, j))
+            score = score_pair(contacts[i], contacts[j])
+            if score < threshold:
+                continue
+            root_i, root_j = _find(parents, i), _find(parents, j)
+            low = min(score, link_scores.get(root_i, 1.0), link_scores.get(root_j, 1.0))
+            if root_i != root_j:
+                parents[root_j] = root_i
+                link_scores.pop(root_j, None)
+            link_scores[root_i] = low
+
+    groups: Dict[int, List[int]] = {}
+    for index in range(len(contacts)):
+        if parents[index] != index or index in link_scores:
+            groups.setdefault(_find(parents, index), []).append(index)
+
+    merges = [_plan(contacts, members, link_scores[root]) for root, members in groups.items() if len(members) > 1]
+    merges.sort(key=lambda merge: (-merge.score, normalize_name(merge.keep.name)))
+    return DedupeReport(merges, len(seen), skipped)
+
+
+def _filled_fields(contact: Contact) -> int:
+    return sum(1 for field in Contact.FIELDS if getattr(contact, field))
+
+
+def _plan(contacts: Sequence[Contact], members: List[int], score: float) -> Merge:
+    group = [contacts[index] for index in members]
+    keep = max(group, key=_filled_fields)
+    remove = [contact for contact in group if contact is not keep]
+
+    fields: Dict[str, str] = {}
+    for field in Contact.FIELDS:
+        if field == "name" or getattr(keep, field):
+            continue
+        value: Optional[str] = next((getattr(c, field) for c in remove if getattr(c, field)), None)
+        if value:
+            fields[field] = value
+    return Merge(keep, remove, fields, score)
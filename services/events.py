@@ -0,0 +1,72 @@
+from itertools import count
+from typing import Callable, Dict, List, Optional
+
+# A listener may return the record adjusted to what it actually stored, or None if unchanged.
+Listener = Callable[[Dict], Optional[Dict]]
+
+# Source of record revisions, unique across all books of the process.
+_revisions = count(1)
+
+
+def next_revision() -> int:
+    """
+    Returns a new record revision, which the books stamp on a contact or note whenever it is stored
+    or edited. Since no two stamps are equal, a revision identifies one state of one record, e.g.
+    for caching its rendering.
+
+    Returns:
+        int: The revision, greater than 0.
+    """
+
+    return next(_revisions)
+
+
+class ChangeNotifier:
+    """
+    Mixin that lets books publish a record of every mutation to subscribed listeners
+    (e.g. the persistence journal).
+
+    Attributes:
+        version (int): Incremented on every mutation, so comparing it with an earlier value tells
+            whether the book changed since (e.g. since it was last saved).
+    """
+
+    def _init_listeners(self) -> None:
+        self._listeners: List[Listener] = []
+        self.version = 0
+
+    def subscribe(self, listener: Listener) -> None:
+        """
+        Register a callable that receives a dict record for every mutation.
+
+        Args:
+            listener (Callable[[Dict], Optional[Dict]]): The callable to register. It may return
+                an adjusted record (see ``_emit``).
+        """
+
+        self._listeners.append(listener)
+
+    def unsubscribe(self, listener: Listener) -> None:
+        """
+        Remove a previously registered listener.
+
+        Args:
+            listener (Callable[[Dict], Optional[Dict]]): The callable to remove.
+        """
+
+        self._listeners.remove(listener)
+
+    def _emit(self, record: Dict) -> Dict:
+        """
+        Publishes a mutation record to the listeners.
+
+        Returns:
+            Dict: The record as the listeners stored it. A listener returns an adjusted record when
+            it had to change the mutation, e.g. the journal giving a note another id because a
+            concurrent writer used it; the book then holds the adjusted version.
+        """
+
+        self.version += 1
+        for listener in self._listeners:
+            record = listener(record) or record
+        return record
@@ -0,0 +1,132 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+from services.bk_tree import BKTree, edit_distance
+
+
+def default_distance(name: str) -> int:
+    """
+    Returns the edit distance tolerated by a fuzzy lookup of a name: one edit per three characters,
+    rounded up, at most 3. So "jhon" (a transposition, two edits) finds "john" and "jon smtih"
+    still finds "john smith".
+
+    Args:
+        name (str): The normalized query name.
+
+    Returns:
+        int: The maximum edit distance.
+    """
+
+    return max(1, min(3, -(-len(name) // 3)))
+
+
+class FuzzyNameIndex:
+    """
+    Typo-tolerant lookup of normalized names.
+
+    Names are split into words. A BK-tree over the distinct words finds the words within the whole
+    distance budget of a query word, and postings from words to names turn those into candidate
+    names: a name within the budget has such a word for every query word that could not simply
+    have been deleted, and the distances of these words add up to at most the budget. The
+    candidates found that way are verified with the edit distance of the whole name.
+
+    The work depends on the number of distinct words and on how many names share the matched
+    words, not on the total number of names, so lookups stay fast on a million names. A misplaced
+    space ("johnsmith") is not found, since it changes the words themselves.
+    """
+
+    def __init__(self):
+        self._words = BKTree()
+        self._postings: Dict[str, Set[str]] = {}
+
+    def clear(self) -> None:
+        """
+        Removes all names from the index.
+        """
+
+        self._words.clear()
+        self._postings.clear()
+
+    def add(self, name: str) -> None:
+        """
+        Indexes a normalized name.
+
+        Args:
+            name (str): The name, as returned by normalize_name.
+        """
+
+        for word in set(name.split()):
+            names = self._postings.get(word)
+            if names is None:
+                names = self._postings[word] = set()
+                self._words.add(word)
+            names.add(name)
+
+    def remove(self, name: str) -> None:
+        """
+        Removes a normalized name from the index, if present.
+
+        Args:
+            name (str): The name, as returned by normalize_name.
+        """
+
+        for word in set(name.split()):
+            names = self._postings.get(word)
+            if names is None:
+                continue
+            names.discard(name)
+            if not names:
+                del self._postings[word]
+                self._words.remove(word)
+
+    def _levels(self, word: str, max_distance: int) -> List[Set[str]]:
+        """
+        Returns, for every distance up to ``max_distance``, the names with a word that far from the
+        given word.
+        """
+
+        levels: List[Set[str]] = [set() for _ in range(max_distance + 1)]
+        for match, distance in self._words.search(word, max_distance):
+            levels[distance] |= self._postings[match]
+        return levels
+
+    def search(self, name: str, max_distance: Optional[int] = None, limit: int = 5) -> List[Tuple[str, int]]:
+        """
+        Finds the indexed names closest to the given one.
+
+        Args:
+            name (str): The normalized query name.
+            max_distance (Optional[int]): The largest edit distance returned; defaults to
+                ``default_distance(name)``.
+            limit (int): The most results returned, 0 for all.
+
+        Returns:
+            List[Tuple[str, int]]: Names and their edit distances, closest first.
+        """
+
+        if max_distance is None:
+            max_distance = default_distance(name)
+        words = name.split()
+        if not words:
+            return []
+
+        # Deleting a query word costs its length plus a space; words that cheap may be missing.
+        required = {word for word in words if len(word) + 1 > max_distance} or set(words)
+        levels = [self._levels(word, max_distance) for word in sorted(required)]
+        levels.sort(key=lambda names: sum(map(len, names)))
+
+        # The names whose words are, in total, a given number of edits away from the query words
+        # matched so far. One word may take all the edits, so each is matched with the whole budget.
+        totals = levels[0]
+        for names in levels[1:]:
+            totals = [
+                set().union(*(totals[spent] & names[cost - spent] for spent in range(cost + 1)))
+                for cost in range(max_distance + 1)
+            ]
+        candidates = set().union(*totals)
+        results = []
+        for candidate in candidates:
+            distance = edit_distance(name, candidate, max_distance)
+            if distance <= max_distance:
+                results.append((candidate, distance))
+        results.sort(key=lambda result: (result[1], result[0]))
+        return results[:limit] if limit else results
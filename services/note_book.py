@@ -1,33 +1,235 @@
 from models.note import Note
-from typing import List, Optional
+from services.events import ChangeNotifier, next_revision
+from services.query import Access, Field, Predicate, Queryable, Schema
+from services.sorted_index import SortedIndex, prefix_end
+from services.text_index import FullTextIndex
+from utils.startup import profile
+from typing import Dict, Iterator, List, Optional, Set, Tuple, Union
 
 
-class NoteBook:
+def normalize_tag(tag: str) -> str:
     """
-    Manages a list of notes with support for adding, editing, searching, and deleting notes.
+    Returns the normalized form of a tag (or note text) used for case-insensitive matching.
+
+    Args:
+        tag (str): The tag to normalize.
+
+    Returns:
+        str: The stripped, case-folded tag.
+    """
+
+    return tag.strip().casefold()
+
+
+def parse_note_id(identifier: str) -> Optional[int]:
+    """
+    Parses a note reference of the form '#<id>'.
+
+    Args:
+        identifier (str): The user-supplied identifier.
+
+    Returns:
+        Optional[int]: The note id, or None if the identifier is not an id reference.
+    """
+
+    identifier = identifier.strip()
+    if identifier.startswith("#") and identifier[1:].isdigit():
+        return int(identifier[1:])
+    return None
+
+
+def _matches_search(note: Note, keyword: str) -> bool:
+    """
+    Returns whether a note contains a lowercased keyword in its text or carries it as a tag, as in search_notes.
     """
 
+    return keyword in note.text.lower() or any(normalize_tag(tag) == normalize_tag(keyword) for tag in note.tags)
+
+
+# The fields structured queries (see services.query) can use on notes.
+NOTE_SCHEMA = Schema(
+    {
+        "id": Field("int", lambda note: note.id),
+        "text": Field("text", lambda note: note.text),
+        "tag": Field("tags", lambda note: note.tags),
+    },
+    _matches_search,
+    order="id",
+    key=lambda note: note.id,
+)
+
+
+class NoteBook(ChangeNotifier, Queryable):
+    """
+    Manages a collection of notes with support for adding, editing, searching, and deleting notes.
+
+    Notes get a stable integer id when added and are stored in an id-keyed dictionary that preserves
+    insertion order, so lookup, edit and deletion by id are O(1). Notes are also indexed by normalized
+    tag and by normalized text, so tag and exact-text lookups cost O(matches) instead of a scan.
+    A BM25 full-text index backs ranked search; structured queries (``query``, ``explain``) use
+    it, the tag and text indexes or id ranges when one of them narrows the search. The full-text
+    index and the sorted index of (normalized text, id) keys that listings walk are built on
+    first use and then kept up to date.
+
+    Every successful mutation is published to subscribers as a record that ``apply`` can replay.
+    """
+
+    query_schema = NOTE_SCHEMA
+
     def __init__(self):
-        self.notes = []
+        self._init_listeners()
+        self._notes: Dict[int, Note] = {}
+        self._next_id = 1
+        self._tags: Dict[str, Dict[int, None]] = {}
+        self._texts: Dict[str, Dict[int, None]] = {}
+        self._words: Optional[FullTextIndex] = None
+        self._order: Optional[SortedIndex] = None
+
+    @property
+    def notes(self) -> Dict[int, Note]:
+        """
+        The notes keyed by id, in insertion order.
 
-    def add_note(self, text: str, tags: Optional[List[str]] = None) -> None:
+        Mutate it only through the NoteBook methods, otherwise the indexes go stale.
+        Assigning a new collection (e.g. one loaded from a pickle file) rebuilds the indexes. A plain
+        list of notes, as written by older versions, is migrated by giving each note an id.
+        """
+
+        return self._notes
+
+    @notes.setter
+    def notes(self, notes: Union[Dict[int, Note], List[Note]]) -> None:
+        if isinstance(notes, dict):
+            notes = list(notes.values())
+
+        self._notes = {}
+        self._tags = {}
+        self._texts = {}
+        self._words = None
+        self._order = None
+        self._next_id = max((getattr(n, "id", None) or 0 for n in notes), default=0) + 1
+
+        for note in notes:
+            if getattr(note, "id", None) is None or note.id in self._notes:
+                note.id = self._next_id
+                self._next_id += 1
+            self._notes[note.id] = note
+            self._index(note)
+        self.version += 1
+
+    def __len__(self) -> int:
+        return len(self._notes)
+
+    def __getstate__(self) -> dict:
+        return {"notes": self._notes}
+
+    def __setstate__(self, state: dict) -> None:
+        self.__init__()
+        self.notes = state["notes"]
+
+    def _index(self, note: Note) -> None:
+        # Notes are (re)indexed whenever they are stored or edited: a new revision marks the change.
+        note.revision = next_revision()
+        if self._words is not None:
+            self._words.add(note.id, note.text)
+        text = normalize_tag(note.text)
+        self._texts.setdefault(text, {})[note.id] = None
+        if self._order is not None:
+            self._order.add((text, note.id))
+        for tag in note.tags:
+            self._tags.setdefault(normalize_tag(tag), {})[note.id] = None
+
+    def _unindex(self, note: Note) -> None:
+        if self._words is not None:
+            self._words.remove(note.id, note.text)
+        if self._order is not None:
+            self._order.remove((normalize_tag(note.text), note.id))
+        for index, key in [(self._texts, note.text), *((self._tags, tag) for tag in note.tags)]:
+            key = normalize_tag(key)
+            bucket = index.get(key)
+            if bucket is not None:
+                bucket.pop(note.id, None)
+                if not bucket:
+                    del index[key]
+
+    def _text_index(self) -> FullTextIndex:
+        """
+        Returns the full-text index of the note texts, building it on first use.
+        """
+
+        if self._words is None:
+            with profile.phase("build notes full-text index"):
+                index = FullTextIndex()
+                for note_id, note in self._notes.items():
+                    index.add(note_id, note.text)
+            self._words = index
+        return self._words
+
+    def _match(self, identifier: str) -> List[int]:
+        """
+        Returns the ids of the notes referenced by '#<id>', or else of the notes whose text equals
+        the identifier or that carry it as a tag (case-insensitive).
+        """
+
+        note_id = parse_note_id(identifier)
+        if note_id is not None:
+            return [note_id] if note_id in self._notes else []
+
+        identifier = normalize_tag(identifier)
+        matches = dict(self._texts.get(identifier, {}))
+        matches.update(self._tags.get(identifier, {}))
+        return list(matches)
+
+    def get(self, note_id: int) -> Optional[Note]:
+        """
+        Return the note with the given id.
+
+        Args:
+            note_id (int): The note id.
+
+        Returns:
+            Optional[Note]: The note, or None if there is no note with that id.
+        """
+
+        return self._notes.get(note_id)
+
+    def add_note(self, text: str, tags: Optional[List[str]] = None) -> Note:
         """
         Add a new note with text and optional tags.
 
         Args:
             text (str): The content of the note.
             tags (Optional[List[str]]): A list of tags to associate with the note.
+
+        Returns:
+            Note: The added note, with its id assigned.
+        """
+
+        return self._insert(Note(text, tags, self._next_id))
+
+    def _insert(self, note: Note) -> Note:
         """
+        Stores a note that already has an id, replacing any note with the same id.
 
-        self.notes.append(Note(text, tags))
+        Returns:
+            Note: The note as stored; a subscriber may have renumbered it (see ChangeNotifier._emit).
+        """
+
+        if note.id in self._notes:
+            self._unindex(self._notes[note.id])
+        self._notes[note.id] = note
+        self._next_id = max(self._next_id, note.id + 1)
+        self._index(note)
+        record = self._emit({"op": "add", "note": note.to_dict()})
+        return self._notes[record["note"]["id"]]
 
     def edit_note(
         self, identifier: str, new_text: Optional[str] = None, new_tags: Optional[List[str]] = None) -> bool:
         """
-        Edit a note identified by matching text or tag. Updates the text and/or tags if provided.
+        Edit notes identified by '#<id>', or by matching text or tag. Updates the text and/or tags if provided.
 
         Args:
-            identifier (str): A keyword to find the note by text or tag.
+            identifier (str): A note id reference or a keyword to find the notes by text or tag.
             new_text (Optional[str]): The new text to replace the current note text.
             new_tags (Optional[List[str]]): New list of tags to replace current tags.
 
@@ -35,18 +237,39 @@ class NoteBook:
             bool: True if at least one note was edited, False otherwise.
         """
 
-        edited = False
-        identifier = identifier.lower()
+        matches = self._match(identifier)
+
+        for note_id in matches:
+            self.edit_note_by_id(note_id, new_text, new_tags)
+
+        return bool(matches)
+
+    def edit_note_by_id(
+        self, note_id: int, new_text: Optional[str] = None, new_tags: Optional[List[str]] = None) -> bool:
+        """
+        Edit the note with the given id.
+
+        Args:
+            note_id (int): The note id.
+            new_text (Optional[str]): The new text to replace the current note text.
+            new_tags (Optional[List[str]]): New list of tags to replace current tags.
 
-        for note in self.notes:
-            if identifier == note.text.lower() or identifier in [tag.lower() for tag in note.tags]:
-                if new_text:
-                    note.text = new_text
-                if new_tags is not None:
-                    note.tags = new_tags
-                edited = True
+        Returns:
+            bool: True if the note exists, False otherwise.
+        """
+
+        note = self._notes.get(note_id)
+        if note is None:
+            return False
 
-        return edited
+        self._unindex(note)
+        if new_text:
+            note.text = new_text
+        if new_tags is not None:
+            note.tags = new_tags
+        self._index(note)
+        self._emit({"op": "edit", "id": note_id, "text": new_text, "tags": new_tags})
+        return True
 
     def search_notes(self, keyword: str) -> List[Note]:
         """
@@ -56,10 +279,173 @@ class NoteBook:
             keyword (str): The keyword to search for.
 
         Returns:
-            List[Note]: A list of notes matching the keyword.
+            List[Note]: The matching notes, in text order (see ``iter_sorted``).
+        """
+
+        tagged = self._tags.get(normalize_tag(keyword), {})
+        keyword = keyword.lower()
+        return [note for note in self.iter_sorted() if keyword in note.text.lower() or note.id in tagged]
+
+    def _text_order(self) -> SortedIndex:
+        """
+        Returns the (normalized text, id) keys in order, building the index on first use.
+        """
+
+        if self._order is None:
+            self._order = SortedIndex((normalize_tag(note.text), note_id) for note_id, note in self._notes.items())
+        return self._order
+
+    def sorted_notes(self) -> List[Note]:
+        """
+        Return all notes ordered alphabetically by text (case-insensitive), then by id.
+
+        Returns:
+            List[Note]: The sorted notes.
+        """
+
+        return list(self.iter_sorted())
+
+    def sorted_range(self, first: Optional[str] = None, last: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Returns the positions, in text order, of the notes from one text through another.
+
+        Args:
+            first (Optional[str]): The first text (or start of a text) included; None starts at
+                the first note.
+            last (Optional[str]): The texts starting with this are the last included; None runs
+                to the last note.
+
+        Returns:
+            Tuple[int, int]: (start, stop) positions for ``iter_sorted``.
+        """
+
+        low = (normalize_tag(first),) if first else None
+        high = (prefix_end(normalize_tag(last)),) if last else None
+        return self._text_order().window(low, high)
+
+    def iter_sorted(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Note]:
+        """
+        Lazily yields the notes at positions ``start`` to ``stop`` (exclusive) in text order.
+
+        Args:
+            start (int): The first position.
+            stop (Optional[int]): The position to stop at, or None for the end.
+
+        Returns:
+            Iterator[Note]: The notes.
         """
 
-        return [note for note in self.notes if keyword.lower() in note.text.lower() or keyword in note.tags]
+        notes = self._notes
+        return (notes[note_id] for _, note_id in self._text_order().islice(start, stop))
+
+    def _query_access(self, predicate: Predicate) -> Optional[Access]:
+        field, op, value = predicate.field, predicate.op, predicate.value
+        if field == "id":
+            bounds = predicate.bounds(1, self._next_id - 1)
+            if bounds is None:
+                return None
+            ids = range(bounds[0], bounds[1] + 1)
+            return Access(
+                f"id range: {bounds[0]}..{bounds[1]}", len(ids),
+                lambda: [self._notes[note_id] for note_id in ids if note_id in self._notes],
+            )
+        if field == "tag" and op == "eq":
+            ids = list(self._tags.get(value, ()))
+            return Access(f"tag index: {value}", len(ids), lambda: [self._notes[note_id] for note_id in ids])
+        if field == "tag" and op == "glob":
+            ids = list(dict.fromkeys(
+                note_id for tag, bucket in self._tags.items() if value.fullmatch(tag) for note_id in bucket
+            ))
+            return Access(f"tag index: {predicate.text.split(':', 1)[1]}", len(ids),
+                          lambda: [self._notes[note_id] for note_id in ids])
+        if field == "text" and op == "eq":
+            ids = list(self._texts.get(normalize_tag(value), ()))
+            return Access(f"text index: {value}", len(ids), lambda: [self._notes[note_id] for note_id in ids])
+        fragment = predicate.fragment
+        if field in ("text", None) and fragment and fragment.isascii() and fragment.isalnum():
+            # A run of word characters lies within one word of any text containing it.
+            ids = self._text_index().containing(fragment)
+            if field is None:
+                ids.update(self._tags.get(normalize_tag(fragment), ()))
+            return Access(f"word index: *{fragment}*", len(ids), lambda: [self._notes[note_id] for note_id in ids])
+        return None
+
+    def _query_scan(self) -> Access:
+        return Access("full scan", len(self._notes), lambda: list(self._notes.values()))
+
+    def search_ranked(self, query: str, limit: int = 10) -> List[Tuple[Note, float]]:
+        """
+        Search note texts by relevance using BM25.
+
+        The query may contain plain terms, prefix terms ending in '*' and quoted phrases;
+        phrases are required, terms only affect the score.
+
+        Args:
+            query (str): The search query.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[Note, float]]: (note, score) pairs, most relevant first.
+        """
+
+        return [(self._notes[note_id], score) for note_id, score in self._text_index().search(query, limit)]
+
+    def search_tag(self, tag: str) -> List[Note]:
+        """
+        Return the notes carrying the given tag (case-insensitive).
+
+        Args:
+            tag (str): The tag to look up.
+
+        Returns:
+            List[Note]: The tagged notes.
+        """
+
+        return [self._notes[note_id] for note_id in self._tags.get(normalize_tag(tag), {})]
+
+    def tag_counts(self) -> List[Tuple[str, int]]:
+        """
+        Return every tag with the number of notes carrying it, most used first.
+
+        Returns:
+            List[Tuple[str, int]]: (normalized tag, note count) pairs.
+        """
+
+        return sorted(((tag, len(notes)) for tag, notes in self._tags.items()), key=lambda t: (-t[1], t[0]))
+
+    def delete_notes(self, identifier: str) -> int:
+        """
+        Delete the note referenced by '#<id>', or the notes whose text equals the identifier
+        or that carry it as a tag (case-insensitive).
+
+        Args:
+            identifier (str): The note id reference, text or tag.
+
+        Returns:
+            int: The number of deleted notes.
+        """
+
+        matches = self._match(identifier)
+        for note_id in matches:
+            self.delete_note_by_id(note_id)
+        return len(matches)
+
+    def delete_note_by_id(self, note_id: int) -> Optional[Note]:
+        """
+        Delete the note with the given id.
+
+        Args:
+            note_id (int): The note id.
+
+        Returns:
+            Optional[Note]: The deleted note, or None if there is no note with that id.
+        """
+
+        note = self._notes.pop(note_id, None)
+        if note is not None:
+            self._unindex(note)
+            self._emit({"op": "delete", "id": note_id})
+        return note
 
     def delete_note(self, text: str) -> None:
         """
@@ -69,4 +455,77 @@ class NoteBook:
             text (str): The exact text of the note to delete.
         """
 
-        self.notes = [n for n in self.notes if n.text != text]
+        for note_id in list(self._texts.get(normalize_tag(text), {})):
+            if self._notes[note_id].text == text:
+                self.delete_note_by_id(note_id)
+
+    def apply(self, record: dict) -> None:
+        """
+        Replays a mutation record previously published to subscribers.
+
+        Args:
+            record (dict): The mutation record.
+        """
+
+        op = record["op"]
+        if op == "add":
+            self._insert(Note.from_dict(record["note"]))
+        elif op == "edit":
+            self.edit_note_by_id(record["id"], record["text"], record["tags"])
+        elif op == "delete":
+            self.delete_note_by_id(record["id"])
+        else:
+            raise ValueError(f"Unknown note operation: {op}")
+
+    @staticmethod
+    def changed_keys(record: dict) -> Set[int]:
+        """
+        Returns the ids of the notes a mutation record creates, changes or removes, so that
+        records of concurrent writers touching different notes can be told apart.
+
+        Args:
+            record (dict): The mutation record.
+
+        Returns:
+            Set[int]: The note ids.
+        """
+
+        if record["op"] == "add":
+            return {record["note"]["id"]}
+        return {record["id"]}
+
+    def revert(self, record: dict) -> bool:
+        """
+        Undoes the last mutation, given its record, without notifying subscribers (the version
+        still changes). Only additions can be undone from their record alone.
+
+        Args:
+            record (dict): The record of the last mutation.
+
+        Returns:
+            bool: True if the mutation was undone.
+        """
+
+        if record["op"] != "add":
+            return False
+        note = self._notes.pop(record["note"]["id"], None)
+        if note is not None:
+            self._unindex(note)
+        self.version += 1
+        return True
+
+    def rebase(self, record: dict) -> dict:
+        """
+        Returns a mutation record made against an older state, adjusted to be applied to this one:
+        a note added under an id that another writer has used meanwhile gets the next free id.
+
+        Args:
+            record (dict): The mutation record.
+
+        Returns:
+            dict: The record to apply.
+        """
+
+        if record["op"] == "add" and record["note"]["id"] in self._notes:
+            return {**record, "note": {**record["note"], "id": self._next_id}}
+        return record
@@ -0,0 +1,151 @@
+import re
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set, Tuple
+
+# National numbers ("0501234567") are stored in international form ("380501234567"): the trunk
+# prefix is replaced with the default country code.
+DEFAULT_COUNTRY_CODE = "380"
+TRUNK_PREFIX = "0"
+INTERNATIONAL_PREFIX = "00"
+
+_NON_DIGITS = re.compile(r"[^0-9]")
+
+
+def normalize_phone(phone: str) -> str:
+    """
+    Returns the canonical digit form of a phone number (or of the start of one) used for lookups.
+
+    Spaces, dashes, dots and brackets are dropped, as are a leading '+' or '00'; national numbers
+    starting with the trunk prefix get the default country code, so "+380 50 123 4567",
+    "00380501234567" and "050-123-45-67" all become "380501234567", and "+1555..." matches "1555...".
+
+    Args:
+        phone (str): The phone number or prefix.
+
+    Returns:
+        str: The digits, or an empty string if there are none.
+    """
+
+    phone = phone.strip()
+    digits = _NON_DIGITS.sub("", phone)
+    if phone.startswith("+"):
+        return digits
+    if digits.startswith(INTERNATIONAL_PREFIX):
+        return digits[len(INTERNATIONAL_PREFIX):]
+    if digits.startswith(TRUNK_PREFIX):
+        return DEFAULT_COUNTRY_CODE + digits[len(TRUNK_PREFIX):]
+    return digits
+
+
+class PhoneIndex:
+    """
+    Index of canonical phone numbers to the keys of the contacts using them.
+
+    Exact (caller ID) lookups go through a hash map. Prefix queries, such as an operator or area
+    code, bisect a sorted array of (phone, key) pairs, which is built on the first prefix query
+    and then kept sorted on every change. Numbers shared by several contacts are tracked as they
+    are added, so listing duplicates does not scan the book.
+    """
+
+    def __init__(self):
+        self._keys: Dict[str, Set[str]] = {}
+        self._sorted: Optional[List[Tuple[str, str]]] = None
+        self._shared: Set[str] = set()
+
+    def clear(self) -> None:
+        """
+        Removes all numbers from the index.
+        """
+
+        self._keys.clear()
+        self._sorted = None
+        self._shared.clear()
+
+    def add(self, key: str, phone: Optional[str]) -> None:
+        """
+        Indexes the phone number of the contact stored under the given key.
+
+        Args:
+            key (str): The key the contact is stored under.
+            phone (Optional[str]): The contact's phone number.
+        """
+
+        canonical = normalize_phone(phone) if phone else ""
+        if not canonical:
+            return
+        keys = self._keys.setdefault(canonical, set())
+        keys.add(key)
+        if len(keys) > 1:
+            self._shared.add(canonical)
+        if self._sorted is not None:
+            insort(self._sorted, (canonical, key))
+
+    def remove(self, key: str, phone: Optional[str]) -> None:
+        """
+        Removes the phone number of the contact stored under the given key.
+
+        Must be called before the contact's phone is changed.
+
+        Args:
+            key (str): The key the contact is stored under.
+            phone (Optional[str]): The contact's phone number.
+        """
+
+        canonical = normalize_phone(phone) if phone else ""
+        keys = self._keys.get(canonical)
+        if keys is None or key not in keys:
+            return
+        keys.discard(key)
+        if len(keys) < 2:
+            self._shared.discard(canonical)
+        if not keys:
+            del self._keys[canonical]
+        if self._sorted is not None:
+            index = bisect_left(self._sorted, (canonical, key))
+            if index < len(self._sorted) and self._sorted[index] == (canonical, key):
+                del self._sorted[index]
+
+    def find(self, phone: str) -> List[str]:
+        """
+        Returns the keys of the contacts with the given phone number, in any notation.
+
+        Args:
+            phone (str): The phone number.
+
+        Returns:
+            List[str]: The matching keys, sorted.
+        """
+
+        return sorted(self._keys.get(normalize_phone(phone), ()))
+
+    def prefix(self, prefix: str) -> List[Tuple[str, str]]:
+        """
+        Returns the numbers starting with the given prefix, after normalizing it like a number.
+
+        Args:
+            prefix (str): The start of a phone number, e.g. "+38050" or "050".
+
+        Returns:
+            List[Tuple[str, str]]: (canonical phone, key) pairs in phone order.
+        """
+
+        canonical = normalize_phone(prefix)
+        if not canonical:
+            return []
+        if self._sorted is None:
+            self._sorted = sorted((phone, key) for phone, keys in self._keys.items() for key in keys)
+        start = bisect_left(self._sorted, (canonical,))
+        # ":" sorts right after "9", so this is the first number not starting with the prefix.
+        stop = bisect_left(self._sorted, (canonical + ":",), start)
+        return self._sorted[start:stop]
+
+    def duplicates(self) -> List[Tuple[str, List[str]]]:
+        """
+        Returns the phone numbers used by more than one contact.
+
+        Returns:
+            List[Tuple[str, List[str]]]: Canonical numbers with the sorted keys of their contacts,
+            in phone order.
+        """
+
+        return [(phone, sorted(self._keys[phone])) for phone in sorted(self._shared)]
@@ -0,0 +1,727 @@
+"""
+Structured queries over the contact and note books.
+
+A query is a boolean combination of field predicates, plus optional ``sort:`` and ``limit:`` terms::
+
+    email:*@acme.com birthday:month=5
+    tag:urgent AND tag:client -text:draft
+    (name:jo* OR phone:050*) sort:-birthday limit:10
+
+Terms next to each other are AND-ed; ``OR`` binds weaker than ``AND``, ``NOT`` or a leading ``-``
+negates a term, and parentheses group. A predicate is ``field:value`` with an optional operator
+after the colon:
+
+* ``name:jo`` - the field contains "jo" (case-insensitive); ``*`` and ``?`` make it a wildcard
+  pattern over the whole value, e.g. ``email:*@acme.com``.
+* ``name:=Jane Doe`` (quote values with spaces: ``name:="Jane Doe"``), ``email:!=x@y.com``.
+* ``birthday:>=1990-01-01``, ``id:<100`` and the ranges ``id:10..20``, ``birthday:1990..1995``
+  (either end may be left open).
+* ``birthday:month=5``, ``birthday:day=1..7``, ``birthday:year<2000`` compare a part of the date.
+* Phone numbers are compared in their normalized form, so ``phone:0501234567`` finds
+  "+380 50 123 4567", and ``phone:050*`` is a prefix.
+* Tags match a whole tag: ``tag:urgent``, ``tag:proj*``.
+* A bare word matches like the plain search of the book.
+
+A book plans a query by asking each predicate whether one of its indexes can produce the
+candidates, estimating how many rows each index would return, and picking the cheapest; the
+whole query is then evaluated on those candidates only. Without a usable index, or when the best
+one would return about the whole book anyway, it scans.
+"""
+
+import heapq
+import re
+from itertools import chain
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+_OPERATORS = ("!=", ">=", "<=", "=", ">", "<")
+_COMPARISONS = {
+    "eq": lambda a, b: a == b,
+    "ne": lambda a, b: a != b,
+    "lt": lambda a, b: a < b,
+    "le": lambda a, b: a <= b,
+    "gt": lambda a, b: a > b,
+    "ge": lambda a, b: a >= b,
+}
+_OPERATOR_NAMES = {"=": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge"}
+_TERM = re.compile(r"([A-Za-z_]+):(.*)", re.DOTALL)
+_DATE_PART = re.compile(r"(month|day|year)(!=|>=|<=|=|>|<)(.*)", re.DOTALL)
+_DATE_PARTS = {"year": slice(0, 4), "month": slice(5, 7), "day": slice(8, 10)}
+
+
+def _wildcards(value: str) -> bool:
+    return "*" in value or "?" in value
+
+
+def _pattern(value: str) -> "re.Pattern":
+    """
+    Compiles a wildcard pattern, where ``*`` matches any run of characters and ``?`` one character.
+    """
+
+    return re.compile("".join(".*" if c == "*" else "." if c == "?" else re.escape(c) for c in value), re.DOTALL)
+
+
+class Field:
+    """
+    A queryable field of a book's records.
+
+    Attributes:
+        kind (str): "text", "phone", "date" (YYYY-MM-DD strings), "int" or "tags".
+        get (Callable[[Any], Any]): Reads the field from a record.
+    """
+
+    def __init__(self, kind: str, get: Callable[[Any], Any]):
+        self.kind = kind
+        self.get = get
+
+
+class Schema:
+    """
+    The fields of one book's records and how bare words and default ordering work.
+
+    Args:
+        fields (Dict[str, Field]): The queryable fields by name.
+        search (Callable[[Any, str], bool]): Whether a record matches a bare (lowercased) word.
+        order (str): The field results are sorted by when the query has no ``sort:``.
+        key (Callable[[Any], Hashable]): Identifies a record, so records fetched twice are returned once.
+        normalize (Callable[[str], str]): Canonical form of phone values, for "phone" fields.
+    """
+
+    def __init__(
+        self, fields: Dict[str, Field], search: Callable[[Any, str], bool], order: str,
+        key: Callable[[Any], Hashable], normalize: Optional[Callable[[str], str]] = None,
+    ):
+        self.fields = fields
+        self.search = search
+        self.order = order
+        self.key = key
+        self.normalize = normalize
+
+
+class Predicate:
+    """
+    One ``field:value`` term, or a bare word (``field`` None).
+
+    Attributes:
+        field (Optional[str]): The field name.
+        op (str): "contains", "glob", "prefix", "range" or a comparison ("eq", "ne", "lt", "le",
+            "gt", "ge").
+        value (Any): The operand, lowercased for text and normalized for phones; a (low, high)
+            pair for ranges, either of which may be None.
+        part (Optional[str]): "month", "day" or "year" for a comparison on part of a date.
+        fragment (Optional[str]): A lowercased substring every matching value contains, which a
+            substring index can look up.
+    """
+
+    def __init__(self, text: str, field: Optional[str], op: str, value: Any, part: Optional[str] = None):
+        self.text = text
+        self.field = field
+        self.op = op
+        self.value = value
+        self.part = part
+        self.fragment: Optional[str] = None
+        self._test: Callable[[Any], bool] = lambda record: False
+
+    def __str__(self) -> str:
+        return self.text
+
+    def test(self, record: Any) -> bool:
+        return self._test(record)
+
+    def bounds(self, low: int, high: int) -> Optional[Tuple[int, int]]:
+        """
+        Returns the inclusive interval of integers within [low, high] that a numeric comparison
+        (or a comparison on a date part) accepts, or None if it is not an interval.
+
+        Args:
+            low (int): The smallest value the field can take.
+            high (int): The largest value the field can take.
+
+        Returns:
+            Optional[Tuple[int, int]]: The interval, empty when the first end exceeds the second.
+        """
+
+        op, value = self.op, self.value
+        if op == "eq":
+            return max(low, value), min(high, value)
+        if op == "lt":
+            return low, min(high, value - 1)
+        if op == "le":
+            return low, min(high, value)
+        if op == "gt":
+            return max(low, value + 1), high
+        if op == "ge":
+            return max(low, value), high
+        if op == "range":
+            start, stop = value
+            return max(low, low if start is None else start), min(high, high if stop is None else stop)
+        return None
+
+
+class And:
+    def __init__(self, children: List[Any]):
+        self.children = children
+
+    def __str__(self) -> str:
+        return "(" + " AND ".join(map(str, self.children)) + ")"
+
+    def test(self, record: Any) -> bool:
+        return all(child.test(record) for child in self.children)
+
+
+class Or:
+    def __init__(self, children: List[Any]):
+        self.children = children
+
+    def __str__(self) -> str:
+        return "(" + " OR ".join(map(str, self.children)) + ")"
+
+    def test(self, record: Any) -> bool:
+        return any(child.test(record) for child in self.children)
+
+
+class Not:
+    def __init__(self, child: Any):
+        self.child = child
+
+    def __str__(self) -> str:
+        return f"NOT {self.child}"
+
+    def test(self, record: Any) -> bool:
+        return not self.child.test(record)
+
+
+class Query:
+    """
+    A parsed query.
+
+    Attributes:
+        where (Optional[Any]): The condition tree (Predicate, And, Or, Not), or None to match all.
+        sort (str): The field to sort by.
+        descending (bool): Whether to sort in descending order.
+        limit (Optional[int]): The most records returned, or None for all.
+    """
+
+    def __init__(self, where: Optional[Any], sort: str, descending: bool = False, limit: Optional[int] = None):
+        self.where = where
+        self.sort = sort
+        self.descending = descending
+        self.limit = limit
+
+
+def _tokens(text: str) -> List[str]:
+    """
+    Splits a query into parentheses and terms; double quotes keep spaces and parentheses in a term.
+    """
+
+    tokens, term, quoted = [], [], False
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+            term.append(char)
+        elif quoted:
+            term.append(char)
+        elif char.isspace() or char in "()":
+            if term:
+                tokens.append("".join(term))
+                term = []
+            if char in "()":
+                tokens.append(char)
+        else:
+            term.append(char)
+    if quoted:
+        raise ValueError("Unbalanced quotes in the query.")
+    if term:
+        tokens.append("".join(term))
+    return tokens
+
+
+def _unquote(value: str) -> str:
+    return value.replace('"', "")
+
+
+def _number(value: str, what: str) -> int:
+    value = value.strip()
+    if not value.lstrip("-").isdigit():
+        raise ValueError(f"{what} expects a whole number, got '{value}'.")
+    return int(value)
+
+
+class _Parser:
+    def __init__(self, text: str, schema: Schema):
+        self.schema = schema
+        self.tokens = _tokens(text)
+        self.position = 0
+        self.sort = schema.order
+        self.descending = False
+        self.limit: Optional[int] = None
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def take(self) -> str:
+        token = self.tokens[self.position]
+        self.position += 1
+        return token
+
+    def parse(self) -> Query:
+        where = self.disjunction()
+        if self.peek() is not None:
+            raise ValueError(f"Unexpected '{self.peek()}' in the query.")
+        return Query(where, self.sort, self.descending, self.limit)
+
+    def disjunction(self) -> Optional[Any]:
+        children = [self.conjunction()]
+        while self.peek() == "OR":
+            self.take()
+            children.append(self.conjunction())
+        children = [child for child in children if child is not None]
+        if len(children) < 2:
+            return children[0] if children else None
+        return Or(children)
+
+    def conjunction(self) -> Optional[Any]:
+        children = []
+        while self.peek() not in (None, ")", "OR"):
+            if self.peek() == "AND":
+                self.take()
+                continue
+            child = self.unary()
+            if child is not None:
+                children.append(child)
+        if len(children) < 2:
+            return children[0] if children else None
+        return And(children)
+
+    def unary(self) -> Optional[Any]:
+        token = self.take()
+        if token == "NOT":
+            if self.peek() in (None, ")", "OR", "AND"):
+                raise ValueError("NOT must be followed by a term.")
+            return self._negate(self.unary())
+        if token == "(":
+            inner = self.disjunction()
+            if self.peek() != ")":
+                raise ValueError("Missing ')' in the query.")
+            self.take()
+            return inner
+        if token == ")":
+            raise ValueError("Unexpected ')' in the query.")
+        if token.startswith("-") and len(token) > 1:
+            return self._negate(self.term(token[1:]))
+        return self.term(token)
+
+    def _negate(self, node: Optional[Any]) -> Any:
+        if node is None:
+            raise ValueError("sort: and limit: cannot be negated.")
+        return Not(node)
+
+    def term(self, token: str) -> Optional[Predicate]:
+        match = _TERM.fullmatch(token) if not token.startswith('"') else None
+        if match is None:
+            word = _unquote(token).lower()
+            predicate = Predicate(token, None, "contains", word)
+            predicate.fragment = word
+            predicate._test = lambda record: self.schema.search(record, word)
+            return predicate
+
+        name, value = match.group(1).lower(), _unquote(match.group(2))
+        if name == "limit":
+            self.limit = _number(value, "limit:")
+            if self.limit < 0:
+                raise ValueError("limit: cannot be negative.")
+            return None
+        if name == "sort":
+            self.descending = value.startswith("-")
+            self.sort = value.lstrip("-").lower()
+            if self.sort not in self.schema.fields:
+                raise ValueError(f"Cannot sort by '{self.sort}'. Fields: {', '.join(self.schema.fields)}.")
+            return None
+
+        field = self.schema.fields.get(name)
+        if field is None:
+            raise ValueError(f"Unknown field '{name}'. Fields: {', '.join(self.schema.fields)}.")
+        return _predicate(token, name, field, value, self.schema)
+
+
+def _split_operator(value: str) -> Tuple[Optional[str], str]:
+    for operator in _OPERATORS:
+        if value.startswith(operator):
+            return _OPERATOR_NAMES[operator], value[len(operator):]
+    return None, value
+
+
+def _range(value: str, convert: Callable[[str], Any]) -> Tuple[Any, Any]:
+    start, stop = value.split("..", 1)
+    return (convert(start) if start else None), (convert(stop) if stop else None)
+
+
+def _in_range(value: Any, bounds: Tuple[Any, Any]) -> bool:
+    start, stop = bounds
+    return (start is None or value >= start) and (stop is None or value <= stop)
+
+
+def _compare(op: str, operand: Any, read: Callable[[Any], Any]) -> Callable[[Any], bool]:
+    """
+    Builds the test of a comparison or range on values produced by ``read`` (None never matches).
+    """
+
+    if op == "range":
+        def test(record):
+            value = read(record)
+            return value is not None and _in_range(value, operand)
+    elif op == "ne":
+        def test(record):
+            return read(record) != operand
+    else:
+        compare = _COMPARISONS[op]
+
+        def test(record):
+            value = read(record)
+            return value is not None and compare(value, operand)
+    return test
+
+
+def _predicate(text: str, name: str, field: Field, value: str, schema: Schema) -> Predicate:
+    get = field.get
+    if field.kind == "date":
+        part = _DATE_PART.fullmatch(value)
+        if part is not None:
+            which, op, operand = part.group(1), _OPERATOR_NAMES[part.group(2)], part.group(3)
+            convert = lambda number: _number(number, f"{name}:{which}")
+            if op == "eq" and ".." in operand:
+                op, operand = "range", _range(operand, convert)
+            else:
+                operand = convert(operand)
+            piece = _DATE_PARTS[which]
+
+            def read(record):
+                date = get(record)
+                digits = date[piece] if date else ""
+                return int(digits) if digits.isdigit() else None
+
+            predicate = Predicate(text, name, op, operand, which)
+            predicate._test = _compare(op, operand, read)
+            return predicate
+
+    op, value = _split_operator(value)
+    if not value:
+        raise ValueError(f"'{text}' needs a value.")
+
+    if field.kind == "int":
+        convert = lambda number: _number(number, f"{name}:")
+        if op in (None, "eq") and ".." in value:
+            op, operand = "range", _range(value, convert)
+        else:
+            op, operand = op or "eq", convert(value)
+        predicate = Predicate(text, name, op, operand)
+        predicate._test = _compare(op, operand, get)
+        return predicate
+
+    if field.kind == "tags":
+        tag = value.strip().casefold()
+        if op in (None, "eq", "ne") and _wildcards(tag):
+            pattern = _pattern(tag)
+            matches = lambda record: any(pattern.fullmatch(t.strip().casefold()) for t in get(record))
+            predicate = Predicate(text, name, "glob" if op != "ne" else "ne", pattern)
+        elif op in (None, "eq", "ne"):
+            matches = lambda record: any(t.strip().casefold() == tag for t in get(record))
+            predicate = Predicate(text, name, "eq" if op != "ne" else "ne", tag)
+        else:
+            raise ValueError(f"Tags can only be matched, not compared: '{text}'.")
+        predicate._test = (lambda record: not matches(record)) if op == "ne" else matches
+        return predicate
+
+    if field.kind == "phone":
+        normalize = schema.normalize or (lambda phone: phone)
+        if op is None and value.endswith("*") and not _wildcards(value[:-1]):
+            prefix = normalize(value[:-1])
+            predicate = Predicate(text, name, "prefix", prefix)
+            predicate._test = lambda record: bool(get(record)) and normalize(get(record)).startswith(prefix)
+            return predicate
+        if op in (None, "eq", "ne") and _wildcards(value):
+            convert = str.lower
+            read = lambda record: (get(record) or "").lower()
+        else:
+            convert = normalize
+            read = lambda record: normalize(get(record)) if get(record) else None
+            op = op or "eq"
+    else:
+        convert = str.lower
+        read = lambda record: get(record).lower() if get(record) else None
+
+    if op in (None, "eq") and ".." in value:
+        op, value = "range", _range(value, convert)
+    else:
+        value = value.lower() if _wildcards(value) else convert(value)
+    if op in (None, "eq", "ne") and _wildcards(value):
+        pattern = _pattern(value)
+        literals = [piece for piece in re.split(r"[*?]", value) if piece]
+        predicate = Predicate(text, name, "glob", pattern)
+        predicate.fragment = max(literals, key=len) if literals else None
+        if op == "ne":
+            predicate.op, predicate.fragment = "ne", None
+            predicate._test = lambda record: not pattern.fullmatch(read(record) or "")
+        else:
+            predicate._test = lambda record: read(record) is not None and pattern.fullmatch(read(record)) is not None
+        return predicate
+    if op is None:
+        predicate = Predicate(text, name, "contains", value)
+        predicate.fragment = value
+        predicate._test = lambda record: value in (read(record) or "")
+        return predicate
+    predicate = Predicate(text, name, op, value)
+    if op == "eq" and field.kind != "phone":
+        predicate.fragment = value
+    if field.kind == "date":
+        predicate._test = _compare_dates(op, value, read)
+    else:
+        predicate._test = _compare(op, value, read)
+    return predicate
+
+
+def _compare_dates(op: str, operand: Any, read: Callable[[Any], Any]) -> Callable[[Any], bool]:
+    """
+    Builds the test of a comparison or range on dates, where a partial date such as "1990" or
+    "1990-05" compares with the same leading part of each date, so ``birthday:1990..1995`` includes
+    all of 1995 and ``birthday:=1990`` matches every date in 1990.
+    """
+
+    if op == "range":
+        start, stop = operand
+
+        def test(record):
+            value = read(record)
+            return value is not None and (start is None or value[:len(start)] >= start) and (
+                stop is None or value[:len(stop)] <= stop)
+        return test
+
+    compare = _COMPARISONS[op]
+    size = len(operand)
+    if op == "ne":
+        return lambda record: read(record) is None or compare(read(record)[:size], operand)
+
+    def test(record):
+        value = read(record)
+        return value is not None and compare(value[:size], operand)
+    return test
+
+
+def compile_query(text: str, schema: Schema) -> Query:
+    """
+    Parses a query against the fields of a book.
+
+    Args:
+        text (str): The query, e.g. ``tag:urgent AND tag:client -text:draft limit:20``.
+        schema (Schema): The fields of the book queried.
+
+    Returns:
+        Query: The parsed query.
+
+    Raises:
+        ValueError: If the query is malformed or names an unknown field.
+    """
+
+    return _Parser(text, schema).parse()
+
+
+class Access:
+    """
+    A way of fetching the candidate records of a query.
+
+    Attributes:
+        description (str): How the candidates are found, e.g. "tag index: urgent".
+        cost (int): Estimated number of records fetched.
+        fetch (Callable[[], Iterable[Any]]): Produces the candidates.
+    """
+
+    def __init__(self, description: str, cost: int, fetch: Callable[[], Iterable[Any]]):
+        self.description = description
+        self.cost = cost
+        self.fetch = fetch
+
+
+def _union(accesses: List[Access], key: Callable[[Any], Hashable]) -> Access:
+    def fetch():
+        seen = set()
+        for record in chain.from_iterable(access.fetch() for access in accesses):
+            if key(record) not in seen:
+                seen.add(key(record))
+                yield record
+
+    description = "union of " + " + ".join(access.description for access in accesses)
+    return Access(description, sum(access.cost for access in accesses), fetch)
+
+
+class Plan:
+    """
+    How a query will be run: the chosen access path, the filter applied to its candidates, and
+    the sort and limit applied to the matches.
+
+    Attributes:
+        query (Query): The parsed query.
+        access (Access): The chosen access path.
+        scan (Access): The full scan, for comparison.
+        considered (List[Access]): The index access paths that were considered.
+    """
+
+    def __init__(self, query: Query, access: Access, scan: Access, considered: List[Access], schema: Schema):
+        self.query = query
+        self.access = access
+        self.scan = scan
+        self.considered = considered
+        self.schema = schema
+
+    def run(self) -> List[Any]:
+        """
+        Runs the plan.
+
+        Returns:
+            List[Any]: The matching records, sorted and limited as the query asks.
+        """
+
+        query = self.query
+        records = self.access.fetch()
+        if query.where is not None:
+            records = (record for record in records if query.where.test(record))
+
+        field = self.schema.fields[query.sort]
+        empty = 0 if field.kind == "int" else ""
+        get = field.get
+        if field.kind == "tags":
+            get = lambda record: ", ".join(field.get(record)).casefold()
+        elif field.kind in ("text", "phone"):
+            get = lambda record: (field.get(record) or "").casefold() or None
+
+        identify = self.schema.key
+
+        def key(record):
+            value = get(record)
+            # Records without the field come last in either direction; ties are broken by identity,
+            # so the order does not depend on the access path.
+            return (value is None) != query.descending, empty if value is None else value, identify(record)
+
+        if query.limit is not None:
+            select = heapq.nlargest if query.descending else heapq.nsmallest
+            return select(query.limit, records, key=key)
+        return sorted(records, key=key, reverse=query.descending)
+
+    def explain(self) -> Dict[str, Any]:
+        """
+        Describes the plan.
+
+        Returns:
+            Dict[str, Any]: "access" and "cost" (the chosen access path and its estimated number of
+            records), "rows" (the records in the book), "filter" (the condition checked on every
+            candidate), "sort", "limit", and "considered" ([description, cost] of every index access
+            path looked at).
+        """
+
+        query = self.query
+        return {
+            "access": self.access.description,
+            "cost": self.access.cost,
+            "rows": self.scan.cost,
+            "filter": str(query.where) if query.where is not None else None,
+            "sort": ("-" if query.descending else "") + query.sort,
+            "limit": query.limit,
+            "considered": [[access.description, access.cost] for access in self.considered],
+        }
+
+
+def plan_query(
+    query: Query, schema: Schema, access: Callable[[Predicate], Optional[Access]], scan: Access,
+) -> Plan:
+    """
+    Chooses how to run a query.
+
+    A predicate can use an index if ``access`` returns one for it. Of the terms of an AND, the
+    cheapest is used; an OR can use indexes only if all its terms can (their union is fetched);
+    NOT never can. The index is used only if it is estimated to fetch fewer records than a scan.
+
+    Args:
+        query (Query): The parsed query.
+        schema (Schema): The fields of the book.
+        access (Callable[[Predicate], Optional[Access]]): Returns an index access path for a
+            predicate, or None.
+        scan (Access): The full scan.
+
+    Returns:
+        Plan: The chosen plan.
+    """
+
+    considered: List[Access] = []
+
+    def best(node: Any) -> Optional[Access]:
+        if isinstance(node, Predicate):
+            found = access(node)
+            if found is not None:
+                considered.append(found)
+            return found
+        if isinstance(node, And):
+            options = [found for found in map(best, node.children) if found is not None]
+            return min(options, key=lambda option: option.cost, default=None)
+        if isinstance(node, Or):
+            options = [best(child) for child in node.children]
+            if any(option is None for option in options):
+                return None
+            return _union(options, schema.key)
+        return None
+
+    chosen = best(query.where) if query.where is not None else None
+    if chosen is None or chosen.cost >= scan.cost:
+        chosen = scan
+    return Plan(query, chosen, scan, considered, schema)
+
+
+class Queryable:
+    """
+    Mixin adding ``query`` and ``explain`` to a book.
+
+    The book sets ``query_schema`` and implements ``_query_access(predicate)``, which returns an
+    Access over one of its indexes that yields every record matching the predicate (and possibly
+    others), or None; and ``_query_scan()``, which returns an Access over all its records.
+    """
+
+    query_schema: Schema
+
+    def _query_access(self, predicate: Predicate) -> Optional[Access]:
+        return None
+
+    def _query_scan(self) -> Access:
+        raise NotImplementedError
+
+    def _plan(self, text: str) -> Plan:
+        query = compile_query(text, self.query_schema)
+        return plan_query(query, self.query_schema, self._query_access, self._query_scan())
+
+    def query(self, text: str) -> List[Any]:
+        """
+        Finds the records matching a structured query (see services.query).
+
+        Args:
+            text (str): The query, e.g. ``email:*@acme.com birthday:month=5``.
+
+        Returns:
+            List[Any]: The matching records, sorted and limited as the query asks.
+
+        Raises:
+            ValueError: If the query is malformed.
+        """
+
+        return self._plan(text).run()
+
+    def explain(self, text: str) -> Dict[str, Any]:
+        """
+        Describes how a structured query would be run, without running it.
+
+        Args:
+            text (str): The query.
+
+        Returns:
+            Dict[str, Any]: The plan, see ``Plan.explain``.
+
+        Raises:
+            ValueError: If the query is malformed.
+        """
+
+        return self._plan(text).explain()
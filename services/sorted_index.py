@@ -0,0 +1,178 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Iterable, Iterator, List, Optional, Tuple
+
+# Keys per chunk: chunks are split when they grow to twice this size.
+CHUNK_SIZE = 512
+
+
+def prefix_end(prefix: str) -> str:
+    """
+    Returns a string greater than every string starting with the prefix, and smaller than every
+    greater string not starting with it, to use as the exclusive end of a prefix range.
+
+    Args:
+        prefix (str): The prefix.
+
+    Returns:
+        str: The bound.
+    """
+
+    return prefix + chr(0x10FFFF)
+
+
+class SortedIndex:
+    """
+    Sorted collection of unique, comparable keys, kept in order as keys are added and removed.
+
+    Keys are stored in chunks of a few hundred, with the last key of every chunk in a separate
+    array, like the leaves of a B-tree one level deep: finding the chunk of a key is a bisection
+    of that array, and an insertion or removal only shifts the keys of one chunk. So updates cost
+    O(log n + CHUNK_SIZE) instead of re-sorting, and walking the keys from a position or a key
+    yields them lazily.
+    """
+
+    def __init__(self, keys: Iterable[Any] = ()):
+        ordered = sorted(keys)
+        self._chunks: List[List[Any]] = [ordered[i:i + CHUNK_SIZE] for i in range(0, len(ordered), CHUNK_SIZE)]
+        self._maxes: List[Any] = [chunk[-1] for chunk in self._chunks]
+        self._len = len(ordered)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        for chunk in self._chunks:
+            yield from chunk
+
+    def add(self, key: Any) -> None:
+        """
+        Inserts a key in order.
+
+        Args:
+            key (Any): The key, not already in the index.
+        """
+
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._len = 1
+            return
+
+        position = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+        chunk = self._chunks[position]
+        insort(chunk, key)
+        self._maxes[position] = chunk[-1]
+        self._len += 1
+        if len(chunk) > 2 * CHUNK_SIZE:
+            self._chunks[position:position + 1] = [chunk[:CHUNK_SIZE], chunk[CHUNK_SIZE:]]
+            self._maxes[position:position + 1] = [chunk[CHUNK_SIZE - 1], chunk[-1]]
+
+    def remove(self, key: Any) -> bool:
+        """
+        Removes a key.
+
+        Args:
+            key (Any): The key.
+
+        Returns:
+            bool: True if the key was in the index.
+        """
+
+        position = bisect_left(self._maxes, key)
+        if position == len(self._maxes):
+            return False
+        chunk = self._chunks[position]
+        index = bisect_left(chunk, key)
+        if index == len(chunk) or chunk[index] != key:
+            return False
+
+        del chunk[index]
+        self._len -= 1
+        if chunk:
+            self._maxes[position] = chunk[-1]
+        else:
+            del self._chunks[position]
+            del self._maxes[position]
+        return True
+
+    def rank(self, key: Any, right: bool = False) -> int:
+        """
+        Returns the position at which a key is or would be inserted.
+
+        Args:
+            key (Any): The key.
+            right (bool): Whether to return the position after keys equal to it.
+
+        Returns:
+            int: The number of keys smaller than the key (or not greater, with ``right``).
+        """
+
+        search = bisect_right if right else bisect_left
+        position = search(self._maxes, key)
+        if position == len(self._maxes):
+            return self._len
+        return sum(map(len, self._chunks[:position])) + search(self._chunks[position], key)
+
+    def islice(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Any]:
+        """
+        Lazily yields the keys at positions ``start`` to ``stop`` (exclusive) in order.
+
+        Args:
+            start (int): The first position.
+            stop (Optional[int]): The position to stop at, or None for the end.
+
+        Yields:
+            Any: The keys.
+        """
+
+        stop = self._len if stop is None else min(stop, self._len)
+        for chunk_index, chunk in enumerate(self._chunks):
+            if start < len(chunk):
+                break
+            start -= len(chunk)
+            stop -= len(chunk)
+        else:
+            return
+
+        remaining = stop - start
+        for chunk in self._chunks[chunk_index:]:
+            if remaining <= 0:
+                return
+            part = chunk[start:start + remaining] if start or remaining < len(chunk) else chunk
+            yield from part
+            remaining -= len(part)
+            start = 0
+
+    def irange(self, low: Optional[Any] = None, high: Optional[Any] = None) -> Iterator[Any]:
+        """
+        Lazily yields the keys from ``low`` (inclusive) up to ``high`` (exclusive) in order.
+
+        Args:
+            low (Optional[Any]): The smallest key, or None to start at the first key.
+            high (Optional[Any]): The bound to stop at, or None to walk to the end.
+
+        Yields:
+            Any: The keys.
+        """
+
+        start = 0 if low is None else self.rank(low)
+        for key in self.islice(start):
+            if high is not None and not key < high:
+                return
+            yield key
+
+    def window(self, low: Optional[Any] = None, high: Optional[Any] = None) -> Tuple[int, int]:
+        """
+        Returns the positions of the keys from ``low`` (inclusive) up to ``high`` (exclusive).
+
+        Args:
+            low (Optional[Any]): The smallest key, or None for the first key.
+            high (Optional[Any]): The exclusive bound, or None for the end.
+
+        Returns:
+            Tuple[int, int]: (start, stop) positions, for ``islice``.
+        """
+
+        start = 0 if low is None else self.rank(low)
+        stop = self._len if high is None else self.rank(high)
+        return start, max(start, stop)
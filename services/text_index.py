@@ -0,0 +1,305 @@
+import heapq
+import math
+import re
+from bisect import bisect_left, insort
+from typing import Any, Dict, Hashable, List, Optional, Set, Tuple
+
+_TOKEN_RE = re.compile(r"\w+")
+_QUERY_RE = re.compile(r'"([^"]*)"|(\S+)')
+
+# Standard BM25 parameters.
+K1 = 1.2
+B = 0.75
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Splits text into case-folded word tokens.
+
+    Args:
+        text (str): The text to split.
+
+    Returns:
+        List[str]: The tokens in order of appearance.
+    """
+
+    return _TOKEN_RE.findall(text.casefold())
+
+
+def parse_query(query: str) -> List[Tuple[str, Any]]:
+    """
+    Splits a full-text query into clauses.
+
+    Args:
+        query (str): Terms, ``prefix*`` terms and ``"quoted phrases"``.
+
+    Returns:
+        List[Tuple[str, Any]]: ("phrase", [tokens]), ("prefix", prefix) and ("term", token) clauses.
+    """
+
+    clauses = []
+    for phrase, word in _QUERY_RE.findall(query):
+        if phrase:
+            terms = tokenize(phrase)
+            if terms:
+                clauses.append(("phrase", terms))
+        elif word.endswith("*"):
+            prefix = word[:-1].casefold()
+            if prefix:
+                clauses.append(("prefix", prefix))
+        else:
+            clauses.extend(("term", term) for term in tokenize(word))
+    return clauses
+
+
+def idf(documents: int, matching: int) -> float:
+    """
+    Returns the BM25 inverse document frequency of a clause.
+
+    Args:
+        documents (int): Number of documents in the collection.
+        matching (int): Number of documents matching the clause.
+
+    Returns:
+        float: The idf, always positive.
+    """
+
+    return math.log(1 + (documents - matching + 0.5) / (matching + 0.5))
+
+
+def term_score(weight: float, frequency: int, length: int, average_length: float) -> float:
+    """
+    Returns the BM25 contribution of one clause to a document's score.
+
+    Args:
+        weight (float): The idf of the clause.
+        frequency (int): Occurrences of the clause in the document.
+        length (int): The document length in tokens.
+        average_length (float): The average document length.
+
+    Returns:
+        float: The contribution.
+    """
+
+    norm = K1 * (1 - B + B * length / average_length)
+    return weight * frequency * (K1 + 1) / (frequency + norm)
+
+
+def count_phrase(tokens: List[str], terms: List[str]) -> int:
+    """
+    Returns the number of occurrences of a phrase in a token list.
+
+    Args:
+        tokens (List[str]): The document tokens.
+        terms (List[str]): The phrase tokens.
+
+    Returns:
+        int: The number of positions where the phrase starts.
+    """
+
+    size = len(terms)
+    return sum(1 for start in range(len(tokens) - size + 1) if tokens[start:start + size] == terms)
+
+
+class FullTextIndex:
+    """
+    Positional inverted index with BM25 ranking.
+
+    Supports plain terms, prefix terms (``meet*``) and quoted phrases (``"project kickoff"``).
+    Terms and prefixes are OR-ed together and contribute to the score; every phrase in a query
+    is required. Documents are identified by any hashable id supplied by the caller.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {}
+        self._lengths: Dict[Hashable, int] = {}
+        self._total_length = 0
+        self._vocabulary: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def clear(self) -> None:
+        """
+        Removes all documents from the index.
+        """
+
+        self._postings.clear()
+        self._lengths.clear()
+        self._total_length = 0
+        self._vocabulary.clear()
+
+    def add(self, doc: Hashable, text: str) -> None:
+        """
+        Indexes the text of a document.
+
+        Args:
+            doc (Hashable): The document id.
+            text (str): The document text.
+        """
+
+        tokens = tokenize(text)
+        self._lengths[doc] = len(tokens)
+        self._total_length += len(tokens)
+
+        for position, term in enumerate(tokens):
+            posting = self._postings.get(term)
+            if posting is None:
+                posting = self._postings[term] = {}
+                insort(self._vocabulary, term)
+            posting.setdefault(doc, []).append(position)
+
+    def remove(self, doc: Hashable, text: str) -> None:
+        """
+        Removes a document from the index.
+
+        Args:
+            doc (Hashable): The document id.
+            text (str): The text the document was indexed with.
+        """
+
+        length = self._lengths.pop(doc, None)
+        if length is None:
+            return
+
+        self._total_length -= length
+        for term in set(tokenize(text)):
+            posting = self._postings[term]
+            posting.pop(doc, None)
+            if not posting:
+                del self._postings[term]
+                del self._vocabulary[bisect_left(self._vocabulary, term)]
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[Hashable, float]]:
+        """
+        Returns the best matching documents for a query.
+
+        Args:
+            query (str): Terms, ``prefix*`` terms and ``"quoted phrases"``.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[Hashable, float]]: (document id, BM25 score) pairs, best first.
+        """
+
+        if not self._lengths:
+            return []
+
+        clauses = []
+        required = None
+
+        for kind, value in parse_query(query):
+            if kind == "phrase":
+                matches = self._phrase_matches(value)
+                required = set(matches) if required is None else required & matches.keys()
+                clauses.append((matches, False))
+            elif kind == "prefix":
+                clauses.extend((self._postings[term], True) for term in self._expand(value))
+            elif value in self._postings:
+                clauses.append((self._postings[value], True))
+
+        return self._top(clauses, required, limit)
+
+    def containing(self, fragment: str) -> Set[Hashable]:
+        """
+        Returns the documents with a word containing the fragment, by scanning the vocabulary.
+
+        Args:
+            fragment (str): A case-folded run of word characters.
+
+        Returns:
+            Set[Hashable]: The document ids.
+        """
+
+        docs: Set[Hashable] = set()
+        for term in self._vocabulary:
+            if fragment in term:
+                docs.update(self._postings[term])
+        return docs
+
+    def _expand(self, prefix: str) -> List[str]:
+        """
+        Returns the vocabulary terms starting with the prefix.
+        """
+
+        terms = []
+        for index in range(bisect_left(self._vocabulary, prefix), len(self._vocabulary)):
+            term = self._vocabulary[index]
+            if not term.startswith(prefix):
+                break
+            terms.append(term)
+        return terms
+
+    def _phrase_matches(self, terms: List[str]) -> Dict[Hashable, int]:
+        """
+        Returns the number of occurrences of a phrase in each document containing it.
+        """
+
+        postings = [self._postings.get(term) for term in terms]
+        if not all(postings):
+            return {}
+
+        candidates: Set[Hashable] = set(min(postings, key=len))
+        for posting in postings:
+            candidates.intersection_update(posting)
+
+        matches = {}
+        for doc in candidates:
+            starts = set(postings[0][doc])
+            for offset, posting in enumerate(postings[1:], 1):
+                starts &= {position - offset for position in posting[doc]}
+                if not starts:
+                    break
+            if starts:
+                matches[doc] = len(starts)
+        return matches
+
+    def _top(
+        self, clauses: List[Tuple[Dict[Hashable, Any], bool]], required: Optional[Set[Hashable]], limit: int
+    ) -> List[Tuple[Hashable, float]]:
+        """
+        Scores documents against query clauses with BM25 and returns the top ``limit`` of them.
+
+        Each clause maps documents either to their positions of a term (``positional``) or to the
+        number of occurrences of a phrase. Clauses are processed by decreasing idf; once no unseen
+        document can reach the current top-k threshold (MaxScore pruning), the remaining clauses only
+        update documents that already have a score.
+        """
+
+        if limit <= 0:
+            return []
+
+        count = len(self._lengths)
+        average_length = self._total_length / count or 1
+        weighted = sorted(
+            ((idf(count, len(matches)), matches, positional)
+             for matches, positional in clauses if matches),
+            key=lambda clause: clause[0],
+            reverse=True,
+        )
+
+        scores: Dict[Hashable, float] = {}
+        remaining = sum(weight for weight, _, _ in weighted) * (K1 + 1)
+        threshold = 0.0
+
+        for weight, matches, positional in weighted:
+            if len(scores) >= limit and remaining <= threshold:
+                if len(scores) < len(matches):
+                    items = [(doc, matches[doc]) for doc in scores if doc in matches]
+                else:
+                    items = [(doc, value) for doc, value in matches.items() if doc in scores]
+            else:
+                items = matches.items()
+
+            for doc, value in items:
+                if required is not None and doc not in required:
+                    continue
+                frequency = len(value) if positional else value
+                score = term_score(weight, frequency, self._lengths[doc], average_length)
+                scores[doc] = scores.get(doc, 0.0) + score
+
+            remaining -= weight * (K1 + 1)
+            if len(scores) >= limit:
+                threshold = heapq.nlargest(limit, scores.values())[-1]
+
+        return heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,213 @@
+from array import array
+from bisect import bisect_left, insort
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# When even the rarest trigram of a query occurs in this share of the documents, verifying its
+# candidates costs as much as scanning, so ``search`` leaves the query to a scan.
+SCAN_RATIO = 0.5
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Returns the set of all 3-character substrings of a string.
+
+    Args:
+        text (str): The string to split.
+
+    Returns:
+        Set[str]: The trigrams of the string (empty if it is shorter than 3 characters).
+    """
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    Inverted index from trigrams to documents, used to answer substring queries without a full scan.
+
+    Every document is stored under a key (e.g. a contact name) and gets an integer id that reflects its
+    insertion order, so results come back in the same order as a scan over the source dictionary.
+    The text of a document is produced by the ``fields`` callable, which must return already lowercased
+    strings; postings only narrow down the candidates, which are then verified with a real substring test.
+
+    Postings are sorted arrays of 32-bit ids, 4 bytes per entry instead of a set of int objects;
+    a query checks the ids of its rarest trigram against the other postings by bisection.
+    """
+
+    def __init__(self, fields: Callable[[Any], Iterable[str]]):
+        self._fields = fields
+        self._postings: Dict[str, array] = {}
+        self._docs: Dict[int, Any] = {}
+        self._ids: Dict[str, int] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def clear(self) -> None:
+        """
+        Removes all documents from the index.
+        """
+
+        self._postings.clear()
+        self._docs.clear()
+        self._ids.clear()
+        self._next_id = 0
+
+    def add(self, key: str, doc: Any, doc_id: Optional[int] = None) -> int:
+        """
+        Indexes a document under the given key.
+
+        Args:
+            key (str): The key the document is stored under.
+            doc (Any): The document to index.
+            doc_id (Optional[int]): Id returned by a previous ``remove`` call, used to re-index an edited
+                document without changing its position in the result order.
+
+        Returns:
+            int: The id assigned to the document.
+        """
+
+        if doc_id is None:
+            doc_id = self._next_id
+            self._next_id += 1
+
+        self._ids[key] = doc_id
+        self._docs[doc_id] = doc
+        postings = self._postings
+        for gram in self._grams(doc):
+            posting = postings.get(gram)
+            if posting is None:
+                postings[gram] = array("I", (doc_id,))
+            elif posting[-1] < doc_id:
+                posting.append(doc_id)
+            else:
+                insort(posting, doc_id)
+        return doc_id
+
+    def add_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        """
+        Indexes many documents at once, e.g. a whole book; faster than calling ``add`` for each.
+
+        Args:
+            items (Iterable[Tuple[str, Any]]): (key, document) pairs, in the order to return them in.
+        """
+
+        grown: Dict[str, List[int]] = {}
+        for key, doc in items:
+            doc_id = self._next_id
+            self._next_id += 1
+            self._ids[key] = doc_id
+            self._docs[doc_id] = doc
+            for gram in self._grams(doc):
+                ids = grown.get(gram)
+                if ids is None:
+                    grown[gram] = [doc_id]
+                else:
+                    ids.append(doc_id)
+
+        # The new ids are larger than all earlier ones, so every posting stays sorted.
+        for gram, ids in grown.items():
+            posting = self._postings.get(gram)
+            if posting is None:
+                self._postings[gram] = array("I", ids)
+            else:
+                posting.extend(ids)
+
+    def remove(self, key: str) -> Optional[int]:
+        """
+        Removes the document stored under the given key.
+
+        Must be called before the document's fields are changed, since postings are computed from them.
+
+        Args:
+            key (str): The key the document is stored under.
+
+        Returns:
+            Optional[int]: The id the document had, or None if the key is not indexed.
+        """
+
+        doc_id = self._ids.pop(key, None)
+        if doc_id is None:
+            return None
+
+        doc = self._docs.pop(doc_id)
+        for gram in self._grams(doc):
+            posting = self._postings.get(gram)
+            if posting is None:
+                continue
+            index = bisect_left(posting, doc_id)
+            if index < len(posting) and posting[index] == doc_id:
+                del posting[index]
+                if not posting:
+                    del self._postings[gram]
+        return doc_id
+
+    def search(self, query: str) -> Optional[List[Any]]:
+        """
+        Returns the documents with at least one field containing the query.
+
+        Args:
+            query (str): The lowercased substring to look for.
+
+        Returns:
+            Optional[List[Any]]: Matching documents in insertion order, or None if the caller has to
+            scan instead: the query is too short to be answered from the index, or so common that
+            the index would not save anything (see ``SCAN_RATIO``).
+        """
+
+        grams = trigrams(query)
+        if not grams:
+            return None
+
+        postings = []
+        for gram in grams:
+            posting = self._postings.get(gram)
+            if not posting:
+                return []
+            postings.append(posting)
+        postings.sort(key=len)
+        if len(postings[0]) >= SCAN_RATIO * len(self._docs):
+            return None
+
+        # The rarest posting is checked against the others by bisection.
+        candidates = postings[0]
+        for posting in postings[1:]:
+            candidates = [doc_id for doc_id in candidates if _contains(posting, doc_id)]
+            if not candidates:
+                return []
+
+        results = []
+        for doc_id in candidates:
+            doc = self._docs[doc_id]
+            if any(query in field for field in self._fields(doc)):
+                results.append(doc)
+        return results
+
+    def estimate(self, query: str) -> Optional[int]:
+        """
+        Returns an upper bound on the number of candidates ``search`` would verify for a query: the
+        size of its rarest trigram's posting list.
+
+        Args:
+            query (str): The lowercased substring.
+
+        Returns:
+            Optional[int]: The bound, or None if the query is too short to be answered from the index.
+        """
+
+        grams = trigrams(query)
+        if not grams:
+            return None
+        return min(len(self._postings.get(gram, ())) for gram in grams)
+
+    def _grams(self, doc: Any) -> Set[str]:
+        grams = set()
+        for field in self._fields(doc):
+            grams.update(field[i:i + 3] for i in range(len(field) - 2))
+        return grams
+
+
+def _contains(posting: array, doc_id: int) -> bool:
+    index = bisect_left(posting, doc_id)
+    return index < len(posting) and posting[index] == doc_id
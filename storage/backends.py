@@ -0,0 +1,173 @@
+import os
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, Optional
+
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+from utils.autosave import AUTOSAVE_CHANGES, AUTOSAVE_SECONDS, Autosaver
+from utils.journal import JournaledStore
+from utils.startup import profile
+
+CONTACTS_FILE = "addressbook.pkl"
+NOTES_FILE = "notes.pkl"
+DATABASE_FILE = "memomate.db"
+
+
+class PickleStorage:
+    """
+    In-memory books persisted as pickle snapshots plus write-ahead journals.
+
+    Each book is loaded (snapshot read and journal replayed) the first time it is accessed, so
+    startup cost does not depend on the size of the data and a session that only touches contacts
+    never reads the notes. Later accesses pick up changes saved by other processes using the same
+    files (see JournaledStore).
+
+    Every change is journaled as it happens; a background thread (see Autosaver) snapshots the
+    loaded books after ``autosave_changes`` changes or ``autosave_seconds`` seconds, between
+    commands. Closing the storage, on any way out of the program, flushes the journals and
+    finishes a snapshot in progress.
+
+    Attributes:
+        contact_book (ContactBook): The contact book, loaded on first access.
+        note_book (NoteBook): The note book, loaded on first access.
+    """
+
+    def __init__(
+        self, contacts_path: str = CONTACTS_FILE, notes_path: str = NOTES_FILE,
+        autosave_changes: int = AUTOSAVE_CHANGES, autosave_seconds: float = AUTOSAVE_SECONDS,
+    ):
+        self._stores = {
+            "contacts": JournaledStore(ContactBook(), "contacts", contacts_path),
+            "notes": JournaledStore(NoteBook(), "notes", notes_path),
+        }
+        self._opened: Dict[str, JournaledStore] = {}
+        self._deferring: Optional[ExitStack] = None
+        self._busy = threading.RLock()
+        self._autosaver = Autosaver(lambda: list(self._opened.values()), self._busy, autosave_changes, autosave_seconds)
+
+    @property
+    def contact_book(self) -> ContactBook:
+        return self._open("contacts")
+
+    @property
+    def note_book(self) -> NoteBook:
+        return self._open("notes")
+
+    def _open(self, name: str):
+        store = self._opened.get(name)
+        if store is None:
+            store = self._stores[name]
+            with profile.phase(f"load {name}"):
+                store.open()
+            self._opened[name] = store
+            if self._deferring is not None:
+                self._deferring.enter_context(store.deferred())
+            self._autosaver.start()
+        else:
+            store.refresh()
+        return store.book
+
+    @contextmanager
+    def busy(self) -> Iterator[None]:
+        """
+        Keep background snapshots from running while the block uses the books.
+        """
+
+        with self._busy:
+            yield
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """
+        Write the journal records of the changes made inside the block to disk at once when it exits.
+        """
+
+        with self._busy, ExitStack() as stack:
+            for store in self._opened.values():
+                stack.enter_context(store.deferred())
+            self._deferring = stack
+            try:
+                yield
+            finally:
+                self._deferring = None
+
+    def close(self) -> None:
+        """
+        Stop autosaving and flush the journals of the loaded books to disk.
+        """
+
+        self._autosaver.stop()
+        for store in self._opened.values():
+            store.close()
+
+
+class SQLiteStorage:
+    """
+    Books stored in an SQLite database and queried on demand, so the data set does not need to fit in memory.
+
+    Attributes:
+        contact_book (SQLiteContactBook): The contact book.
+        note_book (SQLiteNoteBook): The note book.
+    """
+
+    def __init__(self, db_path: str = DATABASE_FILE):
+        # Imported here so the pickle backend does not load sqlite3.
+        from storage.sqlite_backend import SQLiteContactBook, SQLiteNoteBook, connect
+
+        self.conn = connect(db_path)
+        self.contact_book = SQLiteContactBook(self.conn)
+        self.note_book = SQLiteNoteBook(self.conn)
+
+    @contextmanager
+    def busy(self) -> Iterator[None]:
+        """
+        Mark the block as using the books; SQLite needs no snapshots, so this does nothing.
+        """
+
+        yield
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """
+        Run the block without syncing the database to disk, then checkpoint the WAL once when it exits.
+        """
+
+        self.conn.execute("PRAGMA synchronous=OFF")
+        try:
+            yield
+        finally:
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+
+    def close(self) -> None:
+        """
+        Close the database connection.
+        """
+
+        self.conn.close()
+
+
+def open_storage(backend: Optional[str] = None):
+    """
+    Open the storage backend selected by name, or by the MEMOMATE_STORAGE environment variable.
+
+    Args:
+        backend (Optional[str]): "pickle" (default) or "sqlite". The SQLite database path can be
+            set with MEMOMATE_DB, and the pickle autosave thresholds with MEMOMATE_AUTOSAVE_CHANGES
+            and MEMOMATE_AUTOSAVE_SECONDS.
+
+    Returns:
+        PickleStorage | SQLiteStorage: The opened storage, exposing contact_book, note_book and close().
+    """
+
+    backend = (backend or os.environ.get("MEMOMATE_STORAGE") or "pickle").lower()
+    with profile.phase(f"open {backend} storage"):
+        if backend == "pickle":
+            return PickleStorage(
+                autosave_changes=int(os.environ.get("MEMOMATE_AUTOSAVE_CHANGES") or AUTOSAVE_CHANGES),
+                autosave_seconds=float(os.environ.get("MEMOMATE_AUTOSAVE_SECONDS") or AUTOSAVE_SECONDS),
+            )
+        if backend == "sqlite":
+            return SQLiteStorage(os.environ.get("MEMOMATE_DB") or DATABASE_FILE)
+    raise ValueError(f"Unknown storage backend: {backend}")
@@ -0,0 +1,48 @@
+import argparse
+
+from storage.backends import CONTACTS_FILE, DATABASE_FILE, NOTES_FILE, PickleStorage, SQLiteStorage
+
+
+def migrate(contacts_path: str = CONTACTS_FILE, notes_path: str = NOTES_FILE, db_path: str = DATABASE_FILE) -> tuple:
+    """
+    Copy contacts and notes from the pickle files (including their journals) into an SQLite database.
+
+    Contacts whose name already exists in the database are skipped; notes keep their ids.
+
+    Args:
+        contacts_path (str): The contacts pickle file.
+        notes_path (str): The notes pickle file.
+        db_path (str): The SQLite database file.
+
+    Returns:
+        tuple: The number of contacts and notes written.
+    """
+
+    source = PickleStorage(contacts_path, notes_path)
+    target = SQLiteStorage(db_path)
+    try:
+        contacts = len(source.contact_book) - len(target.contact_book.add_contacts(source.contact_book.contacts.values()))
+        notes = target.note_book.add_notes(source.note_book.notes.values())
+    finally:
+        target.close()
+        source.close()
+    return contacts, notes
+
+
+def main() -> None:
+    """
+    Command-line entry point: python -m storage.migrate [--contacts PATH] [--notes PATH] [--db PATH]
+    """
+
+    parser = argparse.ArgumentParser(description="Migrate MemoMate pickle files to SQLite.")
+    parser.add_argument("--contacts", default=CONTACTS_FILE, help="contacts pickle file")
+    parser.add_argument("--notes", default=NOTES_FILE, help="notes pickle file")
+    parser.add_argument("--db", default=DATABASE_FILE, help="SQLite database file")
+    args = parser.parse_args()
+
+    contacts, notes = migrate(args.contacts, args.notes, args.db)
+    print(f"Migrated {contacts} contacts and {notes} notes to {args.db}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1019 @@
+import heapq
+import sqlite3
+from collections import Counter
+from datetime import date, timedelta
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+
+from models.contact import Contact
+from models.note import Note
+from services.birthday_index import days_until, parse_birthday
+from services.contact_book import CONTACT_SCHEMA, normalize_name
+from services.events import ChangeNotifier
+from services.name_index import FuzzyNameIndex
+from services.note_book import NOTE_SCHEMA, normalize_tag, parse_note_id
+from services.phone_index import normalize_phone
+from services.query import Access, Predicate, Queryable
+from services.sorted_index import prefix_end
+from services.text_index import count_phrase, idf, parse_query, term_score, tokenize
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS contacts (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL UNIQUE,
+    phone TEXT,
+    phone_key TEXT,
+    email TEXT,
+    email_key TEXT,
+    address TEXT,
+    birthday TEXT,
+    birth_month INTEGER,
+    birth_day INTEGER
+);
+CREATE INDEX IF NOT EXISTS contacts_phone ON contacts (phone);
+CREATE INDEX IF NOT EXISTS contacts_email_key ON contacts (email_key);
+CREATE INDEX IF NOT EXISTS contacts_birth_month_day ON contacts (birth_month, birth_day);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS contacts_fts USING fts5 (
+    name, phone, email, address, birthday, content='contacts', content_rowid='id', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS contacts_fts_insert AFTER INSERT ON contacts BEGIN
+    INSERT INTO contacts_fts (rowid, name, phone, email, address, birthday)
+    VALUES (new.id, new.name, new.phone, new.email, new.address, new.birthday);
+END;
+CREATE TRIGGER IF NOT EXISTS contacts_fts_delete AFTER DELETE ON contacts BEGIN
+    INSERT INTO contacts_fts (contacts_fts, rowid, name, phone, email, address, birthday)
+    VALUES ('delete', old.id, old.name, old.phone, old.email, old.address, old.birthday);
+END;
+CREATE TRIGGER IF NOT EXISTS contacts_fts_update AFTER UPDATE ON contacts BEGIN
+    INSERT INTO contacts_fts (contacts_fts, rowid, name, phone, email, address, birthday)
+    VALUES ('delete', old.id, old.name, old.phone, old.email, old.address, old.birthday);
+    INSERT INTO contacts_fts (rowid, name, phone, email, address, birthday)
+    VALUES (new.id, new.name, new.phone, new.email, new.address, new.birthday);
+END;
+
+CREATE TABLE IF NOT EXISTS notes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    text TEXT NOT NULL,
+    text_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS notes_text_key ON notes (text_key);
+
+CREATE TABLE IF NOT EXISTS note_tags (
+    note_id INTEGER NOT NULL REFERENCES notes (id) ON DELETE CASCADE,
+    position INTEGER NOT NULL,
+    tag TEXT NOT NULL,
+    tag_key TEXT NOT NULL,
+    PRIMARY KEY (note_id, position)
+);
+CREATE INDEX IF NOT EXISTS note_tags_tag_key ON note_tags (tag_key);
+
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5 (text, content='notes', content_rowid='id');
+CREATE VIRTUAL TABLE IF NOT EXISTS notes_vocab USING fts5vocab (notes_fts, 'row');
+CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+    INSERT INTO notes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE OF text ON notes BEGIN
+    INSERT INTO notes_fts (notes_fts, rowid, text) VALUES ('delete', old.id, old.text);
+    INSERT INTO notes_fts (rowid, text) VALUES (new.id, new.text);
+END;
+"""
+
+# Created after the phone_key column is added to databases made before it existed.
+PHONE_KEY_INDEX = "CREATE INDEX IF NOT EXISTS contacts_phone_key ON contacts (phone_key)"
+
+_CONTACT_COLUMNS = "name, phone, email, address, birthday"
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """
+    Open a MemoMate SQLite database in WAL mode, creating the schema if needed.
+
+    Args:
+        db_path (str): Path to the database file.
+
+    Returns:
+        sqlite3.Connection: The open connection.
+    """
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    # SQLite's lower() only folds ASCII; searches must match str.lower() exactly.
+    conn.create_function("py_lower", 1, lambda value: value.lower() if value else value, deterministic=True)
+    conn.executescript(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(contacts)")}
+    if "phone_key" not in columns:
+        conn.create_function("normalize_phone", 1, normalize_phone, deterministic=True)
+        with conn:
+            conn.execute("ALTER TABLE contacts ADD COLUMN phone_key TEXT")
+            conn.execute("UPDATE contacts SET phone_key = normalize_phone(phone) WHERE phone IS NOT NULL")
+    conn.execute(PHONE_KEY_INDEX)
+    return conn
+
+
+def _fts_string(text: str) -> str:
+    return '"' + text.replace('"', '""') + '"'
+
+
+def _contact_row(contact: Contact) -> Tuple:
+    month_day = parse_birthday(contact.birthday) or (None, None)
+    return (
+        contact.name, normalize_name(contact.name), contact.phone,
+        normalize_phone(contact.phone) if contact.phone else None, contact.email,
+        normalize_name(contact.email) if contact.email else None, contact.address, contact.birthday, *month_day,
+    )
+
+
+class SQLiteContactBook(ChangeNotifier, Queryable):
+    """
+    ContactBook implementation backed by an SQLite database.
+
+    Names are unique on their normalized (case-folded) form, phone, email and birthday month/day
+    are indexed columns, and a trigram FTS5 table answers substring searches. The fuzzy name index
+    is kept in memory, built from the table on the first fuzzy lookup. Structured queries fetch
+    their candidates through the most selective of these, costed by counting the rows it yields.
+    """
+
+    query_schema = CONTACT_SCHEMA
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._init_listeners()
+        self.conn = conn
+        self._name_index: Optional[FuzzyNameIndex] = None
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+
+    def _select(self, where: str = "", params: Iterable = (), order: str = "id") -> List[Contact]:
+        rows = self.conn.execute(f"SELECT {_CONTACT_COLUMNS} FROM contacts {where} ORDER BY {order}", tuple(params))
+        return [Contact(*row) for row in rows]
+
+    def add_contact(self, contact: Contact) -> bool:
+        """
+        Adds a contact to the book if the name does not already exist (case-insensitive).
+
+        Args:
+            contact (Contact): The contact object to add.
+
+        Returns:
+            bool: True if added successfully, False if a contact with the same name already exists.
+        """
+
+        if not self._insert_many([contact]):
+            return False
+        self._emit({"op": "add", "contact": contact.to_dict()})
+        return True
+
+    def add_contacts(self, contacts: Iterable[Contact]) -> List[Contact]:
+        """
+        Adds several contacts in a single transaction, skipping names that already exist.
+
+        Subscribers receive a single record for the whole batch.
+
+        Args:
+            contacts (Iterable[Contact]): The contacts to add.
+
+        Returns:
+            List[Contact]: The contacts that were rejected because their name already exists.
+        """
+
+        contacts = list(contacts)
+        added = self._insert_many(contacts)
+        if added:
+            self._emit({"op": "add_many", "contacts": [contact.to_dict() for contact in added]})
+        added_ids = set(map(id, added))
+        return [contact for contact in contacts if id(contact) not in added_ids]
+
+    def _insert_many(self, contacts: Iterable[Contact]) -> List[Contact]:
+        added = []
+        with self.conn:
+            for contact in contacts:
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO contacts (name, name_key, phone, phone_key, email, email_key, address, "
+                    "birthday, birth_month, birth_day) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    _contact_row(contact),
+                )
+                if cursor.rowcount:
+                    added.append(contact)
+        if self._name_index is not None:
+            for contact in added:
+                self._name_index.add(normalize_name(contact.name))
+        return added
+
+    def _update(self, contact: Contact, name: str) -> None:
+        self.conn.execute(
+            "UPDATE contacts SET name = ?, name_key = ?, phone = ?, phone_key = ?, email = ?, email_key = ?, "
+            "address = ?, birthday = ?, birth_month = ?, birth_day = ? WHERE name_key = ?",
+            (*_contact_row(contact), normalize_name(name)),
+        )
+
+    def find(self, name: str) -> Optional[Contact]:
+        """
+        Finds and returns a contact by name.
+
+        Args:
+            name (str): The name of the contact to find.
+
+        Returns:
+            Optional[Contact]: The found Contact object, or None if not found.
+        """
+
+        found = self._select("WHERE name_key = ?", (normalize_name(name),))
+        return found[0] if found else None
+
+    def fuzzy_find(self, name: str, max_distance: Optional[int] = None, limit: int = 5) -> List[Tuple[Contact, int]]:
+        """
+        Finds the contacts whose names are closest to a possibly misspelled name.
+
+        Args:
+            name (str): The name to look up, e.g. "Jon Smtih".
+            max_distance (Optional[int]): The largest edit distance between the names; by default it
+                grows with the length of the name, up to 3.
+            limit (int): The most contacts returned.
+
+        Returns:
+            List[Tuple[Contact, int]]: Contacts and the edit distance of their names, closest first.
+        """
+
+        if self._name_index is None:
+            self._name_index = FuzzyNameIndex()
+            for (key,) in self.conn.execute("SELECT name_key FROM contacts"):
+                self._name_index.add(key)
+
+        results = []
+        for key, distance in self._name_index.search(normalize_name(name), max_distance, limit):
+            found = self._select("WHERE name_key = ?", (key,))
+            if found:
+                results.append((found[0], distance))
+        return results
+
+    def find_by_phone(self, phone: str) -> List[Contact]:
+        """
+        Finds the contacts with a phone number, whatever its notation ("+380...", "0...", spaces).
+
+        Args:
+            phone (str): The phone number.
+
+        Returns:
+            List[Contact]: The contacts using the number.
+        """
+
+        return self._select("WHERE phone_key = ?", (normalize_phone(phone),), order="name_key")
+
+    def search_phone_prefix(self, prefix: str) -> List[Contact]:
+        """
+        Finds the contacts whose phone number starts with a prefix, e.g. an operator code.
+
+        Args:
+            prefix (str): The start of a phone number, normalized like a number.
+
+        Returns:
+            List[Contact]: The matching contacts, ordered by phone number.
+        """
+
+        canonical = normalize_phone(prefix)
+        if not canonical:
+            return []
+        # A range on the phone_key index; ":" sorts right after "9".
+        return self._select(
+            "WHERE phone_key >= ? AND phone_key < ?", (canonical, canonical + ":"), order="phone_key, name_key",
+        )
+
+    def duplicate_phones(self) -> List[Tuple[str, List[Contact]]]:
+        """
+        Lists the phone numbers shared by several contacts.
+
+        Returns:
+            List[Tuple[str, List[Contact]]]: Canonical numbers with the contacts using them.
+        """
+
+        shared = self.conn.execute(
+            "SELECT phone_key FROM contacts WHERE phone_key IS NOT NULL GROUP BY phone_key HAVING COUNT(*) > 1 "
+            "ORDER BY phone_key"
+        ).fetchall()
+        return [(phone, self._select("WHERE phone_key = ?", (phone,), order="name_key")) for (phone,) in shared]
+
+    def edit_contact(self, current_name: str, **kwargs) -> bool:
+        """
+        Edits a contact's attributes, including renaming it.
+
+        Args:
+            current_name (str): The current name of the contact to edit.
+            **kwargs: Fields to update (e.g., name, phone, email, address, birthday).
+
+        Returns:
+            bool: True if the contact was successfully edited, False otherwise.
+        """
+
+        contact = self.find(current_name)
+        if not contact:
+            return False
+
+        actual_key = contact.name
+        new_name = kwargs.get("name")
+        if new_name and normalize_name(new_name) != normalize_name(actual_key) and self.find(new_name):
+            print(f"Cannot rename to '{new_name}': already exists.")
+            return False
+
+        for key, value in kwargs.items():
+            setattr(contact, key, value)
+
+        with self.conn:
+            self._update(contact, actual_key)
+        if self._name_index is not None and new_name:
+            self._name_index.remove(normalize_name(actual_key))
+            self._name_index.add(normalize_name(new_name))
+        self._emit({"op": "edit", "name": actual_key, "fields": kwargs})
+        return True
+
+    def delete_contact(self, name: str) -> Optional[Contact]:
+        """
+        Deletes a contact by name.
+
+        Args:
+            name (str): The name of the contact to delete.
+
+        Returns:
+            Optional[Contact]: The deleted Contact object, or None if not found.
+        """
+
+        contact = self.find(name)
+        if contact:
+            with self.conn:
+                self.conn.execute("DELETE FROM contacts WHERE name_key = ?", (normalize_name(name),))
+            if self._name_index is not None:
+                self._name_index.remove(normalize_name(name))
+            self._emit({"op": "delete", "name": contact.name})
+        return contact
+
+    def merge_contacts(self, merges: Iterable[dict]) -> int:
+        """
+        Merges groups of duplicate contacts in a single transaction: each kept contact gets the
+        given fields and its duplicates are deleted. Subscribers receive a single record.
+
+        Args:
+            merges (Iterable[dict]): Entries with "keep" (a name), "fields" (field values to set on
+                it, not including the name) and "remove" (the names of its duplicates).
+
+        Returns:
+            int: The number of contacts deleted.
+        """
+
+        applied = []
+        with self.conn:
+            for merge in merges:
+                contact = self.find(merge["keep"])
+                if contact is None:
+                    continue
+                removed = []
+                for name in merge["remove"]:
+                    if normalize_name(name) == normalize_name(contact.name):
+                        continue
+                    cursor = self.conn.execute("DELETE FROM contacts WHERE name_key = ?", (normalize_name(name),))
+                    if cursor.rowcount:
+                        removed.append(name)
+                        if self._name_index is not None:
+                            self._name_index.remove(normalize_name(name))
+
+                fields = {field: value for field, value in merge["fields"].items() if field != "name"}
+                for field, value in fields.items():
+                    setattr(contact, field, value)
+                self._update(contact, contact.name)
+                applied.append({"keep": contact.name, "fields": fields, "remove": removed})
+
+        if applied:
+            self._emit({"op": "merge", "merges": applied})
+        return sum(len(merge["remove"]) for merge in applied)
+
+    def apply(self, record: dict) -> None:
+        """
+        Replays a mutation record published by a contact book.
+
+        Args:
+            record (dict): The mutation record.
+        """
+
+        op = record["op"]
+        if op == "add":
+            self.add_contact(Contact.from_dict(record["contact"]))
+        elif op == "add_many":
+            self.add_contacts(Contact.from_dict(contact) for contact in record["contacts"])
+        elif op == "edit":
+            self.edit_contact(record["name"], **record["fields"])
+        elif op == "delete":
+            self.delete_contact(record["name"])
+        elif op == "merge":
+            self.merge_contacts(record["merges"])
+        else:
+            raise ValueError(f"Unknown contact operation: {op}")
+
+    def search_contacts(self, query: str) -> List[Contact]:
+        """
+        Searches contacts by partial match on name, phone, email, address or birthday (case-insensitive).
+
+        Queries of three or more characters are answered from the trigram FTS index; shorter ones scan.
+
+        Args:
+            query (str): The substring to search in contact fields.
+
+        Returns:
+            List[Contact]: A list of matching Contact objects.
+        """
+
+        query = query.lower()
+        if len(query) >= 3:
+            candidates = self._select(
+                "WHERE id IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)", (_fts_string(query),)
+            )
+        else:
+            candidates = self._select()
+
+        return [
+            contact for contact in candidates
+            if any(f and query in f.lower() for f in (
+                contact.name, contact.phone, contact.email, contact.address, contact.birthday
+            ))
+        ]
+
+    def _indexed(self, description: str, where: str, params: Tuple) -> Access:
+        count = self.conn.execute(f"SELECT COUNT(*) FROM contacts {where}", params).fetchone()[0]
+        return Access(description, count, lambda: self._select(where, params))
+
+    def _query_access(self, predicate: Predicate) -> Optional[Access]:
+        field, op, value = predicate.field, predicate.op, predicate.value
+        if field == "name" and op == "eq":
+            return self._indexed(f"name_key index: {value}", "WHERE name_key = ?", (normalize_name(value),))
+        if field == "email" and op == "eq":
+            return self._indexed(f"email_key index: {value}", "WHERE email_key = ?", (normalize_name(value),))
+        if field == "phone" and op == "eq":
+            return self._indexed(f"phone_key index: {value}", "WHERE phone_key = ?", (value,))
+        if field == "phone" and op == "prefix" and value:
+            return self._indexed(
+                f"phone_key index: {value}*", "WHERE phone_key >= ? AND phone_key < ?", (value, value + ":"),
+            )
+        if field == "birthday" and predicate.part == "month":
+            bounds = predicate.bounds(1, 12)
+            if bounds is not None:
+                return self._indexed(
+                    f"birth_month index: {bounds[0]}..{bounds[1]}", "WHERE birth_month BETWEEN ? AND ?", bounds,
+                )
+        if predicate.fragment is not None and len(predicate.fragment) >= 3:
+            return self._indexed(
+                f"trigram FTS: '{predicate.fragment}'",
+                "WHERE id IN (SELECT rowid FROM contacts_fts WHERE contacts_fts MATCH ?)",
+                (_fts_string(predicate.fragment),),
+            )
+        return None
+
+    def _query_scan(self) -> Access:
+        return Access("full scan", len(self), self._select)
+
+    def sorted_contacts(self) -> List[Contact]:
+        """
+        Returns all contacts ordered by normalized name.
+
+        Returns:
+            List[Contact]: The sorted contacts.
+        """
+
+        return self._select(order="name_key")
+
+    def sorted_range(self, first: Optional[str] = None, last: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Returns the positions, in name order, of the contacts from one name through another.
+
+        Args:
+            first (Optional[str]): The first name (or start of a name) included; None starts at
+                the first contact.
+            last (Optional[str]): The names starting with this are the last included; None runs
+                to the last contact.
+
+        Returns:
+            Tuple[int, int]: (start, stop) positions for ``iter_sorted``.
+        """
+
+        count = "SELECT COUNT(*) FROM contacts WHERE name_key < ?"
+        start = self.conn.execute(count, (normalize_name(first),)).fetchone()[0] if first else 0
+        stop = self.conn.execute(count, (prefix_end(normalize_name(last)),)).fetchone()[0] if last else len(self)
+        return start, max(start, stop)
+
+    def iter_sorted(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Contact]:
+        """
+        Lazily yields the contacts at positions ``start`` to ``stop`` (exclusive) in name order.
+
+        Args:
+            start (int): The first position.
+            stop (Optional[int]): The position to stop at, or None for the end.
+
+        Returns:
+            Iterator[Contact]: The contacts.
+        """
+
+        limit = -1 if stop is None else max(0, stop - start)
+        rows = self.conn.execute(
+            f"SELECT {_CONTACT_COLUMNS} FROM contacts ORDER BY name_key LIMIT ? OFFSET ?", (limit, start)
+        )
+        return (Contact(*row) for row in rows)
+
+    def days_to_birthday(self, birthday_str: str) -> Union[int, str]:
+        """
+        Calculates the number of days until the next birthday based on a given date string.
+
+        February 29 birthdays are celebrated on February 28 in non-leap years.
+
+        Args:
+            birthday_str (str): Birthday in 'YYYY-MM-DD' format.
+
+        Returns:
+            Union[int, str]: Days remaining until next birthday, or error string if the date is invalid.
+        """
+
+        month_day = parse_birthday(birthday_str)
+        if month_day is None:
+            return "Invalid birthday format. Expected YYYY-MM-DD."
+        return days_until(*month_day, date.today())
+
+    def days_until_birthday(self, name: str) -> Optional[int]:
+        """
+        Returns the number of days until a contact's next birthday, using the stored month and day.
+
+        Args:
+            name (str): The name of the contact.
+
+        Returns:
+            Optional[int]: Days remaining until next birthday, or None if the contact is unknown
+            or has no valid birthday.
+        """
+
+        row = self.conn.execute(
+            "SELECT birth_month, birth_day FROM contacts WHERE name_key = ? AND birth_month IS NOT NULL",
+            (normalize_name(name),),
+        ).fetchone()
+        return days_until(*row, date.today()) if row else None
+
+    def upcoming_birthdays(self, days: int) -> List[Tuple[Contact, int]]:
+        """
+        Returns the contacts whose birthday falls within the given number of days, soonest first.
+
+        The window is translated into (month, day) ranges answered from the birthday index.
+
+        Args:
+            days (int): Size of the window in days; 0 means birthdays today only.
+
+        Returns:
+            List[Tuple[Contact, int]]: (contact, days until birthday) pairs.
+        """
+
+        if days < 0:
+            return []
+
+        today = date.today()
+        end = today + timedelta(days=min(days, 365))
+        start_md, end_md = (today.month, today.day), (end.month, end.day)
+        if end.year == today.year and start_md <= end_md:
+            ranges = [(start_md, end_md)]
+        else:
+            ranges = [(start_md, (12, 31)), ((1, 1), end_md)]
+        # February 29 birthdays are celebrated on February 28 in non-leap years.
+        ranges = [(lo, (2, 29) if hi == (2, 28) else hi) for lo, hi in ranges]
+
+        where = " OR ".join("(birth_month, birth_day) BETWEEN (?, ?) AND (?, ?)" for _ in ranges)
+        params = [value for lo, hi in ranges for value in (*lo, *hi)]
+        rows = self.conn.execute(
+            f"SELECT {_CONTACT_COLUMNS}, birth_month, birth_day FROM contacts WHERE {where}", params
+        )
+
+        matches = []
+        for *fields, month, day in rows:
+            delta = days_until(month, day, today)
+            if delta <= days:
+                matches.append((Contact(*fields), delta))
+        matches.sort(key=lambda match: match[1])
+        return matches
+
+
+class SQLiteNoteBook(ChangeNotifier, Queryable):
+    """
+    NoteBook implementation backed by an SQLite database.
+
+    Tags live in their own table indexed by normalized tag, and an FTS5 table provides BM25 ranked search.
+    Structured queries fetch their candidates by id range, tag or exact text when that is selective.
+    """
+
+    query_schema = NOTE_SCHEMA
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._init_listeners()
+        self.conn = conn
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM notes").fetchone()[0]
+
+    def _load(self, ids: Iterable[int]) -> List[Note]:
+        """
+        Loads notes with their tags, in the order of the given ids.
+        """
+
+        ids = list(ids)
+        if not ids:
+            return []
+
+        notes = {}
+        for chunk in range(0, len(ids), 500):
+            batch = ids[chunk:chunk + 500]
+            marks = ", ".join("?" * len(batch))
+            tags = {}
+            for note_id, tag in self.conn.execute(
+                f"SELECT note_id, tag FROM note_tags WHERE note_id IN ({marks}) ORDER BY note_id, position", batch
+            ):
+                tags.setdefault(note_id, []).append(tag)
+            for note_id, text in self.conn.execute(f"SELECT id, text FROM notes WHERE id IN ({marks})", batch):
+                notes[note_id] = Note(text, tags.get(note_id), note_id)
+        return [notes[note_id] for note_id in ids if note_id in notes]
+
+    def _match(self, identifier: str) -> List[int]:
+        note_id = parse_note_id(identifier)
+        if note_id is not None:
+            return [note_id] if self.get(note_id) else []
+
+        key = normalize_tag(identifier)
+        rows = self.conn.execute(
+            "SELECT id FROM notes WHERE text_key = ? UNION SELECT note_id FROM note_tags WHERE tag_key = ?",
+            (key, key),
+        )
+        return [row[0] for row in rows]
+
+    def _write_tags(self, note_id: int, tags: List[str]) -> None:
+        self.conn.execute("DELETE FROM note_tags WHERE note_id = ?", (note_id,))
+        self.conn.executemany(
+            "INSERT INTO note_tags (note_id, position, tag, tag_key) VALUES (?, ?, ?, ?)",
+            [(note_id, position, tag, normalize_tag(tag)) for position, tag in enumerate(tags)],
+        )
+
+    def get(self, note_id: int) -> Optional[Note]:
+        """
+        Return the note with the given id.
+
+        Args:
+            note_id (int): The note id.
+
+        Returns:
+            Optional[Note]: The note, or None if there is no note with that id.
+        """
+
+        found = self._load([note_id])
+        return found[0] if found else None
+
+    def add_note(self, text: str, tags: Optional[List[str]] = None) -> Note:
+        """
+        Add a new note with text and optional tags.
+
+        Args:
+            text (str): The content of the note.
+            tags (Optional[List[str]]): A list of tags to associate with the note.
+
+        Returns:
+            Note: The added note, with its id assigned.
+        """
+
+        note = Note(text, tags)
+        self.add_notes([note])
+        return note
+
+    def add_notes(self, notes: Iterable[Note]) -> int:
+        """
+        Add several notes in a single transaction. Notes that already have an id keep it.
+
+        Args:
+            notes (Iterable[Note]): The notes to add; their ids are assigned in place.
+
+        Returns:
+            int: The number of notes added.
+        """
+
+        added = []
+        with self.conn:
+            for note in notes:
+                row = (note.text, normalize_tag(note.text), note.id)
+                if note.id is not None and self.conn.execute("SELECT 1 FROM notes WHERE id = ?", (note.id,)).fetchone():
+                    self.conn.execute("UPDATE notes SET text = ?, text_key = ? WHERE id = ?", row)
+                else:
+                    note.id = self.conn.execute("INSERT INTO notes (text, text_key, id) VALUES (?, ?, ?)", row).lastrowid
+                self._write_tags(note.id, note.tags)
+                added.append(note)
+        for note in added:
+            self._emit({"op": "add", "note": note.to_dict()})
+        return len(added)
+
+    def edit_note(
+        self, identifier: str, new_text: Optional[str] = None, new_tags: Optional[List[str]] = None) -> bool:
+        """
+        Edit notes identified by '#<id>', or by matching text or tag. Updates the text and/or tags if provided.
+
+        Args:
+            identifier (str): A note id reference or a keyword to find the notes by text or tag.
+            new_text (Optional[str]): The new text to replace the current note text.
+            new_tags (Optional[List[str]]): New list of tags to replace current tags.
+
+        Returns:
+            bool: True if at least one note was edited, False otherwise.
+        """
+
+        matches = self._match(identifier)
+        for note_id in matches:
+            self.edit_note_by_id(note_id, new_text, new_tags)
+        return bool(matches)
+
+    def edit_note_by_id(
+        self, note_id: int, new_text: Optional[str] = None, new_tags: Optional[List[str]] = None) -> bool:
+        """
+        Edit the note with the given id.
+
+        Args:
+            note_id (int): The note id.
+            new_text (Optional[str]): The new text to replace the current note text.
+            new_tags (Optional[List[str]]): New list of tags to replace current tags.
+
+        Returns:
+            bool: True if the note exists, False otherwise.
+        """
+
+        with self.conn:
+            if new_text:
+                cursor = self.conn.execute(
+                    "UPDATE notes SET text = ?, text_key = ? WHERE id = ?", (new_text, normalize_tag(new_text), note_id)
+                )
+                if not cursor.rowcount:
+                    return False
+            elif not self.conn.execute("SELECT 1 FROM notes WHERE id = ?", (note_id,)).fetchone():
+                return False
+            if new_tags is not None:
+                self._write_tags(note_id, new_tags)
+        self._emit({"op": "edit", "id": note_id, "text": new_text, "tags": new_tags})
+        return True
+
+    def search_notes(self, keyword: str) -> List[Note]:
+        """
+        Search notes by keyword in text or tag (case-insensitive).
+
+        Args:
+            keyword (str): The keyword to search for.
+
+        Returns:
+            List[Note]: The matching notes, in text order (see ``iter_sorted``).
+        """
+
+        rows = self.conn.execute(
+            "SELECT id FROM notes WHERE instr(py_lower(text), ?) > 0 "
+            "OR id IN (SELECT note_id FROM note_tags WHERE tag_key = ?) ORDER BY text_key, id",
+            (keyword.lower(), normalize_tag(keyword)),
+        )
+        return self._load(row[0] for row in rows)
+
+    def sorted_notes(self) -> List[Note]:
+        """
+        Return all notes ordered alphabetically by text (case-insensitive), then by id.
+
+        Returns:
+            List[Note]: The sorted notes.
+        """
+
+        return list(self.iter_sorted())
+
+    def sorted_range(self, first: Optional[str] = None, last: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Returns the positions, in text order, of the notes from one text through another.
+
+        Args:
+            first (Optional[str]): The first text (or start of a text) included; None starts at
+                the first note.
+            last (Optional[str]): The texts starting with this are the last included; None runs
+                to the last note.
+
+        Returns:
+            Tuple[int, int]: (start, stop) positions for ``iter_sorted``.
+        """
+
+        count = "SELECT COUNT(*) FROM notes WHERE text_key < ?"
+        start = self.conn.execute(count, (normalize_tag(first),)).fetchone()[0] if first else 0
+        stop = self.conn.execute(count, (prefix_end(normalize_tag(last)),)).fetchone()[0] if last else len(self)
+        return start, max(start, stop)
+
+    def iter_sorted(self, start: int = 0, stop: Optional[int] = None) -> Iterator[Note]:
+        """
+        Lazily yields the notes at positions ``start`` to ``stop`` (exclusive) in text order.
+
+        Args:
+            start (int): The first position.
+            stop (Optional[int]): The position to stop at, or None for the end.
+
+        Yields:
+            Note: The notes, loaded with their tags a few hundred at a time.
+        """
+
+        limit = -1 if stop is None else max(0, stop - start)
+        rows = self.conn.execute("SELECT id FROM notes ORDER BY text_key, id LIMIT ? OFFSET ?", (limit, start))
+        while True:
+            ids = [row[0] for row in rows.fetchmany(500)]
+            if not ids:
+                return
+            yield from self._load(ids)
+
+    def _indexed(self, description: str, where: str, params: Tuple) -> Access:
+        count = self.conn.execute(f"SELECT COUNT(*) FROM notes {where}", params).fetchone()[0]
+        return Access(
+            description, count,
+            lambda: self._load(row[0] for row in self.conn.execute(f"SELECT id FROM notes {where} ORDER BY id", params)),
+        )
+
+    def _query_access(self, predicate: Predicate) -> Optional[Access]:
+        field, op, value = predicate.field, predicate.op, predicate.value
+        if field == "id":
+            bounds = predicate.bounds(1, 2 ** 63 - 1)
+            if bounds is not None:
+                return self._indexed(f"id range: {bounds[0]}..{bounds[1]}", "WHERE id BETWEEN ? AND ?", bounds)
+        if field == "tag" and op == "eq":
+            return self._indexed(
+                f"tag_key index: {value}", "WHERE id IN (SELECT note_id FROM note_tags WHERE tag_key = ?)", (value,),
+            )
+        if field == "text" and op == "eq":
+            return self._indexed(f"text_key index: {value}", "WHERE text_key = ?", (normalize_tag(value),))
+        return None
+
+    def _query_scan(self) -> Access:
+        return Access(
+            "full scan", len(self), lambda: self._load(row[0] for row in self.conn.execute("SELECT id FROM notes")),
+        )
+
+    def search_ranked(self, query: str, limit: int = 10) -> List[Tuple[Note, float]]:
+        """
+        Search note texts by relevance using BM25.
+
+        The query may contain plain terms, prefix terms ending in '*' and quoted phrases;
+        phrases are required, terms only affect the score. FTS5 finds the matching notes, which
+        are then scored like in NoteBook: FTS5's own bm25() floors the idf of a term found in half
+        the notes or more to almost zero, so on a small book every score would be 0.
+
+        Args:
+            query (str): The search query.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Tuple[Note, float]]: (note, score) pairs, most relevant first.
+        """
+
+        phrases, optional = [], []
+        for kind, value in parse_query(query):
+            if kind == "phrase":
+                phrases.append(_fts_string(" ".join(value)))
+            elif kind == "prefix":
+                optional.append(_fts_string(value) + " *")
+            else:
+                optional.append(_fts_string(value))
+        if not phrases and not optional:
+            return []
+
+        expression = " AND ".join(phrases)
+        if optional:
+            any_clause = "(" + " OR ".join(phrases + optional) + ")"
+            expression = f"{expression} AND {any_clause}" if expression else any_clause
+
+        texts = self.conn.execute(
+            "SELECT id, text FROM notes WHERE id IN (SELECT rowid FROM notes_fts WHERE notes_fts MATCH ?)", (expression,),
+        ).fetchall()
+        if not texts or limit <= 0:
+            return []
+
+        count = len(self)
+        total_length = self.conn.execute("SELECT SUM(cnt) FROM notes_vocab").fetchone()[0] or 0
+        average_length = total_length / count or 1
+        terms, phrases = {}, []
+        for kind, value in parse_query(query):
+            if kind == "phrase":
+                matching = self.conn.execute(
+                    "SELECT COUNT(*) FROM notes_fts WHERE notes_fts MATCH ?", (_fts_string(" ".join(value)),),
+                ).fetchone()[0]
+                phrases.append((idf(count, matching), value))
+            elif kind == "prefix":
+                for term, matching in self.conn.execute(
+                    "SELECT term, doc FROM notes_vocab WHERE term >= ? AND term < ?", (value, prefix_end(value)),
+                ):
+                    terms[term] = idf(count, matching)
+            else:
+                row = self.conn.execute("SELECT doc FROM notes_vocab WHERE term = ?", (value,)).fetchone()
+                if row:
+                    terms[value] = idf(count, row[0])
+
+        scores = []
+        for note_id, text in texts:
+            tokens = tokenize(text)
+            frequencies = Counter(tokens)
+            score = sum(
+                term_score(terms[term], frequency, len(tokens), average_length)
+                for term, frequency in frequencies.items() if term in terms
+            )
+            for weight, phrase in phrases:
+                score += term_score(weight, count_phrase(tokens, phrase), len(tokens), average_length)
+            scores.append((score, note_id))
+        top = heapq.nlargest(limit, scores, key=lambda item: item[0])
+        notes = {note.id: note for note in self._load(note_id for _, note_id in top)}
+        return [(notes[note_id], score) for score, note_id in top]
+
+    def search_tag(self, tag: str) -> List[Note]:
+        """
+        Return the notes carrying the given tag (case-insensitive).
+
+        Args:
+            tag (str): The tag to look up.
+
+        Returns:
+            List[Note]: The tagged notes.
+        """
+
+        rows = self.conn.execute(
+            "SELECT DISTINCT note_id FROM note_tags WHERE tag_key = ? ORDER BY note_id", (normalize_tag(tag),)
+        )
+        return self._load(row[0] for row in rows)
+
+    def tag_counts(self) -> List[Tuple[str, int]]:
+        """
+        Return every tag with the number of notes carrying it, most used first.
+
+        Returns:
+            List[Tuple[str, int]]: (normalized tag, note count) pairs.
+        """
+
+        rows = self.conn.execute(
+            "SELECT tag_key, COUNT(DISTINCT note_id) AS notes FROM note_tags GROUP BY tag_key ORDER BY notes DESC, tag_key"
+        )
+        return [tuple(row) for row in rows]
+
+    def delete_notes(self, identifier: str) -> int:
+        """
+        Delete the note referenced by '#<id>', or the notes whose text equals the identifier
+        or that carry it as a tag (case-insensitive).
+
+        Args:
+            identifier (str): The note id reference, text or tag.
+
+        Returns:
+            int: The number of deleted notes.
+        """
+
+        matches = self._match(identifier)
+        for note_id in matches:
+            self.delete_note_by_id(note_id)
+        return len(matches)
+
+    def delete_note_by_id(self, note_id: int) -> Optional[Note]:
+        """
+        Delete the note with the given id.
+
+        Args:
+            note_id (int): The note id.
+
+        Returns:
+            Optional[Note]: The deleted note, or None if there is no note with that id.
+        """
+
+        note = self.get(note_id)
+        if note is not None:
+            with self.conn:
+                self.conn.execute("DELETE FROM notes WHERE id = ?", (note_id,))
+            self._emit({"op": "delete", "id": note_id})
+        return note
+
+    def delete_note(self, text: str) -> None:
+        """
+        Delete a note by exact text match.
+
+        Args:
+            text (str): The exact text of the note to delete.
+        """
+
+        rows = self.conn.execute("SELECT id FROM notes WHERE text = ?", (text,)).fetchall()
+        for (note_id,) in rows:
+            self.delete_note_by_id(note_id)
+
+    def apply(self, record: dict) -> None:
+        """
+        Replays a mutation record published by a note book.
+
+        Args:
+            record (dict): The mutation record.
+        """
+
+        op = record["op"]
+        if op == "add":
+            self.add_notes([Note.from_dict(record["note"])])
+        elif op == "edit":
+            self.edit_note_by_id(record["id"], record["text"], record["tags"])
+        elif op == "delete":
+            self.delete_note_by_id(record["id"])
+        else:
+            raise ValueError(f"Unknown note operation: {op}")
@@ -0,0 +1,104 @@
+import time
+
+import pytest
+
+import utils.autosave
+from models.contact import Contact
+from storage.backends import PickleStorage
+from utils.autosave import Autosaver
+from utils.journal import read_records
+
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = PickleStorage(
+        str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"), autosave_changes=3, autosave_seconds=0.2,
+    )
+    yield storage
+    storage.close()
+
+
+def _add(book, *names):
+    for name in names:
+        book.add_contact(Contact(name, "0501234567"))
+
+
+def _wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_dirty_tracking(storage):
+    book = storage.contact_book
+    store = storage._stores["contacts"]
+    assert not store.dirty and store.unsaved == 0 and store.dirty_since is None
+    assert not store.save()
+
+    _add(book, "Jane Doe", "John Roe")
+    assert store.dirty and store.unsaved == 2 and store.dirty_since is not None
+    assert store.save(background=False)
+    store.wait()
+    assert not store.dirty and store.unsaved == 0 and store.dirty_since is None
+
+
+def test_due_after_changes_or_time(storage, monkeypatch):
+    book = storage.contact_book
+    store = storage._stores["contacts"]
+    autosaver = Autosaver(lambda: [store], storage._busy, changes=3, seconds=60.0)
+    assert not autosaver.due(store)
+    _add(book, "Jane Doe", "John Roe")
+    assert not autosaver.due(store)
+    _add(book, "Ann Lee")
+    assert autosaver.due(store)
+
+    store.save(background=False)
+    _add(book, "Max Payne")
+    assert not autosaver.due(store)
+    started = store.dirty_since
+    monkeypatch.setattr(utils.autosave.time, "monotonic", lambda: started + 60.0)
+    assert autosaver.due(store)
+
+
+def test_changed_books_are_snapshotted_in_the_background(storage, tmp_path):
+    book = storage.contact_book
+    store = storage._stores["contacts"]
+    _add(book, "Jane Doe")
+    assert _wait_until(lambda: not store.dirty)
+    store.wait()
+    assert list(read_records(store.journal_path)) == []
+
+    # The notes were never opened, so there is nothing to save for them.
+    assert not (tmp_path / "notes.pkl").exists()
+
+
+def test_no_snapshot_while_a_command_runs(storage):
+    book = storage.contact_book
+    store = storage._stores["contacts"]
+    with storage.busy():
+        _add(book, "Jane Doe", "John Roe", "Ann Lee", "Max Payne")
+        time.sleep(0.4)
+        assert store.dirty and store.unsaved == 4
+    assert _wait_until(lambda: not store.dirty)
+
+
+def test_snapshots_survive_a_restart(tmp_path):
+    storage = PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"), autosave_changes=3)
+    _add(storage.contact_book, "Jane Doe", "John Roe", "Ann Lee")
+    store = storage._stores["contacts"]
+    assert _wait_until(lambda: not store.dirty)
+    _add(storage.contact_book, "Max Payne")
+    storage.close()
+    # Only the change made after the snapshot is left in the journal.
+    assert len(list(read_records(store.journal_path))) == 1
+
+    reopened = PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"))
+    try:
+        assert sorted(c.name for c in reopened.contact_book.contacts.values()) == [
+            "Ann Lee", "Jane Doe", "John Roe", "Max Payne",
+        ]
+    finally:
+        reopened.close()
@@ -0,0 +1,103 @@
+import io
+import json
+import os
+import subprocess
+import sys
+
+from cli.batch import parse_line, run_batch, run_command
+from storage.backends import PickleStorage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _storage(directory):
+    return PickleStorage(str(directory / "addressbook.pkl"), str(directory / "notes.pkl"))
+
+
+def _run(directory, lines):
+    storage = _storage(directory)
+    out = io.StringIO()
+    try:
+        failures = run_batch(lines, storage, out)
+    finally:
+        storage.close()
+    return failures, [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_parse_line():
+    assert parse_line('add contact "Jane Doe" +380501234567 "" Kyiv')[:2] == (
+        "add contact", ["Jane Doe", "+380501234567", "", "Kyiv"],
+    )
+    assert parse_line("show   contacts")[:2] == ("show contacts", [])
+    assert parse_line("fly away")[0] is None
+
+
+def test_records_for_each_command(tmp_path):
+    failures, records = _run(tmp_path, [
+        "# a comment",
+        "",
+        'add contact "Jane Doe" 0501234567 "" "" ""',
+        'add contact "Jane Doe" 0501234567 "" "" ""',
+        "fly away",
+        'add note "Unclosed',
+        "search contact jane",
+        "exit",
+        'add contact "Never Run" 0501234567 "" "" ""',
+    ])
+    assert failures == 3
+    assert [(record["line"], record["command"], record["status"]) for record in records] == [
+        (3, "add contact", "ok"),
+        (4, "add contact", "error"),
+        (5, "fly away", "error"),
+        (6, 'add note "Unclosed', "error"),
+        (7, "search contact", "ok"),
+    ]
+    assert records[0]["output"] == "Contact added."
+    assert "already exists" in records[1]["messages"][0]
+    assert records[3]["output"].startswith("Cannot parse line")
+    assert "Jane Doe" in records[4]["output"] and "\x1b[" not in records[4]["output"]
+
+
+def test_unused_arguments_are_reported(tmp_path):
+    _, records = _run(tmp_path, ['add note "Buy milk" home extra'])
+    assert records[0]["status"] == "ok"
+    assert records[0]["unused"] == ["extra"]
+
+
+def test_changes_are_persisted(tmp_path):
+    _run(tmp_path, ['add contact "Jane Doe" 0501234567 "" "" ""', 'add note "Buy milk" home'])
+    storage = _storage(tmp_path)
+    try:
+        assert storage.contact_book.find("Jane Doe") is not None
+        assert len(storage.note_book) == 1
+    finally:
+        storage.close()
+
+
+def test_run_command_answers_prompts_from_arguments(tmp_path):
+    storage = _storage(tmp_path)
+    try:
+        record = run_command("add note", ["Buy milk", "home, shop"], storage)
+        assert record == {"command": "add note", "status": "ok", "output": "Note #1 added."}
+        assert storage.note_book.get(1).tags == ("home", "shop")
+    finally:
+        storage.close()
+
+
+def test_batch_from_the_command_line(tmp_path):
+    script = tmp_path / "script.txt"
+    script.write_text('add contact "Jane Doe" 0501234567 "" "" ""\nshow contacts\n', encoding="utf-8")
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    run = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--batch", str(script)],
+        cwd=tmp_path, env=env, capture_output=True, text=True, timeout=60,
+    )
+    assert run.returncode == 0, run.stderr
+    assert [json.loads(line)["status"] for line in run.stdout.splitlines()] == ["ok", "ok"]
+
+    run = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--batch"],
+        cwd=tmp_path, env=env, input="delete contact Nobody\n", capture_output=True, text=True, timeout=60,
+    )
+    assert run.returncode == 1
+    assert json.loads(run.stdout)["status"] == "error"
@@ -0,0 +1,81 @@
+import json
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from benchmarks import suite
+from benchmarks.compare import compare
+from benchmarks.data import generate_contacts, generate_notes, make_vocabulary, sample
+from services.birthday_index import parse_birthday
+from services.contact_book import normalize_name
+from services.phone_index import normalize_phone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _report(*results):
+    return {"meta": {}, "results": [{"name": name, "records": 1000, "seconds": seconds} for name, seconds in results]}
+
+
+def test_contacts_are_reproducible_and_valid():
+    contacts = generate_contacts(2000, 4)
+    assert [c.to_dict() for c in contacts] == [c.to_dict() for c in generate_contacts(2000, 4)]
+    assert [c.to_dict() for c in contacts] != [c.to_dict() for c in generate_contacts(2000, 5)]
+    assert len({normalize_name(c.name) for c in contacts}) == len(contacts)
+    assert all(len(normalize_phone(c.phone)) == 12 for c in contacts)
+    assert all(parse_birthday(c.birthday) for c in contacts if c.birthday)
+    assert 0.7 < sum(1 for c in contacts if c.birthday) / len(contacts) < 0.9
+
+
+def test_notes_follow_a_zipf_distribution():
+    notes = generate_notes(2000, 4)
+    assert [n.to_dict() for n in notes] == [n.to_dict() for n in generate_notes(2000, 4)]
+    assert [n.id for n in notes] == list(range(1, 2001))
+    tags = Counter(tag for note in notes for tag in note.tags)
+    counts = sorted(tags.values(), reverse=True)
+    # A few tags are on many notes, most on few.
+    assert counts[0] > 10 * counts[len(counts) // 2]
+    assert all(len(set(note.tags)) == len(note.tags) for note in notes)
+
+
+def test_vocabulary_and_sample():
+    words = make_vocabulary(300, 1)
+    assert len(set(words)) == 300 and words == make_vocabulary(300, 1)
+    assert sample(words, 50, 2) == sample(words, 50, 2)
+
+
+def test_compare_flags_slowdowns_over_the_threshold():
+    baseline = _report(("find", 0.010), ("search", 0.100), ("tiny", 0.001), ("gone", 0.5))
+    current = _report(("find", 0.0115), ("search", 0.130), ("tiny", 0.004), ("new", 0.2))
+    rows = {row["name"]: row for row in compare(baseline, current, threshold=0.2)}
+    assert set(rows) == {"find", "search", "tiny"}
+    assert not rows["find"]["regressed"]
+    assert rows["search"]["regressed"] and round(rows["search"]["change"], 2) == 0.3
+    # Too fast in the baseline to be told apart from noise.
+    assert not rows["tiny"]["regressed"]
+
+
+def test_suite_report(tmp_path):
+    report = suite.run([200], seed=1, repeat=1)
+    names = [result["name"] for result in report["results"]]
+    assert len(names) == len(set(names))
+    assert any(name.startswith("contacts.") for name in names) and any(name.startswith("notes.") for name in names)
+    assert all(result["records"] == 200 and result["seconds"] >= 0 for result in report["results"])
+    assert report["meta"]["seed"] == 1
+
+    baseline = tmp_path / "baseline.json"
+    slower = tmp_path / "slower.json"
+    baseline.write_text(json.dumps(report), encoding="utf-8")
+    slowed = {**report, "results": [{**result, "seconds": result["seconds"] * 10 + 1} for result in report["results"]]}
+    slower.write_text(json.dumps(slowed), encoding="utf-8")
+
+    def compare_files(old, new):
+        return subprocess.run(
+            [sys.executable, "-m", "benchmarks.compare", str(old), str(new)],
+            cwd=ROOT, capture_output=True, text=True, timeout=60,
+        )
+
+    assert compare_files(baseline, baseline).returncode == 0
+    run = compare_files(baseline, slower)
+    assert run.returncode == 1 and "REGRESSION" in run.stdout
@@ -0,0 +1,134 @@
+from datetime import date
+
+import pytest
+
+import services.birthday_index
+import services.contact_book
+from cli.commands import birthdays, show_birthday
+from cli.prompts import inline_arguments, strip_colors
+from models.contact import Contact
+from services.birthday_index import BirthdayIndex, birthday_in_year, days_until, parse_birthday
+from services.contact_book import ContactBook
+
+NON_LEAP = date(2025, 2, 27)
+YEAR_END = date(2024, 12, 30)
+
+PEOPLE = {
+    "Leap Day": "2000-02-29",
+    "Feb Last": "1990-02-28",
+    "March First": "1985-03-01",
+    "New Year": "1999-01-01",
+    "Jan Second": "1970-01-02",
+    "Year End": "1980-12-31",
+    "Today End": "1991-12-30",
+    "Yesterday": "1992-12-29",
+}
+
+
+def _index():
+    index = BirthdayIndex()
+    for name, birthday in PEOPLE.items():
+        index.add(name, Contact(name, birthday=birthday))
+    index.add("No Birthday", Contact("No Birthday"))
+    index.add("Bad Birthday", Contact("Bad Birthday", birthday="1990-02-30"))
+    return index
+
+
+def _upcoming(index, days, today):
+    return [(contact.name, delta) for contact, delta in index.upcoming(days, today)]
+
+
+def test_parse_birthday():
+    assert parse_birthday("2000-02-29") == (2, 29)
+    assert parse_birthday("1999-02-29") is None
+    assert parse_birthday("29.02.2000") is None
+    assert parse_birthday(None) is None
+
+
+def test_leap_day_is_celebrated_on_feb_28_in_non_leap_years():
+    assert birthday_in_year(2, 29, 2025) == date(2025, 2, 28)
+    assert birthday_in_year(2, 29, 2024) == date(2024, 2, 29)
+    assert days_until(2, 29, NON_LEAP) == 1
+    assert days_until(2, 29, date(2024, 2, 27)) == 2
+    assert days_until(2, 29, date(2025, 2, 28)) == 0
+    # After Feb 28 of a non-leap year the next celebration is the real leap day.
+    assert days_until(2, 29, date(2023, 3, 1)) == 365
+
+
+def test_leap_day_shows_up_on_feb_28_of_non_leap_years():
+    index = _index()
+    assert len(index) == len(PEOPLE)
+    assert _upcoming(index, 0, NON_LEAP) == []
+    assert _upcoming(index, 1, NON_LEAP) == [("Feb Last", 1), ("Leap Day", 1)]
+    assert _upcoming(index, 2, NON_LEAP) == [("Feb Last", 1), ("Leap Day", 1), ("March First", 2)]
+    assert _upcoming(index, 2, date(2024, 2, 27)) == [("Feb Last", 1), ("Leap Day", 2)]
+    assert index.days_until("Leap Day", NON_LEAP) == 1
+    assert index.days_until("No Birthday", NON_LEAP) is None
+
+
+def test_window_wraps_past_the_year_end():
+    index = _index()
+    assert _upcoming(index, 3, YEAR_END) == [("Today End", 0), ("Year End", 1), ("New Year", 2), ("Jan Second", 3)]
+    # 2025 is not a leap year, so the leap day birthday falls on Feb 28, 60 days later.
+    assert _upcoming(index, 60, YEAR_END)[-2:] == [("Feb Last", 60), ("Leap Day", 60)]
+    assert index.days_until("Yesterday", YEAR_END) == 364
+    # A window of a year or more lists every birthday exactly once.
+    everyone = _upcoming(index, 1000, YEAR_END)
+    assert sorted(name for name, _ in everyone) == sorted(PEOPLE)
+    assert everyone[-1] == ("Yesterday", 364)
+
+
+def test_removed_birthdays_are_forgotten():
+    index = _index()
+    index.remove("Leap Day")
+    index.remove("No Birthday")
+    assert _upcoming(index, 1, NON_LEAP) == [("Feb Last", 1)]
+    assert index.days_until("Leap Day", NON_LEAP) is None
+
+
+def test_select_skips_days_a_month_does_not_have():
+    index = _index()
+    assert [c.name for c in index.select([2], [28, 29, 30, 31])] == ["Feb Last", "Leap Day"]
+    assert [c.name for c in index.select([12, 1], [1, 31])] == ["Year End", "New Year"]
+
+
+@pytest.fixture(params=[NON_LEAP, YEAR_END])
+def today(request, monkeypatch):
+    class FixedDate(date):
+        @classmethod
+        def today(cls):
+            return request.param
+
+    monkeypatch.setattr(services.birthday_index, "date", FixedDate)
+    monkeypatch.setattr(services.contact_book, "date", FixedDate)
+    return request.param
+
+
+def test_show_birthday_uses_the_index(today):
+    book = ContactBook()
+    for name, birthday in PEOPLE.items():
+        book.add_contact(Contact(name, birthday=birthday))
+    book.add_contact(Contact("No Birthday"))
+
+    for name, birthday in PEOPLE.items():
+        expected = days_until(*parse_birthday(birthday), today)
+        assert book.days_until_birthday(name.lower()) == expected
+        assert book.days_to_birthday(birthday) == expected
+        with inline_arguments([name]):
+            assert strip_colors(show_birthday(book)) == f"{name}'s birthday is on {birthday}, in {expected} days."
+
+    with inline_arguments(["No Birthday"]):
+        assert strip_colors(show_birthday(book)) == "Birthday not found."
+    assert book.days_until_birthday("Nobody") is None
+    # Looked up by key and answered from the birthday calendar, without building the search index.
+    assert book._birthdays is not None and book._search is None
+
+
+def test_birthdays_command(today):
+    book = ContactBook()
+    for name, birthday in PEOPLE.items():
+        book.add_contact(Contact(name, birthday=birthday))
+    with inline_arguments(["1"]):
+        output = strip_colors(birthdays(book))
+    expected = {NON_LEAP: ["Feb Last", "Leap Day"], YEAR_END: ["Today End", "Year End"]}[today]
+    assert [name for name in PEOPLE if name in output] == sorted(expected, key=list(PEOPLE).index)
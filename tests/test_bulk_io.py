@@ -0,0 +1,52 @@
+import csv
+import json
+
+import pytest
+
+from cli.commands import dedupe_contacts, export_contacts
+from cli.prompts import inline_arguments
+from models.contact import Contact
+from services.contact_book import ContactBook
+from utils.bulk_io import import_contacts
+
+
+@pytest.fixture
+def book(monkeypatch):
+    book = ContactBook()
+    book.add_contact(Contact("Zoya Koval", "0501234567", "zoya@example.com"))
+    book.add_contact(Contact("Andriy Melnyk", "0671234567", None, "Kyiv", "1990-05-17"))
+    book.add_contact(Contact("andriy melnik", "0671234567", "andriy@example.com"))
+
+    def materialized():
+        raise AssertionError("the whole book was copied into a list")
+
+    # The commands must stream the book through its sorted view.
+    monkeypatch.setattr(book, "sorted_contacts", materialized)
+    return book
+
+
+@pytest.mark.parametrize("extension", ["csv", "jsonl", "vcf"])
+def test_export_streams_in_name_order_and_round_trips(book, tmp_path, extension):
+    path = str(tmp_path / f"contacts.{extension}")
+    with inline_arguments([path]):
+        assert "Exported 3 contact(s)" in export_contacts(book)
+
+    if extension == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            assert [row["name"] for row in csv.DictReader(f)] == ["andriy melnik", "Andriy Melnyk", "Zoya Koval"]
+    elif extension == "jsonl":
+        with open(path, encoding="utf-8") as f:
+            assert [json.loads(line)["birthday"] for line in f] == [None, "1990-05-17", None]
+
+    copy = ContactBook()
+    result = import_contacts(copy, path)
+    assert result.added == 3 and not result.rejected
+    assert sorted(c.name for c in copy.contacts.values()) == sorted(c.name for c in book.iter_sorted())
+
+
+def test_dedupe_merges_from_the_sorted_view(book):
+    with inline_arguments(["", "yes"]):
+        assert "1 duplicate contacts removed" in dedupe_contacts(book)
+    assert len(book) == 2
+    merged = book.find("Andriy Melnyk")
+    assert (merged.email, merged.birthday) == ("andriy@example.com", "1990-05-17")
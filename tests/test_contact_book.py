@@ -0,0 +1,110 @@
+import pickle
+
+import pytest
+
+from models.contact import Contact
+from services.contact_book import ContactBook, normalize_name
+
+
+class _NoScanDict(dict):
+    """
+    A contacts dictionary that fails the test if anything iterates over it.
+    """
+
+    def __iter__(self):
+        raise AssertionError("the contacts were scanned")
+
+    def items(self):
+        raise AssertionError("the contacts were scanned")
+
+    def values(self):
+        raise AssertionError("the contacts were scanned")
+
+    def keys(self):
+        raise AssertionError("the contacts were scanned")
+
+
+@pytest.fixture
+def book():
+    book = ContactBook()
+    for name in ("Jane Doe", "John Smith", "Straße Müller"):
+        book.add_contact(Contact(name, "0501234567"))
+    return book
+
+
+def test_find_ignores_case(book):
+    assert book.find("jane doe").name == "Jane Doe"
+    assert book.find("JOHN SMITH").name == "John Smith"
+    assert book.find("Jane") is None
+
+
+def test_unicode_casefolding(book):
+    assert normalize_name("STRASSE") == normalize_name("straße")
+    assert book.find("STRASSE MÜLLER").name == "Straße Müller"
+    # Decomposed "u" + combining diaeresis matches the composed "ü".
+    assert book.find("strasse müller").name == "Straße Müller"
+    assert not book.add_contact(Contact("STRASSE MÜLLER", "0501234567"))
+
+
+def test_duplicate_names_are_rejected(book):
+    assert not book.add_contact(Contact("JANE DOE", "0501234567"))
+    assert len(book) == 3
+
+
+def test_rename_moves_the_key(book):
+    assert book.edit_contact("jane doe", name="Jane Roe")
+    assert book.find("Jane Doe") is None
+    assert book.find("jane roe").name == "Jane Roe"
+    assert "Jane Roe" in book.contacts and "Jane Doe" not in book.contacts
+    # The old name is free again.
+    assert book.add_contact(Contact("Jane Doe", "0501234567"))
+
+
+def test_rename_to_an_existing_name_is_refused(book):
+    assert not book.edit_contact("Jane Doe", name="john smith")
+    assert book.find("Jane Doe") is not None
+
+
+def test_rename_changing_only_case(book):
+    assert book.edit_contact("jane doe", name="JANE DOE")
+    assert book.find("jane doe").name == "JANE DOE"
+    assert "JANE DOE" in book.contacts and "Jane Doe" not in book.contacts
+
+
+def test_delete_removes_the_key(book):
+    assert book.delete_contact("JOHN smith").name == "John Smith"
+    assert book.find("John Smith") is None
+    assert book.delete_contact("John Smith") is None
+    assert book.add_contact(Contact("John Smith", "0501234567"))
+
+
+def test_pickle_reload_rebuilds_the_index(book):
+    book.edit_contact("Jane Doe", name="Jane Roe")
+    book.delete_contact("John Smith")
+
+    loaded = pickle.loads(pickle.dumps(book))
+
+    assert sorted(loaded.contacts) == ["Jane Roe", "Straße Müller"]
+    assert loaded.find("jane roe").name == "Jane Roe"
+    assert loaded.find("strasse müller").name == "Straße Müller"
+    assert loaded.find("John Smith") is None
+    assert not loaded.add_contact(Contact("JANE ROE", "0501234567"))
+
+
+def test_assigning_contacts_rebuilds_the_index():
+    book = ContactBook()
+    book.contacts = {"Ann Lee": Contact("Ann Lee", "0501234567")}
+    assert book.find("ANN LEE").name == "Ann Lee"
+
+
+def test_lookups_do_not_scan_the_book():
+    book = ContactBook()
+    for i in range(10_000):
+        book.add_contact(Contact(f"Contact {i}", "0501234567"))
+    book._contacts = _NoScanDict(book._contacts)
+
+    assert book.find("CONTACT 9999").name == "Contact 9999"
+    assert not book.add_contact(Contact("contact 5", "0501234567"))
+    assert book.edit_contact("contact 42", phone="0509999999")
+    assert book.delete_contact("contact 7").name == "Contact 7"
+    assert book.find("Contact 7") is None
@@ -0,0 +1,66 @@
+import pytest
+
+from cli.commands import dedupe_contacts
+from cli.prompts import inline_arguments
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.dedupe import MAX_BLOCK, blocking_keys, find_duplicates, score_pair
+
+
+COLLEAGUES = ["Anna Bondar", "Taras Melnyk", "Oksana Shevchuk", "Dmytro Lysenko", "Yuliia Tkachenko"]
+
+
+def _office(size):
+    # Colleagues sharing the office number, plus one person entered twice with only that in common.
+    contacts = [Contact(f"{COLLEAGUES[i % len(COLLEAGUES)]} {i:03}", "044 123 45 67") for i in range(size)]
+    contacts += [Contact("Ivan Petrenko", "044-123-45-67", None, "Kyiv"), Contact("Ivan Petrenk", "+380441234567", None, "Kyiv")]
+    return contacts
+
+
+def test_blocking_keys_normalize_fields():
+    keys = blocking_keys(Contact("Smith  John", "050 123 4567", "John@Example.com"))
+    assert keys == [("name", "john smith"), ("email", "john@example.com"), ("phone", "380501234567")]
+
+
+def test_same_email_with_a_nickname_is_merged():
+    bob = Contact("Bob Smith", None, "bob.smith@example.com")
+    robert = Contact("Robert Smith", "0501234567", "Bob.Smith@example.com", "Kyiv", "1980-01-02")
+    other = Contact("Robert Smithson", "0671234567", "rs@example.com")
+    assert score_pair(bob, robert) >= 0.6
+
+    report = find_duplicates([bob, other, robert])
+    assert len(report.merges) == 1
+    merge = report.merges[0]
+    assert (merge.keep, merge.remove, merge.fields) == (robert, [bob], {})
+    assert report.skipped_blocks == 0
+
+
+def test_conflicting_birthdays_are_not_merged():
+    a = Contact("Olena Koval", "0501234567", None, None, "1990-01-01")
+    b = Contact("Olena Koval", "0501234567", None, None, "1991-02-02")
+    assert find_duplicates([a, b]).merges == []
+
+
+def test_oversized_block_is_skipped_and_counted():
+    report = find_duplicates(_office(MAX_BLOCK))
+    assert report.skipped_blocks == 1
+    assert report.merges == []
+
+    # With a larger limit the pair in the block is found.
+    report = find_duplicates(_office(len(COLLEAGUES)), max_block=len(COLLEAGUES) + 2)
+    assert report.skipped_blocks == 0
+    assert [sorted(c.name for c in [m.keep, *m.remove]) for m in report.merges] == [["Ivan Petrenk", "Ivan Petrenko"]]
+
+
+@pytest.mark.parametrize("size", [MAX_BLOCK, 3])
+def test_command_reports_skipped_blocks(size):
+    book = ContactBook()
+    book.add_contacts(_office(size))
+    with inline_arguments(["", "no"]):
+        result = dedupe_contacts(book)
+    if size == MAX_BLOCK:
+        assert "No duplicate contacts found" in result
+        assert f"1 groups of more than {MAX_BLOCK} contacts" in result
+    else:
+        assert "No contacts were merged" in result
+        assert "not compared" not in result
@@ -0,0 +1,47 @@
+import pytest
+
+from cli.command_handler import commands, dispatcher
+from cli.dispatcher import CommandTrie, split_line, unknown_command
+
+
+@pytest.fixture
+def trie():
+    return CommandTrie(["show birthday", "show birthdays", "add contact", "add note", "exit"])
+
+
+def test_longest_command_wins(trie):
+    assert trie.match(["show", "birthdays", "7"]) == ("show birthdays", 2)
+    assert trie.match(["show", "birthday", "Jane"]) == ("show birthday", 2)
+    assert trie.match(["ADD", "Note"]) == ("add note", 2)
+    assert trie.match(["add"]) == (None, 0)
+    assert trie.match([]) == (None, 0)
+
+
+def test_parse_splits_arguments(trie):
+    assert trie.parse('add contact "Jane Doe" +380501234567 ""') == (
+        "add contact", ["Jane Doe", "+380501234567", ""], '"Jane Doe" +380501234567 ""',
+    )
+    assert trie.parse("  exit  ") == ("exit", [], "")
+    assert trie.parse("fly to moon") == (None, ["fly", "to", "moon"], "fly to moon")
+    with pytest.raises(ValueError):
+        trie.parse('add note "unclosed')
+
+
+def test_split_line_offsets():
+    line = 'add  "two words" x'
+    tokens, starts = split_line(line)
+    assert tokens == ["add", "two words", "x"]
+    assert [line[start:].strip() for start in starts] == [line, '"two words" x', "x"]
+
+
+def test_suggestions(trie):
+    assert trie.suggest("ad contcat Jane") == ["add contact"]
+    assert trie.suggest("show birthdya")[0] == "show birthday"
+    assert trie.suggest("zzz") == []
+    assert unknown_command(trie, "ad note") == "Unknown command. Did you mean: 'add note'?"
+    assert unknown_command(trie, "zzz") == "Unknown command. Type 'commands' to see available options."
+
+
+def test_every_command_is_registered():
+    for name in commands:
+        assert dispatcher.parse(f"{name} extra")[:2] == (name, ["extra"])
@@ -0,0 +1,48 @@
+import io
+
+import pytest
+
+from cli.batch import run_command
+from cli.render import output_text, write_output
+from utils.metrics import Metrics, metrics
+from utils.utils import input_error
+
+
+@input_error
+def _listing(fail_with):
+    yield "first row\n"
+    raise fail_with("no such page")
+
+
+@pytest.mark.parametrize("error", [ValueError, KeyError, IndexError])
+def test_error_in_lazy_output_ends_the_listing(error):
+    out = io.StringIO()
+    write_output(_listing(error), out)
+    lines = out.getvalue().splitlines()
+    assert lines[0] == "first row"
+    assert lines[-1].startswith("Error:") and "no such page" in lines[-1]
+
+
+def test_other_errors_still_propagate():
+    with pytest.raises(RuntimeError):
+        output_text(_listing(RuntimeError))
+
+
+def test_lazy_errors_are_counted(monkeypatch):
+    recorder = Metrics()
+    recorder.enabled = True
+    monkeypatch.setattr(metrics, "run_command", recorder.run_command)
+    monkeypatch.setattr(metrics, "enabled", True)
+
+    assert output_text(_listing(ValueError)).endswith("Error: no such page")
+    stats = recorder.commands["_listing"]
+    assert (stats.calls, stats.errors) == (1, 1)
+
+
+def test_batch_reports_a_failed_listing(monkeypatch):
+    import cli.batch
+
+    monkeypatch.setattr(cli.batch, "resolve", lambda command, storage: (_listing, ValueError))
+    record = run_command("show contacts", [], storage=None)
+    assert record["status"] == "error"
+    assert record["output"].startswith("first row")
@@ -0,0 +1,187 @@
+import os
+import pickle
+
+import pytest
+
+from benchmarks.stress import run as stress
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+from storage.backends import PickleStorage
+from utils.journal import JournaledStore, load_snapshot, read_records, read_records_from
+
+
+def _storage(directory):
+    return PickleStorage(str(directory / "addressbook.pkl"), str(directory / "notes.pkl"))
+
+
+@pytest.fixture
+def open_storages(tmp_path):
+    storages = []
+
+    def open_storage():
+        storages.append(_storage(tmp_path))
+        return storages[-1]
+
+    yield open_storage
+    for storage in storages:
+        storage.close()
+
+
+def test_changes_survive_a_restart(tmp_path):
+    storage = _storage(tmp_path)
+    storage.contact_book.add_contact(Contact("Jane Doe", "0501234567"))
+    note = storage.note_book.add_note("Buy milk", ["home"])
+    storage.close()
+    assert os.path.getsize(tmp_path / "addressbook.journal") > 0
+
+    storage = _storage(tmp_path)
+    assert storage.contact_book.find("jane doe").phone == "0501234567"
+    assert list(storage.note_book.get(note.id).tags) == ["home"]
+    storage.close()
+
+
+def test_each_change_is_one_journal_record(tmp_path):
+    storage = _storage(tmp_path)
+    book = storage.contact_book
+    book.add_contact(Contact("Jane Doe", "0501234567"))
+    book.edit_contact("Jane Doe", email="jane@example.com")
+    book.delete_contact("Jane Doe")
+    book.add_contact(Contact("John Roe"))
+    storage.close()
+
+    records = list(read_records(str(tmp_path / "addressbook.journal")))
+    assert [(record["seq"], record["op"]) for record in records] == [(1, "add"), (2, "edit"), (3, "delete"), (4, "add")]
+    assert not os.path.exists(tmp_path / "addressbook.pkl")
+
+    storage = _storage(tmp_path)
+    assert [c.name for c in storage.contact_book.sorted_contacts()] == ["John Roe"]
+    storage.close()
+
+
+def test_torn_last_record_is_ignored(tmp_path):
+    storage = _storage(tmp_path)
+    storage.note_book.add_note("Buy milk")
+    storage.note_book.add_note("Call mom")
+    storage.close()
+    path = tmp_path / "notes.journal"
+    complete = path.stat().st_size
+    with open(path, "ab") as f:
+        f.write(b'{"seq": 3, "op": "add", "note": {"id": 3, "te')
+
+    assert [record["seq"] for record in read_records(str(path))] == [1, 2]
+    records, offset = read_records_from(str(path), 0)
+    assert len(records) == 2 and offset == complete
+    assert read_records_from(str(path), offset) == ([], offset)
+
+    storage = _storage(tmp_path)
+    assert [note.text for note in storage.note_book.sorted_notes()] == ["Buy milk", "Call mom"]
+    storage.close()
+
+
+def test_compaction_at_the_threshold(tmp_path):
+    snapshot = str(tmp_path / "addressbook.pkl")
+    store = JournaledStore(ContactBook(), "contacts", snapshot, compact_threshold=5)
+    store.open()
+    for i in range(7):
+        store.book.add_contact(Contact(f"Contact {i}"))
+    store.close()
+
+    # The fifth record triggered a snapshot; only the two later ones are left to replay.
+    data, meta = load_snapshot(snapshot)
+    assert meta == {"seq": 5} and len(data) == 5
+    assert [record["seq"] for record in read_records(store.journal_path)] == [6, 7]
+
+    store = JournaledStore(ContactBook(), "contacts", snapshot, compact_threshold=5)
+    store.open()
+    assert len(store.book) == 7 and store.unsaved == 2
+    store.close()
+
+
+def test_plain_pickle_files_still_load(tmp_path):
+    path = tmp_path / "addressbook.pkl"
+    with open(path, "wb") as f:
+        pickle.dump({"jane doe": Contact("Jane Doe")}, f)
+    assert load_snapshot(str(path))[1] == {}
+    storage = _storage(tmp_path)
+    assert storage.contact_book.find("Jane Doe") is not None
+    storage.close()
+
+
+def test_snapshot_replaces_the_journal(tmp_path):
+    storage = _storage(tmp_path)
+    book = storage.contact_book
+    for i in range(20):
+        book.add_contact(Contact(f"Contact {i}"))
+    store = storage._opened["contacts"]
+    assert store.save(background=True)
+    store.wait()
+    book.delete_contact("Contact 3")
+    storage.close()
+
+    storage = _storage(tmp_path)
+    assert len(storage.contact_book) == 19
+    assert storage.contact_book.find("Contact 3") is None
+    storage.close()
+
+
+def test_sessions_see_each_others_changes(open_storages):
+    first, second = open_storages(), open_storages()
+    first.contact_book.add_contact(Contact("Jane Doe"))
+    assert second.contact_book.find("Jane Doe") is not None
+
+    second.contact_book.delete_contact("Jane Doe")
+    assert first.contact_book.find("Jane Doe") is None
+
+
+def test_concurrent_edits_of_one_contact_are_merged(open_storages):
+    first, second = open_storages(), open_storages()
+    first.contact_book.add_contact(Contact("Jane Doe"))
+    stale = second.contact_book
+
+    # The second session edits without looking at the books again after the first one's edit.
+    assert first.contact_book.edit_contact("Jane Doe", phone="0501234567")
+    assert stale.edit_contact("Jane Doe", email="jane@example.com")
+
+    third = open_storages()
+    merged = third.contact_book.find("Jane Doe")
+    assert (merged.phone, merged.email) == ("0501234567", "jane@example.com")
+
+
+def test_concurrent_notes_get_distinct_ids(open_storages):
+    first, second = open_storages().note_book, open_storages().note_book
+    a = first.add_note("From the first session")
+    b = second.add_note("From the second session")
+    assert (a.id, b.id) == (1, 2)
+
+    notes = open_storages().note_book
+    assert (notes.get(1).text, notes.get(2).text) == ("From the first session", "From the second session")
+
+
+def test_concurrent_processes_lose_nothing():
+    assert stress(processes=3, operations=40, compact_every=25)["errors"] == []
+
+
+def test_add_note_returns_the_note_a_subscriber_stored():
+    book = NoteBook()
+    replaying = []
+
+    def renumber(record):
+        # Like the journal merging a concurrent writer: the note is re-added under another id,
+        # and a note from the other writer lands after it.
+        if replaying or record["op"] != "add":
+            return None
+        replaying.append(True)
+        try:
+            book.revert(record)
+            rebased = {**record, "note": {**record["note"], "id": 5}}
+            book.apply(rebased)
+            book.apply({"op": "add", "note": {"id": 9, "text": "From elsewhere", "tags": []}})
+        finally:
+            replaying.clear()
+        return rebased
+
+    book.subscribe(renumber)
+    note = book.add_note("Mine")
+    assert (note.id, note.text) == (5, "Mine")
+    assert book.get(5) is note
@@ -0,0 +1,115 @@
+import io
+import os
+import pickle
+import subprocess
+import sys
+
+import pytest
+
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+from storage.backends import PickleStorage
+from utils.startup import profile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONTACTS = [
+    Contact("Jane Doe", "+380501234567", "jane@acme.com", "Kyiv", "1990-05-17"),
+    Contact("John Smith", "0509876543", "john@acme.com", "Lviv", "1993-05-01"),
+    Contact("Joanna Lee", "0631112233", None, None, "1995-11-30"),
+]
+
+
+def _loaded():
+    book = ContactBook()
+    for contact in CONTACTS:
+        book.add_contact(Contact.from_dict(contact.to_dict()))
+    return pickle.loads(pickle.dumps(book))
+
+
+def _built(book):
+    return {name for name in ("_search", "_birthdays", "_names", "_phones") if getattr(book, name) is not None}
+
+
+def test_loading_builds_no_secondary_index():
+    book = _loaded()
+    assert _built(book) == set()
+    assert book.find("jane doe").name == "Jane Doe"
+    assert _built(book) == set()
+
+
+@pytest.mark.parametrize("call, index", [
+    (lambda book: book.search_contacts("acme"), "_search"),
+    (lambda book: book.upcoming_birthdays(7), "_birthdays"),
+    (lambda book: book.fuzzy_find("Jon Smith"), "_names"),
+    (lambda book: book.find_by_phone("0501234567"), "_phones"),
+])
+def test_each_index_is_built_by_its_first_use(call, index):
+    book = _loaded()
+    call(book)
+    assert _built(book) == {index}
+
+
+def test_build_time_is_reported(monkeypatch):
+    monkeypatch.setattr(profile, "enabled", True)
+    profile.report()
+    _loaded().search_contacts("acme")
+    out = io.StringIO()
+    profile.report(out=out)
+    assert "build contacts search index" in out.getvalue()
+
+
+def test_indexes_built_late_see_earlier_changes():
+    book = _loaded()
+    book.edit_contact("Jane Doe", name="Jane Roe", phone="0671234567", birthday="1990-02-03")
+    book.delete_contact("Joanna Lee")
+    book.add_contact(Contact("Olena Koval", "0505555555", "olena@acme.com"))
+
+    assert [c.name for c in book.search_contacts("acme")] == ["John Smith", "Jane Roe", "Olena Koval"]
+    assert [c.name for c in book.find_by_phone("+380671234567")] == ["Jane Roe"]
+    assert [c.name for c, _ in book.fuzzy_find("Jane Doe")] == ["Jane Roe"]
+    assert book.days_until_birthday("Joanna Lee") is None
+    assert book.days_until_birthday("Jane Roe") is not None
+
+    # Once built, the indexes follow further changes.
+    book.edit_contact("Jane Roe", email="roe@example.com")
+    assert [c.name for c in book.search_contacts("acme")] == ["John Smith", "Olena Koval"]
+
+
+def test_note_full_text_index_is_built_on_first_ranked_search():
+    book = NoteBook()
+    book.add_note("Project kickoff with the client")
+    book = pickle.loads(pickle.dumps(book))
+    assert book._words is None
+    book.add_note("Client invoice")
+    assert [note.text for note, _ in book.search_ranked("client")] == [
+        "Client invoice", "Project kickoff with the client",
+    ]
+    assert book._words is not None
+
+
+def test_startup_imports_no_command_code():
+    script = (
+        "import sys, main; "
+        "print(sorted(m for m in ('cli.commands', 'tabulate', 'prompt_toolkit', 'sqlite3') if m in sys.modules))"
+    )
+    run = subprocess.run([sys.executable, "-c", script], cwd=ROOT, capture_output=True, text=True, timeout=60)
+    assert run.returncode == 0, run.stderr
+    assert run.stdout.strip() == "[]"
+
+
+def test_books_are_loaded_on_first_access(tmp_path):
+    storage = PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"))
+    try:
+        storage.contact_book.add_contact(Contact("Jane Doe", "0501234567"))
+    finally:
+        storage.close()
+
+    storage = PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"))
+    try:
+        assert storage._opened == {}
+        assert storage.contact_book.find("Jane Doe") is not None
+        assert list(storage._opened) == ["contacts"]
+    finally:
+        storage.close()
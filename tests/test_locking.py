@@ -0,0 +1,76 @@
+import os
+import threading
+
+import pytest
+
+from utils.locking import FileLock, atomic_write
+
+fcntl = pytest.importorskip("fcntl")
+
+
+def _is_locked(path):
+    fd = os.open(path, os.O_RDWR)
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        os.close(fd)
+    return False
+
+
+def test_lock_is_reentrant_and_keeps_generations(tmp_path):
+    path = str(tmp_path / "book.lock")
+    lock = FileLock(path)
+    assert lock.generations() == (0, 0)
+    with lock:
+        with lock:
+            lock.set_generations(12, 5)
+        assert _is_locked(path)
+    assert not _is_locked(path)
+    lock.close()
+    assert FileLock(path).generations() == (12, 5)
+
+
+def test_atomic_write_replaces_the_file(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(b"old")
+    atomic_write(b"new", str(path))
+    assert path.read_bytes() == b"new"
+    assert os.listdir(tmp_path) == ["data.bin"]
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="needs os.fork")
+def test_forked_child_gets_its_own_lock(tmp_path):
+    lock = FileLock(str(tmp_path / "book.lock"))
+    held, release = threading.Event(), threading.Event()
+
+    def hold():
+        with lock:
+            held.set()
+            release.wait()
+
+    thread = threading.Thread(target=hold)
+    thread.start()
+    held.wait()
+    pid = os.fork()
+    if pid == 0:
+        status = 1
+        try:
+            # The thread holding the mutex does not exist in the child; without the fork handler
+            # this would hang. Instead the child waits for the parent's flock like any process.
+            import signal
+            signal.alarm(10)
+            with lock:
+                lock.set_generations(3, 2)
+            status = 0
+        finally:
+            os._exit(status)
+
+    assert lock.generations() == (0, 0)
+    release.set()
+    thread.join()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+    assert lock.generations() == (3, 2)
+    lock.close()
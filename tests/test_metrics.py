@@ -0,0 +1,133 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+from cli.command_handler import resolve
+from cli.commands import show_stats
+from cli.prompts import inline_arguments, strip_colors
+from cli.render import output_text
+from storage.backends import PickleStorage
+from utils.metrics import Histogram, Metrics, metrics
+from utils.utils import input_error
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def enabled(monkeypatch):
+    monkeypatch.setattr(metrics, "enabled", True)
+    monkeypatch.setattr(metrics, "commands", {})
+    monkeypatch.setattr(metrics, "operations", {})
+    monkeypatch.setattr(metrics, "_proxies", {})
+    return metrics
+
+
+@input_error
+def _fails(value):
+    raise ValueError(f"bad {value}")
+
+
+@input_error
+def _streams(count):
+    for i in range(count):
+        yield f"{i}\n"
+    raise KeyError("stopped")
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    assert histogram.summary() == {"count": 0, "mean": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    for i in range(1, 101):
+        histogram.record(i / 1000)
+    summary = histogram.summary()
+    assert summary["count"] == 100 and summary["max"] == 0.1
+    # Buckets are about 9% apart, so percentiles are within that of the exact values.
+    assert 0.050 <= summary["p50"] <= 0.050 * 1.1
+    assert 0.095 <= summary["p95"] <= 0.095 * 1.1
+    assert summary["p99"] <= summary["max"]
+    assert sum(count for _, count in histogram.to_dict()["buckets"]) == 100
+
+
+def test_histogram_memory_is_bounded():
+    histogram = Histogram()
+    for i in range(100000):
+        histogram.record(i * 1e-7)
+    assert histogram.count == 100000
+    assert len(histogram.buckets) < 200
+
+
+def test_disabled_metrics_record_nothing():
+    local = Metrics()
+    book = object()
+    assert local.instrument(book, "contacts") is book
+    with local.timed("persistence:journal.append"), local.waiting():
+        pass
+    assert local.operations == {} and local.commands == {}
+
+
+def test_commands_count_calls_and_errors(enabled):
+    assert _fails(1) == "Error: bad 1"
+    assert _fails(2) == "Error: bad 2"
+    assert "".join(_streams(3)) == "0\n1\n2\nError: 'stopped'\n"
+    assert (enabled.commands["_fails"].calls, enabled.commands["_fails"].errors) == (2, 2)
+    stats = enabled.commands["_streams"]
+    assert (stats.calls, stats.errors, stats.latency.count) == (1, 1, 1)
+
+
+def test_waiting_for_input_is_excluded(enabled):
+    def slow_prompt():
+        with enabled.waiting():
+            time.sleep(0.05)
+        return "done"
+
+    assert enabled.run_command("prompt", slow_prompt, (), {}, ()) == "done"
+    assert enabled.commands["prompt"].latency.max < 0.05
+
+
+def test_service_calls_and_operations_are_timed(enabled, tmp_path):
+    storage = PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"))
+    try:
+        func, book = resolve("add contact", storage)
+        assert book is not storage.contact_book and resolve("add contact", storage)[1] is book
+        with inline_arguments(["Jane Doe", "0501234567", "", "", ""]):
+            assert "added" in strip_colors(func(book))
+        func, book = resolve("show contacts", storage)
+        with inline_arguments(["--plain"]):
+            assert "Jane Doe" in output_text(func(book))
+    finally:
+        storage.close()
+
+    assert enabled.commands["add_contact"].calls == 1
+    assert enabled.commands["list_contacts"].latency.count == 1
+    assert enabled.operations["service:contacts.add_contact"].count == 1
+    assert enabled.operations["persistence:journal.append"].count >= 1
+    data = json.loads(json.dumps(enabled.to_dict()))
+    assert set(data["commands"]["add_contact"]) == {"calls", "errors", "latency", "service", "render"}
+
+
+def test_stats_command(monkeypatch, enabled):
+    monkeypatch.setattr(metrics, "enabled", False)
+    assert "Instrumentation is off" in strip_colors(show_stats())
+    monkeypatch.setattr(metrics, "enabled", True)
+    assert strip_colors(show_stats()) == "No commands recorded yet."
+    _fails(1)
+    enabled.record("persistence:journal.sync", 0.002)
+    text = strip_colors(show_stats())
+    assert "_fails" in text and "persistence:journal.sync" in text
+
+
+def test_stats_json_is_written_on_exit(tmp_path):
+    output = tmp_path / "stats.json"
+    run = subprocess.run(
+        [sys.executable, os.path.join(ROOT, "main.py"), "--stats-json", str(output), "--batch"],
+        cwd=tmp_path, env=dict(os.environ, PYTHONPATH=ROOT), input='add note "Buy milk" home\n',
+        capture_output=True, text=True, timeout=60,
+    )
+    assert run.returncode == 0, run.stderr
+    data = json.loads(output.read_text(encoding="utf-8"))
+    assert data["commands"]["add_note"]["calls"] == 1
+    assert "service:notes.add_note" in data["operations"]
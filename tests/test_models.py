@@ -0,0 +1,94 @@
+import pickle
+
+import pytest
+
+import models.contact
+import models.note
+from benchmarks import memory
+from benchmarks.data import generate_contacts
+from models.contact import Contact
+from models.note import Note, intern_tags
+
+
+class _DictContact:
+    # A contact as stored before __slots__, with a per-instance __dict__.
+    def __init__(self, name, phone=None, email=None, address=None, birthday=None):
+        self.name = name
+        self.phone = phone
+        self.email = email
+        self.address = address
+        self.birthday = birthday
+
+
+class _DictNote:
+    def __init__(self, text, tags=None):
+        self.text = text
+        self.tags = tags or []
+
+
+def test_models_have_no_instance_dict():
+    contact, note = Contact("Jane Doe"), Note("Buy milk")
+    for record in (contact, note):
+        assert not hasattr(record, "__dict__")
+        with pytest.raises(AttributeError):
+            record.nickname = "x"
+
+
+def test_tags_are_interned_tuples():
+    first = Note("Buy milk", ["home", "shopping"])
+    second = Note("Buy bread", ("home", "shopping"))
+    assert first.tags == ("home", "shopping")
+    assert first.tags is second.tags
+    assert first.tags[0] is second.tags[0]
+    second.tags = ["home"]
+    assert second.tags == ("home",) and first.tags == ("home", "shopping")
+    assert intern_tags(None) == intern_tags([]) == ()
+
+
+def test_round_trips():
+    contact = Contact("Jane Doe", "0501234567", "jane@example.com", "Kyiv", "1990-05-17")
+    contact.revision = 7
+    loaded = pickle.loads(pickle.dumps(contact))
+    assert loaded.to_dict() == contact.to_dict() and loaded.revision == 0
+    assert Contact.from_dict(contact.to_dict()).to_dict() == contact.to_dict()
+
+    note = Note("Buy milk", ["home"], 3)
+    loaded = pickle.loads(pickle.dumps(note))
+    assert loaded.to_dict() == {"id": 3, "text": "Buy milk", "tags": ["home"]}
+    assert loaded.tags is note.tags
+
+
+def test_pickles_from_before_slots_load(monkeypatch):
+    # Pickle instances of the old classes under the names of the current ones.
+    monkeypatch.setattr(models.contact, "Contact", _DictContact)
+    monkeypatch.setattr(models.note, "Note", _DictNote)
+    _DictContact.__qualname__, _DictNote.__qualname__ = "Contact", "Note"
+    _DictContact.__module__, _DictNote.__module__ = "models.contact", "models.note"
+    try:
+        payload = pickle.dumps([_DictContact("Jane Doe", "0501234567"), _DictNote("Buy milk", ["home"])])
+    finally:
+        _DictContact.__qualname__, _DictNote.__qualname__ = "_DictContact", "_DictNote"
+        _DictContact.__module__ = _DictNote.__module__ = __name__
+    monkeypatch.undo()
+
+    contact, note = pickle.loads(payload)
+    assert isinstance(contact, Contact) and isinstance(note, Note)
+    assert contact.to_dict() == {"name": "Jane Doe", "phone": "0501234567", "email": None, "address": None, "birthday": None}
+    assert (note.id, note.text, note.tags) == (None, "Buy milk", ("home",))
+
+
+def test_memory_benchmark_reports_every_kind():
+    results = memory.run([300], books=True)
+    assert [result["kind"] for result in results] == ["contact", "note", "contact_book", "note_book"]
+    by_kind = {result["kind"]: result["bytes_per_record"] for result in results}
+    assert all(value > 0 for value in by_kind.values())
+    # A book holds the records and their indexes.
+    assert by_kind["contact_book"] > by_kind["contact"]
+    assert by_kind["note_book"] > by_kind["note"]
+
+
+def test_slotted_contacts_are_smaller():
+    contacts = generate_contacts(500, 1)
+    slotted = memory.measure(lambda: [Contact(**c.to_dict()) for c in contacts], len(contacts))
+    plain = memory.measure(lambda: [_DictContact(**c.to_dict()) for c in contacts], len(contacts))
+    assert slotted < plain
@@ -0,0 +1,79 @@
+import pytest
+
+from models.contact import Contact
+from services.bk_tree import BKTree, edit_distance
+from services.contact_book import ContactBook
+from services.name_index import FuzzyNameIndex, default_distance
+
+
+@pytest.fixture
+def book():
+    book = ContactBook()
+    for name in ("Jane Doe", "John Smith", "Jon", "John", "Joan Lee"):
+        book.add_contact(Contact(name=name))
+    return book
+
+
+def names(results):
+    return [(contact.name, distance) for contact, distance in results]
+
+
+@pytest.mark.parametrize("a, b, expected", [
+    ("", "", 0),
+    ("jon", "john", 1),
+    ("jhon", "john", 2),
+    ("jane deo", "jane doe", 2),
+    ("kitten", "sitting", 3),
+])
+def test_edit_distance(a, b, expected):
+    assert edit_distance(a, b) == expected
+    assert edit_distance(b, a) == expected
+    assert edit_distance(a, b, expected) == expected
+    if expected:
+        assert edit_distance(a, b, expected - 1) == expected
+
+
+def test_bk_tree_search_skips_removed_words():
+    tree = BKTree()
+    for word in ("john", "jon", "joan", "jane", "smith"):
+        tree.add(word)
+    tree.remove("joan")
+    assert tree.search("jon", 1) == [("jon", 0), ("john", 1)]
+
+
+def test_default_distance_grows_with_the_name():
+    assert [default_distance("x" * length) for length in (1, 3, 4, 6, 7, 20)] == [1, 1, 2, 2, 3, 3]
+
+
+def test_transposed_word_within_the_budget(book):
+    assert names(book.fuzzy_find("Jane Deo", max_distance=3)) == [("Jane Doe", 2)]
+    assert names(book.fuzzy_find("Jane Deo")) == [("Jane Doe", 2)]
+
+
+def test_typos_in_both_words(book):
+    assert names(book.fuzzy_find("Jon Smtih")) == [("John Smith", 3)]
+
+
+def test_short_names(book):
+    assert names(book.fuzzy_find("jon")) == [("Jon", 0), ("John", 1)]
+    assert names(book.fuzzy_find("jhon")) == [("Jon", 1), ("John", 2)]
+
+
+def test_results_stay_within_max_distance(book):
+    assert names(book.fuzzy_find("jon", max_distance=0)) == [("Jon", 0)]
+    assert names(book.fuzzy_find("Jane Deo", max_distance=1)) == []
+
+
+def test_deleted_word_of_the_query():
+    index = FuzzyNameIndex()
+    index.add("joan lee")
+    assert index.search("joan a lee", max_distance=2) == [("joan lee", 2)]
+
+
+def test_rename_and_delete_update_the_index(book):
+    assert book.edit_contact("John Smith", name="Johan Smit")
+    assert names(book.fuzzy_find("Jon Smtih")) == []
+    assert names(book.fuzzy_find("Johan Smith")) == [("Johan Smit", 1)]
+
+    book.delete_contact("Jon")
+    assert names(book.fuzzy_find("jon")) == [("John", 1)]
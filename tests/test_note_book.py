@@ -0,0 +1,117 @@
+import pickle
+
+import pytest
+
+from cli.commands import delete_note, edit_note, list_tags
+from cli.prompts import inline_arguments, strip_colors
+from models.note import Note
+from services.note_book import NoteBook, parse_note_id
+
+
+@pytest.fixture
+def notes():
+    book = NoteBook()
+    book.add_note("Call the client", ["Work", "urgent"])
+    book.add_note("Buy milk", ["home"])
+    book.add_note("Draft the contract", ["work"])
+    book.add_note("work", ["misc"])
+    return book
+
+
+def _texts(notes):
+    return [note.text for note in notes]
+
+
+def test_tags_are_matched_case_insensitively(notes):
+    assert _texts(notes.search_tag("WORK")) == ["Call the client", "Draft the contract"]
+    assert _texts(notes.search_tag(" urgent ")) == ["Call the client"]
+    assert notes.search_tag("absent") == []
+
+
+def test_search_finds_text_and_tags(notes):
+    assert _texts(notes.search_notes("work")) == ["Call the client", "Draft the contract", "work"]
+    assert _texts(notes.search_notes("milk")) == ["Buy milk"]
+
+
+def test_tag_counts_follow_edits_and_deletes(notes):
+    assert notes.tag_counts() == [("work", 2), ("home", 1), ("misc", 1), ("urgent", 1)]
+    notes.edit_note("buy milk", new_tags=["Work"])
+    assert notes.tag_counts() == [("work", 3), ("misc", 1), ("urgent", 1)]
+    assert notes.delete_notes("urgent") == 1
+    assert notes.tag_counts() == [("work", 2), ("misc", 1)]
+    assert sorted(_texts(notes.search_tag("work"))) == ["Buy milk", "Draft the contract"]
+
+
+def test_edit_and_delete_by_tag_or_text(notes):
+    # "work" is both a tag and the text of a note: all three are matched.
+    assert notes.edit_note("Work", new_text="Done")
+    assert _texts(notes.search_notes("done")) == ["Done"] * 3
+    assert notes.delete_notes("done") == 3
+    assert _texts(notes.sorted_notes()) == ["Buy milk"]
+    assert not notes.edit_note("absent", new_text="x")
+
+
+def test_delete_note_needs_the_exact_text(notes):
+    notes.delete_note("buy milk")
+    assert len(notes) == 4
+    notes.delete_note("Buy milk")
+    assert notes.search_tag("home") == []
+
+
+def test_list_tags_command(notes):
+    rows = [line for line in strip_colors(list_tags(notes)).splitlines() if line.startswith("│")]
+    assert [row.split("│")[1].strip() for row in rows[1:]] == ["work", "home", "misc", "urgent"]
+    assert strip_colors(list_tags(NoteBook())) == "No tags found."
+
+
+def test_parse_note_id():
+    assert parse_note_id("#12") == 12
+    assert parse_note_id(" #3 ") == 3
+    assert parse_note_id("12") is None
+    assert parse_note_id("#x") is None
+
+
+def test_ids_are_stable_and_not_reused(notes):
+    assert [note.id for note in notes.notes.values()] == [1, 2, 3, 4]
+    assert notes.delete_note_by_id(4).text == "work"
+    assert notes.delete_note_by_id(4) is None
+    assert notes.add_note("Later").id == 5
+    assert notes.get(2).text == "Buy milk"
+    assert notes.get(4) is None
+
+
+def test_id_references_touch_only_that_note(notes):
+    assert notes.edit_note("#3", new_text="Sign the contract")
+    assert notes.get(3).text == "Sign the contract"
+    assert notes.get(1).text == "Call the client"
+    assert not notes.edit_note("#9", new_text="x")
+    assert notes.delete_notes("#1") == 1
+    assert notes.delete_notes("#1") == 0
+    assert _texts(notes.search_tag("work")) == ["Sign the contract"]
+
+
+def test_pickle_keeps_ids(notes):
+    notes.delete_note_by_id(2)
+    loaded = pickle.loads(pickle.dumps(notes))
+    assert list(loaded.notes) == [1, 3, 4]
+    assert loaded.add_note("Next").id == 5
+    assert _texts(loaded.search_tag("work")) == ["Call the client", "Draft the contract"]
+
+
+def test_notes_without_ids_are_numbered():
+    book = NoteBook()
+    # A plain list, as older versions stored, and a duplicated id.
+    book.notes = [Note("old one"), Note("kept", None, 7), Note("old two"), Note("clash", None, 7)]
+    assert {note.text: note.id for note in book.notes.values()} == {"old one": 8, "kept": 7, "old two": 9, "clash": 10}
+    assert book.add_note("new").id == 11
+
+
+def test_note_commands_accept_ids(notes):
+    with inline_arguments(["#2", "Buy oat milk", "yes", "home, shop"]):
+        assert strip_colors(edit_note(notes)) == "Note(s) updated."
+    assert (notes.get(2).text, notes.get(2).tags) == ("Buy oat milk", ("home", "shop"))
+    with inline_arguments(["#2"]):
+        assert strip_colors(delete_note(notes)) == "Note(s) deleted."
+    with inline_arguments(["#2"]):
+        assert strip_colors(delete_note(notes)) == "Note not found."
+    assert len(notes) == 3
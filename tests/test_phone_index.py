@@ -0,0 +1,100 @@
+import pytest
+
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.phone_index import DEFAULT_COUNTRY_CODE, PhoneIndex, normalize_phone
+
+
+@pytest.mark.parametrize("phone", [
+    "+380501234567",
+    "+380 50 123 4567",
+    "+38 (050) 123-45-67",
+    "00380501234567",
+    "0501234567",
+    "050 123 45 67",
+    "050-123-45-67",
+    "(050) 123.45.67",
+    " 0501234567 ",
+    "380501234567",
+])
+def test_notations_of_one_number_normalize_alike(phone):
+    assert normalize_phone(phone) == "380501234567"
+
+
+@pytest.mark.parametrize("phone, expected", [
+    ("+1 555 010 9999", "15550109999"),
+    ("001-555-010-9999", "15550109999"),
+    ("050", "38050"),
+    ("0", DEFAULT_COUNTRY_CODE),
+    ("+", ""),
+    ("n/a", ""),
+])
+def test_other_numbers_and_prefixes(phone, expected):
+    assert normalize_phone(phone) == expected
+
+
+def test_trunk_prefix_gets_the_default_country_code():
+    assert DEFAULT_COUNTRY_CODE == "380"
+    assert normalize_phone("0671234567").startswith(DEFAULT_COUNTRY_CODE)
+    # A leading '+' means the number is already international.
+    assert normalize_phone("+0671234567") == "0671234567"
+
+
+@pytest.fixture
+def index():
+    index = PhoneIndex()
+    for key, phone in [
+        ("jane", "+380501234567"), ("olena", "050-123-45-67"), ("john", "0671234567"),
+        ("ivan", "0501112233"), ("bob", "+1 555 010 9999"), ("nobody", None), ("blank", " - "),
+    ]:
+        index.add(key, phone)
+    return index
+
+
+def test_exact_lookup_in_any_notation(index):
+    assert index.find("0501234567") == ["jane", "olena"]
+    assert index.find("+38 050 123 45 67") == ["jane", "olena"]
+    assert index.find("0999999999") == []
+
+
+def test_prefix_lookup_bisects_the_sorted_numbers(index):
+    assert index.prefix("050") == [("380501112233", "ivan"), ("380501234567", "jane"), ("380501234567", "olena")]
+    assert index.prefix("+38067") == [("380671234567", "john")]
+    assert index.prefix("+1") == [("15550109999", "bob")]
+    assert index.prefix("+4") == []
+    assert index.prefix("") == []
+    assert [key for _, key in index.prefix("+380")] == ["ivan", "jane", "olena", "john"]
+
+
+def test_prefix_order_is_kept_on_changes(index):
+    index.prefix("0")
+    index.add("petro", "0500000000")
+    index.remove("jane", "+380501234567")
+    index.remove("ghost", "0501234567")
+    assert [key for _, key in index.prefix("050")] == ["petro", "ivan", "olena"]
+    assert index.find("0501234567") == ["olena"]
+
+
+def test_shared_numbers_are_grouped(index):
+    assert index.duplicates() == [("380501234567", ["jane", "olena"])]
+    index.add("ivan2", "+380 50 111 22 33")
+    assert index.duplicates() == [("380501112233", ["ivan", "ivan2"]), ("380501234567", ["jane", "olena"])]
+    index.remove("olena", "050-123-45-67")
+    assert index.duplicates() == [("380501112233", ["ivan", "ivan2"])]
+    index.clear()
+    assert index.duplicates() == [] and index.find("0501112233") == []
+
+
+def test_contact_book_follows_phone_edits():
+    book = ContactBook()
+    book.add_contacts([Contact("Jane Doe", "+380501234567"), Contact("Olena Koval", "050 123 45 67")])
+    assert [c.name for c in book.find_by_phone("0501234567")] == ["Jane Doe", "Olena Koval"]
+    assert [(phone, [c.name for c in group]) for phone, group in book.duplicate_phones()] == [
+        ("380501234567", ["Jane Doe", "Olena Koval"]),
+    ]
+
+    book.edit_contact("Olena Koval", phone="0671234567")
+    assert book.duplicate_phones() == []
+    assert [c.name for c in book.search_phone_prefix("067")] == ["Olena Koval"]
+    book.delete_contact("Jane Doe")
+    assert book.find_by_phone("+380501234567") == []
@@ -0,0 +1,123 @@
+import io
+import json
+
+import pytest
+
+from cli.batch import run_batch
+from models.contact import Contact
+from services.contact_book import CONTACT_SCHEMA, ContactBook
+from services.note_book import NOTE_SCHEMA, NoteBook
+from services.query import compile_query, plan_query
+from storage.backends import PickleStorage
+
+CONTACTS = [
+    Contact("Jane Doe", "+380501234567", "jane@acme.com", "Kyiv", "1990-05-17"),
+    Contact("Jane Dow", "0671234567", "dow@example.com", None, "1985-01-02"),
+    Contact("John Smith", "0509876543", "john@acme.com", "Lviv", "1993-05-01"),
+    Contact("Joanna Lee", "0631112233", None, None, "1995-11-30"),
+    Contact("Doe Jane", "0970000000", "doe@acme.com", None, None),
+]
+
+
+@pytest.fixture
+def contacts():
+    book = ContactBook()
+    for contact in CONTACTS:
+        book.add_contact(Contact.from_dict(contact.to_dict()))
+    return book
+
+
+@pytest.fixture
+def notes():
+    book = NoteBook()
+    book.add_note("Call the client", ["urgent", "client"])
+    book.add_note("Draft the contract", ["urgent", "client"])
+    book.add_note("Buy milk", ["home"])
+    book.add_note("Plan the project", ["project", "urgent"])
+    return book
+
+
+def _names(contacts):
+    return [contact.name for contact in contacts]
+
+
+def _scanned(book, schema, text):
+    return plan_query(compile_query(text, schema), schema, lambda predicate: None, book._query_scan()).run()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('name:="Jane Doe"', ["Jane Doe"]),
+    ("name:jane", ["Doe Jane", "Jane Doe", "Jane Dow"]),
+    ("email:*@acme.com birthday:month=5", ["Jane Doe", "John Smith"]),
+    ("(name:jo* OR phone:050*) birthday:1990..1995 sort:-birthday limit:10", ["Joanna Lee", "John Smith", "Jane Doe"]),
+    ("phone:0501234567", ["Jane Doe"]),
+    ("birthday:<1990", ["Jane Dow"]),
+    ("jane -name:dow", ["Doe Jane", "Jane Doe"]),
+    ("NOT email:*@acme.com", ["Jane Dow", "Joanna Lee"]),
+])
+def test_contact_queries(contacts, text, expected):
+    assert _names(contacts.query(text)) == expected
+    assert _names(_scanned(contacts, CONTACT_SCHEMA, text)) == expected
+
+
+def test_exact_name_uses_the_name_index(contacts):
+    plan = contacts.explain('name:="Jane Doe"')
+    assert plan["access"].startswith("name")
+    assert plan["cost"] == 1
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("tag:urgent AND tag:client -text:draft", [1]),
+    ("tag:urgent tag:client", [1, 2]),
+    ("tag:proj*", [4]),
+    ("id:2..3", [2, 3]),
+    ('text:="buy milk"', [3]),
+])
+def test_note_queries(notes, text, expected):
+    assert [note.id for note in notes.query(text)] == expected
+    assert [note.id for note in _scanned(notes, NOTE_SCHEMA, text)] == expected
+
+
+def test_invalid_query_is_rejected(contacts):
+    with pytest.raises(ValueError):
+        contacts.query("(name:jane")
+
+
+def _run(tmp_path, lines):
+    storage = PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"))
+    out = io.StringIO()
+    try:
+        run_batch(lines, storage, out)
+    finally:
+        storage.close()
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_readme_queries_from_the_command_line(tmp_path):
+    records = _run(tmp_path, [
+        'add contact "Jane Doe" +380501234567 jane@acme.com "" 1990-05-17',
+        'add contact "Jane Dow" 0671234567 "" "" ""',
+        'add contact Doe 0970000000 "" "" ""',
+        'query contacts name:="Jane Doe"',
+        'add note "Call the client" "urgent, client"',
+        'add note "Draft the contract" "urgent, client"',
+        'query notes tag:urgent AND tag:client -text:draft',
+        'explain notes "tag:urgent AND tag:client -text:draft"',
+    ])
+    by_command = [(record["command"], record["status"], record["output"]) for record in records]
+
+    output = by_command[3][2]
+    assert by_command[3][1] == "ok"
+    assert "Jane Doe" in output and "Jane Dow" not in output and "1 contact(s) found." in output
+    assert "Call the client" in by_command[6][2] and "Draft" not in by_command[6][2]
+    assert by_command[7][1] == "ok" and "tag index" in by_command[7][2]
+
+
+def test_parse_keeps_the_arguments_as_typed():
+    from cli.command_handler import dispatcher
+
+    command, words, text = dispatcher.parse('query  contacts   name:="Jane Doe"  birthday:month=5')
+    assert command == "query contacts"
+    assert words == ["name:=Jane Doe", "birthday:month=5"]
+    assert text == 'name:="Jane Doe"  birthday:month=5'
+    assert dispatcher.parse("show contacts") == ("show contacts", [], "")
@@ -0,0 +1,188 @@
+import io
+from itertools import islice
+
+import pytest
+
+from cli.commands import list_contacts, list_notes
+from cli.prompts import inline_arguments, strip_colors
+from cli.render import (
+    CHUNK_ROWS, DEFAULT_PAGE_SIZE, MAX_COLUMN_WIDTH, ROW_OVERHEAD, SAMPLE_ROWS, PageOptions, RowCache, output_text,
+    page_footer, page_window, parse_page_options, stream_records, stream_table, write_output,
+)
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+
+
+@pytest.fixture
+def book():
+    book = ContactBook()
+    book.add_contacts([Contact(f"Contact {i:03}", f"0501234{i:03}") for i in range(45)])
+    return book
+
+
+CELL_CALLS = []
+
+
+def _cells(contact):
+    CELL_CALLS.append(contact.name)
+    return contact.name, contact.phone or ""
+
+
+def _other_cells(contact):
+    return (contact.name,)
+
+
+def _rows(text):
+    return [line.split()[1] for line in text.splitlines() if line.startswith("Contact")]
+
+
+def test_parse_page_options():
+    options = parse_page_options(["--page", "3", "--plain"])
+    assert (options.offset, options.limit, options.page, options.plain) == (2 * DEFAULT_PAGE_SIZE, DEFAULT_PAGE_SIZE, 3, True)
+    options = parse_page_options(["--offset", "5", "--limit", "10"])
+    assert (options.offset, options.limit, options.page) == (5, 10, None)
+    options = parse_page_options(["--from", "b", "--to", "c"], ranges=True)
+    assert (options.first, options.last) == ("b", "c")
+
+
+@pytest.mark.parametrize("args", [
+    ["--page", "0"], ["--page", "2", "--offset", "3"], ["--limit", "-1"], ["--limit"], ["--sort"], ["--from", "x"],
+])
+def test_invalid_page_options(args):
+    with pytest.raises(ValueError):
+        parse_page_options(args)
+
+
+def test_page_window_and_footer():
+    assert page_window(45, PageOptions()) == (0, 45)
+    assert page_footer(45, PageOptions()) == ""
+    assert page_window(45, PageOptions(40, 20, page=3)) == (40, 45)
+    assert page_footer(45, PageOptions(40, 20, page=3)) == "Page 3 of 3, rows 41-45 of 45.\n"
+    assert page_footer(45, PageOptions(10, 5)) == "Rows 11-15 of 45.\n"
+    assert page_window(45, PageOptions(50, 5)) == (45, 45)
+
+
+def test_stream_table_yields_chunks_lazily():
+    produced = []
+    total = SAMPLE_ROWS + CHUNK_ROWS
+
+    def rows():
+        for i in range(total):
+            produced.append(i)
+            yield [f"row {i}", "x" * (MAX_COLUMN_WIDTH + 10 if i == 5 else 3)]
+
+    chunks = stream_table(rows(), ["Name", "Value"], ["", ""], color=False)
+    header = next(chunks)
+    assert header.splitlines()[0].split() == ["Name", "Value"]
+    first = next(chunks)
+    assert len(first.splitlines()) == CHUNK_ROWS
+    # Only the rows sampled for the column widths were produced, not the whole table.
+    assert len(produced) == SAMPLE_ROWS
+    # A cell wider than the cap is cut with an ellipsis.
+    assert "x" * (MAX_COLUMN_WIDTH - 1) + "…" in first
+    assert sum(len(chunk.splitlines()) for chunk in chunks) == total - CHUNK_ROWS
+
+
+def test_colored_table_has_a_frame():
+    text = "".join(stream_table([["a", "b"], ["c", "d"]], ["H1", "H2"], ["", ""], color=True))
+    lines = strip_colors(text).splitlines()
+    assert lines[0].startswith("╒") and lines[-1].startswith("╘")
+    assert len([line for line in lines if line.startswith("│")]) == 3
+
+
+def test_show_contacts_pages(book):
+    with inline_arguments(["--page", "3", "--plain"]):
+        text = output_text(list_contacts(book))
+    assert _rows(text) == [f"{i:03}" for i in range(40, 45)]
+    assert text.endswith("Page 3 of 3, rows 41-45 of 45.")
+
+    with inline_arguments(["--offset", "2", "--limit", "3", "--plain"]):
+        assert _rows(output_text(list_contacts(book))) == ["002", "003", "004"]
+    with inline_arguments(["--page", "9"]):
+        assert strip_colors(output_text(list_contacts(book))) == "No contacts on this page (45 in total)."
+    with inline_arguments(["--from", "Contact 010", "--to", "Contact 012", "--plain"]):
+        assert _rows(output_text(list_contacts(book))) == ["010", "011", "012"]
+
+
+def test_show_contacts_is_rendered_lazily(book):
+    with inline_arguments(["--plain"]):
+        result = list_contacts(book)
+    assert not isinstance(result, str)
+    assert len(_rows("".join(islice(result, 2)))) == 45
+
+
+def test_show_notes_pages():
+    notes = NoteBook()
+    for i in range(25):
+        notes.add_note(f"Note {i:02}", ["tag"])
+    with inline_arguments(["--page", "2", "--plain"]):
+        text = output_text(list_notes(notes))
+    assert [line.split()[2] for line in text.splitlines() if line.startswith("#")] == [f"{i:02}" for i in range(20, 25)]
+    assert text.endswith("Page 2 of 2, rows 21-25 of 25.")
+
+
+def test_write_output_stops_on_ctrl_c():
+    def chunks():
+        yield "first\n"
+        raise KeyboardInterrupt
+
+    out = io.StringIO()
+    write_output(chunks(), out)
+    assert out.getvalue() == "first\n\n"
+    write_output("message", out)
+    assert out.getvalue().endswith("message\n")
+
+
+def test_row_cache_reuses_unchanged_rows(book):
+    cache = RowCache()
+    contacts = list(book.contacts.values())
+    CELL_CALLS.clear()
+    first = "".join(stream_records(contacts, _cells, ["Name", "Phone"], ["", ""], color=False, cache=cache))
+    assert len(CELL_CALLS) == 45 and len(cache) == 45
+    second = "".join(stream_records(contacts, _cells, ["Name", "Phone"], ["", ""], color=False, cache=cache))
+    assert second == first and len(CELL_CALLS) == 45
+
+    # An edit stamps a new revision, so only that row is built again.
+    book.edit_contact("Contact 003", phone="0509999999")
+    edited = "".join(stream_records(book.contacts.values(), _cells, ["Name", "Phone"], ["", ""], color=False, cache=cache))
+    assert CELL_CALLS[45:] == ["Contact 003"]
+    assert "0509999999" in edited and "0501234003" not in edited
+
+
+def test_row_cache_keys_rows_by_cell_function_and_layout(book):
+    cache = RowCache()
+    contact = next(iter(book.contacts.values()))
+    revision, row = cache.row(contact, _cells)
+    assert cache.row(contact, _cells)[1] is row
+    assert cache.row(contact, _other_cells)[1][1] == (contact.name,)
+
+    layout = cache.layout([20, 12], ["", ""], False)
+    assert cache.layout((20, 12), ("", ""), False) is layout
+    calls = []
+
+    def render(cells, widths):
+        calls.append(cells)
+        return " ".join(cells) + "\n"
+
+    revision, row = cache.row(contact, _cells)
+    text = cache.text(revision, row, layout, render)
+    assert cache.text(revision, cache.row(contact, _cells)[1], layout, render) == text
+    assert len(calls) == 1
+    cache.text(revision, cache.row(contact, _cells)[1], cache.layout([30, 12], ["", ""], False), render)
+    assert len(calls) == 2
+
+
+def test_row_cache_skips_unstored_records_and_keeps_to_its_budget(book):
+    cache = RowCache(budget=10 * ROW_OVERHEAD)
+    revision, row = cache.row(Contact("Loose Contact", "0501234567"), _cells)
+    assert revision == 0 and row[1] == ("Loose Contact", "0501234567") and len(cache) == 0
+
+    contacts = list(book.contacts.values())
+    for contact in contacts:
+        cache.row(contact, _cells)
+    assert cache.size <= cache.budget and len(cache) == 10
+    # The least recently used rows were evicted.
+    assert contacts[0].revision not in cache._rows and contacts[-1].revision in cache._rows
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
@@ -0,0 +1,141 @@
+import asyncio
+import threading
+
+import pytest
+
+from benchmarks import load_test
+from models.contact import Contact
+from server.client import RemoteError, RemoteStorage
+from server.server import BookServer
+from storage.backends import PickleStorage, SQLiteStorage
+
+
+def _factory(tmp_path, backend):
+    if backend == "sqlite":
+        return lambda: SQLiteStorage(str(tmp_path / "memomate.db"))
+    return lambda: PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl"))
+
+
+@pytest.mark.parametrize("backend", ["pickle", "sqlite"])
+def test_reads_alongside_a_batched_write(tmp_path, backend):
+    factory = _factory(tmp_path, backend)
+
+    async def scenario():
+        server = BookServer(factory)
+        await server.start()
+        try:
+            await server.call("contacts", "add_contacts", [[Contact(f"Seed {i}", f"05000000{i:02}") for i in range(10)]], {})
+            batches = server.batches
+            calls = []
+            for i in range(20):
+                calls.append(server.call("contacts", "add_contact", [Contact(f"Added {i}", "0671234567")], {}))
+                calls.append(server.call("contacts", "find", [f"Seed {i % 10}"], {}))
+                calls.append(server.call("contacts", "__len__", [], {}))
+            results = await asyncio.gather(*calls)
+            # Writes queued while the first was waiting share batches.
+            assert server.batches - batches < 20
+            final = await server.call("contacts", "__len__", [], {})
+        finally:
+            await server.stop()
+        return results, final
+
+    results, final = asyncio.run(scenario())
+    writes, finds, lengths = results[0::3], results[1::3], results[2::3]
+    assert writes == [True] * 20
+    assert [found["$contact"]["name"] for found in finds] == [f"Seed {i % 10}" for i in range(20)]
+    # Every read saw the book either before or after each write, never a partial state.
+    assert all(10 <= length <= 30 for length in lengths) and lengths == sorted(lengths)
+    assert final == 30
+
+    storage = factory()
+    try:
+        assert len(storage.contact_book) == 30
+        assert storage.contact_book.find("Added 19").phone == "0671234567"
+    finally:
+        storage.close()
+
+
+def test_unknown_book_and_method_are_rejected(tmp_path):
+    async def scenario():
+        server = BookServer(_factory(tmp_path, "pickle"))
+        await server.start()
+        try:
+            for book, method in [("calendar", "find"), ("contacts", "clear")]:
+                with pytest.raises(ValueError):
+                    await server.call(book, method, [], {})
+        finally:
+            await server.stop()
+
+    asyncio.run(scenario())
+
+
+@pytest.fixture
+def served(tmp_path):
+    address = "unix:" + str(tmp_path / "books.sock")
+    server = BookServer(_factory(tmp_path, "pickle"))
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+    task = loop.create_task(server.serve(address, ready=ready.set))
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(10)
+    yield address
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join(10)
+    loop.close()
+    assert server.requests > 0
+
+
+def test_remote_storage_round_trip(served):
+    remote = RemoteStorage(served)
+    try:
+        contacts = remote.contact_book
+        assert contacts.add_contact(Contact("Jane Doe", "0501234567", "jane@example.com"))
+        duplicate = Contact("Jane Doe", "0670000000")
+        assert contacts.add_contacts([Contact("John Roe"), duplicate]) == [duplicate]
+        assert contacts.find("jane doe").email == "jane@example.com"
+        assert [c.name for c in contacts.search_contacts("doe")] == ["Jane Doe"]
+        assert len(contacts) == 2
+
+        note = remote.note_book.add_note("Call Jane about the lease", ["home"])
+        assert remote.note_book.get(note.id).tags == ("home",)
+        assert [n.text for n in remote.note_book.search_tag("home")] == [note.text]
+
+        with pytest.raises(ValueError, match="Unknown method"):
+            contacts.clear()
+        with pytest.raises(AttributeError):
+            contacts._contacts
+    finally:
+        remote.close()
+
+    # A second client sees the first one's changes.
+    other = RemoteStorage(served)
+    try:
+        assert other.contact_book.find("John Roe") is not None
+    finally:
+        other.close()
+
+
+def test_remote_error_for_server_failures(served):
+    remote = RemoteStorage(served)
+    try:
+        with pytest.raises(RemoteError, match="TypeError"):
+            remote.contact_book.find()
+    finally:
+        remote.close()
+
+
+@pytest.mark.parametrize("storage", ["pickle", "sqlite"])
+def test_load_test_runs(storage):
+    result = load_test.run(clients=4, requests=15, contacts=100, writes=0.3, storage=storage, tcp=False, seed=3)
+    assert result["requests"] == 60
+    assert result["reads"]["count"] + result["writes"]["count"] == 60
+    assert result["writes"]["count"] > 0
+    assert result["requests_per_second"] > 0
@@ -0,0 +1,97 @@
+import random
+
+import pytest
+
+from models.contact import Contact
+from services.contact_book import ContactBook
+from services.note_book import NoteBook
+from services.sorted_index import SortedIndex, prefix_end
+from storage.sqlite_backend import SQLiteNoteBook, connect
+
+
+def test_sorted_index_matches_a_sorted_list(monkeypatch):
+    monkeypatch.setattr("services.sorted_index.CHUNK_SIZE", 8)
+    rng = random.Random(3)
+    index = SortedIndex(rng.sample(range(1000), 100))
+    expected = sorted(index)
+    for _ in range(2000):
+        key = rng.randrange(1000)
+        if key in expected:
+            assert index.remove(key)
+            expected.remove(key)
+        else:
+            index.add(key)
+            expected.append(key)
+            expected.sort()
+    assert not index.remove(-1)
+
+    assert list(index) == expected and len(index) == len(expected)
+    assert list(index.islice(10, 40)) == expected[10:40]
+    assert list(index.islice(len(expected) - 3)) == expected[-3:]
+    assert list(index.irange(200, 300)) == [key for key in expected if 200 <= key < 300]
+    start, stop = index.window(200, 300)
+    assert expected[start:stop] == [key for key in expected if 200 <= key < 300]
+    assert index.rank(expected[5]) == 5 and index.rank(expected[5], right=True) == 6
+
+
+def test_prefix_end():
+    assert "petrenko" < prefix_end("p") < "q"
+
+
+@pytest.fixture
+def contacts():
+    book = ContactBook()
+    for name in ("Olena", "maria", "Petro", "Andriy", "Pavlo", "Zoya"):
+        book.add_contact(Contact(name=name))
+    return book
+
+
+def _names(contacts):
+    return [contact.name for contact in contacts]
+
+
+def test_contact_order_follows_changes(contacts):
+    assert _names(contacts.iter_sorted()) == ["Andriy", "maria", "Olena", "Pavlo", "Petro", "Zoya"]
+    contacts.edit_contact("Zoya", name="Bohdan")
+    contacts.delete_contact("Olena")
+    assert _names(contacts.iter_sorted(1, 3)) == ["Bohdan", "maria"]
+    assert _names(contacts.iter_sorted(start=3)) == ["Pavlo", "Petro"]
+
+
+def test_contact_range(contacts):
+    start, stop = contacts.sorted_range("M", "P")
+    assert _names(contacts.iter_sorted(start, stop)) == ["maria", "Olena", "Pavlo", "Petro"]
+    assert contacts.sorted_range("X", "Y")[0] == contacts.sorted_range("X", "Y")[1]
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def notes(request, tmp_path):
+    if request.param == "memory":
+        book = NoteBook()
+    else:
+        conn = connect(str(tmp_path / "memomate.db"))
+        request.addfinalizer(conn.close)
+        book = SQLiteNoteBook(conn)
+    book.add_note("call Mom", ["home"])
+    book.add_note("Buy milk", ["shop", "home"])
+    book.add_note("buy bread", ["shop"])
+    book.add_note("Archive old mail", ["work"])
+    return book
+
+
+def _texts(notes):
+    return [note.text for note in notes]
+
+
+def test_note_search_is_in_text_order(notes):
+    assert _texts(notes.search_notes("home")) == ["Buy milk", "call Mom"]
+    assert _texts(notes.search_notes("bu")) == ["buy bread", "Buy milk"]
+    assert notes.search_notes("nothing") == []
+
+
+def test_note_order_follows_edits(notes):
+    note = notes.search_notes("mom")[0]
+    assert notes.edit_note_by_id(note.id, "Answer Mom", ["home"])
+    assert _texts(notes.search_notes("home")) == ["Answer Mom", "Buy milk"]
+    start, stop = notes.sorted_range("b", "c")
+    assert _texts(notes.iter_sorted(start, stop)) == ["buy bread", "Buy milk"]
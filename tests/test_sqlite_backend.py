@@ -0,0 +1,146 @@
+import io
+import json
+import random
+
+import pytest
+
+from benchmarks.data import generate_contacts
+from cli.batch import run_batch
+from models.contact import Contact
+from services.note_book import NoteBook
+from storage.backends import PickleStorage, SQLiteStorage
+from storage.migrate import migrate
+from storage.sqlite_backend import SQLiteContactBook, SQLiteNoteBook, connect
+
+SCRIPT = [
+    'add contact "Jane Doe" +380501234567 jane@acme.com "Kyiv, Main St 1" 1990-05-17',
+    'add contact "John Roe" 0671234567 "" "Lviv" ""',
+    'add contact "Olena Koval" 0501234567 olena@example.com "" 1988-02-29',
+    'add contact "jane doe" 0970000000 "" "" ""',
+    'search contact doe',
+    'search contact 067',
+    'lookup phone 050123',
+    'duplicate phones',
+    'edit contact "John Roe" email john@roe.com',
+    'edit contact "Olena Koval" name "Olena Kovalenko"',
+    'show birthday "Jane Doe"',
+    'query contacts "phone:+380501234567 OR name:roe"',
+    'delete contact "Jane Doe"',
+    'show contacts',
+    'add note "Buy milk and bread" "home, shopping"',
+    'add note "Milk the cow before the meeting" farm',
+    'add note "Call mom about bread" home',
+    'add note "Quarterly meeting notes" work',
+    'search note milk',
+    'search note home',
+    'search note "bread milk" ranked',
+    'search note "mee* bread" ranked',
+    'edit note #2 "Feed the cow" no',
+    'delete note #3',
+    'list tags',
+    'show notes',
+    'query notes "tag:home OR text:cow"',
+]
+
+
+def _run_script(storage, lines):
+    out = io.StringIO()
+    try:
+        run_batch(lines, storage, out)
+    finally:
+        storage.close()
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+def test_command_scripts_give_the_same_output_on_both_backends(tmp_path):
+    pickled = _run_script(PickleStorage(str(tmp_path / "addressbook.pkl"), str(tmp_path / "notes.pkl")), SCRIPT)
+    sqlite = _run_script(SQLiteStorage(str(tmp_path / "memomate.db")), SCRIPT)
+    assert len(pickled) == len(SCRIPT)
+    # Only the second "Jane Doe" is refused.
+    assert [record["line"] for record in pickled if record["status"] != "ok"] == [4]
+    for expected, actual in zip(pickled, sqlite):
+        assert actual == expected
+
+    # Ranked scores are real BM25 scores, not FTS5's floored ones.
+    ranked = [record["output"] for record in sqlite if SCRIPT[record["line"] - 1].endswith(" ranked")]
+    assert len(ranked) == 2
+    assert all(output.startswith("[") and "[0.00]" not in output for output in ranked)
+
+
+@pytest.fixture
+def contacts():
+    book = SQLiteContactBook(connect(":memory:"))
+    book.add_contacts([
+        Contact("Jane Doe", "+380501234567", "Jane@Acme.com", "Kyiv", "1990-05-17"),
+        Contact("John Roe", "0671234567"),
+        Contact("Olena Koval", "050 123 4567", None, None, "1988-02-29"),
+    ])
+    return book
+
+
+def test_contact_book_lookups(contacts):
+    assert len(contacts) == 3
+    assert contacts.find("jane doe").email == "Jane@Acme.com"
+    assert not contacts.add_contact(Contact("JANE DOE"))
+    assert [c.name for c in contacts.find_by_phone("0501234567")] == ["Jane Doe", "Olena Koval"]
+    assert [c.name for c in contacts.search_phone_prefix("+38067")] == ["John Roe"]
+    assert [(phone, [c.name for c in group]) for phone, group in contacts.duplicate_phones()] == [
+        ("380501234567", ["Jane Doe", "Olena Koval"]),
+    ]
+    assert [c.name for c in contacts.search_contacts("acme")] == ["Jane Doe"]
+    assert [c.name for c, _ in contacts.fuzzy_find("Jane Do")] == ["Jane Doe"]
+    assert [c.name for c in contacts.sorted_contacts()] == ["Jane Doe", "John Roe", "Olena Koval"]
+
+
+def test_contact_book_changes(contacts):
+    assert contacts.edit_contact("John Roe", name="Johnny Roe", phone="0991112233")
+    assert contacts.find("John Roe") is None
+    assert [c.name for c in contacts.find_by_phone("+380991112233")] == ["Johnny Roe"]
+    assert [c.name for c in contacts.search_contacts("johnny")] == ["Johnny Roe"]
+    assert contacts.delete_contact("Jane Doe").name == "Jane Doe"
+    assert contacts.search_contacts("acme") == []
+    assert [c.name for c in contacts.find_by_phone("0501234567")] == ["Olena Koval"]
+
+
+def test_ranked_search_matches_the_in_memory_book():
+    rng = random.Random(5)
+    words = ["milk", "bread", "meeting", "call", "mom", "project", "kickoff", "report", "cow", "invoice"]
+    memory, sqlite = NoteBook(), SQLiteNoteBook(connect(":memory:"))
+    for _ in range(200):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(1, 12)))
+        memory.add_note(text)
+        sqlite.add_note(text)
+
+    queries = ["milk", "bread milk", '"call mom"', "meet* report", '"project kickoff" invoice', "absent"]
+    queries += [" ".join(rng.sample(words, 3)) for _ in range(20)]
+    for query in queries:
+        expected = memory.search_ranked(query, 10)
+        actual = sqlite.search_ranked(query, 10)
+        assert [score for _, score in actual] == pytest.approx([score for _, score in expected])
+        assert all(score > 0 for _, score in actual)
+        # Notes with equal scores may come in either order.
+        assert {(n.id, round(s, 9)) for n, s in actual} == {(n.id, round(s, 9)) for n, s in expected}
+
+
+def test_migrate_copies_pickled_books(tmp_path):
+    contacts_path, notes_path, db_path = (str(tmp_path / name) for name in ("addressbook.pkl", "notes.pkl", "memomate.db"))
+    source = PickleStorage(contacts_path, notes_path)
+    source.contact_book.add_contacts(generate_contacts(50, 2))
+    source.note_book.add_note("Buy milk", ["home"])
+    source.note_book.add_note("Kickoff notes", ["work", "project"])
+    source.note_book.delete_note_by_id(1)
+    expected_contacts = [c.to_dict() for c in source.contact_book.sorted_contacts()]
+    expected_notes = [n.to_dict() for n in source.note_book.sorted_notes()]
+    source.close()
+
+    assert migrate(contacts_path, notes_path, db_path) == (50, 1)
+    target = SQLiteStorage(db_path)
+    try:
+        assert [c.to_dict() for c in target.contact_book.sorted_contacts()] == expected_contacts
+        assert [n.to_dict() for n in target.note_book.sorted_notes()] == expected_notes
+        assert target.note_book.get(2).tags == ("work", "project")
+    finally:
+        target.close()
+
+    # Running it again does not duplicate contacts.
+    assert migrate(contacts_path, notes_path, db_path)[0] == 0
@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from services.text_index import FullTextIndex, parse_query, tokenize
+
+DOCS = {
+    1: "Project kickoff meeting with the client",
+    2: "Meeting notes: the project budget",
+    3: "Buy milk and bread",
+    4: "Kickoff of the second project, project plan attached",
+    5: "Client meeting moved to Friday",
+}
+
+
+@pytest.fixture
+def index():
+    index = FullTextIndex()
+    for doc, text in DOCS.items():
+        index.add(doc, text)
+    return index
+
+
+def _docs(results):
+    return [doc for doc, _ in results]
+
+
+def test_tokenize_and_parse_query():
+    assert tokenize("Project-Kickoff, STRAßE") == ["project", "kickoff", "strasse"]
+    assert parse_query('meet* "Project Kickoff" client *') == [
+        ("prefix", "meet"), ("phrase", ["project", "kickoff"]), ("term", "client"),
+    ]
+
+
+def test_terms_are_ranked_by_bm25(index):
+    results = index.search("project")
+    assert _docs(results)[0] == 4
+    assert set(_docs(results)) == {1, 2, 4}
+    assert [score for _, score in results] == sorted((score for _, score in results), reverse=True)
+
+
+def test_prefix_terms(index):
+    assert set(_docs(index.search("meet*"))) == {1, 2, 5}
+
+
+def test_phrases_are_required(index):
+    assert _docs(index.search('"project kickoff" client')) == [1]
+    assert index.search('"kickoff project"') == []
+
+
+@pytest.mark.parametrize("limit", [0, -1])
+def test_no_results_without_a_limit(index, limit):
+    assert index.search("project", limit=limit) == []
+
+
+def test_no_results_for_unknown_terms(index):
+    assert index.search("nothing") == []
+    assert FullTextIndex().search("project") == []
+
+
+def test_top_results_match_a_full_ranking():
+    rng = random.Random(5)
+    words = [f"w{i}" for i in range(40)]
+    index = FullTextIndex()
+    for doc in range(300):
+        index.add(doc, " ".join(rng.choices(words, weights=range(40, 0, -1), k=rng.randint(3, 20))))
+    for query in ("w1 w7 w30", "w0 w39", "w2* w11"):
+        full = index.search(query, limit=1000)
+        for limit in (1, 5, 20):
+            assert [score for _, score in index.search(query, limit)] == pytest.approx(
+                [score for _, score in full[:limit]]
+            )
+
+
+def test_remove_and_readd(index):
+    index.remove(3, DOCS[3])
+    assert index.search("milk") == []
+    assert len(index) == 4
+
+    index.remove(1, DOCS[1])
+    index.add(1, "Milk delivery")
+    assert _docs(index.search("milk")) == [1]
+    assert 1 not in _docs(index.search("kickoff"))
+    assert index.containing("ilk") == {1}
@@ -0,0 +1,74 @@
+import random
+
+import pytest
+
+from benchmarks.data import generate_contacts
+from models.contact import Contact
+from services.contact_book import ContactBook, _matches_search
+from services.trigram_index import TrigramIndex, trigrams
+
+
+def _scan(book, query):
+    query = query.lower()
+    return [contact.name for contact in book.contacts.values() if _matches_search(contact, query)]
+
+
+@pytest.fixture(scope="module")
+def book():
+    book = ContactBook()
+    book.add_contacts(generate_contacts(2000, 7))
+    return book
+
+
+def test_trigrams():
+    assert trigrams("abcd") == {"abc", "bcd"}
+    assert trigrams("ab") == set()
+
+
+def test_random_queries_match_the_scan(book):
+    rng = random.Random(11)
+    contacts = list(book.contacts.values())
+    queries = ["", "a", "ko", "380", "050", "@", "gmail", ".com", "-05-", "zzzq"]
+    for _ in range(300):
+        contact = rng.choice(contacts)
+        field = rng.choice([f for f in (contact.name, contact.phone, contact.email, contact.address, contact.birthday) if f])
+        start = rng.randrange(len(field))
+        queries.append(field[start:start + rng.randint(1, 8)])
+    for query in queries + [query.upper() for query in queries]:
+        assert [contact.name for contact in book.search_contacts(query)] == _scan(book, query), query
+
+
+def test_results_follow_edits():
+    book = ContactBook()
+    book.add_contacts(generate_contacts(300, 3))
+    book.search_contacts("abc")
+    rng = random.Random(5)
+    for i, contact in enumerate(rng.sample(list(book.contacts.values()), 60)):
+        if i % 3 == 0:
+            book.delete_contact(contact.name)
+        elif i % 3 == 1:
+            book.edit_contact(contact.name, email=f"moved{i}@example.org")
+        else:
+            book.edit_contact(contact.name, name=f"{contact.name} Renamed")
+    book.add_contact(Contact("New Example", "0501112233", "new@example.org"))
+    for query in ("example.org", "renamed", "moved1", "new ex", "050"):
+        assert [contact.name for contact in book.search_contacts(query)] == _scan(book, query)
+
+
+def test_common_queries_are_left_to_a_scan():
+    index = TrigramIndex(lambda doc: [doc])
+    index.add_many((str(i), f"item {i}") for i in range(10))
+    index.add("rare", "rare item")
+    assert index.search("ite") is None
+    assert index.search("rar") == ["rare item"]
+    assert index.search("xyz") == []
+    assert index.estimate("tem") == 11
+
+
+def test_structured_query_on_a_common_fragment():
+    book = ContactBook()
+    for name in ("Olena Koval", "Ivan Kovalenko", "Petro Kovach", "Maria Lee"):
+        book.add_contact(Contact(name))
+    # The planner picks the trigram index, which leaves a fragment this common to a scan.
+    assert book.explain("name:kov")["access"] == "trigram index: 'kov'"
+    assert [contact.name for contact in book.query("name:kov")] == ["Ivan Kovalenko", "Olena Koval", "Petro Kovach"]
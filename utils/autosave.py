@@ -0,0 +1,85 @@
+import threading
+import time
+from typing import Callable, Iterable
+
+from utils.journal import JournaledStore
+
+# A changed book is snapshotted once this many changes are not in its snapshot, or once its oldest
+# such change is this many seconds old.
+AUTOSAVE_CHANGES = 1000
+AUTOSAVE_SECONDS = 30.0
+
+
+class Autosaver:
+    """
+    Background thread that snapshots changed books.
+
+    Every change already reaches the journal as it happens; the snapshots keep the journals short,
+    so loading stays fast. A book is snapshotted after ``changes`` unsaved changes or ``seconds``
+    after its first unsaved change, whichever comes first; unchanged books are skipped at the cost
+    of comparing two numbers.
+
+    The snapshot is only taken while no command is using the books: the thread tries the shared
+    ``lock`` (held by the storage while a command runs) and otherwise retries on its next check,
+    so it never sees a half-applied change and never makes the prompt wait.
+
+    Args:
+        stores (Callable[[], Iterable[JournaledStore]]): Returns the stores to watch.
+        lock (threading.RLock): Held while commands use the books.
+        changes (int): Unsaved changes that trigger a snapshot.
+        seconds (float): Age of the oldest unsaved change that triggers a snapshot.
+    """
+
+    def __init__(
+        self, stores: Callable[[], Iterable[JournaledStore]], lock: threading.RLock,
+        changes: int = AUTOSAVE_CHANGES, seconds: float = AUTOSAVE_SECONDS,
+    ):
+        self.stores = stores
+        self.lock = lock
+        self.changes = changes
+        self.seconds = seconds
+        self.interval = min(1.0, seconds / 4)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        """
+        Start the thread, unless it is running.
+        """
+
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name="autosave", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the thread, waiting for a check in progress.
+        """
+
+        if self._thread is not None:
+            self._stopped.set()
+            self._thread.join()
+            self._thread = None
+
+    def due(self, store: JournaledStore) -> bool:
+        """
+        Return whether a store should be snapshotted now.
+        """
+
+        if not store.dirty:
+            return False
+        since = store.dirty_since
+        return store.unsaved >= self.changes or (since is not None and time.monotonic() - since >= self.seconds)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            if not self.lock.acquire(blocking=False):
+                continue
+            try:
+                for store in self.stores():
+                    # A snapshot still being written is left to finish first.
+                    if store.poll() and self.due(store):
+                        store.save()
+            finally:
+                self.lock.release()
@@ -0,0 +1,283 @@
+import csv
+import json
+import os
+import re
+from datetime import date
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from models.contact import Contact
+from utils.validators import is_valid_birthday, is_valid_email, is_valid_phone
+
+BATCH_SIZE = 1000
+_VCARD_SEPARATOR = re.compile(r"(?<!\\);")
+FORMATS = {".csv": "csv", ".vcf": "vcard", ".vcard": "vcard", ".jsonl": "jsonl", ".ndjson": "jsonl"}
+
+
+class ImportResult:
+    """
+    Summary of a contact import.
+
+    Attributes:
+        added (int): Number of contacts added.
+        rejected (int): Number of rows rejected.
+        report_path (Optional[str]): CSV file listing every rejected row with its reason, if any.
+        sample (List[Tuple[int, str, str]]): The first few rejections as (row, name, reason).
+    """
+
+    SAMPLE_SIZE = 10
+
+    def __init__(self, report_path: Optional[str]):
+        self.added = 0
+        self.rejected = 0
+        self.report_path = report_path
+        self.sample: List[Tuple[int, str, str]] = []
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    """
+    Returns the file format given explicitly or implied by the file extension.
+
+    Args:
+        path (str): The file path.
+        fmt (Optional[str]): "csv", "vcard" or "jsonl"; inferred from the extension if omitted.
+
+    Returns:
+        str: The format name.
+    """
+
+    if fmt:
+        fmt = fmt.lower()
+        if fmt in FORMATS.values():
+            return fmt
+        raise ValueError(f"Unsupported format '{fmt}'. Use csv, vcard or jsonl.")
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Cannot infer format from '{path}'. Use a .csv, .vcf or .jsonl file.")
+    return FORMATS[extension]
+
+
+def read_csv(f: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yields (row number, fields) from a CSV file with a header row naming the contact fields.
+    """
+
+    reader = csv.DictReader(f)
+    reader.fieldnames = [name.strip().lower() for name in reader.fieldnames or []]
+    for row in reader:
+        yield reader.line_num, row
+
+
+def read_jsonl(f: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yields (line number, fields) from a JSON-lines file with one contact object per line.
+    """
+
+    for line_number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else {"_error": "Invalid JSON object"}
+
+
+def _vcard_unescape(value: str) -> str:
+    return value.replace("\\n", " ").replace("\\N", " ").replace("\\,", ",").replace("\\;", ";").replace("\\\\", "\\")
+
+
+def _vcard_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace(",", "\\,").replace(";", "\\;").replace("\n", "\\n")
+
+
+def _vcard_lines(f: TextIO) -> Iterator[Tuple[int, str]]:
+    """
+    Yields unfolded vCard content lines with the number of the line they start on.
+    """
+
+    current, start = None, 0
+    for line_number, line in enumerate(f, 1):
+        line = line.rstrip("\r\n")
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield start, current
+        current, start = line, line_number
+    if current is not None:
+        yield start, current
+
+
+def read_vcard(f: TextIO) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """
+    Yields (line number, fields) for each card of a vCard file (FN, TEL, EMAIL, ADR and BDAY are read).
+    """
+
+    card, start = None, 0
+    for line_number, line in _vcard_lines(f):
+        name, _, value = line.partition(":")
+        prop = name.split(";")[0].upper()
+        if "." in prop:
+            prop = prop.split(".", 1)[1]
+
+        if prop == "BEGIN" and value.upper() == "VCARD":
+            card, start = {}, line_number
+        elif prop == "END" and card is not None:
+            yield start, card
+            card = None
+        elif card is None:
+            continue
+        elif prop == "FN":
+            card["name"] = _vcard_unescape(value)
+        elif prop == "TEL" and "phone" not in card:
+            card["phone"] = value.replace(" ", "").replace("-", "").replace("(", "").replace(")", "")
+        elif prop == "EMAIL" and "email" not in card:
+            card["email"] = value
+        elif prop == "ADR" and "address" not in card:
+            parts = [_vcard_unescape(part) for part in _VCARD_SEPARATOR.split(value)]
+            card["address"] = ", ".join(part for part in parts if part)
+        elif prop == "BDAY":
+            digits = value.replace("-", "")
+            card["birthday"] = f"{digits[:4]}-{digits[4:6]}-{digits[6:8]}" if len(digits) == 8 else value
+
+
+READERS = {"csv": read_csv, "jsonl": read_jsonl, "vcard": read_vcard}
+
+
+def validate(rows: Iterable[Tuple[int, Dict[str, Any]]]) -> Iterator[Tuple[int, Dict[str, Any], Optional[Contact], str]]:
+    """
+    Validates raw rows with the same rules as the interactive prompts.
+
+    Yields:
+        Tuple[int, Dict, Optional[Contact], str]: (row number, raw fields, contact or None, rejection reason).
+    """
+
+    today = date.today()
+    for row_number, fields in rows:
+        if "_error" in fields:
+            yield row_number, fields, None, fields["_error"]
+            continue
+
+        values = {field: str(fields.get(field) or "").strip() for field in Contact.FIELDS}
+        if not values["name"]:
+            reason = "Name is required"
+        elif not is_valid_phone(values["phone"]):
+            reason = "Invalid phone number"
+        elif values["email"] and not is_valid_email(values["email"]):
+            reason = "Invalid email address"
+        elif values["birthday"] and not is_valid_birthday(values["birthday"], today):
+            reason = "Invalid birthday"
+        else:
+            yield row_number, fields, Contact(**{k: v or None for k, v in values.items()}), ""
+            continue
+        yield row_number, fields, None, reason
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[List]:
+    """
+    Splits an iterable into lists of at most ``size`` items.
+    """
+
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_contacts(contact_book, path: str, fmt: Optional[str] = None, batch_size: int = BATCH_SIZE) -> ImportResult:
+    """
+    Streams contacts from a CSV, vCard or JSON-lines file into the contact book.
+
+    Rows are read lazily and added in batches through ``add_contacts``, so memory stays bounded and indexes
+    and persistence are updated once per batch. Rejected rows (invalid fields or duplicate names) are
+    written to ``<path>.rejected.csv``.
+
+    Args:
+        contact_book (ContactBook): The book to import into.
+        path (str): The file to import.
+        fmt (Optional[str]): "csv", "vcard" or "jsonl"; inferred from the extension if omitted.
+        batch_size (int): Number of contacts inserted at a time.
+
+    Returns:
+        ImportResult: Counts and the path of the rejection report.
+    """
+
+    fmt = detect_format(path, fmt)
+    report_path = f"{path}.rejected.csv"
+    result = ImportResult(report_path)
+
+    with open(path, encoding="utf-8-sig", newline="") as source, \
+            open(report_path, "w", encoding="utf-8", newline="") as report_file:
+        report = csv.writer(report_file)
+        report.writerow(["row", "name", "reason"])
+
+        def reject(row_number: int, name: str, reason: str) -> None:
+            result.rejected += 1
+            report.writerow([row_number, name, reason])
+            if len(result.sample) < ImportResult.SAMPLE_SIZE:
+                result.sample.append((row_number, name, reason))
+
+        for batch in batched(validate(READERS[fmt](source)), batch_size):
+            valid = []
+            for row_number, fields, contact, reason in batch:
+                if contact is None:
+                    reject(row_number, str(fields.get("name") or ""), reason)
+                else:
+                    valid.append((row_number, contact))
+
+            duplicates = set(map(id, contact_book.add_contacts(contact for _, contact in valid)))
+            for row_number, contact in valid:
+                if id(contact) in duplicates:
+                    reject(row_number, contact.name, "Contact with this name already exists")
+                else:
+                    result.added += 1
+
+    if not result.rejected:
+        os.remove(report_path)
+        result.report_path = None
+    return result
+
+
+def export_contacts(contacts: Iterable[Contact], path: str, fmt: Optional[str] = None) -> int:
+    """
+    Streams contacts to a CSV, vCard or JSON-lines file.
+
+    Args:
+        contacts (Iterable[Contact]): The contacts to write.
+        path (str): The output file.
+        fmt (Optional[str]): "csv", "vcard" or "jsonl"; inferred from the extension if omitted.
+
+    Returns:
+        int: The number of contacts written.
+    """
+
+    fmt = detect_format(path, fmt)
+    count = 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            writer = csv.writer(f)
+            writer.writerow(Contact.FIELDS)
+        for contact in contacts:
+            if fmt == "csv":
+                writer.writerow([getattr(contact, field) or "" for field in Contact.FIELDS])
+            elif fmt == "jsonl":
+                f.write(json.dumps(contact.to_dict(), ensure_ascii=False) + "\n")
+            else:
+                f.write(_vcard(contact))
+            count += 1
+    return count
+
+
+def _vcard(contact: Contact) -> str:
+    lines = ["BEGIN:VCARD", "VERSION:3.0", f"FN:{_vcard_escape(contact.name)}", f"N:{_vcard_escape(contact.name)};;;;"]
+    if contact.phone:
+        lines.append(f"TEL;TYPE=CELL:{contact.phone}")
+    if contact.email:
+        lines.append(f"EMAIL:{contact.email}")
+    if contact.address:
+        lines.append(f"ADR:;;{_vcard_escape(contact.address)};;;;")
+    if contact.birthday:
+        lines.append(f"BDAY:{contact.birthday}")
+    lines.append("END:VCARD")
+    return "\r\n".join(lines) + "\r\n"
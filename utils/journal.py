@@ -0,0 +1,637 @@
+import json
+import os
+import pickle
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.locking import FileLock, atomic_write
+from utils.metrics import metrics
+
+# Records are written to the OS after every append and fsync'd every FSYNC_BATCH records.
+FSYNC_BATCH = 64
+# Once this many records have been journaled since the last snapshot, a new snapshot is written.
+COMPACT_THRESHOLD = 10_000
+
+
+def load_snapshot(file_path: str) -> Tuple[Optional[Any], Dict]:
+    """
+    Load a snapshot written by save_snapshot, or a plain pickle file written by save_data.
+
+    The snapshot data is the first object in the file, so load_data can still read it; it is followed
+    by a metadata dictionary holding the sequence number of the last journal record it includes.
+
+    Args:
+        file_path (str): The path to the snapshot file.
+
+    Returns:
+        Tuple[Optional[Any], Dict]: The data (None if the file does not exist) and its metadata.
+    """
+
+    try:
+        with open(file_path, "rb") as f:
+            data = pickle.load(f)
+            try:
+                meta = pickle.load(f)
+            except EOFError:
+                meta = {}
+    except FileNotFoundError:
+        return None, {}
+    return data, meta
+
+
+def save_snapshot(payload: bytes, file_path: str) -> None:
+    """
+    Atomically replace a snapshot file with already pickled data.
+
+    Args:
+        payload (bytes): The pickled data followed by its pickled metadata.
+        file_path (str): The path to the snapshot file.
+    """
+
+    atomic_write(payload, file_path)
+
+
+class Journal:
+    """
+    Append-only log of mutation records stored as JSON lines.
+    """
+
+    def __init__(self, path: str, fsync_batch: int = FSYNC_BATCH):
+        self.path = path
+        self.fsync_batch = fsync_batch
+        self._file = None
+        self._unsynced = 0
+        self.deferred = False
+
+    def append(self, record: Dict) -> None:
+        """
+        Append a record to the journal.
+
+        The record reaches the OS immediately, so it survives the process being killed;
+        it is fsync'd to disk together with the rest of its batch. While ``deferred`` is set,
+        records stay in the file buffer until the next ``sync``.
+
+        Args:
+            record (Dict): A JSON-serializable record.
+        """
+
+        with metrics.timed("persistence:journal.append"):
+            if self._file is None:
+                self._file = open(self.path, "ab")
+            self._file.write((json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8"))
+            self._unsynced += 1
+            if self.deferred:
+                return
+            self._file.flush()
+        if self._unsynced >= self.fsync_batch:
+            self.sync()
+
+    def sync(self) -> None:
+        """
+        Force all appended records to disk.
+        """
+
+        if self._file is not None and self._unsynced:
+            with metrics.timed("persistence:journal.sync"):
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self) -> None:
+        """
+        Sync and close the journal file.
+        """
+
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def stat(self) -> Optional[os.stat_result]:
+        """
+        Return the status of the journal file (None if it does not exist), with appended records
+        included unless they are deferred.
+        """
+
+        try:
+            return os.fstat(self._file.fileno()) if self._file is not None else os.stat(self.path)
+        except FileNotFoundError:
+            return None
+
+    def moved(self) -> bool:
+        """
+        Return whether the open journal file was removed or replaced by another process (during
+        its compaction), so appends must go to a new file.
+        """
+
+        if self._file is None:
+            return False
+        try:
+            return os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def records(self) -> Iterator[Dict]:
+        """
+        Iterate over the records stored in the journal.
+
+        A truncated last line, left by a crash in the middle of a write, is ignored.
+
+        Yields:
+            Dict: The journaled records, oldest first.
+        """
+
+        return read_records(self.path)
+
+
+def _write_file(payload: bytes, file_path: str) -> None:
+    with open(file_path, "wb") as f:
+        f.write(payload)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_snapshot_and_exit(data: Any, seq: int, file_path: str) -> None:
+    """
+    Pickle the data into a snapshot file and exit. Runs in a forked child process, which must not
+    return into the parent's code or run its exit handlers.
+    """
+
+    status = 1
+    try:
+        _write_file(pickle.dumps(data) + pickle.dumps({"seq": seq}), file_path)
+        status = 0
+    finally:
+        os._exit(status)
+
+
+def read_records(path: str) -> Iterator[Dict]:
+    """
+    Iterate over the JSON-lines records of a journal file, ignoring a truncated last line.
+
+    Args:
+        path (str): The path to the journal file.
+
+    Yields:
+        Dict: The records, oldest first.
+    """
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    return
+    except FileNotFoundError:
+        return
+
+
+def read_records_from(path: str, offset: int) -> Tuple[List[Dict], int]:
+    """
+    Read the complete records of a journal file that start at or after a byte offset.
+
+    Args:
+        path (str): The path to the journal file.
+        offset (int): Where the previous read stopped.
+
+    Returns:
+        Tuple[List[Dict], int]: The records and the offset after the last complete one.
+    """
+
+    records = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    break
+                offset += len(line)
+    except FileNotFoundError:
+        pass
+    return records, offset
+
+
+class JournaledStore:
+    """
+    Persists a book as a snapshot file plus a write-ahead journal of its mutations.
+
+    Opening the store loads the snapshot, replays the journal on top of it and subscribes to the book,
+    so each later mutation is appended to the journal as a small record. Saving therefore costs in
+    proportion to the change rather than to the dataset. When the journal grows past a threshold,
+    the book is pickled in memory and the snapshot file is written by a background thread.
+
+    Every record carries a sequence number and the snapshot stores the last one it includes, so replay
+    skips records that a snapshot already covers even if a compaction was interrupted.
+
+    Several processes may use the same files. Journal appends, compactions and snapshot installs
+    hold an advisory lock, and the lock file keeps the sequence number of the last record written
+    by anyone (the generation on disk). Before appending, a store whose generation is behind first
+    catches up: records from other processes that touch different contacts or notes are replayed
+    into the book; if one touches the same record (or the journal was compacted away meanwhile)
+    the book is reloaded from disk and the pending change re-applied on top, so the newer data of
+    the other process is merged with this change rather than overwritten, and every process replays
+    the same history.
+
+    Args:
+        book (Any): The ContactBook or NoteBook to persist.
+        attribute (str): Name of the book attribute holding its data ("contacts" or "notes").
+        snapshot_path (str): The snapshot pickle file, e.g. "addressbook.pkl".
+        compact_threshold (int): Number of journaled records that triggers a compaction.
+    """
+
+    def __init__(self, book: Any, attribute: str, snapshot_path: str, compact_threshold: int = COMPACT_THRESHOLD):
+        self.book = book
+        self.attribute = attribute
+        self.snapshot_path = snapshot_path
+        base = os.path.splitext(snapshot_path)[0]
+        self.journal_path = f"{base}.journal"
+        self.compacting_path = f"{self.journal_path}.compacting"
+        self.lock_path = f"{base}.lock"
+        self.compact_threshold = compact_threshold
+        self.journal = Journal(self.journal_path)
+        self._file_lock: Optional[FileLock] = None
+        self._seq = 0
+        self._journal_id: Optional[int] = None
+        self._offset = 0
+        self._pending = 0
+        self._replaying = False
+        self._saved_version: Optional[int] = None
+        self._dirty_since: Optional[float] = None
+        self._compaction: Optional[threading.Thread] = None
+        self._child: Optional[Tuple[int, str, int]] = None
+        self._snapshot: Optional[Tuple[str, int]] = None
+
+    @property
+    def _lock(self) -> FileLock:
+        # Created on first use, so constructing a store touches no files.
+        if self._file_lock is None:
+            self._file_lock = FileLock(self.lock_path)
+        return self._file_lock
+
+    def open(self) -> None:
+        """
+        Load the snapshot, replay the journal and start journaling the book's mutations.
+        """
+
+        with self._lock:
+            self._reload()
+        self.book.subscribe(self._append)
+        if self._pending >= self.compact_threshold:
+            self.compact()
+
+    def close(self) -> None:
+        """
+        Stop journaling, flush the journal to disk and wait for a running compaction.
+        """
+
+        self.book.unsubscribe(self._append)
+        self.journal.close()
+        self.wait()
+        if self._file_lock is not None:
+            self._file_lock.close()
+            self._file_lock = None
+
+    def refresh(self) -> None:
+        """
+        Bring the book up to date with changes written by other processes. Costs one small read of
+        the lock file when there are none.
+        """
+
+        with self._lock:
+            self._catch_up()
+
+    @contextmanager
+    def deferred(self) -> Iterator[None]:
+        """
+        Buffer the journal records of the mutations made inside the block and write them to disk
+        together when it exits, instead of flushing each one.
+
+        Other processes wait for the block to finish before writing. A crash inside the block loses
+        the buffered records, so it suits scripted batches that can be re-run rather than
+        interactive edits.
+        """
+
+        with self._lock:
+            self.journal.deferred = True
+            try:
+                yield
+            finally:
+                self.journal.deferred = False
+                self.journal.sync()
+                self._follow_journal()
+
+    @property
+    def dirty(self) -> bool:
+        """
+        Whether the book changed since its snapshot was taken.
+        """
+
+        return self.book.version != self._saved_version
+
+    @property
+    def unsaved(self) -> int:
+        """
+        The number of journal records not yet included in a snapshot.
+        """
+
+        return self._pending
+
+    @property
+    def dirty_since(self) -> Optional[float]:
+        """
+        The ``time.monotonic()`` of the first change not yet included in a snapshot, if any.
+        """
+
+        return self._dirty_since
+
+    def save(self, background: bool = True) -> bool:
+        """
+        Snapshot the book if it changed since the last snapshot; an unchanged book costs nothing.
+
+        Args:
+            background (bool): Whether to write the snapshot in the background.
+
+        Returns:
+            bool: True if a snapshot was started.
+        """
+
+        if not self.dirty:
+            return False
+        self.compact(background)
+        return True
+
+    def poll(self) -> bool:
+        """
+        Install the snapshot of a finished background compaction, without waiting.
+
+        Returns:
+            bool: True if no compaction is running any more.
+        """
+
+        if self._child is not None:
+            pid, tmp_path, seq = self._child
+            finished, status = os.waitpid(pid, os.WNOHANG)
+            if not finished:
+                return False
+            self._child = None
+            self._written(tmp_path, seq, status)
+        if self._compaction is not None:
+            if self._compaction.is_alive():
+                return False
+            self._compaction = None
+        if self._snapshot is not None:
+            self._install(*self._snapshot)
+            self._snapshot = None
+        return True
+
+    def wait(self) -> None:
+        """
+        Wait for a running background compaction to finish and install its snapshot.
+        """
+
+        if self._child is not None:
+            pid, tmp_path, seq = self._child
+            _, status = os.waitpid(pid, 0)
+            self._child = None
+            self._written(tmp_path, seq, status)
+        if self._compaction is not None:
+            self._compaction.join()
+        self.poll()
+
+    def _written(self, tmp_path: str, seq: int, status: int) -> None:
+        if status == 0:
+            self._snapshot = (tmp_path, seq)
+        elif os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    def compact(self, background: bool = True) -> None:
+        """
+        Write a new snapshot of the book and discard the journal records it covers.
+
+        In the background, where ``os.fork`` is available, a child process pickles and writes the
+        book: it gets a copy-on-write copy of the memory, so the snapshot is consistent and the
+        caller is held up only by the fork. Elsewhere the book is pickled synchronously and only
+        the file write runs in a background thread. The snapshot replaces the current one the
+        next time the store writes, or when it is closed.
+
+        Forking while other threads run is safe here because the fork happens with the store lock
+        held, so no other thread of this process is appending to the journal or installing a
+        snapshot, and callers (a command, or the Autosaver holding the storage's busy lock) are the
+        only ones mutating the book, so the child sees no half-applied change. The child only
+        pickles the book, writes the file and leaves with ``os._exit``: it takes none of the locks
+        other threads may have held at the fork (logging, metrics, other stores) and does not flush
+        inherited file buffers. The FileLocks it inherits are reset by an at-fork handler (see
+        utils.locking), so the parent's ``flock`` is never released from the child.
+
+        Args:
+            background (bool): Whether to write the snapshot in the background.
+        """
+
+        self.wait()
+        with self._lock:
+            self._catch_up()
+            seq = self._seq
+            self.journal.close()
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, "rb") as src, open(self.compacting_path, "ab") as dst:
+                    dst.write(src.read())
+                    dst.flush()
+                    os.fsync(dst.fileno())
+                os.remove(self.journal_path)
+            self._follow_journal()
+            self._pending = 0
+            self._saved_version = self.book.version
+            self._dirty_since = None
+
+            tmp_path = f"{self.snapshot_path}.{os.getpid()}.{seq}.tmp"
+            data = getattr(self.book, self.attribute)
+            if background and hasattr(os, "fork"):
+                # Still inside the store lock: see the docstring for why forking here is safe.
+                with metrics.timed("persistence:snapshot.fork"):
+                    pid = os.fork()
+                if pid == 0:
+                    _write_snapshot_and_exit(data, seq, tmp_path)
+                self._child = (pid, tmp_path, seq)
+                return
+            with metrics.timed("persistence:snapshot.pickle"):
+                payload = pickle.dumps(data) + pickle.dumps({"seq": seq})
+
+        def write() -> None:
+            with metrics.timed("persistence:snapshot.write"):
+                _write_file(payload, tmp_path)
+            self._snapshot = (tmp_path, seq)
+
+        if background:
+            self._compaction = threading.Thread(target=write, name=f"compact-{self.snapshot_path}", daemon=True)
+            self._compaction.start()
+        else:
+            write()
+            self.wait()
+
+    def _install(self, tmp_path: str, seq: int) -> None:
+        """
+        Replace the snapshot with a written one unless another process installed a newer one, and
+        drop the compacted records it covers.
+        """
+
+        with self._lock:
+            generation, snapshot = self._lock.generations()
+            if seq < snapshot or (seq == snapshot and os.path.exists(self.snapshot_path)):
+                os.remove(tmp_path)
+                return
+            os.replace(tmp_path, self.snapshot_path)
+            self._lock.set_generations(max(generation, seq), seq)
+            # Another process may have compacted newer records meanwhile; those must stay.
+            newer = [record for record in read_records(self.compacting_path) if record["seq"] > seq]
+            if newer:
+                atomic_write(
+                    b"".join((json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8") for r in newer),
+                    self.compacting_path,
+                )
+            elif os.path.exists(self.compacting_path):
+                os.remove(self.compacting_path)
+
+    def _reload(self) -> None:
+        """
+        Replace the book's data with the snapshot and journals on disk. Call with the lock held.
+        """
+
+        data, meta = load_snapshot(self.snapshot_path)
+        self._replaying = True
+        try:
+            setattr(self.book, self.attribute, data if data is not None else {})
+            self._seq = meta.get("seq", 0)
+            self._pending = 0
+            for path in (self.compacting_path, self.journal_path):
+                for record in read_records(path):
+                    if record["seq"] > self._seq:
+                        self.book.apply(record)
+                        self._seq = record["seq"]
+                        self._pending += 1
+        finally:
+            self._replaying = False
+        # A process that died between bumping the generation and writing its record leaves a gap.
+        self._seq = max(self._seq, self._lock.generations()[0])
+        self._follow_journal()
+        if self._pending:
+            self._saved_version, self._dirty_since = None, time.monotonic()
+        else:
+            self._saved_version, self._dirty_since = self.book.version, None
+
+    def _follow_journal(self) -> None:
+        """
+        Remembers which journal file this store has read up to, and where.
+        """
+
+        if self.journal.moved():
+            self.journal.close()
+        stat = self.journal.stat()
+        self._journal_id, self._offset = (stat.st_ino, stat.st_size) if stat is not None else (None, 0)
+
+    def _unseen_records(self) -> List[Dict]:
+        """
+        Returns the records written by other processes since this store last looked, oldest first.
+        """
+
+        try:
+            journal_id = os.stat(self.journal_path).st_ino
+        except FileNotFoundError:
+            journal_id = None
+        if journal_id is not None and journal_id == self._journal_id:
+            records, _ = read_records_from(self.journal_path, self._offset)
+        else:
+            # Compacted by another process: the records are in the compacting file or a new journal.
+            if self.journal.moved():
+                self.journal.close()
+            records = [r for path in (self.compacting_path, self.journal_path) for r in read_records(path)]
+        return [record for record in records if record["seq"] > self._seq]
+
+    def _catch_up(self, pending: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Replays the changes other processes made since this store last wrote or read, merging the
+        pending record of a change this process has already applied to the book. Call with the
+        lock held.
+
+        Args:
+            pending (Optional[Dict]): The record of the change being journaled, if any.
+
+        Returns:
+            Optional[Dict]: The pending record, adjusted to the merged book (e.g. a note renumbered
+            because another process used its id).
+        """
+
+        generation, _ = self._lock.generations()
+        if generation <= self._seq:
+            return pending
+
+        records = self._unseen_records()
+        contiguous = bool(records) and records[0]["seq"] == self._seq + 1
+        keys = self.book.changed_keys(pending) if pending is not None else set()
+        conflict = any(keys & self.book.changed_keys(record) for record in records)
+        if contiguous and (not conflict or self.book.revert(pending)):
+            # A conflicting addition was undone: it is applied again after the other changes.
+            self._replaying = True
+            try:
+                for record in records:
+                    self.book.apply(record)
+                    self._seq = record["seq"]
+                    self._pending += 1
+                if conflict:
+                    pending = self.book.rebase(pending)
+                    self.book.apply(pending)
+            finally:
+                self._replaying = False
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+        else:
+            # The other process changed the same records, or its records were compacted away:
+            # start from the data on disk and apply this change on top of it.
+            self._reload()
+            if pending is not None:
+                pending = self.book.rebase(pending)
+                self._replaying = True
+                try:
+                    self.book.apply(pending)
+                finally:
+                    self._replaying = False
+        self._seq = max(self._seq, generation)
+        self._follow_journal()
+        return pending
+
+    def _append(self, record: Dict) -> Optional[Dict]:
+        """
+        Journals a mutation record of the book, after catching up with other processes.
+
+        Returns:
+            Optional[Dict]: The record as journaled, which differs from the given one when the
+            change had to be rebased (see ``_catch_up``); None for records being replayed.
+        """
+
+        if self._replaying:
+            return None
+        with self._lock:
+            if self._snapshot is not None:
+                self.wait()
+            record = self._catch_up(record)
+            if self.journal.moved():
+                self.journal.close()
+            self._seq += 1
+            # The generation is bumped before the record is written; see _reload.
+            self._lock.set_generations(self._seq, self._lock.generations()[1])
+            self.journal.append({"seq": self._seq, **record})
+            stat = self.journal.stat()
+            self._journal_id, self._offset = stat.st_ino, stat.st_size
+            self._pending += 1
+            if self._dirty_since is None:
+                self._dirty_since = time.monotonic()
+            # A compaction still writing the previous snapshot is left to finish first.
+            if self._pending >= self.compact_threshold and self.poll():
+                self.compact()
+        return record
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import threading
+import weakref
+from typing import Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: only threads of this process are excluded.
+    fcntl = None
+
+# Every open FileLock, reset in forked children (see _reopen_after_fork).
+_open_locks: "weakref.WeakSet[FileLock]" = weakref.WeakSet()
+
+
+def atomic_write(payload: bytes, file_path: str) -> None:
+    """
+    Replace a file with new contents so readers see either the old or the new file, never a part.
+
+    The data goes to a uniquely named temporary file in the same directory, is fsync'd and then
+    renamed over the target, so concurrent writers and a crash mid-write cannot corrupt it.
+
+    Args:
+        payload (bytes): The new contents.
+        file_path (str): The file to replace.
+    """
+
+    directory = os.path.dirname(os.path.abspath(file_path))
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{os.path.basename(file_path)}.", suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class FileLock:
+    """
+    Advisory lock shared by all processes using the same book files, plus the book's generation
+    counters.
+
+    The lock is an ``fcntl.flock`` on a small file that stores two numbers: the sequence number of
+    the last journal record written by any process (the generation of the data on disk) and the
+    generation included in the current snapshot. Reading them is enough to tell whether another
+    process changed the book. The lock is reentrant and also excludes other threads of this process.
+
+    A process forked while the lock is held (see JournaledStore.compact) shares the parent's lock
+    file description, and with it the ``flock``. The child therefore gets a fresh mutex and its own
+    file description (see ``_reopen_after_fork``): using the lock there neither deadlocks on the
+    parent's mutex nor releases the parent's ``flock``.
+
+    Args:
+        path (str): The lock file, created if missing.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        self._mutex = threading.RLock()
+        self._depth = 0
+        _open_locks.add(self)
+
+    def __enter__(self) -> "FileLock":
+        self._mutex.acquire()
+        if self._depth == 0 and fcntl is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX)
+            except BaseException:
+                self._mutex.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._depth -= 1
+        if self._depth == 0 and fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        self._mutex.release()
+
+    def generations(self) -> Tuple[int, int]:
+        """
+        Return the generation on disk and the generation of the snapshot (0 for a new lock file).
+        """
+
+        fields = os.pread(self._fd, 64, 0).split()
+        if len(fields) < 2:
+            return 0, 0
+        return int(fields[0]), int(fields[1])
+
+    def set_generations(self, data: int, snapshot: int) -> None:
+        """
+        Store the generation on disk and the generation of the snapshot. Call with the lock held.
+        """
+
+        line = f"{data} {snapshot}\n".encode().ljust(64)
+        os.pwrite(self._fd, line, 0)
+
+    def close(self) -> None:
+        """
+        Close the lock file.
+        """
+
+        _open_locks.discard(self)
+        os.close(self._fd)
+
+
+def _reopen_after_fork() -> None:
+    """
+    Give each open FileLock of a forked child a new mutex and file description, unlocked.
+
+    The mutex may have been held by a thread that does not exist in the child, and unlocking the
+    inherited descriptor would release the ``flock`` the parent holds.
+    """
+
+    for lock in list(_open_locks):
+        try:
+            fd = os.open(lock.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            continue
+        os.close(lock._fd)
+        lock._fd = fd
+        lock._mutex = threading.RLock()
+        lock._depth = 0
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reopen_after_fork)
@@ -0,0 +1,334 @@
+import json
+import math
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List
+
+# Histogram buckets grow by 2 ** (1/8), about 9% apart, starting at one microsecond.
+_BUCKET_BASE = 2 ** (1 / 8)
+_BUCKET_FLOOR = 1e-6
+_NULL = nullcontext()
+
+
+class Histogram:
+    """
+    Latency histogram with logarithmic buckets, so memory stays constant however many values are
+    recorded and percentiles are accurate to about 9%.
+    """
+
+    def __init__(self):
+        self.buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """
+        Add a latency.
+
+        Args:
+            seconds (float): The latency in seconds.
+        """
+
+        index = 0 if seconds <= _BUCKET_FLOOR else int(math.log(seconds / _BUCKET_FLOOR, _BUCKET_BASE)) + 1
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, fraction: float) -> float:
+        """
+        Return the latency below which the given fraction of recorded values fall.
+
+        Args:
+            fraction (float): E.g. 0.95 for the 95th percentile.
+
+        Returns:
+            float: The upper bound of the bucket holding that percentile, in seconds (0 if empty).
+        """
+
+        if not self.count:
+            return 0.0
+        rank = math.ceil(fraction * self.count)
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(_BUCKET_FLOOR * _BUCKET_BASE ** index, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """
+        Return the count, mean, p50, p95, p99 and max, in seconds.
+        """
+
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+            "max": self.max,
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return the summary plus the raw buckets as (upper bound in seconds, count) pairs.
+        """
+
+        return {
+            **self.summary(),
+            "buckets": [[_BUCKET_FLOOR * _BUCKET_BASE ** index, self.buckets[index]] for index in sorted(self.buckets)],
+        }
+
+
+class CommandStats:
+    """
+    Counters and timings of one command.
+
+    Attributes:
+        calls (int): Number of calls.
+        errors (int): Number of calls that ended in an input error.
+        latency (Histogram): Time spent in the command, excluding waiting for user input.
+        service (Histogram): Part of the latency spent in contact and note book calls.
+        render (Histogram): Part of the latency spent formatting and writing output.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.latency = Histogram()
+        self.service = Histogram()
+        self.render = Histogram()
+
+
+class _Frame:
+    def __init__(self, stats: CommandStats):
+        self.stats = stats
+        self.start = time.perf_counter()
+        self.waited = 0.0
+        self.service = 0.0
+
+
+class Metrics:
+    """
+    Per-command call and error counters and latency histograms, plus timings of book (service)
+    calls and persistence operations.
+
+    Everything is off unless ``enabled`` is set; disabled, each hook costs a flag check.
+
+    Attributes:
+        enabled (bool): Whether measurements are recorded.
+        commands (Dict[str, CommandStats]): Statistics per command function name.
+        operations (Dict[str, Histogram]): Timings per service or persistence operation,
+            e.g. "service:contacts.find" or "persistence:journal.append".
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.commands: Dict[str, CommandStats] = {}
+        self.operations: Dict[str, Histogram] = {}
+        self._frames: List[_Frame] = []
+        self._proxies: Dict[int, "_TimedBook"] = {}
+
+    def run_command(self, name: str, func: Callable, args: tuple, kwargs: dict, errors: tuple) -> Any:
+        """
+        Call a command function, counting the call and timing it.
+
+        Input errors (``errors``) are counted and re-raised. A lazily rendered result (an iterator
+        of text chunks) keeps being timed while it is consumed, and errors it raises are counted
+        as well.
+
+        Args:
+            name (str): The command name.
+            func (Callable): The command function.
+            args (tuple): Positional arguments.
+            kwargs (dict): Keyword arguments.
+            errors (tuple): The exception types counted as errors.
+
+        Returns:
+            Any: The command result.
+        """
+
+        stats = self.commands.get(name)
+        if stats is None:
+            stats = self.commands[name] = CommandStats()
+        stats.calls += 1
+
+        frame = _Frame(stats)
+        self._frames.append(frame)
+        try:
+            result = func(*args, **kwargs)
+        except errors:
+            stats.errors += 1
+            self._finish(frame)
+            raise
+        except BaseException:
+            self._finish(frame)
+            raise
+
+        if isinstance(result, str):
+            self._finish(frame)
+            return result
+        self._frames.remove(frame)
+        return self._follow(frame, result, errors)
+
+    def _follow(self, frame: _Frame, chunks: Iterable[str], errors: tuple) -> Iterator[str]:
+        self._frames.append(frame)
+        try:
+            yield from chunks
+        except errors:
+            frame.stats.errors += 1
+            raise
+        finally:
+            self._finish(frame)
+
+    def _finish(self, frame: _Frame) -> None:
+        if frame in self._frames:
+            self._frames.remove(frame)
+        latency = time.perf_counter() - frame.start - frame.waited
+        frame.stats.latency.record(latency)
+        frame.stats.service.record(frame.service)
+        frame.stats.render.record(max(latency - frame.service, 0.0))
+
+    def waiting(self):
+        """
+        Context manager excluding the time spent inside it (waiting for user input) from the
+        current command's latency.
+        """
+
+        if not self.enabled or not self._frames:
+            return _NULL
+        return self._waiting(self._frames[-1])
+
+    @contextmanager
+    def _waiting(self, frame: _Frame) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            frame.waited += time.perf_counter() - start
+
+    def timed(self, operation: str):
+        """
+        Context manager timing a persistence (or other) operation under the given name.
+
+        Args:
+            operation (str): The operation name, e.g. "persistence:journal.sync".
+        """
+
+        if not self.enabled:
+            return _NULL
+        return self._timed(operation)
+
+    @contextmanager
+    def _timed(self, operation: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(operation, time.perf_counter() - start)
+
+    def record(self, operation: str, seconds: float) -> None:
+        """
+        Add a timing of an operation.
+
+        Args:
+            operation (str): The operation name.
+            seconds (float): The elapsed time.
+        """
+
+        histogram = self.operations.get(operation)
+        if histogram is None:
+            histogram = self.operations[operation] = Histogram()
+        histogram.record(seconds)
+
+    def instrument(self, book: Any, label: str) -> Any:
+        """
+        Return a proxy of a book that times its public method calls as service calls, or the book
+        itself when instrumentation is disabled.
+
+        Args:
+            book (Any): A contact or note book.
+            label (str): "contacts" or "notes".
+
+        Returns:
+            Any: The proxy, or the book.
+        """
+
+        if not self.enabled or book is None:
+            return book
+        proxy = self._proxies.get(id(book))
+        if proxy is None or proxy._book is not book:
+            proxy = self._proxies[id(book)] = _TimedBook(self, book, label)
+        return proxy
+
+    def _service_call(self, operation: str, method: Callable, args: tuple, kwargs: dict) -> Any:
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.record(operation, elapsed)
+            if self._frames:
+                self._frames[-1].service += elapsed
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        Return all statistics as JSON-serializable data, latencies in seconds.
+        """
+
+        return {
+            "commands": {
+                name: {
+                    "calls": stats.calls,
+                    "errors": stats.errors,
+                    "latency": stats.latency.to_dict(),
+                    "service": stats.service.to_dict(),
+                    "render": stats.render.to_dict(),
+                }
+                for name, stats in sorted(self.commands.items())
+            },
+            "operations": {name: histogram.to_dict() for name, histogram in sorted(self.operations.items())},
+        }
+
+    def dump(self, path: str) -> None:
+        """
+        Write the statistics to a JSON file.
+
+        Args:
+            path (str): The output file.
+        """
+
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
+            f.write("\n")
+
+
+class _TimedBook:
+    """
+    Forwards attribute access to a book, timing calls of its public methods.
+    """
+
+    def __init__(self, metrics: Metrics, book: Any, label: str):
+        self._metrics = metrics
+        self._book = book
+        self._label = label
+
+    def __len__(self) -> int:
+        return len(self._book)
+
+    def __getattr__(self, name: str) -> Any:
+        attribute = getattr(self._book, name)
+        if name.startswith("_") or not callable(attribute):
+            return attribute
+
+        operation = f"service:{self._label}.{name}"
+
+        def call(*args, **kwargs):
+            return self._metrics._service_call(operation, attribute, args, kwargs)
+
+        return call
+
+
+metrics = Metrics()
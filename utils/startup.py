@@ -0,0 +1,69 @@
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, TextIO, Tuple
+
+
+class StartupProfile:
+    """
+    Records how long the phases of startup take, e.g. importing a module or loading a book.
+
+    Times are measured from when this module was first imported, which main.py does before anything
+    else. Phases may run lazily after the first prompt or in background threads; each report prints
+    the phases finished since the previous one.
+
+    Attributes:
+        enabled (bool): Whether reports are printed (set by --startup-profile).
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.enabled = False
+        self._phases: List[Tuple[str, float, float]] = []
+        self._reported = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, label: str) -> Iterator[None]:
+        """
+        Time the block as a startup phase.
+
+        Args:
+            label (str): The phase name, e.g. "load contacts".
+        """
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._phases.append((label, start - self.origin, time.perf_counter() - start))
+
+    def report(self, milestone: Optional[str] = None, out: Optional[TextIO] = None) -> None:
+        """
+        Print the phases finished since the last report, if profiling is enabled.
+
+        Args:
+            milestone (Optional[str]): A point reached now, printed with its time since startup
+                (e.g. "first prompt").
+            out (Optional[TextIO]): The stream to write to, stderr by default.
+        """
+
+        if not self.enabled:
+            return
+
+        out = out or sys.stderr
+        with self._lock:
+            phases = self._phases[self._reported:]
+            self._reported = len(self._phases)
+
+        for label, start, duration in phases:
+            out.write(f"[startup] {label:<36} {duration * 1000:8.1f} ms  (at {start * 1000:.1f} ms)\n")
+        if milestone:
+            elapsed = time.perf_counter() - self.origin
+            out.write(f"[startup] {milestone:<36} {elapsed * 1000:8.1f} ms since start\n")
+        out.flush()
+
+
+profile = StartupProfile()
@@ -1,17 +1,21 @@
 import pickle
-from typing import Any, Callable, Optional
+from typing import Any, Callable, Iterator, Optional
+
+from utils.locking import atomic_write
+from utils.metrics import metrics
+
+INPUT_ERRORS = (KeyError, ValueError, IndexError)
 
 
 def save_data(book: Any, file_path: str) -> None:
     """
-    Save a Python object to a file using pickle.
+    Save a Python object to a file using pickle, replacing the file atomically.
 
     Args:
         book (Any): The object to serialize and save.
         file_path (str): The path to the file where the object will be stored.
     """
-    with open(file_path, "wb") as f:
-        pickle.dump(book, f)
+    atomic_write(pickle.dumps(book), file_path)
 
 
 def load_data(file_path: str) -> Optional[Any]:
@@ -35,6 +39,12 @@ def input_error(func: Callable) -> Callable:
     """
     Decorator that wraps a function and handles common input-related exceptions.
 
+    When instrumentation is enabled (see utils.metrics), it also counts the calls and errors of the
+    command and records its latency, excluding time spent waiting for user input.
+
+    A lazily rendered result (an iterator of text chunks) is handled the same way while it is
+    consumed: an error raised mid-stream ends the output with the error message.
+
     Args:
         func (Callable): The function to wrap.
 
@@ -44,7 +54,26 @@ def input_error(func: Callable) -> Callable:
     """
     def wrapper(*args, **kwargs) -> Any:
         try:
-            return func(*args, **kwargs)
-        except (KeyError, ValueError, IndexError) as e:
+            if metrics.enabled:
+                result = metrics.run_command(func.__name__, func, args, kwargs, INPUT_ERRORS)
+            else:
+                result = func(*args, **kwargs)
+        except INPUT_ERRORS as e:
             return f"Error: {str(e)}"
+        if isinstance(result, Iterator):
+            return _guarded(result)
+        return result
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
     return wrapper
+
+
+def _guarded(chunks: Iterator[str]) -> Iterator[str]:
+    """
+    Yields the chunks of a lazily rendered result, turning an input error into a final error line.
+    """
+
+    try:
+        yield from chunks
+    except INPUT_ERRORS as e:
+        yield f"Error: {str(e)}\n"
@@ -0,0 +1,57 @@
+import re
+from datetime import date
+
+EMAIL_PATTERN = re.compile(r"[^@]+@[^@]+\.[^@]+")
+PHONE_PATTERN = re.compile(r"^\+?\d{10,15}$")
+# Mirrors what datetime.strptime(value, "%Y-%m-%d") accepts.
+BIRTHDAY_PATTERN = re.compile(r"(\d{4})-(1[0-2]|0[1-9]|[1-9])-(3[01]|[12]\d|0[1-9]|[1-9]| [1-9])")
+
+
+def is_valid_email(email: str) -> bool:
+    """
+    Check if the given email address is valid.
+
+    Args:
+        email (str): Email address to validate.
+
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+
+    return bool(EMAIL_PATTERN.match(email))
+
+
+def is_valid_phone(phone: str) -> bool:
+    """
+    Validate the phone number format.
+
+    Args:
+        phone (str): Phone number to validate.
+
+    Returns:
+        bool: True if valid, False otherwise.
+    """
+
+    return bool(PHONE_PATTERN.match(phone))
+
+
+def is_valid_birthday(birthday_str: str, today: date = None) -> bool:
+    """
+    Validate the birthday format and ensure it is not in the future.
+
+    Args:
+        birthday_str (str): Birthday string in 'YYYY-MM-DD' format.
+        today (date): Reference date, defaults to today; pass it when validating many values.
+
+    Returns:
+        bool: True if valid and not in future, False otherwise.
+    """
+
+    match = BIRTHDAY_PATTERN.fullmatch(birthday_str)
+    if not match:
+        return False
+    try:
+        bday = date(*(int(part) for part in match.groups()))
+    except ValueError:
+        return False
+    return bday <= (today or date.today())